@@ -0,0 +1 @@
+# Offline analytics over archived verification history
@@ -0,0 +1,100 @@
+"""Offline analytics CLI over archived verification history.
+
+Usage:
+    python -m src.analytics archive/ --since 2025-07-01 --until 2025-10-01
+    python -m src.analytics export.csv --chat -1001234567890 --csv-dir reports/
+
+Reads archive files (*.jsonl.zst) and API exports (*.ndjson, *.jsonl, *.csv)
+without touching the live database.
+"""
+
+import argparse
+import csv
+import logging
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from src.analytics.loader import load_history
+from src.analytics.reports import REPORTS, Report
+
+
+def _parse_date(value: str) -> datetime:
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid date: {value} (expected YYYY-MM-DD[THH:MM:SS])")
+
+
+def format_table(report: Report) -> str:
+    """Render a report as a plain-text table."""
+    cells = [report.headers] + [[str(value) for value in row] for row in report.rows]
+    widths = [max(len(row[i]) for row in cells) for i in range(len(report.headers))]
+
+    lines = [report.title, "=" * len(report.title)]
+    for n, row in enumerate(cells):
+        lines.append("  ".join(cell.rjust(width) for cell, width in zip(row, widths)))
+        if n == 0:
+            lines.append("  ".join("-" * width for width in widths))
+    return "\n".join(lines)
+
+
+def write_csv(report: Report, directory: Path) -> Path:
+    """Write a report to <directory>/<report name>.csv."""
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{report.name}.csv"
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(report.headers)
+        writer.writerows(report.rows)
+    return path
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.analytics",
+        description="Aggregate archived TGuard verification history."
+    )
+    parser.add_argument("paths", nargs="+", help="Archive/export files or directories containing them")
+    parser.add_argument("--since", type=_parse_date, help="Only include requests at or after this UTC time")
+    parser.add_argument("--until", type=_parse_date, help="Only include requests before this UTC time")
+    parser.add_argument("--chat", type=int, action="append", dest="chat_ids", help="Only include this chat (repeatable)")
+    parser.add_argument(
+        "--report",
+        choices=list(REPORTS),
+        action="append",
+        dest="reports",
+        help="Report to produce (repeatable, default: all)"
+    )
+    parser.add_argument("--csv-dir", type=Path, help="Also write each report as CSV into this directory")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    args = build_parser().parse_args(argv)
+
+    try:
+        history = load_history(args.paths, since=args.since, until=args.until, chat_ids=args.chat_ids)
+    except FileNotFoundError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    print(f"{len(history)} records loaded\n")
+
+    for name in args.reports or REPORTS:
+        report = REPORTS[name](history)
+        print(format_table(report))
+        print()
+        if args.csv_dir:
+            write_csv(report, args.csv_dir)
+
+    if args.csv_dir:
+        print(f"CSV reports written to {args.csv_dir}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""Load archived or exported verification history into columnar arrays."""
+
+import csv
+import io
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import zstandard
+
+logger = logging.getLogger(__name__)
+
+# File suffixes understood by the loader (archive files, export files)
+SUPPORTED_SUFFIXES = (".jsonl.zst", ".jsonl", ".ndjson", ".csv")
+
+_TIME_FIELDS = ("request_time", "session_created_time", "session_completed_time")
+
+
+@dataclass
+class HistoryColumns:
+    """Verification history as one numpy array per field."""
+    chat_id: np.ndarray  # int64
+    status: np.ndarray  # str, "" for sessions without a join request
+    request_type: np.ndarray  # str
+    verification_completed: np.ndarray  # bool
+    request_time: np.ndarray  # datetime64[us]
+    session_created_time: np.ndarray  # datetime64[us]
+    session_completed_time: np.ndarray  # datetime64[us]
+
+    def __len__(self) -> int:
+        return len(self.chat_id)
+
+    def select(self, mask: np.ndarray) -> "HistoryColumns":
+        """Get the rows where mask is True."""
+        return HistoryColumns(**{name: getattr(self, name)[mask] for name in self.__dataclass_fields__})
+
+
+def _is_supported(path: Path) -> bool:
+    return any(path.name.endswith(suffix) for suffix in SUPPORTED_SUFFIXES)
+
+
+def discover_files(paths: Iterable[str]) -> List[Path]:
+    """Expand files and directories into the sorted list of history files to read."""
+    files = []
+    for raw in paths:
+        path = Path(raw)
+        if path.is_dir():
+            files.extend(sorted(p for p in path.iterdir() if p.is_file() and _is_supported(p)))
+        elif path.is_file():
+            files.append(path)
+        else:
+            raise FileNotFoundError(f"History file or directory not found: {raw}")
+    return files
+
+
+def _read_records(path: Path) -> Iterator[Dict[str, Any]]:
+    """Yield history records from a JSONL (optionally zstd-compressed) or CSV file."""
+    if path.name.endswith(".zst"):
+        with open(path, "rb") as fh:
+            reader = zstandard.ZstdDecompressor().stream_reader(fh)
+            for line in io.TextIOWrapper(reader, encoding="utf-8"):
+                if line.strip():
+                    yield json.loads(line)
+    elif path.suffix == ".csv":
+        with open(path, newline="", encoding="utf-8") as fh:
+            yield from csv.DictReader(fh)
+    else:
+        with open(path, encoding="utf-8") as fh:
+            for line in fh:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _as_bool(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "t", "yes")
+    return bool(value)
+
+
+def _as_time(value: Any) -> str:
+    return value if value else "NaT"
+
+
+def load_history(
+        paths: Iterable[str],
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        chat_ids: Optional[List[int]] = None
+) -> HistoryColumns:
+    """Load history files into columns, filtered by request time window and chats."""
+    chat_id: List[int] = []
+    status: List[str] = []
+    request_type: List[str] = []
+    completed: List[bool] = []
+    times: Dict[str, List[str]] = {field: [] for field in _TIME_FIELDS}
+
+    for path in discover_files(paths):
+        count = 0
+        for record in _read_records(path):
+            chat_id.append(int(record.get("chat_id") or 0))
+            status.append(record.get("status") or "")
+            request_type.append(record.get("request_type") or "")
+            completed.append(_as_bool(record.get("verification_completed") or record.get("captcha_completed")))
+            for field in _TIME_FIELDS:
+                times[field].append(_as_time(record.get(field)))
+            count += 1
+        logger.info(f"Loaded {count} records from {path}")
+
+    columns = HistoryColumns(
+        chat_id=np.array(chat_id, dtype=np.int64),
+        status=np.array(status, dtype=str),
+        request_type=np.array(request_type, dtype=str),
+        verification_completed=np.array(completed, dtype=bool),
+        **{field: np.array(values, dtype="datetime64[us]") for field, values in times.items()}
+    )
+
+    # Sessions archived without a join request are placed on their creation time
+    reference_time = np.where(
+        np.isnat(columns.request_time), columns.session_created_time, columns.request_time
+    )
+    mask = np.ones(len(columns), dtype=bool)
+    if since is not None:
+        mask &= reference_time >= np.datetime64(since, "us")
+    if until is not None:
+        mask &= reference_time < np.datetime64(until, "us")
+    if chat_ids:
+        mask &= np.isin(columns.chat_id, np.array(chat_ids, dtype=np.int64))
+
+    return columns.select(mask)
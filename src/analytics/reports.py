@@ -0,0 +1,159 @@
+"""Vectorized aggregate reports over verification history columns."""
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from src.analytics.loader import HistoryColumns
+
+# Solve latency histogram bucket edges in seconds
+LATENCY_BUCKETS = (0, 5, 10, 20, 30, 60, 120, 300, 600, np.inf)
+
+
+@dataclass
+class Report:
+    """A tabular report."""
+    name: str
+    title: str
+    headers: List[str]
+    rows: List[List[Any]]
+
+
+def _rate(part: np.ndarray, total: np.ndarray) -> np.ndarray:
+    return np.divide(part * 100.0, total, out=np.zeros(len(total)), where=total > 0)
+
+
+def _requests_only(history: HistoryColumns) -> HistoryColumns:
+    return history.select(history.status != "")
+
+
+def _solve_seconds(history: HistoryColumns):
+    """Get (row mask, solve latency in seconds) for sessions that were completed."""
+    mask = ~np.isnat(history.session_completed_time) & ~np.isnat(history.session_created_time)
+    latency = (history.session_completed_time[mask] - history.session_created_time[mask]) / np.timedelta64(1, "s")
+    return mask, latency
+
+
+def chat_funnel(history: HistoryColumns) -> Report:
+    """Per-chat funnel: requests -> captcha solved -> approved, plus rejections and expiries."""
+    requests = _requests_only(history)
+    chats, index = np.unique(requests.chat_id, return_inverse=True)
+    size = len(chats)
+
+    total = np.bincount(index, minlength=size)
+    solved = np.bincount(index, weights=requests.verification_completed, minlength=size).astype(np.int64)
+    by_status = {
+        status: np.bincount(index, weights=requests.status == status, minlength=size).astype(np.int64)
+        for status in ("approved", "rejected", "expired", "pending")
+    }
+    solve_rate = _rate(solved, total)
+    approval_rate = _rate(by_status["approved"], total)
+
+    rows = [
+        [int(chats[i]), int(total[i]), int(solved[i]), int(by_status["approved"][i]),
+         int(by_status["rejected"][i]), int(by_status["expired"][i]), int(by_status["pending"][i]),
+         round(float(solve_rate[i]), 1), round(float(approval_rate[i]), 1)]
+        for i in np.argsort(-total, kind="stable")
+    ]
+    return Report(
+        name="chat_funnel",
+        title="Per-chat funnel",
+        headers=["chat_id", "requests", "solved", "approved", "rejected", "expired", "pending",
+                 "solve_rate_%", "approval_rate_%"],
+        rows=rows
+    )
+
+
+def latency_histogram(history: HistoryColumns) -> Report:
+    """Histogram of captcha solve latency (session created -> completed)."""
+    _, latency = _solve_seconds(history)
+    counts, _ = np.histogram(latency, bins=np.array(LATENCY_BUCKETS, dtype=float))
+    share = _rate(counts, np.full(len(counts), max(len(latency), 1)))
+
+    rows = []
+    for i, count in enumerate(counts):
+        low, high = LATENCY_BUCKETS[i], LATENCY_BUCKETS[i + 1]
+        label = f"{low}s+" if np.isinf(high) else f"{low}-{high}s"
+        rows.append([label, int(count), round(float(share[i]), 1)])
+
+    return Report(
+        name="latency_histogram",
+        title="Solve latency histogram",
+        headers=["bucket", "sessions", "share_%"],
+        rows=rows
+    )
+
+
+def latency_by_chat(history: HistoryColumns) -> Report:
+    """Solve latency percentiles per chat."""
+    mask, latency = _solve_seconds(history)
+    chat_ids = history.chat_id[mask]
+
+    order = np.argsort(chat_ids, kind="stable")
+    chat_ids, latency = chat_ids[order], latency[order]
+    chats, starts, counts = np.unique(chat_ids, return_index=True, return_counts=True)
+
+    rows = []
+    for chat, start, count in zip(chats, starts, counts):
+        values = latency[start:start + count]
+        p50, p90, p99 = np.percentile(values, (50, 90, 99))
+        rows.append([int(chat), int(count), round(float(values.mean()), 2),
+                     round(float(p50), 2), round(float(p90), 2), round(float(p99), 2)])
+
+    rows.sort(key=lambda row: row[1], reverse=True)
+    return Report(
+        name="latency_by_chat",
+        title="Solve latency by chat (seconds)",
+        headers=["chat_id", "solved", "mean", "p50", "p90", "p99"],
+        rows=rows
+    )
+
+
+def expiry_by_hour(history: HistoryColumns) -> Report:
+    """Share of join requests that expired, by UTC hour of the request."""
+    requests = _requests_only(history)
+    requests = requests.select(~np.isnat(requests.request_time))
+    hours = (requests.request_time.astype("datetime64[h]").astype(np.int64) % 24)
+
+    total = np.bincount(hours, minlength=24)
+    expired = np.bincount(hours, weights=requests.status == "expired", minlength=24).astype(np.int64)
+    rate = _rate(expired, total)
+
+    return Report(
+        name="expiry_by_hour",
+        title="Expiry rate by hour (UTC)",
+        headers=["hour", "requests", "expired", "expiry_rate_%"],
+        rows=[[hour, int(total[hour]), int(expired[hour]), round(float(rate[hour]), 1)] for hour in range(24)]
+    )
+
+
+def request_types(history: HistoryColumns) -> Report:
+    """Request counts broken down by request type and status."""
+    requests = _requests_only(history)
+    statuses = ("approved", "rejected", "expired", "pending")
+    types, index = np.unique(requests.request_type, return_inverse=True)
+    size = len(types)
+
+    total = np.bincount(index, minlength=size)
+    by_status = [
+        np.bincount(index, weights=requests.status == status, minlength=size).astype(np.int64)
+        for status in statuses
+    ]
+
+    return Report(
+        name="request_types",
+        title="Request type breakdown",
+        headers=["request_type", "requests", *statuses],
+        rows=[[str(types[i]), int(total[i]), *(int(counts[i]) for counts in by_status)] for i in range(size)]
+    )
+
+
+# Registry of available reports, in output order
+REPORTS: Dict[str, Callable[[HistoryColumns], Report]] = {
+    "chat_funnel": chat_funnel,
+    "latency_histogram": latency_histogram,
+    "latency_by_chat": latency_by_chat,
+    "expiry_by_hour": expiry_by_hour,
+    "request_types": request_types,
+}
@@ -0,0 +1,182 @@
+"""Admission control: shed low-priority traffic while the API is overloaded.
+
+When PostgreSQL slows down, requests pile up waiting for pool connections
+until they time out, and everything gets slow at once. The controller
+watches three signals and turns them into one pressure value (1.0 = at a
+configured threshold):
+
+- pool wait: how long a probe waits to check out a database connection
+- in-flight requests handled by this process
+- event loop lag: how late a periodic timer fires
+
+Past a priority's pressure level its requests are answered immediately
+with 503 and Retry-After, lowest priority first: status polls, then page
+loads, and verification submissions last.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.config.settings import AdmissionConfig, config
+from src.database import connection
+from src.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Pressure at which each priority starts being shed
+SHED_PRESSURE = {
+    "status": 1.0,
+    "page": 1.5,
+    "completion": 2.0,
+}
+
+admission_shed = metrics.counter(
+    "tguard_admission_shed_total",
+    "Requests rejected by admission control",
+    ("priority",)
+)
+
+
+# Long-poll and SSE endpoints, not counted as in-flight work
+WAITING_PATHS = frozenset({"/api/v1/verification-wait", "/api/v1/verification-events"})
+
+
+def request_priority(method: str, path: str) -> Optional[str]:
+    """Shedding priority of a request (None = never shed, e.g. health checks and static files)."""
+    if method == "GET" and path.startswith("/api/v1/verification-status/"):
+        return "status"
+    if method == "POST" and path == "/api/verification/status-batch":
+        return "status"
+    if method == "GET" and path in WAITING_PATHS:
+        return "status"
+    if method == "GET" and path in ("/verify", "/api/v1/captcha-config"):
+        return "page"
+    if path.startswith("/api/verification/"):
+        return "page"
+    if method == "POST" and path == "/api/v1/verify":
+        return "completion"
+    return None
+
+
+class AdmissionController:
+    """Tracks load signals and decides which priorities to shed."""
+
+    def __init__(self, admission_config: AdmissionConfig):
+        self.config = admission_config
+        self.in_flight = 0
+        self.loop_lag = 0.0
+        self.pool_wait = 0.0
+        self._probe_started: Optional[float] = None
+        self._tasks: list = []
+
+    def current_pool_wait(self) -> float:
+        """Last probe's checkout wait, or the wait so far of a probe still waiting."""
+        if self._probe_started is not None:
+            return max(self.pool_wait, time.monotonic() - self._probe_started)
+        return self.pool_wait
+
+    def pressure(self) -> float:
+        return max(
+            self.in_flight / self.config.max_in_flight,
+            self.loop_lag * 1000 / self.config.max_loop_lag_ms,
+            self.current_pool_wait() * 1000 / self.config.max_pool_wait_ms
+        )
+
+    def should_shed(self, priority: str) -> bool:
+        return self.pressure() >= SHED_PRESSURE[priority]
+
+    async def _monitor_loop_lag(self) -> None:
+        interval = self.config.probe_interval_seconds
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(interval)
+            lag = max(0.0, time.monotonic() - started - interval)
+            # Halve old readings every interval, so one stall keeps counting for a few probes
+            self.loop_lag = max(lag, self.loop_lag / 2)
+
+    async def _probe_pool(self) -> None:
+        # Probes stop waiting well past the threshold; pressure is already maximal by then
+        timeout = self.config.max_pool_wait_ms * 4 / 1000
+        while True:
+            engine = connection.engine
+            if engine is not None:
+                self._probe_started = time.monotonic()
+                try:
+                    async with asyncio.timeout(timeout):
+                        async with engine.connect():
+                            pass
+                except TimeoutError:
+                    pass
+                except Exception as e:
+                    logger.warning(f"Database pool probe failed: {e}")
+                finally:
+                    self.pool_wait = time.monotonic() - self._probe_started
+                    self._probe_started = None
+            await asyncio.sleep(self.config.probe_interval_seconds)
+
+    def start(self) -> None:
+        """Start the background monitors."""
+        self._tasks = [
+            asyncio.create_task(self._monitor_loop_lag()),
+            asyncio.create_task(self._probe_pool()),
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def snapshot(self) -> Dict[str, Any]:
+        pressure = self.pressure()
+        return {
+            "pressure": round(pressure, 2),
+            "in_flight": self.in_flight,
+            "loop_lag_ms": round(self.loop_lag * 1000, 1),
+            "pool_wait_ms": round(self.current_pool_wait() * 1000, 1),
+            "shedding": [priority for priority, level in SHED_PRESSURE.items() if pressure >= level]
+        }
+
+
+class AdmissionMiddleware:
+    """ASGI middleware counting in-flight requests and rejecting shed ones with 503."""
+
+    def __init__(self, app: ASGIApp, controller: "AdmissionController"):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        priority = request_priority(scope["method"], scope["path"])
+        if priority is not None and self.controller.should_shed(priority):
+            admission_shed.inc(priority=priority)
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": "服务繁忙，请稍后重试"},
+                headers={"Retry-After": str(self.controller.config.retry_after_seconds)}
+            )
+            await response(scope, receive, send)
+            return
+
+        # Clients waiting for status pushes hold no resources while idle
+        if scope["path"] in WAITING_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        self.controller.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.in_flight -= 1
+
+
+# Global admission controller
+admission_controller = AdmissionController(config.admission)
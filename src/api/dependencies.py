@@ -1,26 +1,34 @@
 """FastAPI dependencies for authentication and authorization."""
 
+import hmac
 import logging
 
-from fastapi import Header, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 
+from src.api.services.apikeys import ApiClient, ApiKeyLookupError, QuotaExceededError, api_key_store
 from src.config.settings import config
 
 logger = logging.getLogger(__name__)
 
+# Client name of the API key from config.api.api_key
+DEFAULT_API_CLIENT = "default"
 
-async def verify_api_key(x_api_key: str = Header(..., alias="X-API-Key")) -> str:
+
+async def verify_api_key(x_api_key: str = Header(..., alias="X-API-Key")) -> ApiClient:
     """
-    Verify API Key from X-API-Key header.
-    
+    Verify API Key from X-API-Key header and count the request against its quota.
+
+    The key from config.api.api_key is accepted as the "default" client
+    without a quota; other keys are looked up in the api_keys table.
+
     Args:
         x_api_key: API key from X-API-Key header
-        
+
     Returns:
-        The API key if valid
-        
+        The authenticated client
+
     Raises:
-        HTTPException: If API is disabled or key is invalid
+        HTTPException: If API is disabled, the key is invalid or its quota is used up
     """
     # Check if API is enabled
     if not config.api.enable:
@@ -30,16 +38,19 @@ async def verify_api_key(x_api_key: str = Header(..., alias="X-API-Key")) -> str
             detail="API访问已禁用"
         )
 
-    # Check if API key is configured
-    if not config.api.api_key:
-        logger.error("API is enabled but API key is not configured")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="API配置错误"
-        )
+    if config.api.api_key and hmac.compare_digest(x_api_key.encode(), config.api.api_key.encode()):
+        client = ApiClient(DEFAULT_API_CLIENT)
+    else:
+        try:
+            client = await api_key_store.authenticate(x_api_key)
+        except ApiKeyLookupError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="服务暂时不可用，请稍后重试"
+            )
 
     # Verify API key
-    if x_api_key != config.api.api_key:
+    if client is None:
         logger.warning(f"Invalid API key attempted: {x_api_key[:8]}...")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -47,4 +58,29 @@ async def verify_api_key(x_api_key: str = Header(..., alias="X-API-Key")) -> str
             headers={"WWW-Authenticate": "X-API-Key"},
         )
 
-    return x_api_key
+    try:
+        api_key_store.consume(client)
+    except QuotaExceededError as e:
+        logger.warning(f"API client {client.name} exceeded its daily quota")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="API 调用次数已达今日上限",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+    return client
+
+
+async def get_api_client(client: ApiClient = Depends(verify_api_key)) -> str:
+    """Name of the authenticated API client (owner of its verifications and webhooks)."""
+    return client.name
+
+
+async def require_default_client(api_client: str = Depends(get_api_client)) -> str:
+    """Only allow the default client (config.api.api_key), for tenant-wide data."""
+    if api_client != DEFAULT_API_CLIENT:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="该接口仅限管理员 API 密钥访问"
+        )
+    return api_client
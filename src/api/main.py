@@ -8,9 +8,17 @@ from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
+from src.api.admission import AdmissionMiddleware, admission_controller
+from src.api.ratelimit import RateLimitMiddleware
 from src.api.routes import verification, static_files, health, external
+from src.api.services.apikeys import api_key_store
+from src.api.services.status_events import status_hub
+from src.api.services.webhooks import webhook_dispatcher
+from src.captcha.factory import get_captcha_pool, get_shadow_provider
 from src.config.settings import config
 from src.database.connection import init_database, close_database
+from src.database.operations import maintain_partitions
+from src.events.bus import event_bus
 
 # Setup basic logging
 logging.basicConfig(
@@ -30,10 +38,52 @@ async def lifespan(app: FastAPI):
     await init_database()
     logger.info("Database initialized")
 
+    # The bot keeps upcoming partitions created; do it here too so inserts
+    # don't fail after the bot has been down past the pre-created months
+    await maintain_partitions(months_ahead=config.database.partition_months_ahead)
+
+    if config.admission.enable:
+        admission_controller.start()
+
+    if config.status_events.listen:
+        status_hub.start()
+
+    if config.webhooks.enable:
+        await webhook_dispatcher.start()
+
+    if config.api.enable:
+        api_key_store.start()
+
+    # Start the event bus once its subscribers above are registered
+    if config.events.enable:
+        event_bus.start()
+
+    # Open and warm up the pooled HTTP clients of the captcha provider chain
+    captcha_pool = None
+    try:
+        captcha_pool = get_captcha_pool()
+        await captcha_pool.start()
+    except ValueError as e:
+        logger.error(f"Captcha provider unavailable: {e}")
+    shadow_provider = get_shadow_provider()
+    if shadow_provider is not None:
+        await shadow_provider.start()
+
     yield
 
     # Cleanup
     logger.info("Shutting down TGuard API server...")
+    if config.admission.enable:
+        await admission_controller.stop()
+    await event_bus.stop()
+    await webhook_dispatcher.close()
+    if config.api.enable:
+        await api_key_store.stop()
+    await verification.shadow_evaluator.drain()
+    if captcha_pool is not None:
+        await captcha_pool.close()
+    if shadow_provider is not None:
+        await shadow_provider.close()
     await close_database()
 
 
@@ -54,6 +104,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if config.rate_limit.enable:
+    app.add_middleware(RateLimitMiddleware, rate_limit_config=config.rate_limit)
+
+# Added last so it runs first: shed requests never reach the rate limit store
+if config.admission.enable:
+    app.add_middleware(AdmissionMiddleware, controller=admission_controller)
+
 # Include routers
 app.include_router(verification.router, prefix="/api/v1")
 app.include_router(external.router, prefix="/api")
@@ -0,0 +1,254 @@
+"""Sliding-window rate limiting middleware for the public API.
+
+Requests are counted per client IP, per verification token and per API key
+with the sliding window counter approximation: the previous fixed window's
+count, weighted by how much of it still overlaps the sliding window, plus
+the current window's count. That needs two integers per key instead of a
+timestamp per request, and is simple to share through PostgreSQL.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.api.routes.verification import get_client_ip, untrusted_proxy_peer
+from src.config.settings import RateLimitConfig
+from src.database.operations import delete_expired_rate_limit_counters, hit_rate_limit_counter
+from src.utils.cache import TTLCache
+from src.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Largest request body read to find the verification token
+MAX_PEEK_BODY_BYTES = 64 * 1024
+
+# How often the PostgreSQL store deletes counters of finished windows
+COUNTER_CLEANUP_INTERVAL_SECONDS = 60
+
+rate_limit_decisions = metrics.counter(
+    "tguard_rate_limit_decisions_total",
+    "Rate limiter decisions by key type",
+    ("key_type", "decision")
+)
+
+
+class RateLimitStore(ABC):
+    """Storage of per-key fixed window counts."""
+
+    @abstractmethod
+    async def hit(self, key: str, window: int) -> Optional[Tuple[int, int, float]]:
+        """Count a request for key.
+
+        Returns (current window count including this request, previous window
+        count, seconds elapsed in the current window), or None if the store
+        is unavailable.
+        """
+        pass
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    """Per-process counters, bounded to max_keys."""
+
+    def __init__(self, max_keys: int):
+        self._windows = TTLCache(maxsize=max_keys, ttl=60)  # key -> (window index, current, previous)
+
+    async def hit(self, key: str, window: int) -> Optional[Tuple[int, int, float]]:
+        now = time.time()
+        index = int(now // window)
+
+        current, previous = 0, 0
+        entry = self._windows.get(key)
+        if entry is not None:
+            if entry[0] == index:
+                current, previous = entry[1], entry[2]
+            elif entry[0] == index - 1:
+                previous = entry[1]
+
+        current += 1
+        self._windows.set(key, (index, current, previous), ttl=2 * window)
+        return current, previous, now - index * window
+
+
+class PostgresRateLimitStore(RateLimitStore):
+    """Counters shared by all API instances through the rate_limit_counters table."""
+
+    def __init__(self):
+        self._cleaned_at = time.monotonic()
+
+    async def hit(self, key: str, window: int) -> Optional[Tuple[int, int, float]]:
+        now = time.time()
+        index = int(now // window)
+        expires_at = datetime.utcnow() + timedelta(seconds=2 * window)
+
+        counts = await hit_rate_limit_counter(key, index, expires_at)
+
+        if time.monotonic() - self._cleaned_at > COUNTER_CLEANUP_INTERVAL_SECONDS:
+            self._cleaned_at = time.monotonic()
+            await delete_expired_rate_limit_counters()
+
+        if counts is None:
+            return None
+        return counts[0], counts[1], now - index * window
+
+
+def create_rate_limit_store(rate_limit_config: RateLimitConfig) -> RateLimitStore:
+    """Create the configured rate limit store."""
+    if rate_limit_config.store == "memory":
+        return MemoryRateLimitStore(rate_limit_config.max_keys)
+    if rate_limit_config.store == "postgres":
+        return PostgresRateLimitStore()
+    raise ValueError(f"Unknown rate limit store: {rate_limit_config.store}. Available stores: memory, postgres")
+
+
+def retry_after(current: int, previous: int, elapsed: float, window: int, limit: int) -> int:
+    """Seconds until the sliding window has room for another request, if none are made meanwhile."""
+    room = limit - 1
+    if current <= room and previous > 0:
+        # The weighted previous window decays enough within the current window
+        wait = window * (1 - (room - current) / previous) - elapsed
+    else:
+        # The current window alone is over: wait until it has decayed as the previous window
+        wait = (window - elapsed) + window * (1 - room / current)
+    return max(1, math.ceil(wait))
+
+
+def _route_key_types(method: str, path: str) -> Tuple[str, ...]:
+    """Key types a request is counted under (empty for routes that are not limited)."""
+    if path == "/verify" and method == "GET":
+        return "ip", "token"
+    if path == "/api/v1/verify" and method == "POST":
+        return "ip", "token"
+    if path in ("/api/v1/verification-wait", "/api/v1/verification-events") and method == "GET":
+        return ("ip",)
+    if path.startswith(("/api/verification/", "/api/captcha/", "/api/webhooks")):
+        return ("api_key",)
+    return ()
+
+
+class RateLimitMiddleware:
+    """ASGI middleware answering over-limit requests with 429 and Retry-After."""
+
+    def __init__(self, app: ASGIApp, rate_limit_config: RateLimitConfig, store: Optional[RateLimitStore] = None):
+        self.app = app
+        self.store = store or create_rate_limit_store(rate_limit_config)
+        self.limits: Dict[str, Tuple[int, int]] = {
+            "ip": (rate_limit_config.ip_limit, rate_limit_config.ip_window_seconds),
+            "token": (rate_limit_config.token_limit, rate_limit_config.token_window_seconds),
+            "api_key": (rate_limit_config.api_key_limit, rate_limit_config.api_key_window_seconds),
+        }
+        self._proxy_checked = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        key_types = _route_key_types(scope["method"], scope["path"])
+        if not key_types:
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        keys: List[Tuple[str, str]] = []
+
+        if "ip" in key_types:
+            if not self._proxy_checked:
+                self._check_proxy(request)
+            keys.append(("ip", get_client_ip(request)))
+
+        if "token" in key_types:
+            token = request.query_params.get("token")
+            if scope["method"] == "POST":
+                token, receive = await self._peek_token(receive)
+            if token:
+                keys.append(("token", token))
+
+        if "api_key" in key_types:
+            api_key = request.headers.get("X-API-Key")
+            if api_key:
+                # Never store API keys themselves (the shared store is a database table)
+                keys.append(("api_key", hashlib.sha256(api_key.encode()).hexdigest()[:32]))
+
+        wait = 0
+        for key_type, value in keys:
+            limit, window = self.limits[key_type]
+            counts = await self.store.hit(f"{key_type}:{value}", window)
+            if counts is None:
+                # Fail open: an unavailable store must not take the API down with it
+                rate_limit_decisions.inc(key_type=key_type, decision="error")
+                continue
+
+            current, previous, elapsed = counts
+            if previous * (1 - elapsed / window) + current > limit:
+                rate_limit_decisions.inc(key_type=key_type, decision="limited")
+                wait = max(wait, retry_after(current, previous, elapsed, window, limit))
+            else:
+                rate_limit_decisions.inc(key_type=key_type, decision="allowed")
+
+        if wait:
+            logger.warning(f"Rate limited {scope['method']} {scope['path']} from {get_client_ip(request)}")
+            response = JSONResponse(
+                status_code=429,
+                content={"detail": "请求过于频繁，请稍后重试"},
+                headers={"Retry-After": str(wait)}
+            )
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
+
+    def _check_proxy(self, request: Request) -> None:
+        """Warn once when requests seem to come through a proxy that is not trusted."""
+        peer = untrusted_proxy_peer(request)
+        if peer is None:
+            return
+        self._proxy_checked = True
+        logger.warning(
+            f"Request from {peer}, which looks like a reverse proxy (or the Docker network gateway) "
+            f"but is not in [api] trusted_proxies: every client behind it shares one IP rate limit. "
+            f"Add its address or network to trusted_proxies"
+        )
+
+    @staticmethod
+    async def _peek_token(receive: Receive) -> Tuple[Optional[str], Receive]:
+        """Read the JSON body for its "token" field, returning a receive that replays the body."""
+        chunks = []
+        size = 0
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            size += len(chunks[-1])
+            more_body = message.get("more_body", False) and size <= MAX_PEEK_BODY_BYTES
+
+        body = b"".join(chunks)
+        replayed = False
+
+        async def replay() -> Message:
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": more_body}
+            return await receive()
+
+        token = None
+        if not more_body:
+            try:
+                data = json.loads(body)
+                if isinstance(data, dict) and isinstance(data.get("token"), str):
+                    token = data["token"]
+            except ValueError:
+                pass
+
+        return token, replay
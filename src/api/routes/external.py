@@ -1,15 +1,36 @@
 """External API routes for creating verification requests."""
 
+import csv
+import io
+import json
 import logging
 from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Literal, Optional
 
-from fastapi import APIRouter, HTTPException, Depends
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import AnyHttpUrl, BaseModel
+from sqlalchemy.exc import SQLAlchemyError
 
-from src.api.dependencies import verify_api_key
+from src.api.dependencies import DEFAULT_API_CLIENT, get_api_client, require_default_client
+from src.api.services.idempotency import IdempotencyKeyReusedError, idempotency_store, request_hash
+from src.api.services.status_events import describe_status
+from src.api.services.webhooks import UnsafeWebhookURLError, check_webhook_url
 from src.config.settings import config
-from src.database.operations import create_join_request, create_verification_session
-from src.utils.crypto import generate_verification_token
+from src.database.history import HISTORY_FIELDS, history_record
+from src.database.models import RequestStatus
+from src.database.operations import (
+    create_api_verifications,
+    create_join_request,
+    create_verification_session,
+    create_webhook,
+    delete_webhook,
+    get_captcha_metrics_summary,
+    get_verification_statuses,
+    get_webhooks,
+    stream_verification_history
+)
+from src.utils.crypto import generate_secret, generate_verification_token
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -27,19 +48,114 @@ class CreateVerificationResponse(BaseModel):
     expires_at: str
 
 
+class CreateVerificationBatchRequest(BaseModel):
+    """Request model for creating verifications for many users."""
+    user_ids: List[int]
+
+
+class BatchVerificationItem(CreateVerificationResponse):
+    """One created verification in a batch response."""
+    user_id: int
+
+
+class CreateVerificationBatchResponse(BaseModel):
+    """Response model for creating verifications for many users."""
+    verifications: List[BatchVerificationItem]
+
+
+class CreateWebhookRequest(BaseModel):
+    """Request model for registering a webhook."""
+    url: AnyHttpUrl
+
+
+class WebhookResponse(BaseModel):
+    """Response model for a registered webhook."""
+    id: int
+    url: str
+    enabled: bool
+    created_time: str
+    secret: Optional[str] = None  # Only returned when the webhook is registered
+
+
+class VerificationStatusBatchRequest(BaseModel):
+    """Request model for looking up many verification tokens."""
+    tokens: List[str]
+
+
+def _check_batch_size(size: int, limit: int) -> None:
+    if size == 0:
+        raise HTTPException(
+            status_code=400,
+            detail="批量请求不能为空"
+        )
+    if size > limit:
+        raise HTTPException(
+            status_code=413,
+            detail=f"单次批量请求最多 {limit} 项"
+        )
+
+
+async def _run_idempotent(
+        idempotency_key: Optional[str],
+        api_client: str,
+        path: str,
+        body: Dict[str, Any],
+        response: Response,
+        handler: Callable[[], Awaitable[Dict[str, Any]]]
+) -> Dict[str, Any]:
+    """Run a create handler, or replay its earlier response for a repeated Idempotency-Key."""
+    if idempotency_key is None:
+        return await handler()
+
+    try:
+        result, replayed = await idempotency_store.run(
+            api_client,
+            idempotency_key,
+            request_hash(path, body),
+            handler
+        )
+    except IdempotencyKeyReusedError:
+        raise HTTPException(
+            status_code=422,
+            detail="Idempotency-Key 已用于不同的请求"
+        )
+
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
+
+
 @router.post("/verification/create", response_model=CreateVerificationResponse)
 async def create_verification(
         request: CreateVerificationRequest,
-        api_key: str = Depends(verify_api_key)
+        response: Response,
+        api_client: str = Depends(get_api_client),
+        idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", min_length=1, max_length=255)
 ):
     """
     Create a new verification request via external API.
     
     This endpoint allows external bots to create verification requests
     for Telegram users. Returns a token and verification URL.
+
+    A retry carrying the same Idempotency-Key header as an earlier successful
+    call returns that call's response instead of creating another request.
     """
+    async def handler() -> Dict[str, Any]:
+        return (await _create_verification(request.user_id, api_client)).model_dump()
+
+    return await _run_idempotent(
+        idempotency_key,
+        api_client,
+        "/verification/create",
+        request.model_dump(),
+        response,
+        handler
+    )
+
+
+async def _create_verification(user_id: int, api_client: str) -> CreateVerificationResponse:
     try:
-        user_id = request.user_id
 
         logger.info(f"Creating verification request via API for user {user_id}")
 
@@ -60,7 +176,8 @@ async def create_verification(
             first_name="",
             last_name=None,
             verification_token=verification_token,
-            request_type="api"
+            request_type="api",
+            api_client=api_client
         )
 
         if not db_join_request:
@@ -104,3 +221,274 @@ async def create_verification(
             status_code=500,
             detail="服务器内部错误"
         )
+
+
+@router.post("/verification/create-batch", response_model=CreateVerificationBatchResponse)
+async def create_verification_batch(
+        request: CreateVerificationBatchRequest,
+        response: Response,
+        api_client: str = Depends(get_api_client),
+        idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", min_length=1, max_length=255)
+):
+    """
+    Create verification requests for many users at once.
+
+    Works like /verification/create for each user, but all join requests and
+    sessions are written in one transaction. Repeated user IDs get one
+    verification. Idempotency-Key is honoured as for /verification/create.
+    """
+    user_ids = list(dict.fromkeys(request.user_ids))
+    _check_batch_size(len(user_ids), config.api.batch_create_max_size)
+
+    async def handler() -> Dict[str, Any]:
+        return (await _create_verification_batch(user_ids, api_client)).model_dump()
+
+    return await _run_idempotent(
+        idempotency_key,
+        api_client,
+        "/verification/create-batch",
+        request.model_dump(),
+        response,
+        handler
+    )
+
+
+async def _create_verification_batch(user_ids: List[int], api_client: str) -> CreateVerificationBatchResponse:
+
+    logger.info(f"Creating {len(user_ids)} verification requests via API")
+
+    tokens = {user_id: generate_verification_token() for user_id in user_ids}
+    expires_at = datetime.utcnow() + timedelta(minutes=10)
+
+    if not await create_api_verifications(tokens, expires_at, api_client=api_client):
+        raise HTTPException(
+            status_code=500,
+            detail="创建验证请求失败"
+        )
+
+    return CreateVerificationBatchResponse(
+        verifications=[
+            BatchVerificationItem(
+                user_id=user_id,
+                token=token,
+                verification_url=f"{config.api.base_url}/verify?token={token}",
+                expires_at=expires_at.isoformat()
+            )
+            for user_id, token in tokens.items()
+        ]
+    )
+
+
+@router.post("/verification/status-batch")
+async def verification_status_batch(
+        request: VerificationStatusBatchRequest,
+        api_client: str = Depends(get_api_client)
+):
+    """
+    Look up the status of many verification tokens with one query.
+
+    Each entry has the fields of /api/v1/verification-status/{token}, plus
+    found=false for tokens that do not exist. Clients with their own API key
+    only see the verifications they created; other tokens are not found.
+    """
+    tokens = list(dict.fromkeys(request.tokens))
+    _check_batch_size(len(tokens), config.api.batch_status_max_size)
+
+    statuses = await get_verification_statuses(
+        tokens,
+        api_client=None if api_client == DEFAULT_API_CLIENT else api_client
+    )
+    if statuses is None:
+        raise HTTPException(
+            status_code=500,
+            detail="服务器内部错误"
+        )
+
+    now = datetime.utcnow()
+    return {"verifications": [describe_status(token, statuses.get(token), now) for token in tokens]}
+
+
+async def _prepend(first: Optional[List[Any]], rest: AsyncIterator) -> AsyncIterator:
+    if first is not None:
+        yield first
+    async for rows in rest:
+        yield rows
+
+
+async def _export_ndjson(batches: AsyncIterator) -> AsyncIterator[str]:
+    async for rows in batches:
+        yield "".join(
+            json.dumps(history_record(row._mapping), ensure_ascii=False) + "\n"
+            for row in rows
+        )
+
+
+async def _export_csv(batches: AsyncIterator) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=HISTORY_FIELDS)
+    writer.writeheader()
+    yield buffer.getvalue()
+
+    async for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(history_record(row._mapping) for row in rows)
+        yield buffer.getvalue()
+
+
+@router.get("/verification/export")
+async def export_verifications(
+        export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+        chat_id: Optional[int] = None,
+        status: Optional[RequestStatus] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        api_client: str = Depends(get_api_client)
+):
+    """
+    Stream verification history as NDJSON or CSV.
+
+    Each row is a join request joined with its verification session. Rows are
+    read page by page with a server-side cursor and written out as they arrive,
+    so exports of any size use constant memory. Clients with their own API key
+    only see the verifications they created; the default client sees all.
+
+    A database error on the first page fails the request with 500; a later
+    one aborts the response mid-stream, so a cut-off export never looks
+    complete.
+    """
+    logger.info(
+        f"Exporting verification history as {export_format} "
+        f"(chat={chat_id}, status={status}, since={since}, until={until})"
+    )
+
+    batches = stream_verification_history(
+        chat_id=chat_id,
+        status=status.value if status else None,
+        since=since,
+        until=until,
+        api_client=None if api_client == DEFAULT_API_CLIENT else api_client
+    )
+
+    # Read the first batch before the response starts, so a failing query is still an error status
+    try:
+        first = await anext(batches, None)
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=500,
+            detail="服务器内部错误"
+        )
+    batches = _prepend(first, batches)
+
+    filename = f"verifications-{datetime.utcnow():%Y%m%dT%H%M%S}.{export_format}"
+    if export_format == "csv":
+        body, media_type = _export_csv(batches), "text/csv; charset=utf-8"
+    else:
+        body, media_type = _export_ndjson(batches), "application/x-ndjson"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/captcha/metrics")
+async def captcha_metrics(
+        hours: int = Query(24, ge=1, le=24 * 90),
+        api_client: str = Depends(require_default_client)
+):
+    """
+    Compare captcha providers from shadow-mode traffic (default client only).
+
+    Per provider and role (primary/shadow): calls, success rate, how often the
+    shadow widget had no response by submission time, how often the shadow
+    disagreed with the primary, and verify latency percentiles.
+    """
+    since = datetime.utcnow() - timedelta(hours=hours)
+    return {
+        "since": since.isoformat(),
+        "providers": await get_captcha_metrics_summary(since)
+    }
+
+
+def _webhook_response(webhook, secret: Optional[str] = None) -> WebhookResponse:
+    return WebhookResponse(
+        id=webhook.id,
+        url=webhook.url,
+        enabled=webhook.enabled,
+        created_time=webhook.created_time.isoformat(),
+        secret=secret
+    )
+
+
+@router.post("/webhooks", response_model=WebhookResponse)
+async def register_webhook(
+        request: CreateWebhookRequest,
+        api_client: str = Depends(get_api_client)
+):
+    """
+    Register a webhook called when a verification created by this client completes.
+
+    The URL must be https and must not point at an internal address. The
+    response includes the HMAC signing secret; it is not shown again.
+    """
+    if not config.webhooks.enable:
+        raise HTTPException(
+            status_code=403,
+            detail="Webhook 功能未启用"
+        )
+
+    try:
+        await check_webhook_url(str(request.url))
+    except UnsafeWebhookURLError as e:
+        logger.warning(f"Rejected webhook URL of {api_client}: {e}")
+        raise HTTPException(
+            status_code=400,
+            detail="Webhook 地址必须使用 HTTPS，且不能指向内网、本机或保留地址"
+        )
+
+    webhooks = await get_webhooks(api_client)
+    if webhooks is None:
+        raise HTTPException(
+            status_code=500,
+            detail="服务器内部错误"
+        )
+    if len(webhooks) >= config.webhooks.max_per_client:
+        raise HTTPException(
+            status_code=409,
+            detail=f"最多注册 {config.webhooks.max_per_client} 个 Webhook"
+        )
+
+    secret = generate_secret()
+    webhook = await create_webhook(api_client, str(request.url), secret)
+    if webhook is None:
+        raise HTTPException(
+            status_code=500,
+            detail="注册 Webhook 失败"
+        )
+
+    return _webhook_response(webhook, secret)
+
+
+@router.get("/webhooks")
+async def list_webhooks(api_client: str = Depends(get_api_client)):
+    """List this client's webhooks (without secrets)."""
+    webhooks = await get_webhooks(api_client)
+    if webhooks is None:
+        raise HTTPException(
+            status_code=500,
+            detail="服务器内部错误"
+        )
+    return {"webhooks": [_webhook_response(webhook) for webhook in webhooks]}
+
+
+@router.delete("/webhooks/{webhook_id}")
+async def remove_webhook(webhook_id: int, api_client: str = Depends(get_api_client)):
+    """Delete one of this client's webhooks and its pending deliveries."""
+    if not await delete_webhook(api_client, webhook_id):
+        raise HTTPException(
+            status_code=404,
+            detail="Webhook 不存在"
+        )
+    return {"deleted": webhook_id}
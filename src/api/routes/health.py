@@ -4,11 +4,18 @@ import logging
 from datetime import datetime
 
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
 from sqlalchemy import text
 
-from src.captcha.factory import get_captcha_provider
+from src.api.admission import admission_controller
+from src.api.services.ipreputation import get_ip_reputation
+from src.api.services.status_events import status_hub
+from src.captcha.factory import get_captcha_pool
+from src.captcha.resilience import CircuitBreaker
 from src.config.settings import config
 from src.database.connection import get_session
+from src.events.bus import event_bus
+from src.utils.metrics import metrics
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -50,11 +57,19 @@ async def detailed_health_check():
 
     # Check captcha provider
     try:
-        captcha_provider = get_captcha_provider()
+        captcha_pool = get_captcha_pool()
+        selected = captcha_pool.select()
         health_status["checks"]["captcha"] = {
             "status": "healthy",
-            "provider": captcha_provider.provider_name
+            "provider": selected.provider_name,
+            "providers": {
+                provider.provider_name: provider.health_snapshot()
+                for provider in captcha_pool.providers
+            }
         }
+        # Failing over or probing a recovering provider is reported without failing our own health
+        if selected is not captcha_pool.providers[0] or selected.breaker.state != CircuitBreaker.CLOSED:
+            health_status["checks"]["captcha"]["status"] = "degraded"
     except Exception as e:
         logger.error(f"Captcha provider health check failed: {e}")
         health_status["checks"]["captcha"] = {
@@ -63,6 +78,39 @@ async def detailed_health_check():
         }
         health_status["status"] = "unhealthy"
 
+    # Shedding is reported without failing our own health, so the load balancer keeps this instance
+    if config.admission.enable:
+        snapshot = admission_controller.snapshot()
+        health_status["checks"]["admission"] = {
+            "status": "degraded" if snapshot["shedding"] else "healthy",
+            **snapshot
+        }
+
+    # Report the IP reputation database; a missing file only disables the check
+    ip_reputation = get_ip_reputation()
+    if ip_reputation is not None:
+        snapshot = ip_reputation.snapshot()
+        health_status["checks"]["ip_reputation"] = {
+            "status": "healthy" if snapshot["loaded"] else "degraded",
+            **snapshot
+        }
+
+    # Without the event bus, cached API keys only expire and completions from
+    # other instances are only seen on the next query
+    if config.events.enable:
+        snapshot = event_bus.snapshot()
+        health_status["checks"]["events"] = {
+            "status": "healthy" if snapshot["listening"] else "degraded",
+            **snapshot
+        }
+
+    if config.events.enable and config.status_events.listen:
+        snapshot = status_hub.snapshot()
+        health_status["checks"]["status_events"] = {
+            "status": "healthy" if snapshot["listening"] else "degraded",
+            **snapshot
+        }
+
     # Check configuration
     try:
         # Validate critical config values
@@ -70,7 +118,8 @@ async def detailed_health_check():
             raise ValueError("Bot token not configured")
 
         captcha_config = getattr(config.captcha, config.captcha.provider)
-        if not captcha_config.site_key or not captcha_config.secret_key:
+        # The built-in proof-of-work provider has no site key
+        if not captcha_config.secret_key or not getattr(captcha_config, "site_key", True):
             raise ValueError("Captcha keys not configured")
 
         health_status["checks"]["configuration"] = {"status": "healthy"}
@@ -86,3 +135,9 @@ async def detailed_health_check():
         raise HTTPException(status_code=503, detail=health_status)
 
     return health_status
+
+
+@router.get("/health/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Process metrics in the Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -1,14 +1,17 @@
 """Static file routes for Mini Web App."""
 
 import logging
+import random
 
 from fastapi import APIRouter, Request, HTTPException
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 
-from src.captcha.factory import get_captcha_provider
+from src.api.routes.verification import get_client_ip
+from src.api.services.ipreputation import CHALLENGE, REJECT, check_client_ip, get_challenge_provider
+from src.captcha.factory import get_captcha_provider, get_shadow_provider
 from src.config.settings import config
-from src.database.operations import get_verification_session
+from src.database.operations import get_verification_session, set_session_captcha_provider
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -46,9 +49,34 @@ async def verification_page(request: Request, token: str):
         # Pass expected user_id to template for client-side validation
         # The client will verify this matches the Telegram Web App user ID
 
-        # Get captcha configuration
-        captcha_provider = get_captcha_provider()
-        captcha_config = captcha_provider.get_frontend_config()
+        ip_action = check_client_ip(get_client_ip(request))
+        if ip_action == REJECT:
+            return templates.TemplateResponse(
+                request,
+                "error.html",
+                context={"message": "当前网络环境无法进行验证，请关闭代理或 VPN 后重试"},
+            )
+
+        # Get captcha configuration; flagged networks get a harder challenge
+        hardened = ip_action == CHALLENGE
+        captcha_provider = get_challenge_provider() if hardened else get_captcha_provider()
+
+        # /verify only accepts responses from the provider rendered here; the
+        # session also counts towards the load that raises PoW difficulty
+        await set_session_captcha_provider(token, captcha_provider.provider_name)
+        captcha_provider.record_session(token)
+        captcha_config = captcha_provider.get_frontend_config(hardened=hardened)
+
+        # Shadow mode: a sampled share of pages also runs the shadow provider invisibly
+        shadow_config = None
+        shadow_provider = get_shadow_provider()
+        if (
+                ip_action is None
+                and shadow_provider is not None
+                and shadow_provider.provider_name != captcha_provider.provider_name
+                and random.random() < config.captcha.shadow_sample_rate
+        ):
+            shadow_config = shadow_provider.get_frontend_config()
 
         return templates.TemplateResponse(
             request,
@@ -57,6 +85,7 @@ async def verification_page(request: Request, token: str):
                 "token": token,
                 "expected_user_id": session.user_id,
                 "captcha_config": captcha_config,
+                "shadow_config": shadow_config,
                 "api_base_url": config.api.base_url,
             },
         )
@@ -1,28 +1,55 @@
 """Verification API routes."""
 
+import asyncio
+import ipaddress
+import json
 import logging
-from typing import Optional
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
 
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-from src.api.services.approval import auto_approve_user
-from src.captcha.factory import get_captcha_provider
+from src.api.services.approval import approve_linked_requests, auto_approve_user
+from src.api.services.ipreputation import CHALLENGE, REJECT, check_client_ip, get_challenge_provider
+from src.api.services.replay import ResponseReusedError, VerifyReplayCache
+from src.api.services.shadow import ShadowEvaluator
+from src.api.services.status_events import describe_status, is_waiting, status_hub
+from src.api.services.webhooks import webhook_dispatcher
+from src.captcha.factory import get_captcha_provider, get_shadow_provider
+from src.captcha.resilience import ResilientCaptchaProvider
+from src.config.settings import config
+from src.utils.deadline import DeadlineExceeded, deadline, detach, within_deadline
 from src.database.operations import (
     get_verification_session,
     complete_verification,
-    get_join_request_by_token
+    get_join_request_by_token,
+    get_verification_statuses,
+    set_session_captcha_provider
 )
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+verify_replay_cache = VerifyReplayCache(
+    maxsize=config.api.verify_replay_max_entries,
+    ttl=config.api.verify_replay_ttl_seconds
+)
+shadow_evaluator = ShadowEvaluator()
+
+# Peers whose forwarded headers are believed
+trusted_proxies = [ipaddress.ip_network(proxy, strict=False) for proxy in config.api.trusted_proxies]
+
 
 class VerificationRequest(BaseModel):
     """Verification request model."""
     token: str
     captcha_response: str
     user_id: Optional[int] = None
+    provider: Optional[str] = None  # Provider whose widget produced the response
+    shadow_provider: Optional[str] = None  # Shadow provider rendered on the page, if any
+    shadow_captcha_response: Optional[str] = None
 
 
 class VerificationResponse(BaseModel):
@@ -32,18 +59,83 @@ class VerificationResponse(BaseModel):
     redirect_url: Optional[str] = None
 
 
+def _is_trusted_proxy(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in trusted_proxies)
+
+
 def get_client_ip(request: Request) -> str:
-    """Get client IP address."""
-    # Check for forwarded headers (when behind proxy)
+    """Get client IP address.
+
+    Forwarded headers are only believed when the connection comes from a
+    trusted proxy; anyone else could put any address in them.
+    """
+    peer = request.client.host if request.client else ""
+    if not _is_trusted_proxy(peer):
+        return peer
+
+    # Each proxy appends the address it got the request from: the rightmost
+    # entry that is not one of our proxies is the client
     forwarded_for = request.headers.get("X-Forwarded-For")
     if forwarded_for:
-        return forwarded_for.split(",")[0].strip()
+        for address in reversed(forwarded_for.split(",")):
+            address = address.strip()
+            if address and not _is_trusted_proxy(address):
+                return address
 
     real_ip = request.headers.get("X-Real-IP")
     if real_ip:
-        return real_ip
+        return real_ip.strip()
+
+    return peer
 
-    return request.client.host
+
+def untrusted_proxy_peer(request: Request) -> Optional[str]:
+    """Get the peer address if it looks like a reverse proxy missing from trusted_proxies.
+
+    That is a private address (such as the Docker bridge gateway, which is
+    the peer of every request reaching a container through a published port)
+    or one sending forwarded headers. Every client behind such a proxy gets
+    the proxy's address.
+    """
+    peer = request.client.host if request.client else ""
+    if not peer or _is_trusted_proxy(peer):
+        return None
+    try:
+        private = ipaddress.ip_address(peer).is_private
+    except ValueError:
+        return None
+    if private or "x-forwarded-for" in request.headers or "x-real-ip" in request.headers:
+        return peer
+    return None
+
+
+def _rendered_provider(submitted: Optional[str], rendered: Optional[str]) -> ResilientCaptchaProvider:
+    """Provider to check a response against: the one the page was rendered with.
+
+    A different one is only accepted once the chain has failed over away
+    from the rendered provider, and only if it is the one now preferred.
+    Raises ValueError for any other provider.
+    """
+    current = get_captcha_provider()
+    try:
+        expected = get_captcha_provider(rendered) if rendered else current
+    except ValueError:
+        # The rendered provider was removed from the chain since
+        expected = current
+
+    provider = get_captcha_provider(submitted) if submitted else expected
+    if provider is expected or (provider is current and expected is not current):
+        return provider
+    raise ValueError(f"Captcha provider {provider.provider_name} was not rendered (expected {expected.provider_name})")
+
+
+def _approve_in_bot() -> bool:
+    """Whether the bot process approves verified users, instead of this route."""
+    return config.events.enable and config.events.approve_in_bot
 
 
 @router.post("/verify", response_model=VerificationResponse)
@@ -51,7 +143,28 @@ async def verify_captcha(
         verification_req: VerificationRequest,
         request: Request
 ):
-    """Verify captcha and process join request."""
+    """Verify captcha and process join request.
+
+    Double taps and network retries resubmit the same captcha response; they
+    get the first submission's outcome instead of a second siteverify call.
+    The whole submission runs under verify_deadline_seconds.
+    """
+    try:
+        with deadline(config.api.verify_deadline_seconds):
+            return await verify_replay_cache.run(
+                verification_req.token,
+                verification_req.captcha_response,
+                lambda: _process_verification(verification_req, request)
+            )
+    except ResponseReusedError:
+        raise HTTPException(
+            status_code=400,
+            detail="验证数据已被使用，请重新验证"
+        )
+
+
+async def _process_verification(verification_req: VerificationRequest, request: Request) -> VerificationResponse:
+    """Check the session and captcha response, complete verification and attempt approval."""
     try:
         token = verification_req.token
         captcha_response = verification_req.captcha_response
@@ -59,7 +172,7 @@ async def verify_captcha(
         logger.info(f"Processing verification for token: {token}")
 
         # Get verification session
-        session = await get_verification_session(token)
+        session = await within_deadline(get_verification_session(token))
         if not session:
             logger.warning(f"Verification session not found: {token}")
             raise HTTPException(
@@ -75,8 +188,11 @@ async def verify_captcha(
                 detail="验证会话已过期，请重新申请"
             )
 
-        # Check if already completed
-        if session.captcha_completed:
+        # Check if already completed; a retry after a timed-out submission whose
+        # captcha already passed goes on to the approval step instead
+        verification_result = verify_replay_cache.get_captcha_result(token, captcha_response)
+        resumed = session.captcha_completed and verification_result is not None and verification_result.success
+        if session.captcha_completed and not resumed:
             logger.warning(f"Verification already completed: {token}")
             raise HTTPException(
                 status_code=400,
@@ -99,28 +215,81 @@ async def verify_captcha(
         client_ip = get_client_ip(request)
         user_agent = request.headers.get("User-Agent")
 
-        # Verify captcha
-        captcha_provider = get_captcha_provider()
-        verification_result = await captcha_provider.verify(
-            response=captcha_response,
-            remote_ip=client_ip,
-            user_agent=user_agent
-        )
+        # Flagged networks are refused before spending a provider call
+        ip_action = check_client_ip(client_ip)
+        if ip_action == REJECT:
+            raise HTTPException(
+                status_code=403,
+                detail="当前网络环境无法进行验证，请关闭代理或 VPN 后重试"
+            )
+
+        # Verify captcha with the provider the page was rendered with
+        try:
+            if ip_action == CHALLENGE:
+                captcha_provider = get_captcha_provider(verification_req.provider)
+            else:
+                captcha_provider = _rendered_provider(verification_req.provider, session.captcha_provider)
+        except ValueError as e:
+            logger.warning(f"Rejected captcha provider for token {token}: {e}")
+            raise HTTPException(
+                status_code=400,
+                detail="验证方式无效，请刷新页面重试"
+            )
+        if ip_action == CHALLENGE and captcha_provider is not get_challenge_provider():
+            logger.warning(f"Flagged client {client_ip} submitted {captcha_provider.provider_name} for token {token}")
+            raise HTTPException(
+                status_code=403,
+                detail="验证方式无效，请刷新页面重试"
+            )
+        if verification_result is None:
+            shadow_provider = get_shadow_provider()
+            if shadow_provider is not None and verification_req.shadow_provider != shadow_provider.provider_name:
+                shadow_provider = None
+            verification_result = await shadow_evaluator.verify(
+                captcha_provider,
+                captcha_response,
+                shadow=shadow_provider,
+                shadow_response=verification_req.shadow_captcha_response,
+                remote_ip=client_ip,
+                user_agent=user_agent
+            )
+            verify_replay_cache.store_captcha_result(token, captcha_response, verification_result)
+
+        # Flagged clients must have solved a hardened challenge, not one from an unflagged page
+        if (
+                ip_action == CHALLENGE
+                and verification_result.success
+                and not captcha_provider.is_hardened(verification_result)
+        ):
+            logger.warning(f"Flagged client {client_ip} solved a normal challenge for token {token}")
+            raise HTTPException(
+                status_code=403,
+                detail="验证方式无效，请刷新页面重试"
+            )
 
         if not verification_result.success:
             logger.warning(f"Captcha verification failed: {verification_result.error_code}")
+            if verification_result.error_code == "circuit-open":
+                raise HTTPException(
+                    status_code=503,
+                    detail=verification_result.error_message,
+                    headers={"Retry-After": str(captcha_provider.breaker.open_seconds)}
+                )
+            if verification_result.error_code == "deadline-exceeded":
+                raise DeadlineExceeded()
             raise HTTPException(
                 status_code=400,
                 detail=verification_result.error_message or "验证失败，请重试"
             )
 
         # Mark verification as completed
-        success = await complete_verification(
+        success = resumed or await within_deadline(complete_verification(
             token=token,
             captcha_response=captcha_response,
             ip_address=client_ip,
-            user_agent=user_agent
-        )
+            user_agent=user_agent,
+            captcha_score=verification_result.score
+        ))
 
         if not success:
             logger.error(f"Failed to complete verification: {token}")
@@ -128,12 +297,26 @@ async def verify_captcha(
                 status_code=500,
                 detail="服务器错误，请稍后重试"
             )
+        if not resumed:
+            status_hub.publish(token)
 
         # Check if this is an API request - if so, must approve (if chat_id is valid)
-        join_request = await get_join_request_by_token(token)
+        join_request = await within_deadline(get_join_request_by_token(token))
         if join_request and join_request.request_type == "api":
+            # complete_verification queued the client's webhook deliveries
+            if join_request.api_client is not None and not resumed:
+                webhook_dispatcher.wake()
+
             # For API requests, we must attempt approval if chat_id is valid
             if join_request.chat_id != 0:
+                if _approve_in_bot():
+                    logger.info(f"Verification completed, approval left to the bot (API request): {token}")
+                    return VerificationResponse(
+                        success=True,
+                        message="✅ 验证成功！",
+                        redirect_url="tg://"
+                    )
+
                 approval_result = await auto_approve_user(token)
                 if approval_result.success:
                     logger.info(f"User auto-approved successfully (API request): {token}")
@@ -155,9 +338,21 @@ async def verify_captcha(
                     success=True,
                     message="✅ 验证成功！"
                 )
+        elif _approve_in_bot():
+            # The bot approves the request, and any collapsed into it, when it
+            # receives the VERIFICATION_COMPLETED event
+            logger.info(f"Verification completed, approval left to the bot: {token}")
+            return VerificationResponse(
+                success=True,
+                message="✅ 验证成功！",
+                redirect_url="tg://" if join_request else None
+            )
         else:
-            # Regular Telegram join request - attempt auto-approval
+            # Regular Telegram join request - attempt auto-approval. Requests to
+            # other chats collapsed into this verification are approved in the
+            # background, outside this request's deadline
             approval_result = await auto_approve_user(token)
+            detach(approve_linked_requests(token))
 
             if approval_result.success:
                 logger.info(f"User auto-approved successfully: {token}")
@@ -175,6 +370,12 @@ async def verify_captcha(
 
     except HTTPException:
         raise
+    except DeadlineExceeded:
+        logger.warning(f"Verification deadline exceeded: {verification_req.token}")
+        raise HTTPException(
+            status_code=504,
+            detail="验证超时，请重试"
+        )
     except Exception as e:
         logger.error(f"Unexpected error during verification: {e}")
         raise HTTPException(
@@ -216,12 +417,159 @@ async def get_verification_status(token: str):
         )
 
 
+def _wait_tokens(tokens: List[str]) -> List[str]:
+    tokens = list(dict.fromkeys(tokens))
+    if len(tokens) > config.status_events.max_tokens:
+        raise HTTPException(
+            status_code=413,
+            detail=f"最多同时等待 {config.status_events.max_tokens} 个验证"
+        )
+    return tokens
+
+
+def _expiry_wait(statuses: Dict[str, Dict[str, Any]], tokens: List[str], now: datetime) -> float:
+    """Seconds until the last of the given sessions expires."""
+    return max((statuses[token]["expires_at"] - now).total_seconds() for token in tokens)
+
+
+@router.get("/verification-wait")
+async def wait_verification_status(
+        token: List[str] = Query(..., min_length=1),
+        timeout: float = Query(30, gt=0)
+):
+    """Long-poll the status of one or more tokens.
+
+    Answers as soon as any of the tokens completes, right away if one already
+    has or none of them can anymore, and otherwise after timeout seconds.
+    Entries have the fields of /verification-status/{token} plus found.
+    """
+    tokens = _wait_tokens(token)
+    loop = asyncio.get_running_loop()
+    until = loop.time() + min(timeout, config.status_events.max_wait_seconds)
+
+    # Subscribed before reading, so a completion in between is not missed
+    with status_hub.subscribe(tokens) as queue:
+        while True:
+            statuses = await get_verification_statuses(tokens)
+            if statuses is None:
+                raise HTTPException(
+                    status_code=500,
+                    detail="服务器内部错误"
+                )
+
+            now = datetime.utcnow()
+            entries = [describe_status(token, statuses.get(token), now) for token in tokens]
+            waiting = [entry["token"] for entry in entries if is_waiting(entry)]
+            if not waiting or any(entry.get("completed") for entry in entries):
+                break
+
+            left = min(until - loop.time(), _expiry_wait(statuses, waiting, now))
+            if left <= 0:
+                break
+            try:
+                await asyncio.wait_for(queue.get(), left)
+            except asyncio.TimeoutError:
+                now = datetime.utcnow()
+                entries = [describe_status(token, statuses.get(token), now) for token in tokens]
+                break
+
+    return {"verifications": entries}
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _status_events(tokens: List[str]) -> AsyncIterator[str]:
+    loop = asyncio.get_running_loop()
+    until = loop.time() + config.status_events.max_stream_seconds
+
+    with status_hub.subscribe(tokens) as queue:
+        statuses = await get_verification_statuses(tokens)
+        if statuses is None:
+            yield _sse("error", {"detail": "服务器内部错误"})
+            return
+
+        now = datetime.utcnow()
+        waiting = []
+        for token in tokens:
+            entry = describe_status(token, statuses.get(token), now)
+            yield _sse("status", entry)
+            if is_waiting(entry):
+                waiting.append(token)
+
+        while waiting:
+            left = until - loop.time()
+            if left <= 0:
+                break
+
+            try:
+                await asyncio.wait_for(queue.get(), min(left, config.status_events.keepalive_seconds))
+            except asyncio.TimeoutError:
+                woken = False
+            else:
+                woken = True
+                while not queue.empty():
+                    queue.get_nowait()
+
+            if woken:
+                fresh = await get_verification_statuses(waiting)
+                if fresh is None:
+                    yield _sse("error", {"detail": "服务器内部错误"})
+                    return
+                statuses.update(fresh)
+
+            # Report completions, and sessions that expired since the last check
+            now = datetime.utcnow()
+            for token in list(waiting):
+                entry = describe_status(token, statuses.get(token), now)
+                if not is_waiting(entry):
+                    waiting.remove(token)
+                    yield _sse("status", entry)
+
+            if waiting and not woken:
+                yield ": keepalive\n\n"
+
+        yield _sse("end", {})
+
+
+@router.get("/verification-events")
+async def verification_events(token: List[str] = Query(..., min_length=1)):
+    """Stream the status of one or more tokens as server-sent events.
+
+    Sends a "status" event with each token's current status, then another
+    for each token as it completes or expires, and "end" once none can change
+    anymore (or after max_stream_seconds). Idle streams cost no queries.
+    """
+    tokens = _wait_tokens(token)
+    return StreamingResponse(
+        _status_events(tokens),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/captcha-config")
-async def get_captcha_config():
-    """Get captcha configuration for frontend."""
+async def get_captcha_config(request: Request, token: Optional[str] = None):
+    """Get captcha configuration for frontend (a hardened challenge for flagged networks).
+
+    With a token, the provider is recorded on its session: /verify only
+    accepts responses from the provider last handed out for the token. Only
+    live sessions count towards the load that raises PoW difficulty.
+    """
+    ip_action = check_client_ip(get_client_ip(request))
+    if ip_action == REJECT:
+        raise HTTPException(
+            status_code=403,
+            detail="当前网络环境无法进行验证，请关闭代理或 VPN 后重试"
+        )
+
     try:
-        captcha_provider = get_captcha_provider()
-        config = captcha_provider.get_frontend_config()
+        hardened = ip_action == CHALLENGE
+        captcha_provider = get_challenge_provider() if hardened else get_captcha_provider()
+        if token and await set_session_captcha_provider(token, captcha_provider.provider_name):
+            captcha_provider.record_session(token)
+        config = captcha_provider.get_frontend_config(hardened=hardened)
 
         return {
             "captcha": config,
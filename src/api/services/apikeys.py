@@ -0,0 +1,172 @@
+"""Per-client external API keys with cached lookups and daily quotas.
+
+Keys are looked up by SHA-256 hash and cached (including unknown keys), so
+authenticating a request needs no query while its entry is live. Quotas are
+enforced against in-memory counters; counts are flushed to api_key_usage in
+batches, and the totals returned by the flush bring in the usage recorded by
+other API instances. With several instances a quota can therefore be
+overrun by up to one flush interval's worth of their traffic. Key changes
+made anywhere clear the cache through the event bus.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from src.config.settings import ApiKeysConfig, config
+from src.database.operations import add_api_key_usage, get_api_key_by_hash
+from src.events.bus import CACHE_INVALIDATED, RESYNC, event_bus
+from src.utils.cache import TTLCache
+from src.utils.crypto import hash_api_key
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+@dataclass(frozen=True)
+class ApiClient:
+    """An authenticated external API client."""
+    name: str
+    key_id: Optional[int] = None  # None for the key from config.api.api_key
+    daily_quota: Optional[int] = None
+
+
+class ApiKeyLookupError(Exception):
+    """The API key could not be checked (database unavailable)."""
+
+
+class QuotaExceededError(Exception):
+    """The client used up its daily quota."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Daily quota exceeded, resets in {retry_after}s")
+        self.retry_after = retry_after
+
+
+def _today() -> date:
+    return datetime.utcnow().date()
+
+
+def _seconds_until_tomorrow() -> int:
+    now = datetime.utcnow()
+    tomorrow = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return max(1, int((tomorrow - now).total_seconds()))
+
+
+class ApiKeyStore:
+    """Authenticates API keys and counts their usage."""
+
+    def __init__(self, api_keys_config: ApiKeysConfig):
+        self.config = api_keys_config
+        self._cache = TTLCache(maxsize=api_keys_config.cache_max_entries, ttl=api_keys_config.cache_ttl_seconds)
+        self._day = _today()
+        # Today's usage per key as last read from the database
+        self._recorded: Dict[int, int] = {}
+        # Requests counted here and not flushed yet, per (day, key)
+        self._pending: Dict[Tuple[date, int], int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def authenticate(self, api_key: str) -> Optional[ApiClient]:
+        """Get the client of an API key (None for unknown or revoked keys).
+
+        Raises:
+            ApiKeyLookupError: The key was not cached and the database lookup failed
+        """
+        key_hash = hash_api_key(api_key)
+        client = self._cache.get(key_hash, _MISSING)
+        if client is not _MISSING:
+            return client
+
+        self._roll_day()
+        record = await get_api_key_by_hash(key_hash, self._day)
+        if record is None:
+            raise ApiKeyLookupError()
+
+        client = None
+        if record and not record['revoked']:
+            client = ApiClient(record['name'], record['id'], record['daily_quota'])
+            self._recorded[record['id']] = max(self._recorded.get(record['id'], 0), record['requests'])
+
+        self._cache.set(key_hash, client)
+        return client
+
+    def invalidate(self) -> None:
+        """Drop cached keys, so the next request with each key looks it up again."""
+        self._cache.clear()
+
+    def _on_invalidated(self, data: Dict[str, Any]) -> None:
+        if data.get("cache") == "api_keys":
+            self.invalidate()
+
+    def _roll_day(self) -> None:
+        today = _today()
+        if today != self._day:
+            self._day = today
+            self._recorded.clear()
+
+    def used_today(self, key_id: int) -> int:
+        return self._recorded.get(key_id, 0) + self._pending.get((self._day, key_id), 0)
+
+    def consume(self, client: ApiClient) -> None:
+        """Count one request against the client's daily quota.
+
+        Raises:
+            QuotaExceededError: The quota is used up
+        """
+        if client.key_id is None:
+            return
+
+        self._roll_day()
+        if client.daily_quota is not None and self.used_today(client.key_id) >= client.daily_quota:
+            raise QuotaExceededError(_seconds_until_tomorrow())
+
+        slot = (self._day, client.key_id)
+        self._pending[slot] = self._pending.get(slot, 0) + 1
+
+    async def flush(self) -> None:
+        """Write pending usage counts to the database in one upsert per day."""
+        pending, self._pending = self._pending, {}
+        by_day: Dict[date, Dict[int, int]] = {}
+        for (day, key_id), count in pending.items():
+            by_day.setdefault(day, {})[key_id] = count
+
+        for day, counts in by_day.items():
+            totals = await add_api_key_usage(counts, day)
+            if totals is None:
+                # Keep the counts for the next flush
+                for key_id, count in counts.items():
+                    slot = (day, key_id)
+                    self._pending[slot] = self._pending.get(slot, 0) + count
+                continue
+
+            if day == self._day:
+                self._recorded.update(totals)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.config.usage_flush_seconds)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing API key usage: {e}")
+
+    def start(self) -> None:
+        """Start flushing usage counts periodically and follow key changes on the event bus."""
+        event_bus.subscribe(CACHE_INVALIDATED, self._on_invalidated)
+        event_bus.subscribe(RESYNC, lambda data: self.invalidate())
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush loop and write out the remaining counts."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+
+# Global API key store
+api_key_store = ApiKeyStore(config.api_keys)
@@ -1,13 +1,15 @@
 """Auto-approval service for verified users."""
 
 import logging
-from typing import NamedTuple
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, NamedTuple, Optional
 
 from aiogram import Bot
 from aiogram.exceptions import TelegramBadRequest
 
 from src.config.settings import config
-from src.database.operations import get_join_request_by_token, approve_join_request
+from src.database.operations import approve_join_request, get_join_request_by_token, get_linked_join_requests
+from src.utils.deadline import DeadlineExceeded, within_deadline
 
 logger = logging.getLogger(__name__)
 
@@ -18,44 +20,61 @@ class ApprovalResult(NamedTuple):
     error: str = None
 
 
-async def dismiss_join_request(chat_id: int, user_id: int) -> bool:
-    """Decline (dismiss) a chat join request via Telegram API. Returns True on success."""
+@asynccontextmanager
+async def _telegram(bot: Optional[Bot]) -> AsyncIterator[Bot]:
+    """Use the given bot, or a throwaway one whose session is closed afterwards."""
+    if bot is not None:
+        yield bot
+        return
+
     bot = Bot(token=config.bot.token)
     try:
-        await bot.decline_chat_join_request(chat_id=chat_id, user_id=user_id)
-        logger.info(f"Dismissed join request: user {user_id} for chat {chat_id}")
-        return True
-    except TelegramBadRequest as e:
-        error_msg = str(e).lower()
-        if "request_not_found" in error_msg:
-            logger.warning(f"Join request not found in Telegram (user={user_id}, chat={chat_id})")
-        elif "user_not_found" in error_msg:
-            logger.warning(f"User {user_id} not found")
-        elif "chat_not_found" in error_msg:
-            logger.warning(f"Chat {chat_id} not found")
-        elif "bot_not_member" in error_msg:
-            logger.warning(f"Bot is not a member of chat {chat_id}")
-        elif "not_enough_rights" in error_msg:
-            logger.warning(f"Bot lacks permissions in chat {chat_id}")
-        elif "deactivated" in error_msg:
-            logger.warning(f"User {user_id} is deactivated, skipping dismiss")
-        else:
-            logger.warning(f"Telegram API error on dismiss: {e}")
-        return False
-    except Exception as e:
-        if "deactivated" in str(e).lower():
-            logger.warning(f"User {user_id} is deactivated, skipping dismiss: {e}")
-            return False
-        raise
+        yield bot
     finally:
         await bot.session.close()
 
 
-async def auto_approve_user(verification_token: str) -> ApprovalResult:
-    """Automatically approve user after successful verification."""
+async def dismiss_join_request(chat_id: int, user_id: int, bot: Optional[Bot] = None) -> bool:
+    """Decline (dismiss) a chat join request via Telegram API. Returns True on success."""
+    async with _telegram(bot) as bot:
+        try:
+            await bot.decline_chat_join_request(chat_id=chat_id, user_id=user_id)
+            logger.info(f"Dismissed join request: user {user_id} for chat {chat_id}")
+            return True
+        except TelegramBadRequest as e:
+            error_msg = str(e).lower()
+            if "request_not_found" in error_msg:
+                logger.warning(f"Join request not found in Telegram (user={user_id}, chat={chat_id})")
+            elif "user_not_found" in error_msg:
+                logger.warning(f"User {user_id} not found")
+            elif "chat_not_found" in error_msg:
+                logger.warning(f"Chat {chat_id} not found")
+            elif "bot_not_member" in error_msg:
+                logger.warning(f"Bot is not a member of chat {chat_id}")
+            elif "not_enough_rights" in error_msg:
+                logger.warning(f"Bot lacks permissions in chat {chat_id}")
+            elif "deactivated" in error_msg:
+                logger.warning(f"User {user_id} is deactivated, skipping dismiss")
+            else:
+                logger.warning(f"Telegram API error on dismiss: {e}")
+            return False
+        except Exception as e:
+            if "deactivated" in str(e).lower():
+                logger.warning(f"User {user_id} is deactivated, skipping dismiss: {e}")
+                return False
+            raise
+
+
+async def auto_approve_user(verification_token: str, bot: Optional[Bot] = None) -> ApprovalResult:
+    """Automatically approve user after successful verification.
+
+    Uses the given bot, or a throwaway one. Runs within the caller's deadline,
+    if any: the approval call gets the remaining budget, and the welcome
+    message is skipped once it is spent.
+    """
     try:
         # Get join request
-        join_request = await get_join_request_by_token(verification_token)
+        join_request = await within_deadline(get_join_request_by_token(verification_token))
         if not join_request:
             logger.error(f"Join request not found for token: {verification_token}")
             return ApprovalResult(False, "加群申请不存在")
@@ -70,74 +89,111 @@ async def auto_approve_user(verification_token: str) -> ApprovalResult:
             logger.warning(f"Cannot approve request with chat_id=0 (API request without chat)")
             return ApprovalResult(False, "无效的群组ID")
 
-        # Create bot instance
-        bot = Bot(token=config.bot.token)
+        async with _telegram(bot) as bot:
+            try:
+                # Approve the join request via Telegram API
+                await within_deadline(bot.approve_chat_join_request(
+                    chat_id=join_request.chat_id,
+                    user_id=join_request.user_id
+                ))
+
+                # Update database
+                success = await approve_join_request(verification_token)
+                if not success:
+                    logger.error(f"Failed to update database for token: {verification_token}")
+                    return ApprovalResult(False, "数据库更新失败")
+
+                logger.info(
+                    f"Successfully auto-approved user {join_request.user_id} "
+                    f"for chat {join_request.chat_id}"
+                )
+
+                # Send welcome message to user (optional, only for telegram requests)
+                if join_request.request_type == "telegram":
+                    try:
+                        # Get chat info to include group name
+                        chat_info = await within_deadline(bot.get_chat(join_request.chat_id))
+                        chat_title = chat_info.title if chat_info.title else "群组"
+
+                        # Escape group name for MarkdownV2
+                        from src.utils.markdown import escape_markdown_v2
+                        escaped_title = escape_markdown_v2(chat_title)
+
+                        await within_deadline(bot.send_message(
+                            chat_id=join_request.user_id,
+                            text=f"🎉 *验证成功\\!*\n\n您已成功加入 *{escaped_title}*，欢迎\\!",
+                            parse_mode="MarkdownV2"
+                        ))
+                    except TelegramBadRequest as e:
+                        # Don't fail the approval if we can't send welcome message
+                        logger.warning(f"Could not send welcome message to {join_request.user_id}: {e}")
+                    except DeadlineExceeded:
+                        logger.warning(f"Deadline exceeded, skipped welcome message to {join_request.user_id}")
+
+                return ApprovalResult(True)
+
+            except TelegramBadRequest as e:
+                error_msg = str(e).lower()
+
+                if "user_not_found" in error_msg:
+                    logger.warning(f"User {join_request.user_id} not found")
+                    return ApprovalResult(False, "用户不存在")
+                elif "chat_not_found" in error_msg:
+                    logger.warning(f"Chat {join_request.chat_id} not found")
+                    return ApprovalResult(False, "群组不存在")
+                elif "request_not_found" in error_msg:
+                    logger.warning(f"Join request not found in Telegram")
+                    return ApprovalResult(False, "加群申请在Telegram中不存在")
+                elif "bot_not_member" in error_msg:
+                    logger.error(f"Bot is not a member of chat {join_request.chat_id}")
+                    return ApprovalResult(False, "机器人不是群组成员")
+                elif "not_enough_rights" in error_msg:
+                    logger.error(f"Bot lacks permissions in chat {join_request.chat_id}")
+                    return ApprovalResult(False, "机器人权限不足")
+                else:
+                    logger.error(f"Telegram API error: {e}")
+                    return ApprovalResult(False, f"Telegram API错误：{e}")
+
+    except DeadlineExceeded:
+        logger.warning(f"Deadline exceeded during auto-approval: {verification_token}")
+        return ApprovalResult(False, "审批超时")
+    except Exception as e:
+        logger.error(f"Unexpected error during auto-approval: {e}")
+        return ApprovalResult(False, f"自动审批失败：{e}")
+
+
+async def approve_linked_requests(verification_token: str, bot: Optional[Bot] = None) -> int:
+    """Approve join requests collapsed into a completed verification. Returns the number approved.
 
+    Linked requests are not marked verification_completed: one captcha solve
+    should not count as verified history in every chat it covered.
+    """
+    linked = await get_linked_join_requests(verification_token)
+    if not linked:
+        return 0
+
+    approved = 0
+    async with _telegram(bot) as bot:
         try:
-            # Approve the join request via Telegram API
-            await bot.approve_chat_join_request(
-                chat_id=join_request.chat_id,
-                user_id=join_request.user_id
-            )
-
-            # Update database
-            success = await approve_join_request(verification_token)
-            if not success:
-                logger.error(f"Failed to update database for token: {verification_token}")
-                return ApprovalResult(False, "数据库更新失败")
-
-            logger.info(
-                f"Successfully auto-approved user {join_request.user_id} "
-                f"for chat {join_request.chat_id}"
-            )
-
-            # Send welcome message to user (optional, only for telegram requests)
-            if join_request.request_type == "telegram":
+            for join_request in linked:
                 try:
-                    # Get chat info to include group name
-                    chat_info = await bot.get_chat(join_request.chat_id)
-                    chat_title = chat_info.title if chat_info.title else "群组"
-
-                    # Escape group name for MarkdownV2
-                    from src.utils.markdown import escape_markdown_v2
-                    escaped_title = escape_markdown_v2(chat_title)
-
-                    await bot.send_message(
-                        chat_id=join_request.user_id,
-                        text=f"🎉 *验证成功\\!*\n\n您已成功加入 *{escaped_title}*，欢迎\\!",
-                        parse_mode="MarkdownV2"
+                    await bot.approve_chat_join_request(
+                        chat_id=join_request.chat_id,
+                        user_id=join_request.user_id
                     )
                 except TelegramBadRequest as e:
-                    # Don't fail the approval if we can't send welcome message
-                    logger.warning(f"Could not send welcome message to {join_request.user_id}: {e}")
-
-            return ApprovalResult(True)
+                    logger.warning(
+                        f"Could not approve linked request of user {join_request.user_id} "
+                        f"for chat {join_request.chat_id}: {e}"
+                    )
+                    continue
 
-        except TelegramBadRequest as e:
-            error_msg = str(e).lower()
+                if await approve_join_request(join_request.verification_token):
+                    approved += 1
 
-            if "user_not_found" in error_msg:
-                logger.warning(f"User {join_request.user_id} not found")
-                return ApprovalResult(False, "用户不存在")
-            elif "chat_not_found" in error_msg:
-                logger.warning(f"Chat {join_request.chat_id} not found")
-                return ApprovalResult(False, "群组不存在")
-            elif "request_not_found" in error_msg:
-                logger.warning(f"Join request not found in Telegram")
-                return ApprovalResult(False, "加群申请在Telegram中不存在")
-            elif "bot_not_member" in error_msg:
-                logger.error(f"Bot is not a member of chat {join_request.chat_id}")
-                return ApprovalResult(False, "机器人不是群组成员")
-            elif "not_enough_rights" in error_msg:
-                logger.error(f"Bot lacks permissions in chat {join_request.chat_id}")
-                return ApprovalResult(False, "机器人权限不足")
-            else:
-                logger.error(f"Telegram API error: {e}")
-                return ApprovalResult(False, f"Telegram API错误：{e}")
+            logger.info(f"Approved {approved}/{len(linked)} linked join requests for token: {verification_token}")
 
-        finally:
-            await bot.session.close()
+        except Exception as e:
+            logger.error(f"Unexpected error approving linked join requests: {e}")
 
-    except Exception as e:
-        logger.error(f"Unexpected error during auto-approval: {e}")
-        return ApprovalResult(False, f"自动审批失败：{e}")
+    return approved
@@ -0,0 +1,107 @@
+"""Idempotency-Key support for external API calls.
+
+A client retrying a call with the same Idempotency-Key gets the response of
+the first successful call back instead of a second set of rows. Responses
+are kept in the idempotency_keys table so retries reaching another instance
+or arriving after a restart are recognized too, with an in-memory cache in
+front so replays within this instance need no query. Concurrent calls with
+the same key in one instance wait for the first to finish.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Tuple
+from weakref import WeakValueDictionary
+
+from src.config.settings import config
+from src.database.operations import get_idempotency_record, save_idempotency_record
+from src.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class IdempotencyKeyReusedError(Exception):
+    """The key was already used for a different request."""
+
+
+def request_hash(path: str, body: Any) -> str:
+    """Fingerprint of a request, to tell a retry from a different request reusing the key."""
+    canonical = json.dumps(body, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{path}\n{canonical}".encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """Runs calls at most once per (client, Idempotency-Key) and replays their response."""
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.ttl = ttl
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._locks: "WeakValueDictionary[Tuple[str, str], asyncio.Lock]" = WeakValueDictionary()
+
+    def _lock(self, cache_key: Tuple[str, str]) -> asyncio.Lock:
+        lock = self._locks.get(cache_key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[cache_key] = lock
+        return lock
+
+    def _remember(self, cache_key: Tuple[str, str], record: Dict[str, Any]) -> None:
+        ttl = (record['expires_at'] - datetime.utcnow()).total_seconds()
+        if ttl > 0:
+            self._cache.set(cache_key, record, ttl=min(ttl, self.ttl))
+
+    async def run(
+            self,
+            api_client: str,
+            key: str,
+            fingerprint: str,
+            handler: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Tuple[Dict[str, Any], bool]:
+        """Run handler for a new key, or return the stored response. Returns (response, replayed).
+
+        Only successful responses are stored: a call failing with an
+        exception can be retried with the same key.
+
+        Raises:
+            IdempotencyKeyReusedError: The key was used for a different request
+        """
+        cache_key = (api_client, key)
+        async with self._lock(cache_key):
+            record = self._cache.get(cache_key)
+            if record is None:
+                record = await get_idempotency_record(api_client, key)
+                if record:
+                    self._remember(cache_key, record)
+
+            if not record:
+                response = await handler()
+                body = json.dumps(response, ensure_ascii=False)
+                record = await save_idempotency_record(
+                    api_client,
+                    key,
+                    fingerprint,
+                    body,
+                    datetime.utcnow() + timedelta(seconds=self.ttl)
+                )
+                if record is None:
+                    logger.warning(f"Could not store response for idempotency key of client {api_client}")
+                    return response, False
+
+                self._remember(cache_key, record)
+                # Unless another instance stored a response for the key first
+                if record['request_hash'] == fingerprint and record['response'] == body:
+                    return response, False
+
+            if record['request_hash'] != fingerprint:
+                raise IdempotencyKeyReusedError()
+            return json.loads(record['response']), True
+
+
+# Global idempotency store
+idempotency_store = IdempotencyStore(
+    maxsize=config.api.idempotency_max_entries,
+    ttl=config.api.idempotency_ttl_seconds
+)
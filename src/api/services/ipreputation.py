@@ -0,0 +1,71 @@
+"""IP reputation checks of verification clients."""
+
+import logging
+from typing import Optional
+
+from src.captcha.factory import get_captcha_provider
+from src.captcha.resilience import ResilientCaptchaProvider
+from src.config.settings import config
+from src.ipreputation.index import IPReputation
+
+logger = logging.getLogger(__name__)
+
+REJECT = "reject"
+CHALLENGE = "challenge"
+
+# Global reputation database and challenge provider
+_ip_reputation: Optional[IPReputation] = None
+_challenge_provider: Optional[ResilientCaptchaProvider] = None
+_challenge_provider_loaded = False
+
+
+def get_ip_reputation() -> Optional[IPReputation]:
+    """Get the global IP reputation database (None when the check is disabled)."""
+    global _ip_reputation
+
+    if not config.ip_reputation.enable:
+        return None
+
+    if _ip_reputation is None:
+        _ip_reputation = IPReputation(
+            config.ip_reputation.path,
+            check_interval=config.ip_reputation.reload_check_seconds
+        )
+
+    return _ip_reputation
+
+
+def get_challenge_provider() -> Optional[ResilientCaptchaProvider]:
+    """Get the provider flagged clients must solve (None if it is not in the provider chain)."""
+    global _challenge_provider, _challenge_provider_loaded
+
+    if not _challenge_provider_loaded:
+        _challenge_provider_loaded = True
+        try:
+            _challenge_provider = get_captcha_provider(config.ip_reputation.challenge_provider)
+        except ValueError:
+            logger.error(
+                f"IP reputation challenge provider {config.ip_reputation.challenge_provider} "
+                f"is not in captcha.providers; flagged clients will get the normal captcha"
+            )
+
+    return _challenge_provider
+
+
+def check_client_ip(client_ip: str) -> Optional[str]:
+    """Get the action for a client address: REJECT, CHALLENGE or None to allow it."""
+    ip_reputation = get_ip_reputation()
+    if ip_reputation is None:
+        return None
+
+    category = ip_reputation.lookup(client_ip)
+    if category is None:
+        return None
+
+    action = config.ip_reputation.actions.get(category)
+    if action == CHALLENGE and get_challenge_provider() is None:
+        return None
+    if action in (REJECT, CHALLENGE):
+        logger.info(f"Client {client_ip} listed as {category}: {action}")
+        return action
+    return None
@@ -0,0 +1,94 @@
+"""Replay cache making /verify submissions idempotent per captcha response."""
+
+import asyncio
+import hashlib
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+
+from src.captcha.base import CaptchaVerificationResult
+from src.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseReusedError(Exception):
+    """A captcha response was submitted for a different verification token."""
+
+
+class VerifyReplayCache:
+    """Deduplicates verify submissions keyed on (token, sha256 of the captcha response).
+
+    - A submission identical to an earlier one gets the earlier outcome back
+      (success or client error) without touching the captcha provider again.
+    - Concurrent identical submissions share a single in-flight attempt.
+    - A captcha response already submitted for another token is rejected.
+    - Successful captcha checks are remembered on their own, so a retry after
+      a server error does not burn the single-use response a second time.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._outcomes = TTLCache(maxsize, ttl)
+        self._owners = TTLCache(maxsize, ttl)  # response digest -> token
+        self._captcha_results = TTLCache(maxsize, ttl)
+        self._in_flight: Dict[Tuple[str, str], asyncio.Task] = {}
+
+    @staticmethod
+    def digest(captcha_response: str) -> str:
+        return hashlib.sha256(captcha_response.encode()).hexdigest()
+
+    def get_captcha_result(self, token: str, captcha_response: str) -> Optional[CaptchaVerificationResult]:
+        """Get a remembered successful captcha check for this submission."""
+        return self._captcha_results.get((token, self.digest(captcha_response)))
+
+    def store_captcha_result(self, token: str, captcha_response: str, result: CaptchaVerificationResult) -> None:
+        """Remember a successful captcha check (failures are final and cached as outcomes)."""
+        if result.success:
+            self._captcha_results.set((token, self.digest(captcha_response)), result)
+
+    async def run(self, token: str, captcha_response: str, handler: Callable[[], Awaitable[Any]]) -> Any:
+        """Run handler once per (token, captcha response), replaying its outcome for duplicates.
+
+        Raises:
+            ResponseReusedError: The response was already submitted for another token
+        """
+        digest = self.digest(captcha_response)
+        owner = self._owners.get(digest)
+        if owner is None:
+            self._owners.set(digest, token)
+        elif owner != token:
+            logger.warning(f"Captcha response reused across tokens: {owner} -> {token}")
+            raise ResponseReusedError()
+
+        key = (token, digest)
+        outcome = self._outcomes.get(key)
+        if outcome is not None:
+            logger.info(f"Replaying verification outcome for token: {token}")
+            succeeded, value = outcome
+            if succeeded:
+                return value
+            raise HTTPException(status_code=value.status_code, detail=value.detail, headers=value.headers)
+
+        task = self._in_flight.get(key)
+        if task is None:
+            # Run as a task so a client dropping the connection does not abort the attempt
+            task = asyncio.ensure_future(handler())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._settle(key, done))
+        else:
+            logger.info(f"Joining in-flight verification for token: {token}")
+
+        return await asyncio.shield(task)
+
+    def _settle(self, key: Tuple[str, str], task: asyncio.Task) -> None:
+        self._in_flight.pop(key, None)
+        if task.cancelled():
+            return
+
+        error = task.exception()
+        if error is None:
+            self._outcomes.set(key, (True, task.result()))
+        elif isinstance(error, HTTPException) and error.status_code < 500:
+            # Client errors are final for this response; server errors and 503s may be retried
+            self._outcomes.set(key, (False, error))
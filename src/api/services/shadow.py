@@ -0,0 +1,114 @@
+"""Shadow-mode evaluation of a secondary captcha provider."""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Dict, Optional, Set, Tuple
+
+from src.captcha.base import CaptchaProvider, CaptchaVerificationResult
+from src.database.operations import record_captcha_metrics
+from src.utils.deadline import detach
+
+logger = logging.getLogger(__name__)
+
+
+async def _timed(call: Awaitable[CaptchaVerificationResult]) -> Tuple[CaptchaVerificationResult, int]:
+    started = time.monotonic()
+    result = await call
+    return result, round((time.monotonic() - started) * 1000)
+
+
+class ShadowEvaluator:
+    """Verifies a shadow provider's response alongside the primary one.
+
+    Only the primary result decides the verification, and the caller never
+    waits for the shadow: its verification runs concurrently and the metrics
+    for both calls are written in the background once it finishes. Neither is
+    bound by the request's deadline, so shadow latencies stay comparable.
+    """
+
+    def __init__(self):
+        self._pending: Set[asyncio.Task] = set()
+
+    async def verify(
+            self,
+            primary: CaptchaProvider,
+            response: str,
+            shadow: Optional[CaptchaProvider] = None,
+            shadow_response: Optional[str] = None,
+            remote_ip: Optional[str] = None,
+            user_agent: Optional[str] = None
+    ) -> CaptchaVerificationResult:
+        """Verify with the primary provider, evaluating the shadow provider if given."""
+        shadow_task = None
+        if shadow is not None and shadow_response:
+            shadow_task = detach(
+                _timed(shadow.verify(shadow_response, remote_ip=remote_ip, user_agent=user_agent))
+            )
+
+        result, latency_ms = await _timed(
+            primary.verify(response, remote_ip=remote_ip, user_agent=user_agent)
+        )
+
+        if shadow is not None:
+            task = detach(
+                self._record(primary.provider_name, result, latency_ms, shadow.provider_name, shadow_task)
+            )
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+        return result
+
+    async def _record(
+            self,
+            primary_name: str,
+            primary_result: CaptchaVerificationResult,
+            primary_latency_ms: int,
+            shadow_name: str,
+            shadow_task: Optional[asyncio.Task]
+    ) -> None:
+        rows: list[Dict[str, Any]] = [{
+            "provider": primary_name,
+            "role": "primary",
+            "success": primary_result.success,
+            "error_code": primary_result.error_code,
+            "latency_ms": primary_latency_ms,
+            "agreed": None
+        }]
+
+        try:
+            if shadow_task is None:
+                # The page was shown the shadow widget but it did not finish before submission
+                rows.append({
+                    "provider": shadow_name,
+                    "role": "shadow",
+                    "success": False,
+                    "error_code": "no-response",
+                    "latency_ms": None,
+                    "agreed": None
+                })
+            else:
+                shadow_result, shadow_latency_ms = await shadow_task
+                agreed = shadow_result.success == primary_result.success
+                if not agreed:
+                    logger.info(
+                        f"Shadow disagreement: {primary_name}={primary_result.success} "
+                        f"{shadow_name}={shadow_result.success} ({shadow_result.error_code})"
+                    )
+                rows.append({
+                    "provider": shadow_name,
+                    "role": "shadow",
+                    "success": shadow_result.success,
+                    "error_code": shadow_result.error_code,
+                    "latency_ms": shadow_latency_ms,
+                    "agreed": agreed
+                })
+        except Exception as e:
+            logger.error(f"Shadow verification with {shadow_name} failed: {e}")
+
+        await record_captcha_metrics(rows)
+
+    async def drain(self) -> None:
+        """Wait for background shadow evaluations to be recorded (used at shutdown)."""
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
@@ -0,0 +1,89 @@
+"""Push delivery of verification completions to waiting API clients.
+
+Clients waiting on tokens (SSE or long-poll) subscribe to the hub and cost
+no queries while idle. Completions reach the hub in-process from the verify
+route, and from other API instances through the event bus.
+"""
+
+import asyncio
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from src.events.bus import RESYNC as BUS_RESYNC, VERIFICATION_COMPLETED, event_bus
+
+# Queued to every subscriber when completions may have been missed
+RESYNC = ""
+
+
+def describe_status(token: str, status: Optional[Dict[str, Any]], now: datetime) -> Dict[str, Any]:
+    """Status entry of a token as returned by the status endpoints (status from get_verification_statuses)."""
+    if status is None:
+        return {"token": token, "found": False}
+    return {
+        "token": token,
+        "found": True,
+        "completed": status["captcha_completed"],
+        "expired": now > status["expires_at"],
+        "status": status["status"] or "unknown",
+        "created_time": status["created_time"].isoformat(),
+        "expires_at": status["expires_at"].isoformat()
+    }
+
+
+def is_waiting(entry: Dict[str, Any]) -> bool:
+    """Whether a status entry can still change to completed."""
+    return entry["found"] and not entry["completed"] and not entry["expired"]
+
+
+class StatusHub:
+    """Fans completion events out to the clients waiting on each token."""
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self.listening = False
+
+    @contextmanager
+    def subscribe(self, tokens: List[str]) -> Iterator[asyncio.Queue]:
+        """Receive the tokens (or RESYNC) of completions among the given tokens while in the block."""
+        queue: asyncio.Queue = asyncio.Queue()
+        for token in tokens:
+            self._subscribers.setdefault(token, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            for token in tokens:
+                queues = self._subscribers.get(token)
+                if queues is not None:
+                    queues.discard(queue)
+                    if not queues:
+                        del self._subscribers[token]
+
+    def publish(self, token: str) -> None:
+        """Wake the clients waiting on a completed token."""
+        for queue in self._subscribers.get(token, ()):
+            queue.put_nowait(token)
+
+    def _resync(self, data: Dict[str, Any]) -> None:
+        for queue in {queue for queues in self._subscribers.values() for queue in queues}:
+            queue.put_nowait(RESYNC)
+
+    def _on_completed(self, data: Dict[str, Any]) -> None:
+        self.publish(data["token"])
+
+    def start(self) -> None:
+        """Receive completions from other processes through the event bus."""
+        event_bus.subscribe(VERIFICATION_COMPLETED, self._on_completed)
+        # Completions while the bus was not listening went unheard
+        event_bus.subscribe(BUS_RESYNC, self._resync)
+        self.listening = True
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "listening": self.listening and event_bus.listening,
+            "waiting_tokens": len(self._subscribers)
+        }
+
+
+# Global status hub
+status_hub = StatusHub()
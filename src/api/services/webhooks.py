@@ -0,0 +1,296 @@
+"""Outbound webhook delivery for external API clients.
+
+Events are queued in webhook_deliveries by the transaction that produces
+them. A background dispatcher in each API process claims due deliveries,
+POSTs them with an HMAC-SHA256 signature through one pooled HTTP client,
+and reschedules failures with exponential backoff.
+
+Receivers verify a delivery by recomputing
+hex(HMAC-SHA256(secret, "<X-TGuard-Timestamp>.<body>")) and comparing it to
+the X-TGuard-Signature header (after the "sha256=" prefix).
+
+Webhook URLs must be https and must not resolve to loopback, private,
+link-local or reserved addresses; they are checked when registered and again
+before each delivery, since DNS can change in between. Deliveries connect
+through PublicAddressBackend, which resolves the host, checks the addresses
+and connects to a checked one itself, so a host re-pointed after the check
+cannot redirect the connection (TLS still verifies the hostname).
+"""
+
+import asyncio
+import hashlib
+import hmac
+import ipaddress
+import logging
+import random
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpcore
+import httpx
+
+from src.config.settings import WebhookConfig, config
+from src.database.operations import (
+    claim_webhook_deliveries,
+    delete_finished_webhook_deliveries,
+    record_webhook_results
+)
+from src.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# How often delivered and failed deliveries past retention are deleted
+CLEANUP_INTERVAL_SECONDS = 3600
+
+# Longest error message stored with a delivery
+MAX_ERROR_LENGTH = 500
+
+webhook_deliveries = metrics.counter(
+    "tguard_webhook_deliveries_total",
+    "Webhook delivery attempts by outcome",
+    ("outcome",)
+)
+
+
+class UnsafeWebhookURLError(Exception):
+    """A webhook URL is not https or points at an internal address."""
+    pass
+
+
+def _is_public_address(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if ip.version == 6 and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+async def _resolve(host: str, port: int) -> List[str]:
+    infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    return [info[4][0] for info in infos]
+
+
+async def _public_addresses(host: str, port: int) -> List[str]:
+    """Resolve host, raising UnsafeWebhookURLError unless all its addresses are public."""
+    try:
+        addresses = await _resolve(host, port)
+    except (OSError, ValueError) as e:
+        raise UnsafeWebhookURLError(f"cannot resolve {host}: {e}")
+
+    for address in addresses:
+        if not _is_public_address(address):
+            raise UnsafeWebhookURLError(f"{host} resolves to non-public address {address}")
+    return addresses
+
+
+async def check_webhook_url(url: str) -> None:
+    """Raise UnsafeWebhookURLError unless url is https and all its host's addresses are public."""
+    parts = urlsplit(url)
+    if parts.scheme != "https":
+        raise UnsafeWebhookURLError("webhook URL must use https")
+    if not parts.hostname:
+        raise UnsafeWebhookURLError("webhook URL has no host")
+
+    await _public_addresses(parts.hostname, parts.port or 443)
+
+
+class PublicAddressBackend(httpcore.AsyncNetworkBackend):
+    """Network backend connecting only to public addresses, resolved and checked at connect time.
+
+    The connection is made to the checked IP address, while httpcore still
+    sends the hostname in the Host header and as TLS SNI and verifies the
+    certificate against it.
+    """
+
+    def __init__(self, backend: Optional[httpcore.AsyncNetworkBackend] = None):
+        self._backend = backend or httpcore.AnyIOBackend()
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        addresses = await _public_addresses(host, port)
+
+        error: Optional[Exception] = None
+        for address in dict.fromkeys(addresses):
+            try:
+                return await self._backend.connect_tcp(
+                    address.split("%", 1)[0],
+                    port,
+                    timeout=timeout,
+                    local_address=local_address,
+                    socket_options=socket_options
+                )
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                error = e
+        raise error
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        raise httpcore.ConnectError("webhooks cannot be delivered to unix sockets")
+
+    async def sleep(self, seconds: float) -> None:
+        await self._backend.sleep(seconds)
+
+
+class PinnedTransport(httpx.AsyncHTTPTransport):
+    """HTTP transport whose connections go through PublicAddressBackend."""
+
+    def __init__(self, limits: httpx.Limits, backend: Optional[httpcore.AsyncNetworkBackend] = None):
+        super().__init__(limits=limits)
+        self._pool = httpcore.AsyncConnectionPool(
+            ssl_context=httpx.create_ssl_context(),
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            network_backend=PublicAddressBackend(backend)
+        )
+
+
+def sign_payload(secret: str, timestamp: int, body: bytes) -> str:
+    """Signature header value of a webhook request body."""
+    digest = hmac.new(secret.encode(), f"{timestamp}.".encode() + body, hashlib.sha256).hexdigest()
+    return f"sha256={digest}"
+
+
+def retry_delay(attempts: int, webhook_config: WebhookConfig) -> float:
+    """Seconds before the next attempt after the given number of failed ones (with jitter)."""
+    delay = min(webhook_config.backoff_max_seconds, webhook_config.backoff_base_seconds * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+class WebhookDispatcher:
+    """Sends queued webhook deliveries in the background."""
+
+    def __init__(self, webhook_config: WebhookConfig):
+        self.config = webhook_config
+        # Deliveries stay claimed long enough for one request to time out
+        self.lease_seconds = webhook_config.timeout_seconds * 3
+        self._client: Optional[httpx.AsyncClient] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+        self._last_cleanup = 0.0
+
+    def wake(self) -> None:
+        """Check the queue now instead of at the next poll (call after queueing deliveries)."""
+        self._wake.set()
+
+    async def _deliver(self, delivery: Dict[str, Any]) -> Dict[str, Any]:
+        body = delivery['payload'].encode()
+        timestamp = int(time.time())
+        headers = {
+            "Content-Type": "application/json",
+            "X-TGuard-Event": delivery['event'],
+            "X-TGuard-Delivery": str(delivery['id']),
+            "X-TGuard-Timestamp": str(timestamp),
+            "X-TGuard-Signature": sign_payload(delivery['secret'], timestamp, body)
+        }
+
+        error = None
+        try:
+            await check_webhook_url(delivery['url'])
+            response = await self._client.post(delivery['url'], content=body, headers=headers)
+            if not response.is_success:
+                error = f"HTTP {response.status_code}"
+        except (httpx.HTTPError, UnsafeWebhookURLError) as e:
+            error = f"{type(e).__name__}: {e}"
+
+        now = datetime.utcnow()
+        if error is None:
+            webhook_deliveries.inc(outcome="delivered")
+            return {
+                'id': delivery['id'],
+                'status': "delivered",
+                'next_attempt_at': now,
+                'last_error': None,
+                'delivered_time': now
+            }
+
+        error = error[:MAX_ERROR_LENGTH]
+        if delivery['attempts'] >= self.config.max_attempts:
+            webhook_deliveries.inc(outcome="failed")
+            logger.warning(f"Webhook delivery {delivery['id']} failed after {delivery['attempts']} attempts: {error}")
+            return {
+                'id': delivery['id'],
+                'status': "failed",
+                'next_attempt_at': now,
+                'last_error': error,
+                'delivered_time': None
+            }
+
+        webhook_deliveries.inc(outcome="retry")
+        delay = retry_delay(delivery['attempts'], self.config)
+        logger.info(f"Webhook delivery {delivery['id']} attempt {delivery['attempts']} failed ({error}), retry in {delay:.0f}s")
+        return {
+            'id': delivery['id'],
+            'status': "pending",
+            'next_attempt_at': now + timedelta(seconds=delay),
+            'last_error': error,
+            'delivered_time': None
+        }
+
+    async def dispatch_due(self) -> int:
+        """Send one batch of due deliveries (at most max_concurrency). Returns the number sent."""
+        deliveries = await claim_webhook_deliveries(self.config.max_concurrency, self.lease_seconds)
+        if not deliveries:
+            return 0
+
+        results = await asyncio.gather(*(self._deliver(delivery) for delivery in deliveries))
+        await record_webhook_results(list(results))
+        return len(deliveries)
+
+    async def _cleanup(self) -> None:
+        now = time.monotonic()
+        if now - self._last_cleanup < CLEANUP_INTERVAL_SECONDS:
+            return
+        self._last_cleanup = now
+
+        deleted = await delete_finished_webhook_deliveries(
+            datetime.utcnow() - timedelta(days=self.config.retention_days)
+        )
+        if deleted:
+            logger.info(f"Deleted {deleted} finished webhook deliveries")
+
+    async def _run(self) -> None:
+        while True:
+            sent = 0
+            try:
+                sent = await self.dispatch_due()
+                await self._cleanup()
+            except Exception as e:
+                logger.error(f"Webhook dispatcher error: {e}")
+
+            # A full batch means more may be due right away
+            if sent < self.config.max_concurrency:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.config.poll_interval_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+
+    async def start(self) -> None:
+        """Open the HTTP client and start dispatching."""
+        # An explicit transport also keeps environment proxies from bypassing the address check
+        self._client = httpx.AsyncClient(
+            timeout=self.config.timeout_seconds,
+            transport=PinnedTransport(
+                httpx.Limits(
+                    max_connections=self.config.max_concurrency,
+                    max_keepalive_connections=self.config.max_concurrency
+                )
+            ),
+            headers={"User-Agent": "TGuard-Webhooks/1.0"},
+            follow_redirects=False
+        )
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Global webhook dispatcher
+webhook_dispatcher = WebhookDispatcher(config.webhooks)
@@ -0,0 +1,64 @@
+"""Approval of verified join requests in the bot process.
+
+The API process sends a VERIFICATION_COMPLETED event when a user passes the
+captcha; the bot approves the request (and any collapsed into it) with its
+long-lived Telegram client. Completions sent while the bot was not listening
+are caught up on after each event bus reconnect.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Set
+
+from aiogram import Bot
+
+from src.api.services.approval import approve_linked_requests, auto_approve_user
+from src.database.operations import get_unapproved_verified_tokens
+from src.events.bus import RESYNC, VERIFICATION_COMPLETED, event_bus
+
+logger = logging.getLogger(__name__)
+
+# Verified requests older than this are not caught up on after a reconnect
+CATCH_UP_WINDOW = timedelta(hours=1)
+
+
+class ApprovalWorker:
+    """Approves join requests as their verifications complete."""
+
+    def __init__(self, bot: Bot):
+        self.bot = bot
+        self._in_progress: Set[str] = set()
+
+    async def approve(self, token: str) -> None:
+        """Approve the join request of a completed verification and those collapsed into it."""
+        if token in self._in_progress:
+            return
+
+        self._in_progress.add(token)
+        try:
+            result = await auto_approve_user(token, bot=self.bot)
+            if result.success:
+                logger.info(f"User auto-approved successfully: {token}")
+            else:
+                logger.warning(f"Auto-approval failed for {token}: {result.error}")
+            await approve_linked_requests(token, bot=self.bot)
+        finally:
+            self._in_progress.discard(token)
+
+    def _on_completed(self, data: Dict[str, Any]):
+        # chat_id 0 marks API requests not tied to a chat
+        if data.get("chat_id"):
+            return self.approve(data["token"])
+
+    async def catch_up(self) -> None:
+        """Approve verified requests whose completion event may have been missed."""
+        tokens = await get_unapproved_verified_tokens(datetime.utcnow() - CATCH_UP_WINDOW)
+        if tokens:
+            logger.info(f"Catching up on {len(tokens)} verified join requests")
+        for token in tokens:
+            await self.approve(token)
+
+    def subscribe(self) -> None:
+        """Subscribe to the event bus (before it starts)."""
+        event_bus.subscribe(VERIFICATION_COMPLETED, self._on_completed)
+        event_bus.subscribe(RESYNC, lambda data: self.catch_up())
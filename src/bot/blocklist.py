@@ -0,0 +1,120 @@
+"""Global user blocklist shared by all chats.
+
+The authoritative list lives in the blocklist table; each bot process keeps a
+SortedIdSet copy so join requests can be checked without a database round
+trip. Changes made through this module update the copy immediately; changes
+made elsewhere are picked up through the event bus, or by the refresh loop
+when the bus is disabled.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.config.settings import BlocklistConfig, config
+from src.database.operations import (
+    add_to_blocklist,
+    find_repeat_offenders,
+    get_blocklist_ids,
+    remove_from_blocklist
+)
+from src.events.bus import CACHE_INVALIDATED, RESYNC, event_bus
+from src.utils.idset import SortedIdSet
+
+logger = logging.getLogger(__name__)
+
+
+class Blocklist:
+    """In-memory membership index over the blocklist table."""
+
+    def __init__(self, blocklist_config: BlocklistConfig):
+        self.config = blocklist_config
+        self._ids = SortedIdSet()
+        self.loaded_at: Optional[datetime] = None
+        self._reloading = False
+        self._stale = False
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def nbytes(self) -> int:
+        return self._ids.nbytes
+
+    async def load(self) -> bool:
+        """Reload the index from the database, keeping the current copy on error."""
+        user_ids = await get_blocklist_ids()
+        if user_ids is None:
+            return False
+
+        self._ids = SortedIdSet(user_ids)
+        self.loaded_at = datetime.utcnow()
+        logger.info(f"Blocklist loaded: {len(self._ids)} users ({self._ids.nbytes} bytes)")
+        return True
+
+    async def reload(self) -> None:
+        """Reload the index, once more after the current reload if one is running."""
+        if self._reloading:
+            self._stale = True
+            return
+
+        self._reloading = True
+        try:
+            self._stale = True
+            while self._stale:
+                self._stale = False
+                await self.load()
+        finally:
+            self._reloading = False
+
+    def _on_invalidated(self, data: Dict[str, Any]):
+        if data.get("cache") == "blocklist":
+            return self.reload()
+
+    def follow_changes(self) -> None:
+        """Reload whenever the blocklist table changes (subscribe before the event bus starts)."""
+        event_bus.subscribe(CACHE_INVALIDATED, self._on_invalidated)
+        event_bus.subscribe(RESYNC, lambda data: self.reload())
+
+    async def add(
+            self,
+            user_ids: Iterable[int],
+            reason: str,
+            added_by: Optional[int] = None,
+            source_chat_id: Optional[int] = None
+    ) -> List[int]:
+        """Block users; returns the IDs that were not already blocked."""
+        added = await add_to_blocklist(list(user_ids), reason, added_by, source_chat_id)
+        self._ids.update(added)
+        return added
+
+    async def remove(self, user_id: int) -> bool:
+        """Unblock a user; returns False if they were not blocked."""
+        removed = await remove_from_blocklist(user_id)
+        self._ids.discard(user_id)
+        return removed
+
+    async def block_repeat_offenders(self, user_ids: Iterable[int]) -> List[int]:
+        """Block those of the given users whose verifications keep failing across chats."""
+        since = datetime.utcnow() - timedelta(days=self.config.window_days)
+        offenders = await find_repeat_offenders(
+            list(user_ids),
+            min_failures=self.config.failure_threshold,
+            min_chats=self.config.min_chats,
+            since=since
+        )
+
+        added = []
+        for user_id, chat_id in offenders:
+            added.extend(await self.add([user_id], reason="auto", source_chat_id=chat_id))
+        if added:
+            logger.info(f"Auto-blocked {len(added)} repeat offenders: {added}")
+        return added
+
+
+# Global blocklist instance
+blocklist = Blocklist(config.blocklist)
+
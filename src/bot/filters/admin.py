@@ -1,7 +1,9 @@
 """Admin permission filters."""
 
+from typing import Union
+
 from aiogram.filters import BaseFilter
-from aiogram.types import Message
+from aiogram.types import CallbackQuery, Message
 
 from src.config.settings import config
 
@@ -9,9 +11,9 @@ from src.config.settings import config
 class AdminFilter(BaseFilter):
     """Filter to check if user is admin."""
 
-    async def __call__(self, message: Message) -> bool:
-        """Check if message sender is admin."""
-        if not message.from_user:
+    async def __call__(self, event: Union[Message, CallbackQuery]) -> bool:
+        """Check if message or callback sender is admin."""
+        if not event.from_user:
             return False
 
-        return message.from_user.id in config.bot.admin_ids
+        return event.from_user.id in config.bot.admin_ids
@@ -1,19 +1,69 @@
 """Admin command handlers."""
 
+import asyncio
 import logging
-from datetime import datetime
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
 
-from aiogram import Router
-from aiogram.filters import Command
-from aiogram.types import Message
+from aiogram import Bot, F, Router
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from aiogram.filters import Command, CommandObject
+from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup, Message
 
+from src.bot.blocklist import blocklist
 from src.bot.filters import AdminFilter
 from src.config.settings import config
-from src.database.operations import get_global_stats
+from src.database.models import JoinRequest, RequestStatus
+from src.database.operations import (
+    bulk_update_request_status,
+    create_api_key,
+    get_api_key_by_name,
+    get_global_stats,
+    get_pending_requests_page,
+    list_api_keys,
+    update_api_key
+)
+from src.utils.cache import TTLCache
+from src.utils.crypto import generate_api_key, hash_api_key
+from src.utils.markdown import escape_markdown_v2
+from src.utils.ratelimit import AsyncTokenBucket
 
 logger = logging.getLogger(__name__)
 router = Router()
 
+PENDING_PAGE_SIZE = 10
+PENDING_CACHE_TTL_SECONDS = 15
+
+_EPOCH = datetime(1970, 1, 1)
+
+# Pending request pages keyed by (chat_id, cursor, backward)
+_pending_page_cache = TTLCache(maxsize=256, ttl=PENDING_CACHE_TTL_SECONDS)
+
+BULK_PAGE_SIZE = 200
+BULK_MAX_ATTEMPTS = 3
+BULK_PROGRESS_INTERVAL_SECONDS = 2
+
+# Telegram bots can only download files up to 20 MB
+BLOCK_IMPORT_MAX_BYTES = 20 * 1024 * 1024
+# Rejected line numbers listed in the import summary
+BLOCK_IMPORT_REJECTED_SHOWN = 10
+_BLOCK_IMPORT_SEPARATOR = re.compile(r"[,;\t]")
+
+_DURATION_UNITS = {"m": "minutes", "h": "hours", "d": "days"}
+
+# API client names; "default" belongs to the key in config.api.api_key
+_API_CLIENT_NAME = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+_RESERVED_API_CLIENTS = {"default"}
+
+# Characters of a new key shown in listings
+API_KEY_DISPLAY_PREFIX = 12
+
+# Chats with a bulk approve/decline currently running
+_bulk_jobs: set = set()
+
 
 @router.message(Command("start"))
 async def cmd_start(message: Message):
@@ -116,8 +166,9 @@ async def cmd_api(message: Message):
                 f"🌐 *服务器地址：*\n"
                 f"`{api_config.base_url}`\n\n"
                 f"🔑 *API Key：*\n"
-                f"`{api_config.api_key}`\n\n"
-                "⚠️ *注意：请妥善保管您的 API Key*"
+                f"{f'`{api_config.api_key}`' if api_config.api_key else '未配置'}\n\n"
+                "⚠️ *注意：请妥善保管您的 API Key*\n\n"
+                "为其他接入方签发独立的 API Key 与调用上限：`/apikey_create`，查看所有客户端：`/apikeys`"
             )
         else:
             # API is disabled
@@ -140,6 +191,747 @@ async def cmd_api(message: Message):
         )
 
 
+def _resolve_chat_id(message: Message, args: Optional[str]) -> Optional[int]:
+    """Get target chat ID from command arguments, or the current group chat."""
+    if args:
+        try:
+            return int(args.split()[0])
+        except ValueError:
+            return None
+
+    if message.chat.type != "private":
+        return message.chat.id
+
+    return None
+
+
+def _encode_cursor(join_request: JoinRequest) -> str:
+    micros = (join_request.request_time - _EPOCH) // timedelta(microseconds=1)
+    return f"{micros}:{join_request.id}"
+
+
+def _decode_cursor(micros: str, request_id: str) -> Tuple[datetime, int]:
+    return _EPOCH + timedelta(microseconds=int(micros)), int(request_id)
+
+
+async def _load_pending_page(
+        chat_id: int,
+        cursor: Optional[Tuple[datetime, int]],
+        backward: bool
+) -> List[JoinRequest]:
+    """Load one page (plus one look-ahead row) of pending requests, cached for a short TTL."""
+    key = (chat_id, cursor, backward)
+    page = _pending_page_cache.get(key)
+    if page is None:
+        page = await get_pending_requests_page(
+            chat_id,
+            cursor=cursor,
+            limit=PENDING_PAGE_SIZE + 1,
+            backward=backward
+        )
+        _pending_page_cache.set(key, page)
+    return page
+
+
+def _render_pending_page(
+        chat_id: int,
+        page: int,
+        requests: List[JoinRequest],
+        has_older: bool
+) -> Tuple[str, Optional[InlineKeyboardMarkup]]:
+    """Render a page of pending requests as MarkdownV2 text and a paging keyboard."""
+    if not requests:
+        return (
+            f"📋 *待处理申请*\n群组：`{chat_id}`\n\n"
+            "✅ 当前没有待处理的加群申请",
+            None
+        )
+
+    lines = ["📋 *待处理申请*", f"群组：`{chat_id}` · 第 {page} 页", ""]
+    for join_request in requests:
+        name = " ".join(filter(None, [join_request.first_name, join_request.last_name])) or "—"
+        mention = f" \\(@{escape_markdown_v2(join_request.username)}\\)" if join_request.username else ""
+        status_icon = "✅ 已验证" if join_request.verification_completed else "⏳ 未验证"
+        lines.append(
+            f"• {escape_markdown_v2(name)}{mention} · `{join_request.user_id}` · "
+            f"{status_icon} · `{join_request.request_time:%Y-%m-%d %H:%M}`"
+        )
+
+    buttons = []
+    if page > 1:
+        buttons.append(InlineKeyboardButton(
+            text="⬅️ 上一页",
+            callback_data=f"pending:{chat_id}:p:{page - 1}:{_encode_cursor(requests[0])}"
+        ))
+    if has_older:
+        buttons.append(InlineKeyboardButton(
+            text="下一页 ➡️",
+            callback_data=f"pending:{chat_id}:n:{page + 1}:{_encode_cursor(requests[-1])}"
+        ))
+
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[buttons]) if buttons else None
+    return "\n".join(lines), keyboard
+
+
+@router.message(Command("pending"), AdminFilter())
+async def cmd_pending(message: Message, command: CommandObject):
+    """Handle /pending command (admin only): browse pending join requests of a chat."""
+    try:
+        chat_id = _resolve_chat_id(message, command.args)
+        if chat_id is None:
+            await message.answer(
+                "用法：`/pending <chat_id>`\n\n"
+                "在群组中使用时可省略 `chat_id`",
+                parse_mode="MarkdownV2"
+            )
+            return
+
+        requests = await _load_pending_page(chat_id, cursor=None, backward=False)
+        text, keyboard = _render_pending_page(
+            chat_id,
+            page=1,
+            requests=requests[:PENDING_PAGE_SIZE],
+            has_older=len(requests) > PENDING_PAGE_SIZE
+        )
+        await message.answer(text, reply_markup=keyboard, parse_mode="MarkdownV2")
+
+    except Exception as e:
+        logger.error(f"Error in pending command: {e}")
+        await message.answer(
+            "❌ *获取待处理申请时发生错误*\n\n"
+            "请稍后重试",
+            parse_mode="MarkdownV2"
+        )
+
+
+@router.callback_query(F.data.startswith("pending:"), AdminFilter())
+async def cb_pending_page(callback: CallbackQuery):
+    """Handle pending request paging buttons."""
+    try:
+        _, chat_id, direction, page, micros, request_id = callback.data.split(":")
+        chat_id, page = int(chat_id), int(page)
+        cursor = _decode_cursor(micros, request_id)
+
+        if direction == "p":
+            # Newer page: rows right after the cursor, an older page always exists
+            requests = await _load_pending_page(chat_id, cursor, backward=True)
+            requests, has_older = requests[-PENDING_PAGE_SIZE:], True
+        else:
+            requests = await _load_pending_page(chat_id, cursor, backward=False)
+            requests, has_older = requests[:PENDING_PAGE_SIZE], len(requests) > PENDING_PAGE_SIZE
+
+        if not requests and page > 1:
+            # Everything on this side of the cursor was processed meanwhile; start over
+            page = 1
+            requests = await _load_pending_page(chat_id, cursor=None, backward=False)
+            requests, has_older = requests[:PENDING_PAGE_SIZE], len(requests) > PENDING_PAGE_SIZE
+
+        text, keyboard = _render_pending_page(chat_id, page, requests, has_older)
+        await callback.message.edit_text(text, reply_markup=keyboard, parse_mode="MarkdownV2")
+        await callback.answer()
+
+    except Exception as e:
+        logger.error(f"Error paging pending requests: {e}")
+        await callback.answer("获取待处理申请失败，请稍后重试", show_alert=True)
+
+
+@dataclass
+class BulkProgress:
+    """Running totals of a bulk approve/decline job."""
+    processed: int = 0
+    succeeded: int = 0
+    stale: int = 0
+    failed: int = 0
+
+
+def _parse_duration(value: str) -> Optional[timedelta]:
+    """Parse durations like 30m, 2h, 7d (bare numbers are minutes)."""
+    match = re.fullmatch(r"(\d+)([mhd]?)", value.strip().lower())
+    if not match:
+        return None
+    return timedelta(**{_DURATION_UNITS[match.group(2) or "m"]: int(match.group(1))})
+
+
+def _parse_bulk_args(message: Message, args: Optional[str]):
+    """Parse `[chat_id] [verified] [older=<duration>]`. Returns (chat_id, verified_only, older_than) or None."""
+    tokens = (args or "").split()
+    chat_id = None
+    verified_only = False
+    older_than = None
+
+    for token in tokens:
+        if token == "verified":
+            verified_only = True
+        elif token.startswith("older="):
+            older_than = _parse_duration(token[len("older="):])
+            if older_than is None:
+                return None
+        else:
+            try:
+                chat_id = int(token)
+            except ValueError:
+                return None
+
+    if chat_id is None and message.chat.type != "private":
+        chat_id = message.chat.id
+    if chat_id is None:
+        return None
+
+    return chat_id, verified_only, older_than
+
+
+async def _call_join_request_api(
+        bot: Bot,
+        join_request: JoinRequest,
+        approve: bool,
+        bucket: AsyncTokenBucket,
+        semaphore: asyncio.Semaphore
+) -> str:
+    """Approve or decline one join request in Telegram.
+    Returns "done", "stale" (request no longer exists in Telegram) or "failed"."""
+    async with semaphore:
+        for _ in range(BULK_MAX_ATTEMPTS):
+            await bucket.acquire()
+            try:
+                if approve:
+                    await bot.approve_chat_join_request(chat_id=join_request.chat_id, user_id=join_request.user_id)
+                else:
+                    await bot.decline_chat_join_request(chat_id=join_request.chat_id, user_id=join_request.user_id)
+                return "done"
+            except TelegramRetryAfter as e:
+                logger.warning(f"Flood control hit during bulk action, retrying after {e.retry_after}s")
+                await asyncio.sleep(e.retry_after)
+            except TelegramBadRequest as e:
+                error_msg = str(e).lower()
+                if "user_already_participant" in error_msg:
+                    return "done" if approve else "stale"
+                if "request_not_found" in error_msg or "hide_requester_missing" in error_msg:
+                    return "stale"
+                logger.warning(f"Bulk action failed for user {join_request.user_id}: {e}")
+                return "failed"
+            except Exception as e:
+                logger.warning(f"Bulk action failed for user {join_request.user_id}: {e}")
+                return "failed"
+
+        return "failed"
+
+
+def _render_bulk_progress(action: str, chat_id: int, progress: BulkProgress, finished: bool) -> str:
+    header = f"✅ *批量{action}完成*" if finished else f"⏳ *正在批量{action}*"
+    return (
+        f"{header}\n"
+        f"群组：`{chat_id}`\n\n"
+        f"• 已处理：`{progress.processed}`\n"
+        f"• 成功：`{progress.succeeded}`\n"
+        f"• 已失效：`{progress.stale}`\n"
+        f"• 失败：`{progress.failed}`"
+    )
+
+
+async def _edit_progress(status_message: Message, text: str) -> None:
+    try:
+        await status_message.edit_text(text, parse_mode="MarkdownV2")
+    except TelegramBadRequest as e:
+        if "message is not modified" not in str(e).lower():
+            logger.warning(f"Could not update bulk progress message: {e}")
+
+
+async def _run_bulk_action(message: Message, command: CommandObject, approve: bool) -> None:
+    """Page through a chat's pending requests and approve/decline them all."""
+    action = "通过" if approve else "拒绝"
+    parsed = _parse_bulk_args(message, command.args)
+    if parsed is None:
+        await message.answer(
+            f"用法：`/{command.command} <chat_id> [verified] [older=<时长>]`\n\n"
+            "• `verified`：仅处理已完成人机验证的申请\n"
+            "• `older=30m`：仅处理早于指定时长的申请（支持 `m`/`h`/`d`）\n"
+            "在群组中使用时可省略 `chat_id`",
+            parse_mode="MarkdownV2"
+        )
+        return
+
+    chat_id, verified_only, older_than = parsed
+    if chat_id in _bulk_jobs:
+        await message.answer("⚠️ 该群组已有批量任务正在执行，请稍后再试")
+        return
+
+    _bulk_jobs.add(chat_id)
+    try:
+        progress = BulkProgress()
+        status_message = await message.answer(
+            _render_bulk_progress(action, chat_id, progress, finished=False),
+            parse_mode="MarkdownV2"
+        )
+
+        target_status = RequestStatus.APPROVED if approve else RequestStatus.REJECTED
+        requested_before = datetime.utcnow() - older_than if older_than else None
+        bucket = AsyncTokenBucket(config.bot.bulk_rate_per_second)
+        semaphore = asyncio.Semaphore(config.bot.bulk_concurrency)
+        admin_id = message.from_user.id
+        cursor = None
+        last_edit = time.monotonic()
+
+        logger.info(
+            f"Admin {admin_id} started bulk {'approve' if approve else 'decline'} for chat {chat_id} "
+            f"(verified_only={verified_only}, older_than={older_than})"
+        )
+
+        while True:
+            page = await get_pending_requests_page(
+                chat_id,
+                cursor=cursor,
+                limit=BULK_PAGE_SIZE,
+                verified_only=verified_only,
+                requested_before=requested_before
+            )
+            if not page:
+                break
+            cursor = (page[-1].request_time, page[-1].id)
+
+            outcomes = await asyncio.gather(*(
+                _call_join_request_api(message.bot, join_request, approve, bucket, semaphore)
+                for join_request in page
+            ))
+
+            done_ids = [r.id for r, outcome in zip(page, outcomes) if outcome == "done"]
+            stale_ids = [r.id for r, outcome in zip(page, outcomes) if outcome == "stale"]
+            await bulk_update_request_status(done_ids, target_status, admin_id)
+            await bulk_update_request_status(stale_ids, RequestStatus.EXPIRED, admin_id)
+
+            progress.processed += len(page)
+            progress.succeeded += len(done_ids)
+            progress.stale += len(stale_ids)
+            progress.failed += len(page) - len(done_ids) - len(stale_ids)
+
+            if time.monotonic() - last_edit >= BULK_PROGRESS_INTERVAL_SECONDS:
+                await _edit_progress(status_message, _render_bulk_progress(action, chat_id, progress, finished=False))
+                last_edit = time.monotonic()
+
+            if len(page) < BULK_PAGE_SIZE:
+                break
+
+        _pending_page_cache.clear()
+        await _edit_progress(status_message, _render_bulk_progress(action, chat_id, progress, finished=True))
+        logger.info(f"Bulk {'approve' if approve else 'decline'} finished for chat {chat_id}: {progress}")
+
+    finally:
+        _bulk_jobs.discard(chat_id)
+
+
+@router.message(Command("approve_all"), AdminFilter())
+async def cmd_approve_all(message: Message, command: CommandObject):
+    """Handle /approve_all command (admin only): approve all pending requests of a chat."""
+    try:
+        await _run_bulk_action(message, command, approve=True)
+    except Exception as e:
+        logger.error(f"Error in approve_all command: {e}")
+        await message.answer(
+            "❌ *批量通过时发生错误*\n\n"
+            "请稍后重试",
+            parse_mode="MarkdownV2"
+        )
+
+
+@router.message(Command("decline_all"), AdminFilter())
+async def cmd_decline_all(message: Message, command: CommandObject):
+    """Handle /decline_all command (admin only): decline all pending requests of a chat."""
+    try:
+        await _run_bulk_action(message, command, approve=False)
+    except Exception as e:
+        logger.error(f"Error in decline_all command: {e}")
+        await message.answer(
+            "❌ *批量拒绝时发生错误*\n\n"
+            "请稍后重试",
+            parse_mode="MarkdownV2"
+        )
+
+
+def _blocklist_disabled_text() -> str:
+    return (
+        "🚫 *全局黑名单未启用*\n\n"
+        "请在配置文件中设置 `blocklist.enable = true` 来启用"
+    )
+
+
+def _parse_block_import(content: bytes) -> Tuple[List[int], List[int]]:
+    """Parse a blocklist import file: one user ID per line, or the first column of a CSV.
+
+    Blank lines and lines starting with # are skipped. Returns the user IDs and
+    the numbers of the lines that were rejected (a CSV header included).
+    """
+    user_ids, rejected = [], []
+    for number, line in enumerate(content.decode("utf-8-sig", errors="replace").splitlines(), start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        value = _BLOCK_IMPORT_SEPARATOR.split(line, 1)[0].strip().strip('"\'')
+        if value.isascii() and value.isdigit() and 0 < int(value) < 2 ** 63:
+            user_ids.append(int(value))
+        else:
+            rejected.append(number)
+    return user_ids, rejected
+
+
+@router.message(Command("block"), AdminFilter())
+async def cmd_block(message: Message, command: CommandObject):
+    """Handle /block <user_id> [reason] (admin only): add a user to the global blocklist."""
+    try:
+        if not config.blocklist.enable:
+            await message.answer(_blocklist_disabled_text(), parse_mode="MarkdownV2")
+            return
+
+        parts = (command.args or "").split(maxsplit=1)
+        if not parts or not parts[0].isdigit():
+            await message.answer(
+                "用法：`/block <用户ID> [原因]`",
+                parse_mode="MarkdownV2"
+            )
+            return
+
+        user_id = int(parts[0])
+        added = await blocklist.add(
+            [user_id],
+            reason="manual",
+            added_by=message.from_user.id,
+            source_chat_id=message.chat.id if message.chat.type != "private" else None
+        )
+        if added:
+            logger.info(f"User {user_id} blocked by admin {message.from_user.id}: {parts[1] if len(parts) > 1 else ''}")
+            text = f"✅ 已将用户 `{user_id}` 加入全局黑名单"
+        else:
+            text = f"ℹ️ 用户 `{user_id}` 已在全局黑名单中"
+        await message.answer(text, parse_mode="MarkdownV2")
+
+    except Exception as e:
+        logger.error(f"Error in block command: {e}")
+        await message.answer(
+            "❌ *添加黑名单时发生错误*\n\n"
+            "请稍后重试",
+            parse_mode="MarkdownV2"
+        )
+
+
+@router.message(Command("unblock"), AdminFilter())
+async def cmd_unblock(message: Message, command: CommandObject):
+    """Handle /unblock <user_id> (admin only): remove a user from the global blocklist."""
+    try:
+        if not config.blocklist.enable:
+            await message.answer(_blocklist_disabled_text(), parse_mode="MarkdownV2")
+            return
+
+        args = (command.args or "").strip()
+        if not args.isdigit():
+            await message.answer(
+                "用法：`/unblock <用户ID>`",
+                parse_mode="MarkdownV2"
+            )
+            return
+
+        user_id = int(args)
+        if await blocklist.remove(user_id):
+            logger.info(f"User {user_id} unblocked by admin {message.from_user.id}")
+            text = f"✅ 已将用户 `{user_id}` 移出全局黑名单"
+        else:
+            text = f"ℹ️ 用户 `{user_id}` 不在全局黑名单中"
+        await message.answer(text, parse_mode="MarkdownV2")
+
+    except Exception as e:
+        logger.error(f"Error in unblock command: {e}")
+        await message.answer(
+            "❌ *移除黑名单时发生错误*\n\n"
+            "请稍后重试",
+            parse_mode="MarkdownV2"
+        )
+
+
+@router.message(Command("blocklist"), AdminFilter())
+async def cmd_blocklist(message: Message):
+    """Handle /blocklist (admin only): show global blocklist status."""
+    try:
+        if not config.blocklist.enable:
+            await message.answer(_blocklist_disabled_text(), parse_mode="MarkdownV2")
+            return
+
+        loaded_at = blocklist.loaded_at.strftime("%Y-%m-%d %H:%M:%S") if blocklist.loaded_at else "-"
+        auto_block = (
+            f"失败 {config.blocklist.failure_threshold} 次且涉及 {config.blocklist.min_chats} 个群组"
+            f"（{config.blocklist.window_days} 天内）"
+            if config.blocklist.auto_block else "未启用"
+        )
+        await message.answer(
+            f"🚫 *全局黑名单*\n\n"
+            f"• 用户数：`{len(blocklist)}`\n"
+            f"• 内存占用：`{blocklist.nbytes}` 字节\n"
+            f"• 上次加载：`{loaded_at}`\n"
+            f"• 自动封禁：{escape_markdown_v2(auto_block)}\n\n"
+            "发送包含用户ID的文本文件并附带说明 `/block_import` 可批量导入",
+            parse_mode="MarkdownV2"
+        )
+
+    except Exception as e:
+        logger.error(f"Error in blocklist command: {e}")
+        await message.answer(
+            "❌ *获取黑名单信息时发生错误*\n\n"
+            "请稍后重试",
+            parse_mode="MarkdownV2"
+        )
+
+
+@router.message(Command("block_import"), F.document, AdminFilter())
+async def cmd_block_import(message: Message, bot: Bot):
+    """Handle a document captioned /block_import (admin only): bulk add user IDs to the blocklist.
+
+    The file holds one user ID per line, or a CSV whose first column is the user ID.
+    """
+    try:
+        if not config.blocklist.enable:
+            await message.answer(_blocklist_disabled_text(), parse_mode="MarkdownV2")
+            return
+
+        if message.document.file_size and message.document.file_size > BLOCK_IMPORT_MAX_BYTES:
+            await message.answer("❌ *文件过大*\n\n最大支持 20 MB", parse_mode="MarkdownV2")
+            return
+
+        content = await bot.download(message.document)
+        user_ids, rejected = _parse_block_import(content.read())
+        rejected_text = ""
+        if rejected:
+            shown = ", ".join(map(str, rejected[:BLOCK_IMPORT_REJECTED_SHOWN]))
+            more = " …" if len(rejected) > BLOCK_IMPORT_REJECTED_SHOWN else ""
+            rejected_text = f"\n• 无效行：`{len(rejected)}`（行号：{escape_markdown_v2(shown + more)}）"
+
+        if not user_ids:
+            await message.answer(
+                "❌ *文件中没有找到用户ID*\n\n"
+                f"每行一个用户ID，或CSV的第一列为用户ID{rejected_text}",
+                parse_mode="MarkdownV2"
+            )
+            return
+
+        added = await blocklist.add(user_ids, reason="import", added_by=message.from_user.id)
+        logger.info(
+            f"Admin {message.from_user.id} imported {len(added)} users into the blocklist "
+            f"({len(rejected)} lines rejected)"
+        )
+        await message.answer(
+            f"✅ *黑名单导入完成*\n\n"
+            f"• 文件中的ID：`{len(set(user_ids))}`\n"
+            f"• 新增：`{len(added)}`\n"
+            f"• 黑名单总数：`{len(blocklist)}`"
+            f"{rejected_text}",
+            parse_mode="MarkdownV2"
+        )
+
+    except Exception as e:
+        logger.error(f"Error in block_import command: {e}")
+        await message.answer(
+            "❌ *导入黑名单时发生错误*\n\n"
+            "请稍后重试",
+            parse_mode="MarkdownV2"
+        )
+
+
+def _parse_api_key_args(command: CommandObject) -> Tuple[Optional[str], Optional[str]]:
+    parts = (command.args or "").split()
+    if not parts or not _API_CLIENT_NAME.match(parts[0]):
+        return None, None
+    return parts[0], parts[1] if len(parts) > 1 else None
+
+
+def _parse_quota(value: Optional[str]) -> Tuple[bool, Optional[int]]:
+    """Parse a daily quota argument (missing or 0 = unlimited). Returns (valid, quota)."""
+    if value is None:
+        return True, None
+    if not value.isdigit():
+        return False, None
+    return True, int(value) or None
+
+
+async def _send_new_api_key(message: Message, title: str, name: str, api_key: str) -> None:
+    await message.answer(
+        f"✅ *{title}*\n\n"
+        f"• 客户端：`{name}`\n"
+        f"• API Key：`{api_key}`\n\n"
+        "⚠️ *密钥只显示这一次，请立即妥善保存*",
+        parse_mode="MarkdownV2"
+    )
+
+
+@router.message(Command("apikey_create"), AdminFilter())
+async def cmd_apikey_create(message: Message, command: CommandObject):
+    """Handle /apikey_create <name> [daily_quota] (admin only, private chat): issue a key for a new API client."""
+    try:
+        if message.chat.type != "private":
+            await message.answer("🔒 请在与机器人的私聊中管理 API Key")
+            return
+
+        name, quota_arg = _parse_api_key_args(command)
+        valid_quota, daily_quota = _parse_quota(quota_arg)
+        if name is None or not valid_quota:
+            await message.answer(
+                "用法：`/apikey_create <客户端名称> [每日调用上限]`\n\n"
+                "名称可包含字母、数字、`_` 与 `-`；上限为 0 或省略表示不限",
+                parse_mode="MarkdownV2"
+            )
+            return
+
+        if name in _RESERVED_API_CLIENTS or await get_api_key_by_name(name) is not None:
+            await message.answer(f"❌ 客户端 `{name}` 已存在", parse_mode="MarkdownV2")
+            return
+
+        api_key = generate_api_key()
+        created = await create_api_key(name, hash_api_key(api_key), api_key[:API_KEY_DISPLAY_PREFIX], daily_quota)
+        if created is None:
+            await message.answer("❌ *创建 API Key 失败*\n\n请稍后重试", parse_mode="MarkdownV2")
+            return
+
+        logger.info(f"API client {name} created by admin {message.from_user.id}")
+        await _send_new_api_key(message, "API Key 已创建", name, api_key)
+
+    except Exception as e:
+        logger.error(f"Error in apikey_create command: {e}")
+        await message.answer(
+            "❌ *创建 API Key 时发生错误*\n\n"
+            "请稍后重试",
+            parse_mode="MarkdownV2"
+        )
+
+
+@router.message(Command("apikey_rotate"), AdminFilter())
+async def cmd_apikey_rotate(message: Message, command: CommandObject):
+    """Handle /apikey_rotate <name> (admin only, private chat): replace a client's key (also re-enables it)."""
+    try:
+        if message.chat.type != "private":
+            await message.answer("🔒 请在与机器人的私聊中管理 API Key")
+            return
+
+        name, _ = _parse_api_key_args(command)
+        if name is None:
+            await message.answer("用法：`/apikey_rotate <客户端名称>`", parse_mode="MarkdownV2")
+            return
+
+        api_key = generate_api_key()
+        rotated = await update_api_key(
+            name,
+            key_hash=hash_api_key(api_key),
+            key_prefix=api_key[:API_KEY_DISPLAY_PREFIX],
+            revoked=False,
+            rotated_time=datetime.utcnow()
+        )
+        if not rotated:
+            await message.answer(f"❌ 客户端 `{name}` 不存在", parse_mode="MarkdownV2")
+            return
+
+        logger.info(f"API key of client {name} rotated by admin {message.from_user.id}")
+        await _send_new_api_key(message, "API Key 已更换", name, api_key)
+        await message.answer(
+            f"旧密钥最多在 {config.api_keys.cache_ttl_seconds} 秒内失效"
+        )
+
+    except Exception as e:
+        logger.error(f"Error in apikey_rotate command: {e}")
+        await message.answer(
+            "❌ *更换 API Key 时发生错误*\n\n"
+            "请稍后重试",
+            parse_mode="MarkdownV2"
+        )
+
+
+@router.message(Command("apikey_revoke"), AdminFilter())
+async def cmd_apikey_revoke(message: Message, command: CommandObject):
+    """Handle /apikey_revoke <name> (admin only): disable a client's key."""
+    try:
+        name, _ = _parse_api_key_args(command)
+        if name is None:
+            await message.answer("用法：`/apikey_revoke <客户端名称>`", parse_mode="MarkdownV2")
+            return
+
+        if not await update_api_key(name, revoked=True):
+            await message.answer(f"❌ 客户端 `{name}` 不存在", parse_mode="MarkdownV2")
+            return
+
+        logger.info(f"API key of client {name} revoked by admin {message.from_user.id}")
+        await message.answer(
+            f"✅ 已停用客户端 `{name}` 的 API Key\n\n"
+            f"最多在 {config.api_keys.cache_ttl_seconds} 秒内生效，可通过 `/apikey_rotate` 重新签发",
+            parse_mode="MarkdownV2"
+        )
+
+    except Exception as e:
+        logger.error(f"Error in apikey_revoke command: {e}")
+        await message.answer(
+            "❌ *停用 API Key 时发生错误*\n\n"
+            "请稍后重试",
+            parse_mode="MarkdownV2"
+        )
+
+
+@router.message(Command("apikey_quota"), AdminFilter())
+async def cmd_apikey_quota(message: Message, command: CommandObject):
+    """Handle /apikey_quota <name> <daily_quota> (admin only): change a client's daily quota (0 = unlimited)."""
+    try:
+        name, quota_arg = _parse_api_key_args(command)
+        valid_quota, daily_quota = _parse_quota(quota_arg)
+        if name is None or quota_arg is None or not valid_quota:
+            await message.answer("用法：`/apikey_quota <客户端名称> <每日调用上限，0 为不限>`", parse_mode="MarkdownV2")
+            return
+
+        if not await update_api_key(name, daily_quota=daily_quota):
+            await message.answer(f"❌ 客户端 `{name}` 不存在", parse_mode="MarkdownV2")
+            return
+
+        quota_text = f"每日 {daily_quota} 次" if daily_quota else "不限"
+        await message.answer(
+            f"✅ 客户端 `{name}` 的调用上限已设为{escape_markdown_v2(quota_text)}",
+            parse_mode="MarkdownV2"
+        )
+
+    except Exception as e:
+        logger.error(f"Error in apikey_quota command: {e}")
+        await message.answer(
+            "❌ *修改调用上限时发生错误*\n\n"
+            "请稍后重试",
+            parse_mode="MarkdownV2"
+        )
+
+
+@router.message(Command("apikeys"), AdminFilter())
+async def cmd_apikeys(message: Message):
+    """Handle /apikeys (admin only): list API clients with today's usage."""
+    try:
+        keys = await list_api_keys(datetime.utcnow().date())
+        if keys is None:
+            await message.answer("❌ *获取 API Key 列表失败*\n\n请稍后重试", parse_mode="MarkdownV2")
+            return
+        if not keys:
+            await message.answer(
+                "🔑 *API 客户端*\n\n"
+                "暂无客户端，使用 `/apikey_create <名称>` 创建",
+                parse_mode="MarkdownV2"
+            )
+            return
+
+        lines = []
+        for key in keys:
+            quota = key['daily_quota'] or "∞"
+            state = "已停用" if key['revoked'] else f"今日 {key['requests']}/{quota}"
+            lines.append(f"• `{key['name']}` `{key['key_prefix']}…` {escape_markdown_v2(state)}")
+
+        await message.answer(
+            "🔑 *API 客户端*\n\n" + "\n".join(lines) + "\n\n"
+            + escape_markdown_v2("今日用量每隔数秒同步一次（UTC 日期）"),
+            parse_mode="MarkdownV2"
+        )
+
+    except Exception as e:
+        logger.error(f"Error in apikeys command: {e}")
+        await message.answer(
+            "❌ *获取 API Key 列表时发生错误*\n\n"
+            "请稍后重试",
+            parse_mode="MarkdownV2"
+        )
+
+
 def setup_admin_handlers(dp):
     """Setup admin handlers."""
     dp.include_router(router)
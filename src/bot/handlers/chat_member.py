@@ -2,19 +2,225 @@
 
 import logging
 from datetime import datetime, timedelta
+from typing import Optional
 
 from aiogram import Router
 from aiogram.exceptions import TelegramBadRequest
 from aiogram.types import ChatJoinRequest, InlineKeyboardMarkup, InlineKeyboardButton
 
+from src.bot.blocklist import blocklist
+from src.bot.risk import RiskAssessment, get_risk_engine
+from src.bot.throttle import OpenVerification, join_throttle
 from src.config.settings import config
-from src.database.operations import create_join_request, create_verification_session
+from src.database.models import VerificationSession
+from src.database.operations import (
+    approve_join_request,
+    create_join_request,
+    create_verification_session,
+    get_verification_session
+)
 from src.utils.crypto import generate_verification_token
 
 logger = logging.getLogger(__name__)
 router = Router()
 
 
+async def approve_trusted_request(join_request: ChatJoinRequest, assessment: RiskAssessment) -> bool:
+    """Approve a trusted user's join request directly, skipping the captcha.
+
+    Returns False if the request should go through normal verification instead.
+    """
+    user = join_request.from_user
+    chat = join_request.chat
+
+    try:
+        await join_request.approve()
+    except TelegramBadRequest as e:
+        logger.warning(f"Fast-path approval failed for user {user.id} in chat {chat.id}: {e}")
+        return False
+
+    # Keep a record of the request; "trusted" approvals never count as verified history
+    token = generate_verification_token()
+    db_join_request = await create_join_request(
+        user_id=user.id,
+        chat_id=chat.id,
+        username=user.username,
+        first_name=user.first_name,
+        last_name=user.last_name,
+        verification_token=token,
+        request_type="trusted"
+    )
+    if db_join_request:
+        await approve_join_request(token)
+
+    logger.info(
+        f"Fast-path approved user {user.id} in chat {chat.id} "
+        f"(score {assessment.score:g}: {assessment.describe()})"
+    )
+    return True
+
+
+async def create_verification(join_request: ChatJoinRequest) -> Optional[VerificationSession]:
+    """Create the join request record and a verification session for it."""
+    user = join_request.from_user
+    chat = join_request.chat
+
+    # Generate verification token
+    verification_token = generate_verification_token()
+
+    # Create join request record (marked as telegram type)
+    db_join_request = await create_join_request(
+        user_id=user.id,
+        chat_id=chat.id,
+        username=user.username,
+        first_name=user.first_name,
+        last_name=user.last_name,
+        verification_token=verification_token,
+        request_type="telegram"
+    )
+
+    if not db_join_request:
+        logger.error(f"Failed to create join request for user {user.id}")
+        return None
+
+    # Create verification session
+    expires_at = datetime.utcnow() + timedelta(seconds=config.bot.verification_timeout)
+    verification_session = await create_verification_session(
+        token=verification_token,
+        user_id=user.id,
+        chat_id=chat.id,
+        expires_at=expires_at
+    )
+
+    if not verification_session:
+        logger.error(f"Failed to create verification session for user {user.id}")
+        return None
+
+    return verification_session
+
+
+async def link_to_open_verification(join_request: ChatJoinRequest, open_verification: OpenVerification) -> bool:
+    """Record a join request as part of the user's open verification for another chat.
+
+    Completing that verification approves this request too. Returns False if
+    the verification is no longer open and a new one is needed.
+    """
+    user = join_request.from_user
+    chat = join_request.chat
+
+    parent = await get_verification_session(open_verification.token)
+    if not parent or parent.captcha_completed or parent.is_expired:
+        join_throttle.clear_open(user.id)
+        return False
+
+    db_join_request = await create_join_request(
+        user_id=user.id,
+        chat_id=chat.id,
+        username=user.username,
+        first_name=user.first_name,
+        last_name=user.last_name,
+        verification_token=generate_verification_token(),
+        request_type="telegram",
+        parent_token=open_verification.token
+    )
+    if not db_join_request:
+        logger.error(f"Failed to create linked join request for user {user.id}")
+        return False
+
+    # The parent may have been completed while linking, after its linked requests were approved
+    parent = await get_verification_session(open_verification.token)
+    if parent and parent.captcha_completed:
+        try:
+            await join_request.approve()
+            await approve_join_request(db_join_request.verification_token)
+        except TelegramBadRequest as e:
+            logger.warning(f"Failed to approve linked request of user {user.id} in chat {chat.id}: {e}")
+
+    logger.info(
+        f"Linked join request of user {user.id} in chat {chat.id} "
+        f"to verification for chat {open_verification.chat_id}"
+    )
+    return True
+
+
+async def send_verification_message(join_request: ChatJoinRequest, verification_token: str) -> None:
+    """Send the Mini App verification link to the user (or to the group if they can't be messaged)."""
+    user = join_request.from_user
+    chat = join_request.chat
+
+    # Create Mini Web App URL
+    web_app_url = f"{config.api.base_url}/verify?token={verification_token}"
+
+    # Create inline keyboard with verification button
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(
+            text=config.bot.verification_button_text,
+            web_app={"url": web_app_url}
+        )]
+    ])
+
+    # Send verification message to user
+    try:
+        # Create personalized welcome message with group name
+        chat_title = chat.title or "群组"
+        welcome_text = f"欢迎加入群组{chat_title}！请点击下方链接完成人机验证"
+
+        await join_request.bot.send_message(
+            chat_id=user.id,
+            text=welcome_text,
+            reply_markup=keyboard
+        )
+        logger.info(f"Verification message sent to user {user.id}")
+
+    except TelegramBadRequest as e:
+        if "chat not found" in str(e).lower():
+            logger.warning(f"Cannot send message to user {user.id}: user hasn't started bot")
+
+            # Try to send message to the group mentioning the user
+            try:
+                bot_info = await join_request.bot.get_me()
+                username = user.username or user.first_name
+                await join_request.bot.send_message(
+                    chat_id=chat.id,
+                    text=f"@{username}, 请先私聊 @{bot_info.username} 机器人，然后重新申请加群\\.",
+                    reply_markup=keyboard,
+                    parse_mode="MarkdownV2"
+                )
+            except Exception as group_msg_error:
+                logger.error(f"Failed to send group message: {group_msg_error}")
+        else:
+            logger.error(f"Failed to send verification message: {e}")
+
+
+async def start_throttled_verification(join_request: ChatJoinRequest, deferred: bool = False) -> Optional[str]:
+    """Get the verification token to send for a request, collapsing it into an open verification.
+
+    Deferred requests (past the throttle limit) are always linked to the open
+    verification, whether or not collapsing is enabled, and never resend it.
+    Returns None when nothing needs to be sent: the request was linked to the
+    verification the user already received, or it failed.
+    """
+    user = join_request.from_user
+    chat = join_request.chat
+
+    # Serialize the user's concurrent requests so only the first creates a verification
+    async with join_throttle.lock(user.id):
+        open_verification = join_throttle.open_verification(user.id, force=deferred)
+        if open_verification is not None:
+            if open_verification.chat_id == chat.id:
+                # Repeated request for the same chat: resend the open verification
+                return None if deferred else open_verification.token
+            if await link_to_open_verification(join_request, open_verification):
+                return None
+
+        verification_session = await create_verification(join_request)
+        if not verification_session:
+            return None
+
+        join_throttle.set_open(user.id, verification_session.token, chat.id, verification_session.expires_at)
+        return verification_session.token
+
+
 @router.chat_join_request()
 async def handle_join_request(join_request: ChatJoinRequest):
     """Handle new chat join requests."""
@@ -24,79 +230,41 @@ async def handle_join_request(join_request: ChatJoinRequest):
 
         logger.info(f"New join request from user {user.id} ({user.username}) to chat {chat.id}")
 
-        # Generate verification token
-        verification_token = generate_verification_token()
-
-        # Create join request record (marked as telegram type)
-        db_join_request = await create_join_request(
-            user_id=user.id,
-            chat_id=chat.id,
-            username=user.username,
-            first_name=user.first_name,
-            last_name=user.last_name,
-            verification_token=verification_token,
-            request_type="telegram"
-        )
-
-        if not db_join_request:
-            logger.error(f"Failed to create join request for user {user.id}")
+        # Blocklisted users are declined outright: no token, session or message
+        if config.blocklist.enable and user.id in blocklist:
+            try:
+                await join_request.decline()
+                logger.info(f"Declined blocklisted user {user.id} in chat {chat.id}")
+            except TelegramBadRequest as e:
+                logger.warning(f"Failed to decline blocklisted user {user.id} in chat {chat.id}: {e}")
             return
 
-        # Create verification session
-        expires_at = datetime.utcnow() + timedelta(seconds=config.bot.verification_timeout)
-        verification_session = await create_verification_session(
-            token=verification_token,
-            user_id=user.id,
-            chat_id=chat.id,
-            expires_at=expires_at
-        )
-
-        if not verification_session:
-            logger.error(f"Failed to create verification session for user {user.id}")
+        # Users filing requests across many chats at once are deferred (or declined) past the limit
+        over_limit = config.throttle.enable and join_throttle.over_limit(user.id)
+        if over_limit and config.throttle.over_limit_action == "decline":
+            try:
+                await join_request.decline()
+                logger.info(f"Declined throttled join request of user {user.id} in chat {chat.id}")
+            except TelegramBadRequest as e:
+                logger.warning(f"Failed to decline throttled user {user.id} in chat {chat.id}: {e}")
             return
 
-        # Create Mini Web App URL
-        web_app_url = f"{config.api.base_url}/verify?token={verification_token}"
-
-        # Create inline keyboard with verification button
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(
-                text=config.bot.verification_button_text,
-                web_app={"url": web_app_url}
-            )]
-        ])
+        # Trusted users skip the Mini App and captcha entirely
+        risk_engine = get_risk_engine()
+        if risk_engine is not None:
+            assessment = await risk_engine.assess(user.id, chat.id)
+            if assessment.trusted and await approve_trusted_request(join_request, assessment):
+                return
+            logger.info(f"Risk score {assessment.score:g} for user {user.id}: {assessment.describe()}")
 
-        # Send verification message to user
-        try:
-            # Create personalized welcome message with group name
-            chat_title = chat.title or "群组"
-            welcome_text = f"欢迎加入群组{chat_title}！请点击下方链接完成人机验证"
-
-            await join_request.bot.send_message(
-                chat_id=user.id,
-                text=welcome_text,
-                reply_markup=keyboard
-            )
-            logger.info(f"Verification message sent to user {user.id}")
+        if config.throttle.enable:
+            verification_token = await start_throttled_verification(join_request, deferred=over_limit)
+        else:
+            verification_session = await create_verification(join_request)
+            verification_token = verification_session.token if verification_session else None
 
-        except TelegramBadRequest as e:
-            if "chat not found" in str(e).lower():
-                logger.warning(f"Cannot send message to user {user.id}: user hasn't started bot")
-
-                # Try to send message to the group mentioning the user
-                try:
-                    bot_info = await join_request.bot.get_me()
-                    username = user.username or user.first_name
-                    await join_request.bot.send_message(
-                        chat_id=chat.id,
-                        text=f"@{username}, 请先私聊 @{bot_info.username} 机器人，然后重新申请加群\\.",
-                        reply_markup=keyboard,
-                        parse_mode="MarkdownV2"
-                    )
-                except Exception as group_msg_error:
-                    logger.error(f"Failed to send group message: {group_msg_error}")
-            else:
-                logger.error(f"Failed to send verification message: {e}")
+        if verification_token:
+            await send_verification_message(join_request, verification_token)
 
     except Exception as e:
         logger.error(f"Error handling join request: {e}")
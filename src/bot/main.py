@@ -7,10 +7,18 @@ from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
 
+from src.bot.approvals import ApprovalWorker
+from src.bot.blocklist import blocklist
 from src.bot.handlers import setup_handlers
-from src.bot.tasks import run_cleanup_loop
+from src.bot.tasks import (
+    run_archive_loop,
+    run_blocklist_refresh_loop,
+    run_cleanup_loop,
+    run_partition_maintenance_loop
+)
 from src.config.settings import config
 from src.database.connection import init_database
+from src.events.bus import event_bus
 
 
 async def main():
@@ -27,6 +35,9 @@ async def main():
     # Initialize database
     await init_database()
 
+    if config.blocklist.enable:
+        await blocklist.load()
+
     # Create bot and dispatcher
     bot = Bot(
         token=config.bot.token,
@@ -45,17 +56,35 @@ async def main():
         BotCommand(command="help", description="显示帮助信息"),
     ])
 
+    # Follow approvals and cache changes from other processes
+    if config.events.enable:
+        if config.events.approve_in_bot:
+            ApprovalWorker(bot).subscribe()
+        if config.blocklist.enable:
+            blocklist.follow_changes()
+        event_bus.start()
+
     try:
         logger.info("Bot started successfully")
-        cleanup_task = asyncio.create_task(run_cleanup_loop(60))
+        background_tasks = [
+            asyncio.create_task(run_cleanup_loop(60, bot=bot)),
+            asyncio.create_task(run_partition_maintenance_loop()),
+        ]
+        if config.archive.enable:
+            background_tasks.append(asyncio.create_task(run_archive_loop()))
+        if config.blocklist.enable and not config.events.enable:
+            background_tasks.append(asyncio.create_task(run_blocklist_refresh_loop()))
         try:
             await dp.start_polling(bot)
         finally:
-            cleanup_task.cancel()
-            try:
-                await cleanup_task
-            except asyncio.CancelledError:
-                pass
+            await event_bus.stop()
+            for task in background_tasks:
+                task.cancel()
+            for task in background_tasks:
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
     except Exception as e:
         logger.error(f"Bot error: {e}")
     finally:
@@ -0,0 +1,198 @@
+"""Risk scoring for the trusted-user fast path.
+
+Each join request is scored by a chain of pluggable scorers before a
+verification token is issued. When the summed score reaches the configured
+threshold, the request is approved without sending the user through the
+Mini App and captcha.
+"""
+
+import logging
+import math
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Type
+
+from src.config.settings import RiskConfig, config
+from src.database.operations import get_user_trust_history
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RiskSignal:
+    """Trust contribution of one scorer (positive = more trusted)."""
+    scorer: str
+    score: float
+    reason: str
+
+
+@dataclass
+class RiskAssessment:
+    """Combined result of all scorers for a join request."""
+    user_id: int
+    chat_id: int
+    score: float
+    trusted: bool
+    signals: List[RiskSignal] = field(default_factory=list)
+
+    def describe(self) -> str:
+        return ", ".join(f"{signal.scorer}={signal.score:+g} ({signal.reason})" for signal in self.signals) or "no signals"
+
+
+class RiskContext:
+    """Per-request data shared between scorers; the history query runs at most once."""
+
+    def __init__(self, user_id: int, chat_id: int, risk_config: RiskConfig):
+        self.user_id = user_id
+        self.chat_id = chat_id
+        self.config = risk_config
+        self._history: Optional[Dict[str, Any]] = None
+        self._history_loaded = False
+
+    async def history(self) -> Optional[Dict[str, Any]]:
+        if not self._history_loaded:
+            self._history_loaded = True
+            since = datetime.utcnow() - timedelta(days=self.config.history_days)
+            self._history = await get_user_trust_history(self.user_id, since)
+        return self._history
+
+
+class RiskScorer(ABC):
+    """A pluggable risk scoring stage."""
+
+    name: str = ""
+
+    def __init__(self, risk_config: RiskConfig):
+        self.config = risk_config
+
+    @abstractmethod
+    async def score(self, context: RiskContext) -> Optional[RiskSignal]:
+        """Score a join request, or return None if this scorer has no opinion."""
+        pass
+
+
+class AllowListScorer(RiskScorer):
+    """Users on the chat's allow list (or the global "*" list) are trusted outright."""
+
+    name = "allow_list"
+
+    def __init__(self, risk_config: RiskConfig):
+        super().__init__(risk_config)
+        self._allowed = {
+            str(chat_id): {int(user_id) for user_id in user_ids}
+            for chat_id, user_ids in risk_config.allow_lists.items()
+        }
+
+    async def score(self, context: RiskContext) -> Optional[RiskSignal]:
+        for key in (str(context.chat_id), "*"):
+            if context.user_id in self._allowed.get(key, ()):
+                return RiskSignal(self.name, math.inf, f"allow list {key}")
+        return None
+
+
+class HistoryScorer(RiskScorer):
+    """Rewards captcha-verified approvals and penalizes rejected or expired requests."""
+
+    name = "history"
+
+    async def score(self, context: RiskContext) -> Optional[RiskSignal]:
+        history = await context.history()
+        if not history:
+            return None
+
+        approvals = min(history['verified_approvals'], self.config.max_approvals_counted)
+        failures = history['failures']
+        if not approvals and not failures:
+            return None
+
+        score = approvals * self.config.approval_weight - failures * self.config.failure_penalty
+        return RiskSignal(self.name, score, f"{history['verified_approvals']} verified, {failures} failed")
+
+
+class CaptchaScoreScorer(RiskScorer):
+    """Uses the average provider confidence score of the user's past verifications."""
+
+    name = "captcha_score"
+
+    async def score(self, context: RiskContext) -> Optional[RiskSignal]:
+        history = await context.history()
+        if not history or history['avg_captcha_score'] is None:
+            return None
+        if history['scored_sessions'] < self.config.min_scored_sessions:
+            return None
+
+        average = history['avg_captcha_score']
+        score = (average - 0.5) * 2 * self.config.captcha_score_weight
+        return RiskSignal(self.name, round(score, 2), f"avg {average:.2f} over {history['scored_sessions']}")
+
+
+# Registry of available risk scorers
+RISK_SCORERS: Dict[str, Type[RiskScorer]] = {
+    "allow_list": AllowListScorer,
+    "history": HistoryScorer,
+    "captcha_score": CaptchaScoreScorer,
+}
+
+
+class RiskEngine:
+    """Runs the configured scorers and decides whether a request is trusted."""
+
+    def __init__(self, scorers: List[RiskScorer], risk_config: RiskConfig):
+        self.scorers = scorers
+        self.config = risk_config
+
+    async def assess(self, user_id: int, chat_id: int) -> RiskAssessment:
+        context = RiskContext(user_id, chat_id, self.config)
+        signals = []
+
+        for scorer in self.scorers:
+            try:
+                signal = await scorer.score(context)
+            except Exception as e:
+                logger.error(f"Risk scorer {scorer.name} failed for user {user_id}: {e}")
+                continue
+            if signal is not None:
+                signals.append(signal)
+                # An allow list match decides on its own; skip the database lookups
+                if math.isinf(signal.score):
+                    break
+
+        score = sum(signal.score for signal in signals)
+        return RiskAssessment(
+            user_id=user_id,
+            chat_id=chat_id,
+            score=score,
+            trusted=score >= self.config.threshold,
+            signals=signals
+        )
+
+
+def create_risk_engine() -> RiskEngine:
+    """Create risk engine based on configuration."""
+    scorers = []
+    for name in config.risk.scorers:
+        scorer_class = RISK_SCORERS.get(name)
+        if scorer_class is None:
+            available = ", ".join(RISK_SCORERS.keys())
+            raise ValueError(f"Unknown risk scorer: {name}. Available scorers: {available}")
+        scorers.append(scorer_class(config.risk))
+
+    return RiskEngine(scorers, config.risk)
+
+
+# Global risk engine instance
+_risk_engine: Optional[RiskEngine] = None
+
+
+def get_risk_engine() -> Optional[RiskEngine]:
+    """Get the global risk engine (None when the fast path is disabled)."""
+    global _risk_engine
+
+    if not config.risk.enable:
+        return None
+
+    if _risk_engine is None:
+        _risk_engine = create_risk_engine()
+
+    return _risk_engine
@@ -2,38 +2,102 @@
 
 import asyncio
 import logging
+from typing import Optional
+
+from aiogram import Bot
 
 from src.api.services.approval import dismiss_join_request
-from src.database.operations import cleanup_expired_sessions
+from src.bot.blocklist import blocklist
+from src.config.settings import config
+from src.database.archive import archive_verification_history
+from src.database.operations import (
+    cleanup_expired_sessions,
+    delete_expired_idempotency_records,
+    maintain_partitions
+)
 
 logger = logging.getLogger(__name__)
 
 CLEANUP_INTERVAL_SECONDS = 60
+PARTITION_MAINTENANCE_INTERVAL_SECONDS = 3600
 
 
-async def cleanup_and_dismiss_expired_requests() -> None:
+async def cleanup_and_dismiss_expired_requests(bot: Optional[Bot] = None) -> None:
     """Run cleanup of expired sessions and dismiss corresponding Telegram join requests."""
     try:
         to_dismiss = await cleanup_expired_sessions()
         for chat_id, user_id in to_dismiss:
             try:
-                await dismiss_join_request(chat_id=chat_id, user_id=user_id)
+                await dismiss_join_request(chat_id=chat_id, user_id=user_id, bot=bot)
             except Exception as e:
                 logger.warning(
                     "Skip dismiss for user %s (chat %s): %s",
                     user_id, chat_id, e,
                     exc_info=False
                 )
+
+        if config.blocklist.enable and config.blocklist.auto_block and to_dismiss:
+            await blocklist.block_repeat_offenders(user_id for _, user_id in to_dismiss)
     except Exception as e:
         logger.exception("Error in cleanup_and_dismiss_expired_requests: %s", e)
 
 
-async def run_cleanup_loop(interval_seconds: int = CLEANUP_INTERVAL_SECONDS) -> None:
-    """Run the cleanup+dismiss task periodically."""
+async def run_cleanup_loop(interval_seconds: int = CLEANUP_INTERVAL_SECONDS, bot: Optional[Bot] = None) -> None:
+    """Run the cleanup+dismiss task periodically, and drop expired idempotency records."""
     logger.info("Cleanup loop started (interval=%ds)", interval_seconds)
     while True:
         try:
-            await cleanup_and_dismiss_expired_requests()
+            await cleanup_and_dismiss_expired_requests(bot)
+            deleted = await delete_expired_idempotency_records()
+            if deleted:
+                logger.info("Deleted %d expired idempotency records", deleted)
         except Exception as e:
             logger.exception("Cleanup loop iteration failed: %s", e)
         await asyncio.sleep(interval_seconds)
+
+
+async def run_partition_maintenance_loop(
+        interval_seconds: int = PARTITION_MAINTENANCE_INTERVAL_SECONDS
+) -> None:
+    """Keep future monthly partitions created and drop those past retention."""
+    logger.info("Partition maintenance loop started (interval=%ds)", interval_seconds)
+    while True:
+        try:
+            await maintain_partitions(
+                months_ahead=config.database.partition_months_ahead,
+                retention_months=config.database.partition_retention_months,
+                keep_unarchived=config.archive.enable
+            )
+        except Exception as e:
+            logger.exception("Partition maintenance iteration failed: %s", e)
+        await asyncio.sleep(interval_seconds)
+
+
+async def run_archive_loop(interval_seconds: Optional[int] = None) -> None:
+    """Periodically archive finished verification history and delete it from the hot tables."""
+    archive_config = config.archive
+    interval_seconds = interval_seconds or archive_config.interval_seconds
+    logger.info("Archive loop started (interval=%ds)", interval_seconds)
+    while True:
+        try:
+            await archive_verification_history(
+                directory=archive_config.directory,
+                older_than_days=archive_config.older_than_days,
+                batch_size=archive_config.batch_size,
+                compression_level=archive_config.compression_level
+            )
+        except Exception as e:
+            logger.exception("Archive loop iteration failed: %s", e)
+        await asyncio.sleep(interval_seconds)
+
+
+async def run_blocklist_refresh_loop(interval_seconds: Optional[int] = None) -> None:
+    """Periodically reload the blocklist to pick up changes made by other processes."""
+    interval_seconds = interval_seconds or config.blocklist.refresh_interval_seconds
+    logger.info("Blocklist refresh loop started (interval=%ds)", interval_seconds)
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await blocklist.load()
+        except Exception as e:
+            logger.exception("Blocklist refresh failed: %s", e)
@@ -0,0 +1,95 @@
+"""Cross-chat per-user join request throttle.
+
+Spam accounts file join requests to many chats within seconds. The throttle
+counts each user's requests over a sliding window, and remembers the user's
+open verification so that further requests can be linked to it instead of
+each getting a token, a session and a DM of its own. Requests past the limit
+are linked to it silently (or declined, with over_limit_action = "decline").
+"""
+
+import asyncio
+import time
+import weakref
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Deque, Dict, Optional
+
+from src.config.settings import ThrottleConfig, config
+
+# Requests between sweeps of users whose window has emptied
+PRUNE_EVERY = 1000
+
+
+@dataclass
+class OpenVerification:
+    """The verification a user was last sent."""
+    token: str
+    chat_id: int
+    expires_at: datetime
+
+
+class JoinThrottle:
+    """Per-user sliding window counter and open verification registry (bot process only)."""
+
+    def __init__(self, throttle_config: ThrottleConfig):
+        self.config = throttle_config
+        self._hits: Dict[int, Deque[float]] = {}
+        self._open: Dict[int, OpenVerification] = {}
+        self._locks: "weakref.WeakValueDictionary[int, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self._since_prune = 0
+
+    def hit(self, user_id: int) -> int:
+        """Record a join request; returns the user's requests within the window, this one included."""
+        now = time.monotonic()
+        hits = self._hits.setdefault(user_id, deque())
+        hits.append(now)
+        while hits and now - hits[0] > self.config.window_seconds:
+            hits.popleft()
+
+        self._since_prune += 1
+        if self._since_prune >= PRUNE_EVERY:
+            self._prune(now)
+        return len(hits)
+
+    def over_limit(self, user_id: int) -> bool:
+        """Record a join request and check whether it exceeds max_requests."""
+        return self.hit(user_id) > self.config.max_requests
+
+    def _prune(self, now: float) -> None:
+        self._since_prune = 0
+        stale = [user_id for user_id, hits in self._hits.items() if now - hits[-1] > self.config.window_seconds]
+        for user_id in stale:
+            del self._hits[user_id]
+
+        utcnow = datetime.utcnow()
+        for user_id in [user_id for user_id, open_ in self._open.items() if open_.expires_at <= utcnow]:
+            del self._open[user_id]
+
+    def lock(self, user_id: int) -> asyncio.Lock:
+        """Lock serializing one user's concurrent join requests."""
+        lock = self._locks.get(user_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[user_id] = lock
+        return lock
+
+    def open_verification(self, user_id: int, force: bool = False) -> Optional[OpenVerification]:
+        """Get the user's unexpired verification, if collapsing is enabled (or forced)."""
+        if not self.config.collapse and not force:
+            return None
+        open_ = self._open.get(user_id)
+        if open_ is not None and open_.expires_at <= datetime.utcnow():
+            del self._open[user_id]
+            return None
+        return open_
+
+    def set_open(self, user_id: int, token: str, chat_id: int, expires_at: datetime) -> None:
+        self._open[user_id] = OpenVerification(token, chat_id, expires_at)
+
+    def clear_open(self, user_id: int) -> None:
+        self._open.pop(user_id, None)
+
+
+# Global join throttle instance
+join_throttle = JoinThrottle(config.throttle)
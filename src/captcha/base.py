@@ -1,9 +1,16 @@
 """Abstract base class for captcha providers."""
 
+import logging
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from typing import Dict, Any, Optional
 
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=30)
+
 
 @dataclass
 class CaptchaVerificationResult:
@@ -11,7 +18,7 @@ class CaptchaVerificationResult:
     success: bool
     error_code: Optional[str] = None
     error_message: Optional[str] = None
-    score: Optional[float] = None  # For services that provide confidence scores
+    score: Optional[float] = None  # Confidence (0-1, higher = more likely human) for services that provide one
     challenge_ts: Optional[str] = None  # Timestamp of challenge
     hostname: Optional[str] = None
     extra_data: Optional[Dict[str, Any]] = None
@@ -20,17 +27,69 @@ class CaptchaVerificationResult:
 class CaptchaProvider(ABC):
     """Abstract base class for captcha providers."""
 
-    def __init__(self, site_key: str, secret_key: str, timeout: int = 30):
+    # Whether verify() accepts an idempotency_key, making repeated (retried or hedged) calls for one response safe
+    supports_idempotency_key = False
+
+    def __init__(
+            self,
+            site_key: str,
+            secret_key: str,
+            timeout: int = 30,
+            http2: bool = False,
+            limits: Optional[httpx.Limits] = None
+    ):
         """Initialize captcha provider.
         
         Args:
             site_key: Public site key for frontend
             secret_key: Secret key for backend verification
             timeout: HTTP timeout in seconds
+            http2: Use HTTP/2 for the verification endpoint where supported
+            limits: Connection pool limits of the shared HTTP client
         """
         self.site_key = site_key
         self.secret_key = secret_key
         self.timeout = timeout
+        self.http2 = http2
+        self.limits = limits or DEFAULT_POOL_LIMITS
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def verify_url(self) -> Optional[str]:
+        """Remote verification endpoint, used to pre-warm connections (None if verification is local)."""
+        return None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Get the long-lived pooled HTTP client, creating it on first use."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=self.http2
+            )
+        return self._client
+
+    async def start(self) -> None:
+        """Create the pooled client and open a keep-alive connection to the verify endpoint.
+
+        The warmup request pays DNS, TCP and TLS setup at startup instead of on
+        the first user's verification; its response status is irrelevant.
+        """
+        client = self._get_client()
+        if not self.verify_url:
+            return
+
+        try:
+            await client.head(self.verify_url)
+            logger.info(f"Warmed up {self.provider_name} connection to {self.verify_url}")
+        except httpx.HTTPError as e:
+            logger.warning(f"Could not warm up {self.provider_name} connection: {e}")
+
+    async def close(self) -> None:
+        """Close the pooled HTTP client."""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
 
     @abstractmethod
     async def verify(
@@ -52,14 +111,32 @@ class CaptchaProvider(ABC):
         pass
 
     @abstractmethod
-    def get_frontend_config(self) -> Dict[str, Any]:
+    def get_frontend_config(self, hardened: bool = False) -> Dict[str, Any]:
         """Get configuration for frontend integration.
         
+        Args:
+            hardened: The client looks suspicious; providers that can issue a
+                harder challenge should do so (others ignore it)
+
         Returns:
             Dictionary containing frontend configuration
         """
         pass
 
+    def is_hardened(self, result: CaptchaVerificationResult) -> bool:
+        """Whether a successful result solved a hardened challenge.
+
+        Providers without harder challenges accept every result.
+        """
+        return True
+
+    def record_session(self, token: str) -> None:
+        """Count a live verification session towards the provider's load.
+
+        Only providers that adapt their challenges to load use it.
+        """
+        pass
+
     @property
     @abstractmethod
     def provider_name(self) -> str:
@@ -1,12 +1,16 @@
 """Captcha provider factory."""
 
 import logging
-from typing import Dict, Type
+from typing import Any, Dict, Optional, Type
+
+import httpx
 
 from src.config.settings import config
 from .base import CaptchaProvider
 from .cap import CapProvider
 from .hcaptcha import HCaptchaProvider
+from .pow import PowProvider
+from .resilience import CaptchaProviderPool, CircuitBreaker, ResilientCaptchaProvider
 from .turnstile import TurnstileProvider
 
 logger = logging.getLogger(__name__)
@@ -16,12 +20,26 @@ CAPTCHA_PROVIDERS: Dict[str, Type[CaptchaProvider]] = {
     "hcaptcha": HCaptchaProvider,
     "cap": CapProvider,
     "turnstile": TurnstileProvider,
+    "pow": PowProvider,
 }
 
 
-def create_captcha_provider() -> CaptchaProvider:
-    """Create captcha provider based on configuration."""
-    provider_name = config.captcha.provider.lower()
+def _client_options() -> Dict[str, Any]:
+    """HTTP client options shared by all remote providers."""
+    return {
+        "timeout": config.captcha.timeout_seconds,
+        "http2": config.captcha.http2,
+        "limits": httpx.Limits(
+            max_connections=config.captcha.pool_max_connections,
+            max_keepalive_connections=config.captcha.pool_max_keepalive_connections,
+            keepalive_expiry=config.captcha.pool_keepalive_expiry
+        ),
+    }
+
+
+def create_captcha_provider(provider_name: Optional[str] = None) -> ResilientCaptchaProvider:
+    """Create a captcha provider based on configuration (the primary one by default)."""
+    provider_name = (provider_name or config.captcha.provider).lower()
 
     if provider_name not in CAPTCHA_PROVIDERS:
         available = ", ".join(CAPTCHA_PROVIDERS.keys())
@@ -44,7 +62,7 @@ def create_captcha_provider() -> CaptchaProvider:
         provider = provider_class(
             site_key=provider_config.site_key,
             secret_key=provider_config.secret_key,
-            timeout=config.captcha.timeout_seconds
+            **_client_options()
         )
     elif provider_name == "cap":
         provider_config = config.captcha.cap
@@ -58,7 +76,7 @@ def create_captcha_provider() -> CaptchaProvider:
             server_url=provider_config.server_url,
             site_key=provider_config.site_key,
             secret_key=provider_config.secret_key,
-            timeout=config.captcha.timeout_seconds
+            **_client_options()
         )
     elif provider_name == "turnstile":
         provider_config = config.captcha.turnstile
@@ -71,24 +89,114 @@ def create_captcha_provider() -> CaptchaProvider:
         provider = provider_class(
             site_key=provider_config.site_key,
             secret_key=provider_config.secret_key,
-            timeout=config.captcha.timeout_seconds
+            **_client_options()
+        )
+    elif provider_name == "pow":
+        provider_config = config.captcha.pow
+        # Validate configuration
+        if not provider_config.secret_key:
+            raise ValueError(
+                f"Missing configuration for {provider_name}. "
+                f"Please set secret_key in config.toml"
+            )
+        provider = provider_class(
+            secret_key=provider_config.secret_key,
+            difficulty=provider_config.difficulty,
+            max_difficulty=provider_config.max_difficulty,
+            challenge_ttl=provider_config.challenge_ttl_seconds,
+            load_threshold_per_minute=provider_config.load_threshold_per_minute,
+            raid_threshold_per_minute=provider_config.raid_threshold_per_minute,
+            raid_mode=provider_config.raid_mode,
+            **_client_options()
         )
     else:
         raise ValueError(f"No configuration found for provider: {provider_name}")
 
     logger.info(f"Created captcha provider: {provider_name}")
-    return provider
+    return ResilientCaptchaProvider(
+        provider,
+        breaker=CircuitBreaker(
+            failure_rate_threshold=config.captcha.breaker_failure_rate,
+            min_requests=config.captcha.breaker_min_requests,
+            window_seconds=config.captcha.breaker_window_seconds,
+            open_seconds=config.captcha.breaker_open_seconds,
+            half_open_max_calls=config.captcha.breaker_half_open_calls
+        ),
+        adaptive_timeout=config.captcha.adaptive_timeout,
+        min_timeout=config.captcha.min_timeout_seconds,
+        timeout_multiplier=config.captcha.timeout_multiplier,
+        hedge=config.captcha.hedge_requests,
+        hedge_delay=config.captcha.hedge_delay_ms / 1000 or None
+    )
+
+
+def create_captcha_pool() -> CaptchaProviderPool:
+    """Create the failover chain from `captcha.providers`, skipping misconfigured entries."""
+    providers = []
+    for name in config.captcha.providers or [config.captcha.provider]:
+        try:
+            providers.append(create_captcha_provider(name))
+        except ValueError as e:
+            logger.error(f"Skipping captcha provider {name}: {e}")
+
+    if not providers:
+        raise ValueError("No usable captcha provider configured")
+
+    return CaptchaProviderPool(providers)
+
+
+# Shadow providers must complete without user interaction, since users never see them
+SHADOW_CAPABLE_PROVIDERS = ("turnstile", "pow")
+
+
+def create_shadow_provider() -> Optional[ResilientCaptchaProvider]:
+    """Create the shadow evaluation provider from `captcha.shadow_provider`, if configured."""
+    provider_name = config.captcha.shadow_provider.lower()
+    if not provider_name:
+        return None
+
+    if provider_name not in SHADOW_CAPABLE_PROVIDERS:
+        raise ValueError(
+            f"Provider {provider_name} cannot run in shadow mode. "
+            f"Shadow-capable providers: {', '.join(SHADOW_CAPABLE_PROVIDERS)}"
+        )
+
+    return create_captcha_provider(provider_name)
+
+
+# Global provider chain and shadow provider
+_captcha_pool: Optional[CaptchaProviderPool] = None
+_shadow_provider: Optional[ResilientCaptchaProvider] = None
+_shadow_provider_loaded = False
+
+
+def get_captcha_pool() -> CaptchaProviderPool:
+    """Get the global captcha provider chain."""
+    global _captcha_pool
+
+    if _captcha_pool is None:
+        _captcha_pool = create_captcha_pool()
+
+    return _captcha_pool
 
 
-# Global provider instance
-_captcha_provider: CaptchaProvider = None
+def get_captcha_provider(provider_name: Optional[str] = None) -> ResilientCaptchaProvider:
+    """Get a captcha provider of the chain by name, or the one currently preferred for new verifications."""
+    pool = get_captcha_pool()
+    if provider_name:
+        return pool.get(provider_name.lower())
+    return pool.select()
 
 
-def get_captcha_provider() -> CaptchaProvider:
-    """Get the global captcha provider instance."""
-    global _captcha_provider
+def get_shadow_provider() -> Optional[ResilientCaptchaProvider]:
+    """Get the global shadow evaluation provider (None when shadow mode is off or misconfigured)."""
+    global _shadow_provider, _shadow_provider_loaded
 
-    if _captcha_provider is None:
-        _captcha_provider = create_captcha_provider()
+    if not _shadow_provider_loaded:
+        _shadow_provider_loaded = True
+        try:
+            _shadow_provider = create_shadow_provider()
+        except ValueError as e:
+            logger.error(f"Shadow captcha provider disabled: {e}")
 
-    return _captcha_provider
+    return _shadow_provider
@@ -15,6 +15,10 @@ class HCaptchaProvider(CaptchaProvider):
 
     VERIFY_URL = "https://hcaptcha.com/siteverify"
 
+    @property
+    def verify_url(self) -> str:
+        return self.VERIFY_URL
+
     @property
     def provider_name(self) -> str:
         return "hcaptcha"
@@ -37,27 +41,29 @@ class HCaptchaProvider(CaptchaProvider):
             if remote_ip:
                 data["remoteip"] = remote_ip
 
-            # Make verification request
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response_obj = await client.post(
-                    self.VERIFY_URL,
-                    data=data,
-                    headers={
-                        "Content-Type": "application/x-www-form-urlencoded",
-                        "User-Agent": user_agent or "TGuard-Bot/1.0"
-                    }
-                )
+            # Make verification request over the pooled keep-alive client
+            response_obj = await self._get_client().post(
+                self.VERIFY_URL,
+                data=data,
+                headers={
+                    "Content-Type": "application/x-www-form-urlencoded",
+                    "User-Agent": user_agent or "TGuard-Bot/1.0"
+                }
+            )
 
-                response_obj.raise_for_status()
-                result = response_obj.json()
+            response_obj.raise_for_status()
+            result = response_obj.json()
 
             # Parse response
             success = result.get("success", False)
 
             if success:
                 logger.info("hCaptcha verification successful")
+                # hCaptcha Enterprise reports a risk score (1 = likely bot); store confidence instead
+                risk_score = result.get("score")
                 return CaptchaVerificationResult(
                     success=True,
+                    score=1 - risk_score if risk_score is not None else None,
                     challenge_ts=result.get("challenge_ts"),
                     hostname=result.get("hostname"),
                     extra_data=result
@@ -97,7 +103,7 @@ class HCaptchaProvider(CaptchaProvider):
                 error_message="验证过程中发生错误"
             )
 
-    def get_frontend_config(self) -> Dict[str, Any]:
+    def get_frontend_config(self, hardened: bool = False) -> Dict[str, Any]:
         """Get hCaptcha frontend configuration."""
         return {
             "provider": "hcaptcha",
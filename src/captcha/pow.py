@@ -0,0 +1,202 @@
+"""Built-in proof-of-work captcha provider.
+
+Challenges are HMAC-signed by the server, so nothing needs to be stored until
+a solution is accepted, and verification is a handful of hashes with no
+network I/O. The browser searches for a counter such that
+sha256("<challenge>:<counter>") starts with `difficulty` zero bits.
+"""
+
+import hashlib
+import hmac
+import logging
+import secrets
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+
+from src.utils.cache import TTLCache
+from .base import CaptchaProvider, CaptchaVerificationResult
+
+logger = logging.getLogger(__name__)
+
+# Hard cap so a misconfiguration cannot make challenges unsolvable on phones
+MAX_DIFFICULTY_BITS = 28
+
+
+def leading_zero_bits(digest: bytes) -> int:
+    """Count the leading zero bits of a digest."""
+    value = int.from_bytes(digest, "big")
+    return len(digest) * 8 - value.bit_length()
+
+
+class PowProvider(CaptchaProvider):
+    """Local proof-of-work verification provider."""
+
+    def __init__(
+            self,
+            secret_key: str,
+            difficulty: int = 16,
+            max_difficulty: int = 22,
+            challenge_ttl: int = 300,
+            load_threshold_per_minute: int = 60,
+            raid_threshold_per_minute: int = 600,
+            raid_mode: bool = False,
+            **kwargs
+    ):
+        """Initialize proof-of-work provider.
+
+        Args:
+            secret_key: HMAC key used to sign challenges
+            difficulty: Base number of leading zero bits required
+            max_difficulty: Difficulty used during a raid
+            challenge_ttl: Seconds a challenge stays solvable
+            load_threshold_per_minute: Verification sessions per minute above which difficulty starts rising
+            raid_threshold_per_minute: Session rate treated as a raid
+            raid_mode: Always use max_difficulty
+            **kwargs: HTTP client options passed to CaptchaProvider (unused)
+        """
+        super().__init__("", secret_key, **kwargs)
+        self.difficulty = min(difficulty, MAX_DIFFICULTY_BITS)
+        self.max_difficulty = min(max(max_difficulty, self.difficulty), MAX_DIFFICULTY_BITS)
+        self.challenge_ttl = challenge_ttl
+        self.load_threshold = load_threshold_per_minute
+        self.raid_threshold = raid_threshold_per_minute
+        self.raid_mode = raid_mode
+
+        self._key = secret_key.encode()
+        self._sessions: deque = deque()  # [second, sessions first seen in that second]
+        # Sessions already counted this minute, so reloading a page does not add load
+        self._counted = TTLCache(maxsize=200_000, ttl=60)
+        # Nonces of accepted solutions, kept until their challenge would have expired anyway
+        self._spent = TTLCache(maxsize=200_000, ttl=challenge_ttl)
+
+    @property
+    def provider_name(self) -> str:
+        return "pow"
+
+    def _sign(self, payload: str) -> str:
+        return hmac.new(self._key, payload.encode(), hashlib.sha256).hexdigest()[:32]
+
+    def record_session(self, token: str) -> None:
+        """Count a live verification session towards the load, once per minute.
+
+        Load is measured in sessions rather than issued challenges: challenges
+        can be fetched without a session, so counting them would let anyone
+        push every real user to max_difficulty.
+        """
+        if token in self._counted:
+            return
+        self._counted.set(token, True)
+
+        second = int(time.monotonic())
+        if self._sessions and self._sessions[-1][0] == second:
+            self._sessions[-1][1] += 1
+        else:
+            self._sessions.append([second, 1])
+        while self._sessions and second - self._sessions[0][0] >= 60:
+            self._sessions.popleft()
+
+    def session_rate(self) -> int:
+        """Verification sessions seen over the last minute."""
+        now = int(time.monotonic())
+        return sum(count for second, count in self._sessions if now - second < 60)
+
+    def current_difficulty(self) -> int:
+        """Difficulty for new challenges.
+
+        One extra bit (twice the work) per doubling of the session rate over
+        the load threshold, and max_difficulty during a raid.
+        """
+        rate = self.session_rate()
+        if self.raid_mode or rate >= self.raid_threshold:
+            return self.max_difficulty
+        if rate <= self.load_threshold:
+            return self.difficulty
+        extra = (rate // self.load_threshold).bit_length() - 1
+        return min(self.difficulty + extra, self.max_difficulty)
+
+    def issue_challenge(self, hardened: bool = False) -> str:
+        """Create a signed challenge: <nonce>.<expires_at>.<difficulty>.<signature>.
+
+        Hardened challenges always use max_difficulty.
+        """
+        difficulty = self.max_difficulty if hardened else self.current_difficulty()
+        payload = f"{secrets.token_hex(12)}.{int(time.time()) + self.challenge_ttl}.{difficulty}"
+        return f"{payload}.{self._sign(payload)}"
+
+    async def verify(
+            self,
+            response: str,
+            remote_ip: Optional[str] = None,
+            user_agent: Optional[str] = None
+    ) -> CaptchaVerificationResult:
+        """Verify a "<challenge>:<counter>" solution."""
+        if not response:
+            return CaptchaVerificationResult(
+                success=False,
+                error_code="missing-input-response",
+                error_message="请完成验证"
+            )
+
+        try:
+            challenge, counter = response.rsplit(":", 1)
+            nonce, expires_at, difficulty, signature = challenge.split(".")
+            expires_at, difficulty = int(expires_at), int(difficulty)
+        except ValueError:
+            return CaptchaVerificationResult(
+                success=False,
+                error_code="invalid-input-response",
+                error_message="验证数据无效，请重新验证"
+            )
+
+        if len(counter) > 20 or not hmac.compare_digest(signature, self._sign(f"{nonce}.{expires_at}.{difficulty}")):
+            logger.warning("PoW verification failed: bad signature")
+            return CaptchaVerificationResult(
+                success=False,
+                error_code="invalid-input-response",
+                error_message="验证数据无效，请重新验证"
+            )
+
+        if expires_at < time.time():
+            return CaptchaVerificationResult(
+                success=False,
+                error_code="challenge-expired",
+                error_message="验证已过期，请重新验证"
+            )
+
+        if nonce in self._spent:
+            logger.warning("PoW verification failed: challenge already used")
+            return CaptchaVerificationResult(
+                success=False,
+                error_code="timeout-or-duplicate",
+                error_message="验证超时或重复提交"
+            )
+
+        digest = hashlib.sha256(f"{challenge}:{counter}".encode()).digest()
+        if leading_zero_bits(digest) < difficulty:
+            logger.warning("PoW verification failed: insufficient work")
+            return CaptchaVerificationResult(
+                success=False,
+                error_code="invalid-solution",
+                error_message="验证失败，请重试"
+            )
+
+        self._spent.set(nonce, True, ttl=max(1, expires_at - time.time()))
+        logger.info(f"PoW verification successful (difficulty {difficulty})")
+        return CaptchaVerificationResult(
+            success=True,
+            extra_data={"difficulty": difficulty}
+        )
+
+    def is_hardened(self, result: CaptchaVerificationResult) -> bool:
+        """Whether the solved challenge had max_difficulty, as hardened challenges do."""
+        return (result.extra_data or {}).get("difficulty", 0) >= self.max_difficulty
+
+    def get_frontend_config(self, hardened: bool = False) -> Dict[str, Any]:
+        """Get PoW frontend configuration with a freshly issued challenge."""
+        challenge = self.issue_challenge(hardened)
+        return {
+            "provider": "pow",
+            "challenge": challenge,
+            "difficulty": int(challenge.split(".")[2])
+        }
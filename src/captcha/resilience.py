@@ -0,0 +1,470 @@
+"""Latency tracking, adaptive timeouts, circuit breaking and failover for captcha providers."""
+
+import asyncio
+import logging
+import math
+import time
+import uuid
+from collections import deque
+from typing import Dict, Any, List, Optional
+
+from src.utils.deadline import remaining
+from .base import CaptchaProvider, CaptchaVerificationResult
+
+logger = logging.getLogger(__name__)
+
+# Error codes meaning the provider itself failed, as opposed to rejecting the user's response
+PROVIDER_ERROR_CODES = frozenset({"network-error", "http-error", "internal-error", "timeout"})
+
+# Returned when the request's deadline ran out before the provider answered
+DEADLINE_EXCEEDED_RESULT = CaptchaVerificationResult(
+    success=False,
+    error_code="deadline-exceeded",
+    error_message="验证超时，请重试"
+)
+
+
+def idempotency_key(response: str) -> str:
+    """Stable per-response UUID, so retries of one captcha response are recognized by the provider."""
+    return str(uuid.uuid5(uuid.NAMESPACE_OID, response))
+
+
+class LatencyTracker:
+    """Tracks recent call latencies as an EWMA plus percentiles over a sliding sample window."""
+
+    def __init__(self, alpha: float = 0.2, window: int = 200):
+        """Initialize latency tracker.
+
+        Args:
+            alpha: EWMA smoothing factor (higher reacts faster)
+            window: Number of recent samples kept for percentiles
+        """
+        self.alpha = alpha
+        self.ewma: Optional[float] = None
+        self._samples: deque = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        """Record one call latency."""
+        self.ewma = seconds if self.ewma is None else self.alpha * seconds + (1 - self.alpha) * self.ewma
+        self._samples.append(seconds)
+
+    @property
+    def count(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Get the q-th percentile (0-1) of recent samples, or None without samples."""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)]
+
+    def snapshot(self) -> Dict[str, Any]:
+        def ms(value: Optional[float]) -> Optional[float]:
+            return round(value * 1000, 1) if value is not None else None
+
+        return {
+            "samples": self.count,
+            "ewma_ms": ms(self.ewma),
+            "p50_ms": ms(self.percentile(0.5)),
+            "p95_ms": ms(self.percentile(0.95)),
+            "p99_ms": ms(self.percentile(0.99)),
+        }
+
+
+class CircuitBreaker:
+    """Error-rate circuit breaker with half-open recovery probes.
+
+    closed: all calls pass; opens when the failure rate over the window
+    reaches the threshold (with at least min_requests calls).
+    open: calls fail fast until open_seconds have passed.
+    half_open: up to half_open_max_calls trial calls pass; all succeeding
+    closes the breaker, any failure re-opens it.
+
+    allow_request hands out a ticket that the call's outcome is reported
+    with. Only trial calls of the current half-open period count towards
+    closing or re-opening it; calls admitted earlier that finish late are
+    ignored while the breaker is open or half-open.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+            self,
+            failure_rate_threshold: float = 0.5,
+            min_requests: int = 10,
+            window_seconds: float = 60,
+            open_seconds: float = 30,
+            half_open_max_calls: int = 3
+    ):
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_requests = min_requests
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+
+        self.state = self.CLOSED
+        self.opened_at: Optional[float] = None
+        self._outcomes: deque = deque()  # (monotonic time, succeeded)
+        self._half_open_in_flight = 0
+        self._half_open_successes = 0
+        self._half_open_period = 0
+
+    def _prune(self, now: float) -> None:
+        while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+            self._outcomes.popleft()
+
+    def _open(self, now: float) -> None:
+        self.state = self.OPEN
+        self.opened_at = now
+        self._outcomes.clear()
+        logger.warning("Captcha circuit breaker opened")
+
+    @property
+    def is_open(self) -> bool:
+        """Whether calls are currently being rejected (open and not yet due for probing)."""
+        return self.state == self.OPEN and time.monotonic() - self.opened_at < self.open_seconds
+
+    def failure_rate(self) -> tuple:
+        """Get (calls, failure rate) over the current window."""
+        self._prune(time.monotonic())
+        total = len(self._outcomes)
+        failures = sum(1 for _, succeeded in self._outcomes if not succeeded)
+        return total, (failures / total if total else 0.0)
+
+    def allow_request(self) -> Optional[int]:
+        """Check whether a call may proceed (reserving a trial slot when half-open).
+
+        Returns None if the call is rejected, otherwise its ticket: 0 for a
+        regular call, the half-open period number for a trial call.
+        """
+        now = time.monotonic()
+
+        if self.state == self.OPEN:
+            if now - self.opened_at < self.open_seconds:
+                return None
+            self.state = self.HALF_OPEN
+            self._half_open_in_flight = 0
+            self._half_open_successes = 0
+            self._half_open_period += 1
+            logger.info("Captcha circuit breaker half-open, probing provider")
+
+        if self.state == self.HALF_OPEN:
+            if self._half_open_in_flight >= self.half_open_max_calls:
+                return None
+            self._half_open_in_flight += 1
+            return self._half_open_period
+
+        return 0
+
+    def _is_current_trial(self, ticket: int) -> bool:
+        return self.state == self.HALF_OPEN and ticket == self._half_open_period
+
+    def release(self, ticket: int) -> None:
+        """Give back a half-open trial slot for a call that finished without an outcome."""
+        if self._is_current_trial(ticket) and self._half_open_in_flight > 0:
+            self._half_open_in_flight -= 1
+
+    def record_success(self, ticket: int) -> None:
+        now = time.monotonic()
+        if self.state == self.OPEN:
+            return
+        if self.state == self.HALF_OPEN:
+            if not self._is_current_trial(ticket):
+                return
+            self._half_open_in_flight -= 1
+            self._half_open_successes += 1
+            if self._half_open_successes >= self.half_open_max_calls:
+                self.state = self.CLOSED
+                self.opened_at = None
+                logger.info("Captcha circuit breaker closed")
+            return
+
+        self._outcomes.append((now, True))
+        self._prune(now)
+
+    def record_failure(self, ticket: int) -> None:
+        now = time.monotonic()
+        if self.state == self.OPEN:
+            return
+        if self.state == self.HALF_OPEN:
+            if self._is_current_trial(ticket):
+                self._open(now)
+            return
+
+        self._outcomes.append((now, False))
+        self._prune(now)
+
+        total = len(self._outcomes)
+        failures = sum(1 for _, succeeded in self._outcomes if not succeeded)
+        if total >= self.min_requests and failures / total >= self.failure_rate_threshold:
+            self._open(now)
+
+    def snapshot(self) -> Dict[str, Any]:
+        total, rate = self.failure_rate()
+        snapshot = {
+            "state": self.state,
+            "window_requests": total,
+            "window_failure_rate": round(rate, 3),
+        }
+        if self.state == self.OPEN:
+            elapsed = time.monotonic() - self.opened_at
+            snapshot["retry_in_seconds"] = max(0.0, round(self.open_seconds - elapsed, 1))
+        return snapshot
+
+
+class ResilientCaptchaProvider(CaptchaProvider):
+    """Wraps a provider with latency tracking, adaptive timeouts and a circuit breaker."""
+
+    # Samples needed before the adaptive timeout replaces the configured one
+    MIN_ADAPTIVE_SAMPLES = 20
+
+    def __init__(
+            self,
+            provider: CaptchaProvider,
+            breaker: Optional[CircuitBreaker] = None,
+            adaptive_timeout: bool = True,
+            min_timeout: float = 2.0,
+            timeout_multiplier: float = 3.0,
+            hedge: bool = False,
+            hedge_delay: Optional[float] = None
+    ):
+        """Initialize resilient provider.
+
+        Args:
+            provider: The wrapped provider
+            breaker: Circuit breaker (a default one is created if omitted)
+            adaptive_timeout: Derive the timeout from observed latency
+            min_timeout: Lower bound of the adaptive timeout in seconds
+            timeout_multiplier: Adaptive timeout = p99 latency * multiplier
+            hedge: Send a second verify call when the first is slow (only if the provider supports it)
+            hedge_delay: Seconds before hedging (None = p95 latency)
+        """
+        super().__init__(provider.site_key, provider.secret_key, provider.timeout)
+        self.provider = provider
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyTracker()
+        self.adaptive_timeout = adaptive_timeout
+        self.min_timeout = min_timeout
+        self.timeout_multiplier = timeout_multiplier
+        self.hedge = hedge and provider.supports_idempotency_key
+        self.hedge_delay = hedge_delay
+        self.hedged_calls = 0
+
+    @property
+    def provider_name(self) -> str:
+        return self.provider.provider_name
+
+    @property
+    def verify_url(self) -> Optional[str]:
+        return self.provider.verify_url
+
+    def get_frontend_config(self, hardened: bool = False) -> Dict[str, Any]:
+        return self.provider.get_frontend_config(hardened)
+
+    def is_hardened(self, result: CaptchaVerificationResult) -> bool:
+        return self.provider.is_hardened(result)
+
+    def record_session(self, token: str) -> None:
+        self.provider.record_session(token)
+
+    async def start(self) -> None:
+        await self.provider.start()
+
+    async def close(self) -> None:
+        await self.provider.close()
+
+    def current_timeout(self) -> float:
+        """Timeout for the next call: p99 latency * multiplier, clamped to [min_timeout, timeout]."""
+        p99 = self.latency.percentile(0.99)
+        if not self.adaptive_timeout or p99 is None or self.latency.count < self.MIN_ADAPTIVE_SAMPLES:
+            return self.provider.timeout
+        return min(self.provider.timeout, max(self.min_timeout, p99 * self.timeout_multiplier))
+
+    def current_hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None when hedging is off or latency is still unknown."""
+        if not self.hedge:
+            return None
+        if self.hedge_delay:
+            return self.hedge_delay
+        if self.latency.count < self.MIN_ADAPTIVE_SAMPLES:
+            return None
+        return self.latency.percentile(0.95)
+
+    def is_degraded(self) -> bool:
+        """Whether the provider is failing or slowing down without having tripped the breaker yet."""
+        calls, rate = self.breaker.failure_rate()
+        if calls >= self.breaker.min_requests / 2 and rate >= self.breaker.failure_rate_threshold / 2:
+            return True
+        return self.latency.ewma is not None and self.latency.ewma > self.provider.timeout / 2
+
+    async def _verify_hedged(
+            self,
+            response: str,
+            remote_ip: Optional[str],
+            user_agent: Optional[str],
+            delay: float
+    ) -> CaptchaVerificationResult:
+        """Race a second call against a slow first one; both share one idempotency key."""
+        key = idempotency_key(response)
+
+        def call() -> asyncio.Task:
+            return asyncio.ensure_future(self.provider.verify(
+                response,
+                remote_ip=remote_ip,
+                user_agent=user_agent,
+                idempotency_key=key
+            ))
+
+        pending = {call()}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                self.hedged_calls += 1
+                pending.add(call())
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+            # Prefer an answer from the provider over a transport failure of the other call
+            while True:
+                for task in done:
+                    result = task.result()
+                    if result.error_code not in PROVIDER_ERROR_CODES:
+                        return result
+                if not pending:
+                    return result
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def verify(
+            self,
+            response: str,
+            remote_ip: Optional[str] = None,
+            user_agent: Optional[str] = None
+    ) -> CaptchaVerificationResult:
+        """Verify through the wrapped provider, failing fast while the breaker is open.
+
+        The call gets the smaller of the provider timeout and the remaining
+        request deadline; running out of deadline is not held against the
+        provider.
+        """
+        timeout = self.current_timeout()
+        budget = remaining()
+        cut_by_deadline = budget is not None and budget < timeout
+        if cut_by_deadline:
+            timeout = budget
+            if timeout <= 0:
+                return DEADLINE_EXCEEDED_RESULT
+
+        ticket = self.breaker.allow_request()
+        if ticket is None:
+            logger.warning(f"{self.provider_name} circuit open, rejecting verification")
+            return CaptchaVerificationResult(
+                success=False,
+                error_code="circuit-open",
+                error_message="验证服务暂时不可用，请稍后重试"
+            )
+
+        hedge_delay = self.current_hedge_delay()
+        if hedge_delay is not None and hedge_delay < timeout:
+            call = self._verify_hedged(response, remote_ip, user_agent, hedge_delay)
+        elif self.provider.supports_idempotency_key:
+            call = self.provider.verify(
+                response,
+                remote_ip=remote_ip,
+                user_agent=user_agent,
+                idempotency_key=idempotency_key(response)
+            )
+        else:
+            call = self.provider.verify(response, remote_ip=remote_ip, user_agent=user_agent)
+
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(call, timeout=timeout)
+        except asyncio.CancelledError:
+            self.breaker.release(ticket)
+            raise
+        except asyncio.TimeoutError:
+            if cut_by_deadline:
+                self.breaker.release(ticket)
+                logger.warning(f"{self.provider_name} verification cut off by request deadline after {timeout:.1f}s")
+                return DEADLINE_EXCEEDED_RESULT
+            # Timeouts count as samples so the adaptive timeout widens when the provider slows down
+            self.latency.record(timeout)
+            self.breaker.record_failure(ticket)
+            logger.warning(f"{self.provider_name} verification timed out after {timeout:.1f}s")
+            return CaptchaVerificationResult(
+                success=False,
+                error_code="timeout",
+                error_message="验证服务响应超时，请稍后重试"
+            )
+
+        self.latency.record(time.monotonic() - started)
+        if result.error_code in PROVIDER_ERROR_CODES:
+            self.breaker.record_failure(ticket)
+        else:
+            self.breaker.record_success(ticket)
+
+        return result
+
+    def health_snapshot(self) -> Dict[str, Any]:
+        """Breaker state and latency stats for health checks."""
+        snapshot = {
+            "breaker": self.breaker.snapshot(),
+            "latency": self.latency.snapshot(),
+            "timeout_seconds": round(self.current_timeout(), 2),
+            "degraded": self.is_degraded(),
+        }
+        if self.hedge:
+            snapshot["hedged_calls"] = self.hedged_calls
+        return snapshot
+
+
+class CaptchaProviderPool:
+    """Ordered failover chain of captcha providers.
+
+    New verification pages get the first provider whose breaker is not open,
+    preferring providers that are not degraded; configured order breaks ties
+    so traffic returns to the primary once it recovers.
+    """
+
+    def __init__(self, providers: List[ResilientCaptchaProvider]):
+        if not providers:
+            raise ValueError("Captcha provider chain is empty")
+        self.providers = providers
+        self._selected: Optional[ResilientCaptchaProvider] = None
+
+    def get(self, name: str) -> ResilientCaptchaProvider:
+        """Get a provider of the chain by name."""
+        for provider in self.providers:
+            if provider.provider_name == name:
+                return provider
+        raise ValueError(f"Captcha provider not enabled: {name}")
+
+    def select(self) -> ResilientCaptchaProvider:
+        """Pick the provider to render for a new verification."""
+        ranked = sorted(
+            enumerate(self.providers),
+            key=lambda item: (item[1].breaker.is_open, item[1].is_degraded(), item[0])
+        )
+        selected = ranked[0][1]
+
+        if selected is not self._selected:
+            if self._selected is not None:
+                logger.warning(
+                    f"Captcha provider failover: {self._selected.provider_name} -> {selected.provider_name}"
+                )
+            self._selected = selected
+
+        return selected
+
+    async def start(self) -> None:
+        for provider in self.providers:
+            await provider.start()
+
+    async def close(self) -> None:
+        for provider in self.providers:
+            await provider.close()
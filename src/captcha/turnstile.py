@@ -15,6 +15,13 @@ class TurnstileProvider(CaptchaProvider):
 
     VERIFY_URL = "https://challenges.cloudflare.com/turnstile/v0/siteverify"
 
+    # siteverify returns the same result for repeated calls carrying the same idempotency_key
+    supports_idempotency_key = True
+
+    @property
+    def verify_url(self) -> str:
+        return self.VERIFY_URL
+
     @property
     def provider_name(self) -> str:
         return "turnstile"
@@ -23,9 +30,14 @@ class TurnstileProvider(CaptchaProvider):
             self,
             response: str,
             remote_ip: Optional[str] = None,
-            user_agent: Optional[str] = None
+            user_agent: Optional[str] = None,
+            idempotency_key: Optional[str] = None
     ) -> CaptchaVerificationResult:
-        """Verify Turnstile response."""
+        """Verify Turnstile response.
+
+        Calls sharing an idempotency_key may be repeated without the second
+        one failing as a duplicate, which makes hedged verification safe.
+        """
         try:
             # Prepare verification data
             data = {
@@ -33,20 +45,21 @@ class TurnstileProvider(CaptchaProvider):
                 "response": response,
                 "remoteip": remote_ip or ""
             }
+            if idempotency_key:
+                data["idempotency_key"] = idempotency_key
+
+            # Make verification request over the pooled keep-alive client
+            response_obj = await self._get_client().post(
+                self.VERIFY_URL,
+                data=data,
+                headers={
+                    "Content-Type": "application/x-www-form-urlencoded",
+                    "User-Agent": user_agent or "TGuard-Bot/1.0"
+                }
+            )
 
-            # Make verification request
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response_obj = await client.post(
-                    self.VERIFY_URL,
-                    data=data,
-                    headers={
-                        "Content-Type": "application/x-www-form-urlencoded",
-                        "User-Agent": user_agent or "TGuard-Bot/1.0"
-                    }
-                )
-
-                response_obj.raise_for_status()
-                result = response_obj.json()
+            response_obj.raise_for_status()
+            result = response_obj.json()
 
             # Parse response
             success = result.get("success", False)
@@ -94,7 +107,7 @@ class TurnstileProvider(CaptchaProvider):
                 error_message="验证过程中发生错误"
             )
 
-    def get_frontend_config(self) -> Dict[str, Any]:
+    def get_frontend_config(self, hardened: bool = False) -> Dict[str, Any]:
         """Get Turnstile frontend configuration."""
         return {
             "provider": "turnstile",
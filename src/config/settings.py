@@ -1,6 +1,6 @@
 """Configuration management for TGuard bot."""
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from functools import lru_cache
 from pathlib import Path
 
@@ -14,6 +14,8 @@ class BotConfig:
     verification_timeout: int
     verification_button_text: str
     admin_ids: list[int]
+    bulk_concurrency: int = 10
+    bulk_rate_per_second: float = 20
 
 
 @dataclass
@@ -26,12 +28,19 @@ class DatabaseConfig:
     password: str
     min_size: int
     max_size: int
+    partition_months_ahead: int = 3
+    partition_retention_months: int = 0
 
     @property
     def url(self) -> str:
         """Get database URL for asyncpg."""
         return f"postgresql+asyncpg://{self.user}:{self.password}@{self.host}:{self.port}/{self.name}"
 
+    @property
+    def dsn(self) -> str:
+        """Get database DSN for direct asyncpg connections."""
+        return f"postgresql://{self.user}:{self.password}@{self.host}:{self.port}/{self.name}"
+
 
 @dataclass
 class CaptchaProviderConfig:
@@ -55,6 +64,18 @@ class TurnstileCaptchaConfig:
     secret_key: str
 
 
+@dataclass
+class PowCaptchaConfig:
+    """Built-in proof-of-work captcha configuration."""
+    secret_key: str = ""
+    difficulty: int = 16
+    max_difficulty: int = 22
+    challenge_ttl_seconds: int = 300
+    load_threshold_per_minute: int = 60
+    raid_threshold_per_minute: int = 600
+    raid_mode: bool = False
+
+
 @dataclass
 class CaptchaConfig:
     """Captcha configuration."""
@@ -64,6 +85,24 @@ class CaptchaConfig:
     hcaptcha: CaptchaProviderConfig
     cap: CapCaptchaConfig
     turnstile: TurnstileCaptchaConfig
+    pow: PowCaptchaConfig = field(default_factory=PowCaptchaConfig)
+    http2: bool = True
+    pool_max_connections: int = 20
+    pool_max_keepalive_connections: int = 10
+    pool_keepalive_expiry: float = 30
+    adaptive_timeout: bool = True
+    min_timeout_seconds: float = 2
+    timeout_multiplier: float = 3
+    breaker_failure_rate: float = 0.5
+    breaker_min_requests: int = 10
+    breaker_window_seconds: float = 60
+    breaker_open_seconds: float = 30
+    breaker_half_open_calls: int = 3
+    providers: list[str] = field(default_factory=list)
+    hedge_requests: bool = False
+    hedge_delay_ms: int = 0
+    shadow_provider: str = ""
+    shadow_sample_rate: float = 1.0
 
 
 @dataclass
@@ -74,6 +113,136 @@ class APIConfig:
     base_url: str
     enable: bool = False
     api_key: str = ""
+    verify_replay_ttl_seconds: int = 600
+    verify_replay_max_entries: int = 10000
+    verify_deadline_seconds: float = 10.0
+    batch_create_max_size: int = 100
+    batch_status_max_size: int = 500
+    idempotency_ttl_seconds: int = 86400
+    idempotency_max_entries: int = 10000
+    trusted_proxies: list[str] = field(default_factory=lambda: ["127.0.0.1", "::1"])
+
+
+@dataclass
+class RiskConfig:
+    """Risk scoring for the trusted-user fast path."""
+    enable: bool = False
+    threshold: float = 3.0
+    scorers: list[str] = field(default_factory=lambda: ["allow_list", "history", "captcha_score"])
+    history_days: int = 180
+    approval_weight: float = 1.0
+    max_approvals_counted: int = 5
+    failure_penalty: float = 2.0
+    captcha_score_weight: float = 2.0
+    min_scored_sessions: int = 2
+    allow_lists: dict = field(default_factory=dict)
+
+
+@dataclass
+class BlocklistConfig:
+    """Global user blocklist shared by all chats."""
+    enable: bool = False
+    auto_block: bool = True
+    failure_threshold: int = 3
+    min_chats: int = 2
+    window_days: int = 7
+    refresh_interval_seconds: int = 300
+
+
+@dataclass
+class RateLimitConfig:
+    """Sliding-window rate limits of the public API."""
+    enable: bool = False
+    store: str = "memory"  # "memory" or "postgres" (shared between API instances)
+    max_keys: int = 100000
+    ip_limit: int = 60
+    ip_window_seconds: int = 60
+    token_limit: int = 20
+    token_window_seconds: int = 60
+    api_key_limit: int = 600
+    api_key_window_seconds: int = 60
+
+
+@dataclass
+class AdmissionConfig:
+    """API load shedding thresholds."""
+    enable: bool = False
+    max_in_flight: int = 200
+    max_loop_lag_ms: int = 200
+    max_pool_wait_ms: int = 500
+    probe_interval_seconds: float = 0.5
+    retry_after_seconds: int = 5
+
+
+@dataclass
+class StatusEventsConfig:
+    """Push delivery of verification completions (SSE and long-poll)."""
+    listen: bool = True
+    max_tokens: int = 100
+    max_wait_seconds: int = 60
+    max_stream_seconds: int = 600
+    keepalive_seconds: int = 15
+
+
+@dataclass
+class EventsConfig:
+    """Cross-process event bus over PostgreSQL LISTEN/NOTIFY."""
+    enable: bool = False
+    approve_in_bot: bool = False
+
+
+@dataclass
+class ApiKeysConfig:
+    """Per-client external API keys stored in the database."""
+    cache_ttl_seconds: int = 60
+    cache_max_entries: int = 10000
+    usage_flush_seconds: int = 10
+
+
+@dataclass
+class WebhookConfig:
+    """Outbound completion webhooks for external API clients."""
+    enable: bool = False
+    max_per_client: int = 5
+    max_concurrency: int = 10
+    timeout_seconds: float = 10.0
+    max_attempts: int = 8
+    backoff_base_seconds: float = 10.0
+    backoff_max_seconds: float = 3600.0
+    poll_interval_seconds: float = 5.0
+    retention_days: int = 7
+
+
+@dataclass
+class ThrottleConfig:
+    """Cross-chat per-user join request throttle."""
+    enable: bool = False
+    window_seconds: int = 60
+    max_requests: int = 10
+    collapse: bool = True
+    over_limit_action: str = "defer"  # "defer" or "decline"
+
+
+@dataclass
+class IPReputationConfig:
+    """Offline IP reputation checks of verification clients."""
+    enable: bool = False
+    path: str = "ip-reputation.bin"
+    reload_check_seconds: int = 30
+    # Category -> "reject" or "challenge"; unlisted categories are allowed
+    actions: dict = field(default_factory=lambda: {"datacenter": "challenge", "proxy": "reject", "tor": "reject"})
+    challenge_provider: str = "pow"
+
+
+@dataclass
+class ArchiveConfig:
+    """Verification history archival configuration."""
+    enable: bool = False
+    directory: str = "archive"
+    older_than_days: int = 90
+    batch_size: int = 1000
+    compression_level: int = 3
+    interval_seconds: int = 3600
 
 
 @dataclass
@@ -83,6 +252,17 @@ class Config:
     database: DatabaseConfig
     captcha: CaptchaConfig
     api: APIConfig
+    archive: ArchiveConfig
+    risk: RiskConfig
+    blocklist: BlocklistConfig
+    ip_reputation: IPReputationConfig
+    throttle: ThrottleConfig
+    rate_limit: RateLimitConfig
+    admission: AdmissionConfig
+    status_events: StatusEventsConfig
+    webhooks: WebhookConfig
+    api_keys: ApiKeysConfig
+    events: EventsConfig
 
 
 @lru_cache()
@@ -105,15 +285,52 @@ def load_config(config_path: str = "config.toml") -> Config:
             timeout_seconds=data['captcha']['timeout_seconds'],
             hcaptcha=CaptchaProviderConfig(**data['captcha']['hcaptcha']),
             cap=CapCaptchaConfig(**data['captcha']['cap']),
-            turnstile=TurnstileCaptchaConfig(**data['captcha']['turnstile'])
+            turnstile=TurnstileCaptchaConfig(**data['captcha']['turnstile']),
+            pow=PowCaptchaConfig(**data['captcha'].get('pow', {})),
+            http2=data['captcha'].get('http2', True),
+            pool_max_connections=data['captcha'].get('pool_max_connections', 20),
+            pool_max_keepalive_connections=data['captcha'].get('pool_max_keepalive_connections', 10),
+            pool_keepalive_expiry=data['captcha'].get('pool_keepalive_expiry', 30),
+            adaptive_timeout=data['captcha'].get('adaptive_timeout', True),
+            min_timeout_seconds=data['captcha'].get('min_timeout_seconds', 2),
+            timeout_multiplier=data['captcha'].get('timeout_multiplier', 3),
+            breaker_failure_rate=data['captcha'].get('breaker_failure_rate', 0.5),
+            breaker_min_requests=data['captcha'].get('breaker_min_requests', 10),
+            breaker_window_seconds=data['captcha'].get('breaker_window_seconds', 60),
+            breaker_open_seconds=data['captcha'].get('breaker_open_seconds', 30),
+            breaker_half_open_calls=data['captcha'].get('breaker_half_open_calls', 3),
+            providers=data['captcha'].get('providers', [data['captcha']['provider']]),
+            hedge_requests=data['captcha'].get('hedge_requests', False),
+            hedge_delay_ms=data['captcha'].get('hedge_delay_ms', 0),
+            shadow_provider=data['captcha'].get('shadow_provider', ''),
+            shadow_sample_rate=data['captcha'].get('shadow_sample_rate', 1.0)
         ),
         api=APIConfig(
             host=data['api']['host'],
             port=data['api']['port'],
             base_url=data['api']['base_url'],
             enable=data['api'].get('enable', False),
-            api_key=data['api'].get('api_key', '')
-        )
+            api_key=data['api'].get('api_key', ''),
+            verify_replay_ttl_seconds=data['api'].get('verify_replay_ttl_seconds', 600),
+            verify_replay_max_entries=data['api'].get('verify_replay_max_entries', 10000),
+            verify_deadline_seconds=data['api'].get('verify_deadline_seconds', 10.0),
+            batch_create_max_size=data['api'].get('batch_create_max_size', 100),
+            batch_status_max_size=data['api'].get('batch_status_max_size', 500),
+            idempotency_ttl_seconds=data['api'].get('idempotency_ttl_seconds', 86400),
+            idempotency_max_entries=data['api'].get('idempotency_max_entries', 10000),
+            trusted_proxies=data['api'].get('trusted_proxies', ["127.0.0.1", "::1"])
+        ),
+        archive=ArchiveConfig(**data.get('archive', {})),
+        risk=RiskConfig(**data.get('risk', {})),
+        blocklist=BlocklistConfig(**data.get('blocklist', {})),
+        ip_reputation=IPReputationConfig(**data.get('ip_reputation', {})),
+        throttle=ThrottleConfig(**data.get('throttle', {})),
+        rate_limit=RateLimitConfig(**data.get('rate_limit', {})),
+        admission=AdmissionConfig(**data.get('admission', {})),
+        status_events=StatusEventsConfig(**data.get('status_events', {})),
+        webhooks=WebhookConfig(**data.get('webhooks', {})),
+        api_keys=ApiKeysConfig(**data.get('api_keys', {})),
+        events=EventsConfig(**data.get('events', {}))
     )
 
 
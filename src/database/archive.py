@@ -0,0 +1,227 @@
+"""Archival of finished verification history to zstd-compressed JSONL files."""
+
+import asyncio
+import json
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+import zstandard
+from sqlalchemy import delete, exists, or_, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.connection import get_session
+from src.database.history import history_record, history_select, session_history_select
+from src.database.models import JoinRequest, VerificationSession, RequestStatus
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = (RequestStatus.APPROVED, RequestStatus.REJECTED, RequestStatus.EXPIRED)
+
+# First and last ID of the rows one cursor wrote
+IdRange = Tuple[int, int]
+
+
+@dataclass
+class ArchiveResult:
+    """Outcome of one archival run."""
+    path: Optional[Path]
+    archived: int
+    deleted_requests: int
+    deleted_sessions: int
+
+
+def _finished_request_filter(cutoff: datetime):
+    return (
+        JoinRequest.status.in_(FINISHED_STATUSES),
+        JoinRequest.request_time < cutoff,
+    )
+
+
+def _finished_before(started_at: datetime):
+    """Requests already finished when the run started (and so written as such)."""
+    return or_(JoinRequest.processed_time.is_(None), JoinRequest.processed_time < started_at)
+
+
+def _session_orphaned():
+    return ~exists().where(JoinRequest.verification_token == VerificationSession.token)
+
+
+def _orphan_session_filter(cutoff: datetime):
+    """Sessions past the cutoff whose join request is gone (superseded or already archived)."""
+    return (
+        VerificationSession.created_time < cutoff,
+        VerificationSession.expires_at < cutoff,
+        _session_orphaned(),
+    )
+
+
+def _encode_rows(rows) -> bytes:
+    return b"".join(
+        json.dumps(history_record(row._mapping), ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+        for row in rows
+    )
+
+
+async def _write_archive(
+        path: Path,
+        cutoff: datetime,
+        batch_size: int,
+        compression_level: int
+) -> Tuple[int, Optional[IdRange], Optional[IdRange]]:
+    """Stream archivable rows through a server-side cursor into a compressed file.
+
+    Only one batch of rows is held in memory at a time. Both cursors are
+    ordered by ID, so the rows written are bounded by the first and last ID
+    of each; returns the number of records and those (first, last) ranges of
+    join request and orphaned session IDs.
+    """
+    archived = 0
+    ranges: List[Optional[IdRange]] = [None, None]
+    compressor = zstandard.ZstdCompressor(level=compression_level)
+
+    with open(path, "wb") as fh:
+        writer = compressor.stream_writer(fh, closefd=False)
+
+        async with get_session()() as session:
+            queries = (
+                (history_select().where(*_finished_request_filter(cutoff)).order_by(JoinRequest.id), "id"),
+                (session_history_select().where(*_orphan_session_filter(cutoff)).order_by(VerificationSession.id),
+                 "session_id"),
+            )
+            for index, (query, id_field) in enumerate(queries):
+                result = await session.stream(query.execution_options(yield_per=batch_size))
+                async for rows in result.partitions(batch_size):
+                    await asyncio.to_thread(writer.write, _encode_rows(rows))
+                    archived += len(rows)
+                    first = ranges[index][0] if ranges[index] else rows[0]._mapping[id_field]
+                    ranges[index] = (first, rows[-1]._mapping[id_field])
+
+        writer.flush(zstandard.FLUSH_FRAME)
+        writer.close()
+        fh.flush()
+        os.fsync(fh.fileno())
+
+    return archived, ranges[0], ranges[1]
+
+
+async def _delete_range(
+        model,
+        token_column,
+        id_range: Optional[IdRange],
+        filters,
+        batch_size: int,
+        cascade: Optional[Callable[[AsyncSession, List[str]], Awaitable[int]]] = None
+) -> Tuple[int, int]:
+    """Delete the rows within id_range that still match filters, in transactions of at most batch_size rows.
+
+    cascade(session, tokens) is called with the verification tokens of each
+    batch of deleted rows, in the same transaction. Returns the number of
+    rows deleted and the sum of what cascade returned.
+    """
+    if id_range is None:
+        return 0, 0
+
+    deleted = cascaded = 0
+    lower, upper = id_range[0] - 1, id_range[1]
+    while True:
+        batch = (
+            select(model.id)
+            .where(model.id > lower, model.id <= upper, *filters)
+            .order_by(model.id)
+            .limit(batch_size)
+        )
+        async with get_session()() as session:
+            result = await session.execute(
+                delete(model)
+                .where(model.id.in_(batch.scalar_subquery()), *filters)
+                .returning(model.id, token_column)
+            )
+            rows = result.all()
+            if cascade is not None and rows:
+                cascaded += await cascade(session, [row[1] for row in rows])
+            await session.commit()
+
+        if not rows:
+            return deleted, cascaded
+        deleted += len(rows)
+        lower = max(row.id for row in rows)
+
+
+async def _delete_sessions(session: AsyncSession, tokens: List[str]) -> int:
+    """Delete the sessions of deleted join requests that no other request refers to."""
+    result = await session.execute(
+        delete(VerificationSession).where(VerificationSession.token.in_(tokens), _session_orphaned())
+    )
+    return result.rowcount
+
+
+async def archive_verification_history(
+        directory: str,
+        older_than_days: int,
+        batch_size: int = 1000,
+        compression_level: int = 3
+) -> Optional[ArchiveResult]:
+    """Archive finished join requests and their sessions older than N days, then delete them.
+
+    Rows are written to ``verification-<timestamp>.jsonl.zst`` and only removed
+    from the database once the file has been fully written and fsynced. Only
+    the ID ranges written are deleted from, and only rows that were already
+    archivable when the run started: ones that became archivable meanwhile
+    are left for the next run.
+    """
+    started_at = datetime.utcnow()
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    archive_dir = Path(directory)
+    archive_dir.mkdir(parents=True, exist_ok=True)
+
+    final_path = archive_dir / f"verification-{datetime.utcnow():%Y%m%dT%H%M%S}.jsonl.zst"
+    tmp_path = final_path.with_name(final_path.name + ".tmp")
+
+    try:
+        archived, request_range, session_range = await _write_archive(tmp_path, cutoff, batch_size, compression_level)
+
+        if archived == 0:
+            tmp_path.unlink(missing_ok=True)
+            return ArchiveResult(path=None, archived=0, deleted_requests=0, deleted_sessions=0)
+
+        os.replace(tmp_path, final_path)
+        logger.info(f"Archived {archived} verification records to {final_path}")
+
+        # Each request's session goes with it, once no other join request refers to it
+        deleted_requests, deleted_sessions = await _delete_range(
+            JoinRequest,
+            JoinRequest.verification_token,
+            request_range,
+            (*_finished_request_filter(cutoff), _finished_before(started_at)),
+            batch_size,
+            cascade=_delete_sessions
+        )
+        deleted_orphans, _ = await _delete_range(
+            VerificationSession,
+            VerificationSession.token,
+            session_range,
+            _orphan_session_filter(cutoff),
+            batch_size
+        )
+        deleted_sessions += deleted_orphans
+        logger.info(
+            f"Deleted {deleted_requests} archived join requests "
+            f"and {deleted_sessions} verification sessions"
+        )
+
+        return ArchiveResult(
+            path=final_path,
+            archived=archived,
+            deleted_requests=deleted_requests,
+            deleted_sessions=deleted_sessions
+        )
+
+    except (SQLAlchemyError, OSError) as e:
+        logger.error(f"Error archiving verification history: {e}")
+        tmp_path.unlink(missing_ok=True)
+        return None
@@ -0,0 +1,89 @@
+"""Flat verification history records shared by archival and export."""
+
+from datetime import datetime
+from typing import Any, Dict, Mapping
+
+from sqlalchemy import Select, select
+
+from src.database.models import JoinRequest, VerificationSession
+
+# Column order of a history record, used for JSONL keys and CSV headers
+HISTORY_FIELDS = (
+    "id",
+    "user_id",
+    "chat_id",
+    "username",
+    "first_name",
+    "last_name",
+    "verification_token",
+    "status",
+    "request_type",
+    "request_time",
+    "processed_time",
+    "admin_id",
+    "verification_completed",
+    "session_id",
+    "captcha_completed",
+    "ip_address",
+    "user_agent",
+    "session_created_time",
+    "session_completed_time",
+    "session_expires_at",
+)
+
+
+def history_select() -> Select:
+    """Select join requests outer-joined with their verification session, labelled as history fields."""
+    return (
+        select(
+            JoinRequest.id,
+            JoinRequest.user_id,
+            JoinRequest.chat_id,
+            JoinRequest.username,
+            JoinRequest.first_name,
+            JoinRequest.last_name,
+            JoinRequest.verification_token,
+            JoinRequest.status,
+            JoinRequest.request_type,
+            JoinRequest.request_time,
+            JoinRequest.processed_time,
+            JoinRequest.admin_id,
+            JoinRequest.verification_completed,
+            VerificationSession.id.label("session_id"),
+            VerificationSession.captcha_completed,
+            VerificationSession.ip_address,
+            VerificationSession.user_agent,
+            VerificationSession.created_time.label("session_created_time"),
+            VerificationSession.completed_time.label("session_completed_time"),
+            VerificationSession.expires_at.label("session_expires_at"),
+        )
+        .select_from(JoinRequest)
+        .outerjoin(VerificationSession, VerificationSession.token == JoinRequest.verification_token)
+    )
+
+
+def session_history_select() -> Select:
+    """Select verification sessions on their own, labelled as history fields."""
+    return select(
+        VerificationSession.user_id,
+        VerificationSession.chat_id,
+        VerificationSession.token.label("verification_token"),
+        VerificationSession.id.label("session_id"),
+        VerificationSession.captcha_completed,
+        VerificationSession.ip_address,
+        VerificationSession.user_agent,
+        VerificationSession.created_time.label("session_created_time"),
+        VerificationSession.completed_time.label("session_completed_time"),
+        VerificationSession.expires_at.label("session_expires_at"),
+    )
+
+
+def history_record(row: Mapping[str, Any]) -> Dict[str, Any]:
+    """Convert a history row mapping into a JSON-serializable record with every history field."""
+    record = {}
+    for field in HISTORY_FIELDS:
+        value = row.get(field)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        record[field] = value
+    return record
@@ -6,6 +6,17 @@ from .base import MigrationManager
 from .migration_001_initial_schema import InitialSchemaMigration
 from .migration_002_add_user_stats import AddUserStatsMigration
 from .migration_003_add_request_type import AddRequestTypeMigration
+from .migration_004_partition_by_month import PartitionByMonthMigration
+from .migration_005_add_pending_keyset_index import AddPendingKeysetIndexMigration
+from .migration_006_add_captcha_metrics import AddCaptchaMetricsMigration
+from .migration_007_add_captcha_score import AddCaptchaScoreMigration
+from .migration_008_add_blocklist import AddBlocklistMigration
+from .migration_009_add_parent_token import AddParentTokenMigration
+from .migration_010_add_rate_limit_counters import AddRateLimitCountersMigration
+from .migration_011_add_webhooks import AddWebhooksMigration
+from .migration_012_add_api_keys import AddApiKeysMigration
+from .migration_013_add_idempotency_keys import AddIdempotencyKeysMigration
+from .migration_014_add_captcha_provider import AddCaptchaProviderMigration
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +29,17 @@ def get_migration_manager(session_factory):
     manager.register_migration(InitialSchemaMigration())
     manager.register_migration(AddUserStatsMigration())
     manager.register_migration(AddRequestTypeMigration())
+    manager.register_migration(PartitionByMonthMigration())
+    manager.register_migration(AddPendingKeysetIndexMigration())
+    manager.register_migration(AddCaptchaMetricsMigration())
+    manager.register_migration(AddCaptchaScoreMigration())
+    manager.register_migration(AddBlocklistMigration())
+    manager.register_migration(AddParentTokenMigration())
+    manager.register_migration(AddRateLimitCountersMigration())
+    manager.register_migration(AddWebhooksMigration())
+    manager.register_migration(AddApiKeysMigration())
+    manager.register_migration(AddIdempotencyKeysMigration())
+    manager.register_migration(AddCaptchaProviderMigration())
 
     return manager
 
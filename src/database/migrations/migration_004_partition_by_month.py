@@ -0,0 +1,221 @@
+"""Convert join_requests and verification_sessions to monthly range partitions."""
+
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.partitions import add_months, ensure_partitions, month_start
+from .base import Migration
+
+# Months created ahead of the current one; the bot's maintenance loop keeps this window rolling
+INITIAL_MONTHS_AHEAD = 3
+
+JOIN_REQUESTS_COLUMNS = (
+    "id, user_id, chat_id, username, first_name, last_name, verification_token, status, "
+    "request_time, processed_time, admin_id, verification_completed, request_type"
+)
+
+VERIFICATION_SESSIONS_COLUMNS = (
+    "id, token, user_id, chat_id, captcha_completed, captcha_response, ip_address, "
+    "user_agent, created_time, completed_time, expires_at"
+)
+
+
+class PartitionByMonthMigration(Migration):
+    """Partition join_requests by request_time and verification_sessions by created_time."""
+
+    def get_version(self) -> str:
+        return "004"
+
+    def get_description(self) -> str:
+        return "Convert join_requests and verification_sessions to monthly range-partitioned tables"
+
+    async def upgrade(self, session: AsyncSession) -> None:
+        """Rebuild both tables as partitioned tables and copy existing rows."""
+        await self._partition_table(
+            session,
+            table="join_requests",
+            column="request_time",
+            columns=JOIN_REQUESTS_COLUMNS,
+            create_sql="""
+                CREATE TABLE join_requests (
+                    id INTEGER NOT NULL DEFAULT nextval('join_requests_id_seq'),
+                    user_id BIGINT NOT NULL,
+                    chat_id BIGINT NOT NULL,
+                    username VARCHAR(255),
+                    first_name VARCHAR(255) NOT NULL,
+                    last_name VARCHAR(255),
+                    verification_token VARCHAR(64) NOT NULL,
+                    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+                    request_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    processed_time TIMESTAMP,
+                    admin_id BIGINT,
+                    verification_completed BOOLEAN NOT NULL DEFAULT FALSE,
+                    request_type VARCHAR(20) NOT NULL DEFAULT 'telegram',
+                    PRIMARY KEY (id, request_time),
+                    UNIQUE (verification_token, request_time)
+                ) PARTITION BY RANGE (request_time)
+            """,
+            indexes=(
+                "CREATE INDEX idx_join_requests_user_id ON join_requests(user_id)",
+                "CREATE INDEX idx_join_requests_chat_id ON join_requests(chat_id)",
+                "CREATE INDEX idx_join_requests_token ON join_requests(verification_token)",
+                "CREATE INDEX idx_join_requests_status ON join_requests(status)",
+                "CREATE INDEX idx_join_requests_request_type ON join_requests(request_type)",
+            )
+        )
+
+        await self._partition_table(
+            session,
+            table="verification_sessions",
+            column="created_time",
+            columns=VERIFICATION_SESSIONS_COLUMNS,
+            create_sql="""
+                CREATE TABLE verification_sessions (
+                    id INTEGER NOT NULL DEFAULT nextval('verification_sessions_id_seq'),
+                    token VARCHAR(64) NOT NULL,
+                    user_id BIGINT NOT NULL,
+                    chat_id BIGINT NOT NULL,
+                    captcha_completed BOOLEAN NOT NULL DEFAULT FALSE,
+                    captcha_response TEXT,
+                    ip_address VARCHAR(45),
+                    user_agent TEXT,
+                    created_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    completed_time TIMESTAMP,
+                    expires_at TIMESTAMP NOT NULL,
+                    PRIMARY KEY (id, created_time),
+                    UNIQUE (token, created_time)
+                ) PARTITION BY RANGE (created_time)
+            """,
+            indexes=(
+                "CREATE INDEX idx_verification_sessions_token ON verification_sessions(token)",
+                "CREATE INDEX idx_verification_sessions_user_id ON verification_sessions(user_id)",
+                "CREATE INDEX idx_verification_sessions_expires_at ON verification_sessions(expires_at)",
+            )
+        )
+
+        await session.commit()
+
+    async def downgrade(self, session: AsyncSession) -> None:
+        """Rebuild both tables as plain tables and copy rows back."""
+        await self._unpartition_table(
+            session,
+            table="verification_sessions",
+            columns=VERIFICATION_SESSIONS_COLUMNS,
+            create_sql="""
+                CREATE TABLE verification_sessions (
+                    id INTEGER PRIMARY KEY DEFAULT nextval('verification_sessions_id_seq'),
+                    token VARCHAR(64) NOT NULL UNIQUE,
+                    user_id BIGINT NOT NULL,
+                    chat_id BIGINT NOT NULL,
+                    captcha_completed BOOLEAN NOT NULL DEFAULT FALSE,
+                    captcha_response TEXT,
+                    ip_address VARCHAR(45),
+                    user_agent TEXT,
+                    created_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    completed_time TIMESTAMP,
+                    expires_at TIMESTAMP NOT NULL
+                )
+            """,
+            indexes=(
+                "CREATE INDEX idx_verification_sessions_token ON verification_sessions(token)",
+                "CREATE INDEX idx_verification_sessions_user_id ON verification_sessions(user_id)",
+            )
+        )
+
+        await self._unpartition_table(
+            session,
+            table="join_requests",
+            columns=JOIN_REQUESTS_COLUMNS,
+            create_sql="""
+                CREATE TABLE join_requests (
+                    id INTEGER PRIMARY KEY DEFAULT nextval('join_requests_id_seq'),
+                    user_id BIGINT NOT NULL,
+                    chat_id BIGINT NOT NULL,
+                    username VARCHAR(255),
+                    first_name VARCHAR(255) NOT NULL,
+                    last_name VARCHAR(255),
+                    verification_token VARCHAR(64) NOT NULL UNIQUE,
+                    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+                    request_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    processed_time TIMESTAMP,
+                    admin_id BIGINT,
+                    verification_completed BOOLEAN NOT NULL DEFAULT FALSE,
+                    request_type VARCHAR(20) NOT NULL DEFAULT 'telegram'
+                )
+            """,
+            indexes=(
+                "CREATE INDEX idx_join_requests_user_id ON join_requests(user_id)",
+                "CREATE INDEX idx_join_requests_chat_id ON join_requests(chat_id)",
+                "CREATE INDEX idx_join_requests_token ON join_requests(verification_token)",
+                "CREATE INDEX idx_join_requests_status ON join_requests(status)",
+                "CREATE INDEX idx_join_requests_request_type ON join_requests(request_type)",
+            )
+        )
+
+        await session.commit()
+
+    async def _partition_table(
+            self,
+            session: AsyncSession,
+            table: str,
+            column: str,
+            columns: str,
+            create_sql: str,
+            indexes: tuple
+    ) -> None:
+        """Swap a plain table for a partitioned one, keeping its id sequence."""
+        legacy = f"{table}_legacy"
+
+        # Detach the id sequence so it survives dropping the legacy table
+        await session.execute(text(f"ALTER SEQUENCE {table}_id_seq OWNED BY NONE"))
+        await session.execute(text(f"ALTER TABLE {table} ALTER COLUMN id DROP DEFAULT"))
+        await session.execute(text(f"ALTER TABLE {table} RENAME TO {legacy}"))
+        await session.execute(text(f"ALTER TABLE {legacy} RENAME CONSTRAINT {table}_pkey TO {legacy}_pkey"))
+
+        await session.execute(text(create_sql))
+        await session.execute(text(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id"))
+
+        # Cover every month that already has rows, plus a few months ahead
+        result = await session.execute(text(f"SELECT MIN({column}) FROM {legacy}"))
+        oldest = result.scalar()
+        current_month = month_start(datetime.utcnow())
+        first_month = min(month_start(oldest), current_month) if oldest else current_month
+        await ensure_partitions(session, table, first_month, add_months(current_month, INITIAL_MONTHS_AHEAD))
+
+        await session.execute(text(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {legacy}"))
+        await session.execute(text(f"DROP TABLE {legacy}"))
+
+        # Build indexes after the bulk copy; they cascade to every partition
+        for index_sql in indexes:
+            await session.execute(text(index_sql))
+
+    async def _unpartition_table(
+            self,
+            session: AsyncSession,
+            table: str,
+            columns: str,
+            create_sql: str,
+            indexes: tuple
+    ) -> None:
+        """Swap a partitioned table back for a plain one, keeping its id sequence."""
+        partitioned = f"{table}_partitioned"
+
+        await session.execute(text(f"ALTER SEQUENCE {table}_id_seq OWNED BY NONE"))
+        await session.execute(text(f"ALTER TABLE {table} ALTER COLUMN id DROP DEFAULT"))
+        await session.execute(text(f"ALTER TABLE {table} RENAME TO {partitioned}"))
+        await session.execute(text(f"ALTER TABLE {partitioned} RENAME CONSTRAINT {table}_pkey TO {partitioned}_pkey"))
+
+        # Index names live in the schema namespace, so drop them before recreating
+        for index_sql in indexes:
+            index_name = index_sql.split()[2]
+            await session.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+
+        await session.execute(text(create_sql))
+        await session.execute(text(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id"))
+        await session.execute(text(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {partitioned}"))
+        await session.execute(text(f"DROP TABLE {partitioned}"))
+
+        for index_sql in indexes:
+            await session.execute(text(index_sql))
@@ -0,0 +1,31 @@
+"""Add keyset pagination index for pending join requests migration."""
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .base import Migration
+
+
+class AddPendingKeysetIndexMigration(Migration):
+    """Add partial index backing keyset pagination over pending join requests."""
+
+    def get_version(self) -> str:
+        return "005"
+
+    def get_description(self) -> str:
+        return "Add partial (chat_id, request_time, id) index on pending join requests for keyset pagination"
+
+    async def upgrade(self, session: AsyncSession) -> None:
+        """Create pending keyset index."""
+        await session.execute(text("""
+            CREATE INDEX idx_join_requests_pending_keyset
+            ON join_requests (chat_id, request_time DESC, id DESC)
+            WHERE status = 'pending'
+        """))
+
+        await session.commit()
+
+    async def downgrade(self, session: AsyncSession) -> None:
+        """Drop pending keyset index."""
+        await session.execute(text("DROP INDEX IF EXISTS idx_join_requests_pending_keyset"))
+        await session.commit()
@@ -0,0 +1,55 @@
+"""Add captcha provider metrics table migration."""
+
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.partitions import add_months, ensure_partitions, month_start
+from .base import Migration
+from .migration_004_partition_by_month import INITIAL_MONTHS_AHEAD
+
+
+class AddCaptchaMetricsMigration(Migration):
+    """Add monthly partitioned captcha_metrics table for primary/shadow provider evaluation."""
+
+    def get_version(self) -> str:
+        return "006"
+
+    def get_description(self) -> str:
+        return "Add monthly partitioned captcha_metrics table for shadow provider evaluation"
+
+    async def upgrade(self, session: AsyncSession) -> None:
+        """Create captcha_metrics table and its initial partitions."""
+        await session.execute(text("""
+            CREATE TABLE captcha_metrics (
+                id BIGSERIAL,
+                provider VARCHAR(32) NOT NULL,
+                role VARCHAR(16) NOT NULL,
+                success BOOLEAN NOT NULL,
+                error_code VARCHAR(64),
+                latency_ms INTEGER,
+                agreed BOOLEAN,
+                created_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (id, created_time)
+            ) PARTITION BY RANGE (created_time)
+        """))
+
+        current_month = month_start(datetime.utcnow())
+        await ensure_partitions(
+            session,
+            "captcha_metrics",
+            current_month,
+            add_months(current_month, INITIAL_MONTHS_AHEAD)
+        )
+
+        await session.execute(text(
+            "CREATE INDEX idx_captcha_metrics_created_time ON captcha_metrics (created_time, provider, role)"
+        ))
+
+        await session.commit()
+
+    async def downgrade(self, session: AsyncSession) -> None:
+        """Drop captcha_metrics table with all partitions."""
+        await session.execute(text("DROP TABLE IF EXISTS captcha_metrics"))
+        await session.commit()
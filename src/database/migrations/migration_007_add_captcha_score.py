@@ -0,0 +1,26 @@
+"""Add captcha score to verification sessions migration."""
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .base import Migration
+
+
+class AddCaptchaScoreMigration(Migration):
+    """Add captcha_score column to verification_sessions table."""
+
+    def get_version(self) -> str:
+        return "007"
+
+    def get_description(self) -> str:
+        return "Add captcha_score column to verification_sessions for risk scoring"
+
+    async def upgrade(self, session: AsyncSession) -> None:
+        """Add captcha_score column (cascades to all partitions)."""
+        await session.execute(text("ALTER TABLE verification_sessions ADD COLUMN captcha_score REAL"))
+        await session.commit()
+
+    async def downgrade(self, session: AsyncSession) -> None:
+        """Remove captcha_score column."""
+        await session.execute(text("ALTER TABLE verification_sessions DROP COLUMN IF EXISTS captcha_score"))
+        await session.commit()
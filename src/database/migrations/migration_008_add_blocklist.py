@@ -0,0 +1,43 @@
+"""Add global user blocklist migration."""
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .base import Migration
+
+
+class AddBlocklistMigration(Migration):
+    """Add blocklist table and the index used to find repeat offenders."""
+
+    def get_version(self) -> str:
+        return "008"
+
+    def get_description(self) -> str:
+        return "Add global user blocklist table"
+
+    async def upgrade(self, session: AsyncSession) -> None:
+        """Create blocklist table."""
+        await session.execute(text("""
+            CREATE TABLE blocklist (
+                user_id BIGINT PRIMARY KEY,
+                reason VARCHAR(20) NOT NULL,
+                source_chat_id BIGINT,
+                added_by BIGINT,
+                created_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """))
+
+        # Failed requests per user, for auto-blocking repeat offenders
+        await session.execute(text("""
+            CREATE INDEX idx_join_requests_failed_user
+            ON join_requests (user_id, request_time)
+            WHERE status IN ('rejected', 'expired')
+        """))
+
+        await session.commit()
+
+    async def downgrade(self, session: AsyncSession) -> None:
+        """Drop blocklist table."""
+        await session.execute(text("DROP INDEX IF EXISTS idx_join_requests_failed_user"))
+        await session.execute(text("DROP TABLE IF EXISTS blocklist"))
+        await session.commit()
@@ -0,0 +1,32 @@
+"""Add parent token to join requests migration."""
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .base import Migration
+
+
+class AddParentTokenMigration(Migration):
+    """Add parent_token column linking collapsed join requests to one verification."""
+
+    def get_version(self) -> str:
+        return "009"
+
+    def get_description(self) -> str:
+        return "Add parent_token column to join_requests for cross-chat join throttling"
+
+    async def upgrade(self, session: AsyncSession) -> None:
+        """Add parent_token column and a partial index over linked requests."""
+        await session.execute(text("ALTER TABLE join_requests ADD COLUMN parent_token VARCHAR(64)"))
+        await session.execute(text("""
+            CREATE INDEX idx_join_requests_parent_token
+            ON join_requests (parent_token)
+            WHERE parent_token IS NOT NULL
+        """))
+        await session.commit()
+
+    async def downgrade(self, session: AsyncSession) -> None:
+        """Remove parent_token column."""
+        await session.execute(text("DROP INDEX IF EXISTS idx_join_requests_parent_token"))
+        await session.execute(text("ALTER TABLE join_requests DROP COLUMN IF EXISTS parent_token"))
+        await session.commit()
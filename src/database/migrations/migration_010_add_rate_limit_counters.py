@@ -0,0 +1,39 @@
+"""Add shared rate limit counters migration."""
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .base import Migration
+
+
+class AddRateLimitCountersMigration(Migration):
+    """Add rate_limit_counters table used by the PostgreSQL rate limit store."""
+
+    def get_version(self) -> str:
+        return "010"
+
+    def get_description(self) -> str:
+        return "Add rate_limit_counters table for multi-instance API rate limiting"
+
+    async def upgrade(self, session: AsyncSession) -> None:
+        """Create rate_limit_counters table.
+
+        Counters are short-lived and cheap to lose, so the table is UNLOGGED:
+        no WAL traffic for the per-request upserts.
+        """
+        await session.execute(text("""
+            CREATE UNLOGGED TABLE rate_limit_counters (
+                key VARCHAR(255) NOT NULL,
+                window_index BIGINT NOT NULL,
+                count INTEGER NOT NULL,
+                expires_at TIMESTAMP NOT NULL,
+                PRIMARY KEY (key, window_index)
+            )
+        """))
+        await session.execute(text("CREATE INDEX idx_rate_limit_counters_expires ON rate_limit_counters (expires_at)"))
+        await session.commit()
+
+    async def downgrade(self, session: AsyncSession) -> None:
+        """Drop rate_limit_counters table."""
+        await session.execute(text("DROP TABLE IF EXISTS rate_limit_counters"))
+        await session.commit()
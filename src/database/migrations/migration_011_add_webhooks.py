@@ -0,0 +1,66 @@
+"""Add webhooks and webhook delivery queue migration."""
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .base import Migration
+
+
+class AddWebhooksMigration(Migration):
+    """Add webhooks and webhook_deliveries tables and the api_client column of join requests."""
+
+    def get_version(self) -> str:
+        return "011"
+
+    def get_description(self) -> str:
+        return "Add webhooks, webhook_deliveries and join_requests.api_client for completion webhooks"
+
+    async def upgrade(self, session: AsyncSession) -> None:
+        """Create the webhook tables.
+
+        webhook_deliveries is the persisted delivery queue: dispatchers claim
+        due rows with FOR UPDATE SKIP LOCKED through the partial index over
+        pending deliveries.
+        """
+        await session.execute(text("ALTER TABLE join_requests ADD COLUMN api_client VARCHAR(64)"))
+
+        await session.execute(text("""
+            CREATE TABLE webhooks (
+                id SERIAL PRIMARY KEY,
+                api_client VARCHAR(64) NOT NULL,
+                url TEXT NOT NULL,
+                secret VARCHAR(64) NOT NULL,
+                enabled BOOLEAN NOT NULL DEFAULT TRUE,
+                created_time TIMESTAMP NOT NULL DEFAULT NOW()
+            )
+        """))
+        await session.execute(text("CREATE INDEX idx_webhooks_api_client ON webhooks (api_client)"))
+
+        await session.execute(text("""
+            CREATE TABLE webhook_deliveries (
+                id BIGSERIAL PRIMARY KEY,
+                webhook_id INTEGER NOT NULL REFERENCES webhooks (id) ON DELETE CASCADE,
+                event VARCHAR(64) NOT NULL,
+                payload TEXT NOT NULL,
+                status VARCHAR(20) NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at TIMESTAMP NOT NULL DEFAULT NOW(),
+                last_error TEXT,
+                created_time TIMESTAMP NOT NULL DEFAULT NOW(),
+                delivered_time TIMESTAMP
+            )
+        """))
+        await session.execute(text("""
+            CREATE INDEX idx_webhook_deliveries_due
+            ON webhook_deliveries (next_attempt_at)
+            WHERE status = 'pending'
+        """))
+        await session.execute(text("CREATE INDEX idx_webhook_deliveries_created ON webhook_deliveries (created_time)"))
+        await session.commit()
+
+    async def downgrade(self, session: AsyncSession) -> None:
+        """Drop the webhook tables and the api_client column."""
+        await session.execute(text("DROP TABLE IF EXISTS webhook_deliveries"))
+        await session.execute(text("DROP TABLE IF EXISTS webhooks"))
+        await session.execute(text("ALTER TABLE join_requests DROP COLUMN IF EXISTS api_client"))
+        await session.commit()
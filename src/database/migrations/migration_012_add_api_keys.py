@@ -0,0 +1,46 @@
+"""Add API keys and per-key usage migration."""
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .base import Migration
+
+
+class AddApiKeysMigration(Migration):
+    """Add api_keys and api_key_usage tables for multi-tenant external API access."""
+
+    def get_version(self) -> str:
+        return "012"
+
+    def get_description(self) -> str:
+        return "Add api_keys and api_key_usage tables for per-client API keys and quotas"
+
+    async def upgrade(self, session: AsyncSession) -> None:
+        """Create api_keys (SHA-256 key hashes only) and daily usage counters."""
+        await session.execute(text("""
+            CREATE TABLE api_keys (
+                id SERIAL PRIMARY KEY,
+                name VARCHAR(64) NOT NULL UNIQUE,
+                key_hash CHAR(64) NOT NULL UNIQUE,
+                key_prefix VARCHAR(16) NOT NULL,
+                daily_quota INTEGER,
+                revoked BOOLEAN NOT NULL DEFAULT FALSE,
+                created_time TIMESTAMP NOT NULL DEFAULT NOW(),
+                rotated_time TIMESTAMP
+            )
+        """))
+        await session.execute(text("""
+            CREATE TABLE api_key_usage (
+                api_key_id INTEGER NOT NULL REFERENCES api_keys (id) ON DELETE CASCADE,
+                day DATE NOT NULL,
+                requests BIGINT NOT NULL DEFAULT 0,
+                PRIMARY KEY (api_key_id, day)
+            )
+        """))
+        await session.commit()
+
+    async def downgrade(self, session: AsyncSession) -> None:
+        """Drop API key tables."""
+        await session.execute(text("DROP TABLE IF EXISTS api_key_usage"))
+        await session.execute(text("DROP TABLE IF EXISTS api_keys"))
+        await session.commit()
@@ -0,0 +1,37 @@
+"""Add idempotency keys migration."""
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .base import Migration
+
+
+class AddIdempotencyKeysMigration(Migration):
+    """Add idempotency_keys table storing responses of external API calls by Idempotency-Key."""
+
+    def get_version(self) -> str:
+        return "013"
+
+    def get_description(self) -> str:
+        return "Add idempotency_keys table for Idempotency-Key support in the external API"
+
+    async def upgrade(self, session: AsyncSession) -> None:
+        """Create idempotency_keys table."""
+        await session.execute(text("""
+            CREATE TABLE idempotency_keys (
+                api_client VARCHAR(64) NOT NULL,
+                key VARCHAR(255) NOT NULL,
+                request_hash CHAR(64) NOT NULL,
+                response TEXT NOT NULL,
+                created_time TIMESTAMP NOT NULL DEFAULT NOW(),
+                expires_at TIMESTAMP NOT NULL,
+                PRIMARY KEY (api_client, key)
+            )
+        """))
+        await session.execute(text("CREATE INDEX idx_idempotency_keys_expires ON idempotency_keys (expires_at)"))
+        await session.commit()
+
+    async def downgrade(self, session: AsyncSession) -> None:
+        """Drop idempotency_keys table."""
+        await session.execute(text("DROP TABLE IF EXISTS idempotency_keys"))
+        await session.commit()
@@ -0,0 +1,26 @@
+"""Add captcha provider to verification sessions migration."""
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .base import Migration
+
+
+class AddCaptchaProviderMigration(Migration):
+    """Add captcha_provider column to verification_sessions table."""
+
+    def get_version(self) -> str:
+        return "014"
+
+    def get_description(self) -> str:
+        return "Add captcha_provider column to verification_sessions to bind submissions to the rendered provider"
+
+    async def upgrade(self, session: AsyncSession) -> None:
+        """Add captcha_provider column (cascades to all partitions)."""
+        await session.execute(text("ALTER TABLE verification_sessions ADD COLUMN captcha_provider VARCHAR(32)"))
+        await session.commit()
+
+    async def downgrade(self, session: AsyncSession) -> None:
+        """Remove captcha_provider column."""
+        await session.execute(text("ALTER TABLE verification_sessions DROP COLUMN IF EXISTS captcha_provider"))
+        await session.commit()
@@ -3,7 +3,7 @@
 from datetime import datetime
 from enum import Enum
 
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, BigInteger, Text
+from sqlalchemy import Column, Integer, String, DateTime, Date, Boolean, BigInteger, Text, Float, ForeignKey
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 
@@ -34,7 +34,11 @@ class JoinRequest(Base):
     processed_time = Column(DateTime, nullable=True)
     admin_id = Column(BigInteger, nullable=True)
     verification_completed = Column(Boolean, nullable=False, default=False)
-    request_type = Column(String(20), nullable=False, default="telegram", index=True)  # "telegram" or "api"
+    request_type = Column(String(20), nullable=False, default="telegram", index=True)  # "telegram", "api" or "trusted"
+    # Token of the verification this request was collapsed into (cross-chat join throttle)
+    parent_token = Column(String(64), nullable=True)
+    # External API client that created the request (webhook routing)
+    api_client = Column(String(64), nullable=True)
 
     def __repr__(self):
         return f"<JoinRequest(user_id={self.user_id}, chat_id={self.chat_id}, status={self.status})>"
@@ -50,6 +54,8 @@ class VerificationSession(Base):
     chat_id = Column(BigInteger, nullable=False, index=True)
     captcha_completed = Column(Boolean, nullable=False, default=False)
     captcha_response = Column(Text, nullable=True)
+    captcha_score = Column(Float, nullable=True)  # Provider confidence score, if the provider reports one
+    captcha_provider = Column(String(32), nullable=True)  # Provider the verification page was last rendered with
     ip_address = Column(String(45), nullable=True)  # IPv6 support
     user_agent = Column(Text, nullable=True)
     created_time = Column(DateTime, nullable=False, default=func.now())
@@ -63,3 +69,116 @@ class VerificationSession(Base):
 
     def __repr__(self):
         return f"<VerificationSession(token={self.token}, user_id={self.user_id}, completed={self.captcha_completed})>"
+
+
+class CaptchaMetric(Base):
+    """Captcha provider call metrics for primary/shadow comparison."""
+    __tablename__ = "captcha_metrics"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    provider = Column(String(32), nullable=False)
+    role = Column(String(16), nullable=False)  # "primary" or "shadow"
+    success = Column(Boolean, nullable=False)
+    error_code = Column(String(64), nullable=True)
+    latency_ms = Column(Integer, nullable=True)
+    agreed = Column(Boolean, nullable=True)  # Shadow rows: whether the shadow agreed with the primary
+    created_time = Column(DateTime, nullable=False, default=func.now())
+
+    def __repr__(self):
+        return f"<CaptchaMetric(provider={self.provider}, role={self.role}, success={self.success})>"
+
+
+class BlockedUser(Base):
+    """Globally blocklisted user, declined in every chat without verification."""
+    __tablename__ = "blocklist"
+
+    user_id = Column(BigInteger, primary_key=True, autoincrement=False)
+    reason = Column(String(20), nullable=False)  # "auto", "manual" or "import"
+    source_chat_id = Column(BigInteger, nullable=True)
+    added_by = Column(BigInteger, nullable=True)
+    created_time = Column(DateTime, nullable=False, default=func.now())
+
+    def __repr__(self):
+        return f"<BlockedUser(user_id={self.user_id}, reason={self.reason})>"
+
+
+class RateLimitCounter(Base):
+    """Request count of one rate limit key in one fixed window (shared rate limit store)."""
+    __tablename__ = "rate_limit_counters"
+
+    key = Column(String(255), primary_key=True)
+    window_index = Column(BigInteger, primary_key=True, autoincrement=False)
+    count = Column(Integer, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+
+class Webhook(Base):
+    """Completion webhook registered by an external API client."""
+    __tablename__ = "webhooks"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    api_client = Column(String(64), nullable=False, index=True)
+    url = Column(Text, nullable=False)
+    secret = Column(String(64), nullable=False)  # HMAC-SHA256 signing key
+    enabled = Column(Boolean, nullable=False, default=True)
+    created_time = Column(DateTime, nullable=False, default=func.now())
+
+    def __repr__(self):
+        return f"<Webhook(id={self.id}, api_client={self.api_client}, url={self.url})>"
+
+
+class WebhookDelivery(Base):
+    """Queued or finished delivery of one event to one webhook."""
+    __tablename__ = "webhook_deliveries"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    webhook_id = Column(Integer, ForeignKey("webhooks.id", ondelete="CASCADE"), nullable=False)
+    event = Column(String(64), nullable=False)
+    payload = Column(Text, nullable=False)  # JSON request body
+    status = Column(String(20), nullable=False, default="pending")  # "pending", "delivered" or "failed"
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=func.now())
+    last_error = Column(Text, nullable=True)
+    created_time = Column(DateTime, nullable=False, default=func.now())
+    delivered_time = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<WebhookDelivery(id={self.id}, webhook_id={self.webhook_id}, status={self.status})>"
+
+
+class ApiKey(Base):
+    """External API key of one client; only a SHA-256 hash of the key is stored."""
+    __tablename__ = "api_keys"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String(64), nullable=False, unique=True)  # Client name (owner of verifications and webhooks)
+    key_hash = Column(String(64), nullable=False, unique=True)
+    key_prefix = Column(String(16), nullable=False)  # Shown to admins to tell keys apart
+    daily_quota = Column(Integer, nullable=True)  # Requests per UTC day, None = unlimited
+    revoked = Column(Boolean, nullable=False, default=False)
+    created_time = Column(DateTime, nullable=False, default=func.now())
+    rotated_time = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<ApiKey(name={self.name}, prefix={self.key_prefix}, revoked={self.revoked})>"
+
+
+class ApiKeyUsage(Base):
+    """Requests made with one API key on one UTC day."""
+    __tablename__ = "api_key_usage"
+
+    api_key_id = Column(Integer, ForeignKey("api_keys.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    requests = Column(BigInteger, nullable=False, default=0)
+
+
+class IdempotencyKey(Base):
+    """Stored response of an external API call made with an Idempotency-Key header."""
+    __tablename__ = "idempotency_keys"
+
+    api_client = Column(String(64), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    request_hash = Column(String(64), nullable=False)  # SHA-256 of the request body the key was first used with
+    response = Column(Text, nullable=False)  # JSON response body
+    created_time = Column(DateTime, nullable=False, default=func.now())
+    expires_at = Column(DateTime, nullable=False)
@@ -1,18 +1,58 @@
 """Database operations for TGuard bot."""
 
+import json
 import logging
-from datetime import datetime
-from typing import Optional, List, Dict, Any, Tuple
+from datetime import date, datetime, timedelta
+from typing import Optional, List, Dict, Any, Tuple, AsyncIterator
 
-from sqlalchemy import select, update, func
+from sqlalchemy import select, update, delete, func, or_, tuple_, insert, any_, bindparam, literal, BigInteger, String, Text
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
 from sqlalchemy.exc import SQLAlchemyError
 
 from src.database.connection import get_session
-from src.database.models import JoinRequest, VerificationSession, RequestStatus
+from src.database.history import history_select
+from src.database.models import (
+    JoinRequest,
+    VerificationSession,
+    RequestStatus,
+    CaptchaMetric,
+    BlockedUser,
+    RateLimitCounter,
+    Webhook,
+    WebhookDelivery,
+    ApiKey,
+    ApiKeyUsage,
+    IdempotencyKey
+)
+from src.events.bus import (
+    CACHE_INVALIDATED,
+    EVENTS_CHANNEL,
+    SESSION_CREATED,
+    VERIFICATION_COMPLETED,
+    encode_event
+)
+from src.database.partitions import (
+    PARTITIONED_TABLES,
+    add_months,
+    drop_partitions_before,
+    ensure_partitions,
+    month_start
+)
 
 logger = logging.getLogger(__name__)
 
 
+def _notify(event_type: str, **data: Any):
+    """Statement sending an event bus event, delivered when the transaction commits."""
+    return select(func.pg_notify(EVENTS_CHANNEL, encode_event(event_type, **data)))
+
+# Webhook event sent when a verification created through the external API completes
+VERIFICATION_COMPLETED_EVENT = "verification.completed"
+
+# Rows per blocklist INSERT, well under PostgreSQL's 32767 bind parameter limit
+BLOCKLIST_INSERT_CHUNK = 5000
+
+
 async def create_join_request(
         user_id: int,
         chat_id: int,
@@ -20,9 +60,16 @@ async def create_join_request(
         first_name: str,
         last_name: Optional[str],
         verification_token: str,
-        request_type: str = "telegram"
+        request_type: str = "telegram",
+        parent_token: Optional[str] = None,
+        api_client: Optional[str] = None
 ) -> Optional[JoinRequest]:
-    """Create a new join request."""
+    """Create a new join request.
+
+    A request with a parent_token gets no verification session of its own: it
+    is approved or expired together with the parent verification. api_client
+    names the external API client that created it, for webhook delivery.
+    """
     try:
         async with get_session()() as session:
             # Check if there's already a pending request
@@ -40,6 +87,8 @@ async def create_join_request(
                 existing.verification_token = verification_token
                 existing.request_time = datetime.utcnow()
                 existing.verification_completed = False
+                existing.parent_token = parent_token
+                existing.api_client = api_client
                 await session.commit()
                 logger.info(f"Updated existing join request for user {user_id}")
                 return existing
@@ -52,7 +101,9 @@ async def create_join_request(
                 first_name=first_name,
                 last_name=last_name,
                 verification_token=verification_token,
-                request_type=request_type
+                request_type=request_type,
+                parent_token=parent_token,
+                api_client=api_client
             )
 
             session.add(join_request)
@@ -91,6 +142,13 @@ async def create_verification_session(
             )
 
             session.add(verification_session)
+            await session.execute(_notify(
+                SESSION_CREATED,
+                token=token,
+                user_id=user_id,
+                chat_id=chat_id,
+                expires_at=expires_at.isoformat()
+            ))
             await session.commit()
             await session.refresh(verification_session)
 
@@ -102,6 +160,104 @@ async def create_verification_session(
         return None
 
 
+async def create_api_verifications(
+        tokens: Dict[int, str],
+        expires_at: datetime,
+        api_client: Optional[str] = None
+) -> bool:
+    """Create external API verification requests (chat_id 0) for many users in one transaction.
+
+    Users who already have a pending API request get it re-issued under the
+    new token, as in create_join_request. The remaining join requests and all
+    verification sessions are written with one multi-row INSERT each.
+    """
+    if not tokens:
+        return True
+
+    try:
+        async with get_session()() as session:
+            now = datetime.utcnow()
+            result = await session.execute(
+                select(JoinRequest.id, JoinRequest.user_id).where(
+                    JoinRequest.user_id == any_(bindparam('user_ids', list(tokens), type_=ARRAY(BigInteger))),
+                    JoinRequest.chat_id == 0,
+                    JoinRequest.status == RequestStatus.PENDING
+                )
+            )
+            existing = {user_id: row_id for row_id, user_id in result}
+
+            if existing:
+                table = JoinRequest.__table__
+                await session.execute(
+                    update(table)
+                    .where(table.c.id == bindparam('row_id'))
+                    .values(
+                        verification_token=bindparam('token'),
+                        request_time=now,
+                        verification_completed=False,
+                        parent_token=None,
+                        api_client=api_client
+                    ),
+                    [{'row_id': row_id, 'token': tokens[user_id]} for user_id, row_id in existing.items()]
+                )
+
+            new_requests = [
+                {
+                    'user_id': user_id,
+                    'chat_id': 0,
+                    'first_name': "",
+                    'verification_token': token,
+                    'status': RequestStatus.PENDING,
+                    'request_time': now,
+                    'verification_completed': False,
+                    'request_type': "api",
+                    'api_client': api_client
+                }
+                for user_id, token in tokens.items()
+                if user_id not in existing
+            ]
+            if new_requests:
+                await session.execute(insert(JoinRequest).values(new_requests))
+
+            await session.execute(
+                insert(VerificationSession).values([
+                    {
+                        'token': token,
+                        'user_id': user_id,
+                        'chat_id': 0,
+                        'captcha_completed': False,
+                        'created_time': now,
+                        'expires_at': expires_at
+                    }
+                    for user_id, token in tokens.items()
+                ])
+            )
+
+            payloads = func.unnest(bindparam(
+                'payloads',
+                [
+                    encode_event(
+                        SESSION_CREATED,
+                        token=token,
+                        user_id=user_id,
+                        chat_id=0,
+                        expires_at=expires_at.isoformat()
+                    )
+                    for user_id, token in tokens.items()
+                ],
+                type_=ARRAY(Text)
+            )).table_valued('payload').render_derived()
+            await session.execute(select(func.pg_notify(EVENTS_CHANNEL, payloads.c.payload)))
+
+            await session.commit()
+            logger.info(f"Created {len(tokens)} API verification requests ({len(existing)} re-issued)")
+            return True
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error creating API verification requests: {e}")
+        return False
+
+
 async def get_verification_session(token: str) -> Optional[VerificationSession]:
     """Get verification session by token."""
     try:
@@ -115,15 +271,46 @@ async def get_verification_session(token: str) -> Optional[VerificationSession]:
         return None
 
 
+async def set_session_captcha_provider(token: str, provider_name: str) -> bool:
+    """Record the captcha provider a session's verification page was rendered with.
+
+    Returns whether the token belongs to a live (unexpired, uncompleted) session.
+    """
+    try:
+        async with get_session()() as session:
+            result = await session.execute(
+                update(VerificationSession)
+                .where(
+                    VerificationSession.token == token,
+                    VerificationSession.captcha_completed == False,
+                    VerificationSession.expires_at > datetime.utcnow()
+                )
+                .values(captcha_provider=provider_name)
+            )
+            await session.commit()
+            return result.rowcount > 0
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error recording captcha provider: {e}")
+        return False
+
+
 async def complete_verification(
         token: str,
         captcha_response: str,
         ip_address: Optional[str] = None,
-        user_agent: Optional[str] = None
+        user_agent: Optional[str] = None,
+        captcha_score: Optional[float] = None
 ) -> bool:
-    """Mark verification as completed."""
+    """Mark verification as completed and send a VERIFICATION_COMPLETED event.
+
+    Completions of requests created by an external API client queue a
+    delivery to each of the client's webhooks in the same transaction.
+    """
     try:
         async with get_session()() as session:
+            completed_time = datetime.utcnow()
+
             # Update verification session
             await session.execute(
                 update(VerificationSession)
@@ -131,18 +318,48 @@ async def complete_verification(
                 .values(
                     captcha_completed=True,
                     captcha_response=captcha_response,
+                    captcha_score=captcha_score,
                     ip_address=ip_address,
                     user_agent=user_agent,
-                    completed_time=datetime.utcnow()
+                    completed_time=completed_time
                 )
             )
 
             # Update join request
-            await session.execute(
+            result = await session.execute(
                 update(JoinRequest)
                 .where(JoinRequest.verification_token == token)
                 .values(verification_completed=True)
+                .returning(JoinRequest.user_id, JoinRequest.chat_id, JoinRequest.request_type, JoinRequest.api_client)
             )
+            join_request = result.first()
+
+            if join_request is not None and join_request.api_client is not None:
+                payload = json.dumps({
+                    "event": VERIFICATION_COMPLETED_EVENT,
+                    "token": token,
+                    "user_id": join_request.user_id,
+                    "chat_id": join_request.chat_id,
+                    "completed_time": completed_time.isoformat()
+                })
+                await session.execute(
+                    insert(WebhookDelivery).from_select(
+                        ["webhook_id", "event", "payload"],
+                        select(
+                            Webhook.id,
+                            literal(VERIFICATION_COMPLETED_EVENT, String),
+                            literal(payload, Text)
+                        ).where(Webhook.api_client == join_request.api_client, Webhook.enabled.is_(True))
+                    )
+                )
+
+            await session.execute(_notify(
+                VERIFICATION_COMPLETED,
+                token=token,
+                user_id=join_request.user_id if join_request is not None else None,
+                chat_id=join_request.chat_id if join_request is not None else None,
+                request_type=join_request.request_type if join_request is not None else None
+            ))
 
             await session.commit()
             logger.info(f"Verification completed for token {token}")
@@ -176,6 +393,39 @@ async def approve_join_request(token: str, admin_id: Optional[int] = None) -> bo
         return False
 
 
+async def bulk_update_request_status(
+        request_ids: List[int],
+        status: RequestStatus,
+        admin_id: Optional[int] = None
+) -> int:
+    """Set the status of many pending join requests in one statement. Returns rows updated."""
+    if not request_ids:
+        return 0
+
+    try:
+        async with get_session()() as session:
+            result = await session.execute(
+                update(JoinRequest)
+                .where(
+                    JoinRequest.id.in_(request_ids),
+                    JoinRequest.status == RequestStatus.PENDING
+                )
+                .values(
+                    status=status,
+                    processed_time=datetime.utcnow(),
+                    admin_id=admin_id
+                )
+            )
+
+            await session.commit()
+            logger.info(f"Bulk updated {result.rowcount} join requests to {status.value}")
+            return result.rowcount
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error bulk updating join requests: {e}")
+        return 0
+
+
 async def get_join_request_by_token(token: str) -> Optional[JoinRequest]:
     """Get join request by verification token."""
     try:
@@ -189,6 +439,75 @@ async def get_join_request_by_token(token: str) -> Optional[JoinRequest]:
         return None
 
 
+async def get_verification_statuses(
+        tokens: List[str],
+        api_client: Optional[str] = None
+) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Look up many verification sessions and their join request status with one query.
+
+    Returns token -> status fields for the tokens that exist (and, if
+    api_client is given, were created by that API client), or None on error.
+    """
+    try:
+        async with get_session()() as session:
+            query = (
+                select(
+                    VerificationSession.token,
+                    VerificationSession.captcha_completed,
+                    VerificationSession.created_time,
+                    VerificationSession.expires_at,
+                    JoinRequest.status
+                )
+                .outerjoin(JoinRequest, JoinRequest.verification_token == VerificationSession.token)
+                .where(VerificationSession.token == any_(bindparam('tokens', tokens, type_=ARRAY(String))))
+            )
+            if api_client is not None:
+                query = query.where(JoinRequest.api_client == api_client)
+            result = await session.execute(query)
+            return {row.token: dict(row._mapping) for row in result}
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error getting verification statuses: {e}")
+        return None
+
+
+async def get_linked_join_requests(parent_token: str) -> List[JoinRequest]:
+    """Get pending join requests collapsed into the verification with this token."""
+    try:
+        async with get_session()() as session:
+            result = await session.execute(
+                select(JoinRequest).where(
+                    JoinRequest.parent_token == parent_token,
+                    JoinRequest.status == RequestStatus.PENDING
+                )
+            )
+            return list(result.scalars())
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error getting linked join requests: {e}")
+        return []
+
+
+async def get_unapproved_verified_tokens(since: datetime) -> List[str]:
+    """Get tokens of verified join requests (to a chat) made since the given time that are still pending."""
+    try:
+        async with get_session()() as session:
+            result = await session.execute(
+                select(JoinRequest.verification_token).where(
+                    JoinRequest.verification_completed == True,
+                    JoinRequest.status == RequestStatus.PENDING,
+                    JoinRequest.chat_id != 0,
+                    JoinRequest.parent_token.is_(None),
+                    JoinRequest.request_time >= since
+                )
+            )
+            return list(result.scalars())
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error getting unapproved verified join requests: {e}")
+        return []
+
+
 async def get_pending_requests(chat_id: int, limit: int = 50) -> List[JoinRequest]:
     """Get pending join requests for a chat."""
     try:
@@ -208,6 +527,149 @@ async def get_pending_requests(chat_id: int, limit: int = 50) -> List[JoinReques
         return []
 
 
+async def get_pending_requests_page(
+        chat_id: int,
+        cursor: Optional[Tuple[datetime, int]] = None,
+        limit: int = 10,
+        backward: bool = False,
+        verified_only: bool = False,
+        requested_before: Optional[datetime] = None
+) -> List[JoinRequest]:
+    """Get one page of pending join requests for a chat, newest first.
+
+    Uses keyset pagination on (request_time, id): with backward=False the page
+    holds requests older than cursor, with backward=True requests newer than
+    cursor. Results are always returned newest first. Optionally restricted to
+    requests whose captcha is completed and/or filed before requested_before."""
+    try:
+        async with get_session()() as session:
+            key = tuple_(JoinRequest.request_time, JoinRequest.id)
+            query = select(JoinRequest).where(
+                JoinRequest.chat_id == chat_id,
+                JoinRequest.status == RequestStatus.PENDING
+            )
+            if verified_only:
+                query = query.where(JoinRequest.verification_completed == True)
+            if requested_before is not None:
+                query = query.where(JoinRequest.request_time < requested_before)
+
+            if backward:
+                if cursor is not None:
+                    query = query.where(key > tuple_(*cursor))
+                query = query.order_by(JoinRequest.request_time.asc(), JoinRequest.id.asc())
+            else:
+                if cursor is not None:
+                    query = query.where(key < tuple_(*cursor))
+                query = query.order_by(JoinRequest.request_time.desc(), JoinRequest.id.desc())
+
+            result = await session.execute(query.limit(limit))
+            requests = list(result.scalars().all())
+            return requests[::-1] if backward else requests
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error getting pending requests page: {e}")
+        return []
+
+
+async def stream_verification_history(
+        chat_id: Optional[int] = None,
+        status: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        api_client: Optional[str] = None,
+        page_size: int = 5000,
+        fetch_size: int = 500
+) -> AsyncIterator[List[Any]]:
+    """Yield batches of history rows (join requests joined with sessions), oldest id first.
+
+    Pages are walked with keyset pagination on id, each in its own short
+    transaction, and every page is read through a server-side cursor in
+    fetch_size chunks, so memory stays flat regardless of export size.
+
+    Unlike most operations here, database errors are logged and re-raised:
+    a caller streaming the rows out must not mistake a failed read for the
+    end of the history."""
+    filters = []
+    if api_client is not None:
+        filters.append(JoinRequest.api_client == api_client)
+    if chat_id is not None:
+        filters.append(JoinRequest.chat_id == chat_id)
+    if status is not None:
+        filters.append(JoinRequest.status == status)
+    if since is not None:
+        filters.append(JoinRequest.request_time >= since)
+    if until is not None:
+        filters.append(JoinRequest.request_time < until)
+
+    last_id = 0
+    try:
+        while True:
+            fetched = 0
+            async with get_session()() as session:
+                query = (
+                    history_select()
+                    .where(JoinRequest.id > last_id, *filters)
+                    .order_by(JoinRequest.id)
+                    .limit(page_size)
+                    .execution_options(yield_per=fetch_size)
+                )
+                result = await session.stream(query)
+                async for rows in result.partitions(fetch_size):
+                    fetched += len(rows)
+                    last_id = rows[-1].id
+                    yield rows
+
+            if fetched < page_size:
+                return
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error streaming verification history: {e}")
+        raise
+
+
+async def get_user_trust_history(user_id: int, since: datetime) -> Optional[Dict[str, Any]]:
+    """Get a user's verification track record across all chats since a point in time.
+
+    Only approvals that went through a completed captcha count, so trusted
+    fast-path approvals never vouch for themselves.
+    """
+    try:
+        async with get_session()() as session:
+            result = await session.execute(
+                select(
+                    func.count().filter(
+                        JoinRequest.status == RequestStatus.APPROVED,
+                        JoinRequest.verification_completed.is_(True)
+                    ).label('verified_approvals'),
+                    func.count().filter(
+                        JoinRequest.status.in_([RequestStatus.REJECTED, RequestStatus.EXPIRED])
+                    ).label('failures'),
+                    func.max(JoinRequest.processed_time).filter(
+                        JoinRequest.status == RequestStatus.APPROVED,
+                        JoinRequest.verification_completed.is_(True)
+                    ).label('last_verified_time'),
+                    func.avg(VerificationSession.captcha_score).label('avg_captcha_score'),
+                    func.count(VerificationSession.captcha_score).label('scored_sessions')
+                )
+                .select_from(JoinRequest)
+                .outerjoin(VerificationSession, VerificationSession.token == JoinRequest.verification_token)
+                .where(JoinRequest.user_id == user_id, JoinRequest.request_time >= since)
+            )
+            row = result.one()
+
+            return {
+                'verified_approvals': row.verified_approvals,
+                'failures': row.failures,
+                'last_verified_time': row.last_verified_time,
+                'avg_captcha_score': float(row.avg_captcha_score) if row.avg_captcha_score is not None else None,
+                'scored_sessions': row.scored_sessions
+            }
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error getting trust history for user {user_id}: {e}")
+        return None
+
+
 async def get_verification_stats(chat_id: int) -> Dict[str, Any]:
     """Get verification statistics for a chat."""
     try:
@@ -315,10 +777,15 @@ async def cleanup_expired_sessions() -> List[Tuple[int, int]]:
             if not tokens:
                 return []
 
-            # 2. Get corresponding pending join requests and build dismiss list
+            # 2. Get corresponding pending join requests (including ones collapsed into them)
+            #    and build dismiss list
+            expired_requests = or_(
+                JoinRequest.verification_token.in_(tokens),
+                JoinRequest.parent_token.in_(tokens)
+            )
             join_result = await session.execute(
                 select(JoinRequest.chat_id, JoinRequest.user_id, JoinRequest.request_type).where(
-                    JoinRequest.verification_token.in_(tokens),
+                    expired_requests,
                     JoinRequest.status == RequestStatus.PENDING
                 )
             )
@@ -333,10 +800,10 @@ async def cleanup_expired_sessions() -> List[Tuple[int, int]]:
             await session.execute(
                 update(JoinRequest)
                 .where(
-                    JoinRequest.verification_token.in_(tokens),
+                    expired_requests,
                     JoinRequest.status == RequestStatus.PENDING
                 )
-                .values(status=RequestStatus.EXPIRED)
+                .values(status=RequestStatus.EXPIRED, processed_time=now)
             )
 
             await session.commit()
@@ -346,3 +813,642 @@ async def cleanup_expired_sessions() -> List[Tuple[int, int]]:
     except SQLAlchemyError as e:
         logger.error(f"Error cleaning up expired sessions: {e}")
         return []
+
+
+async def maintain_partitions(months_ahead: int, retention_months: int = 0, keep_unarchived: bool = False) -> List[str]:
+    """Create upcoming monthly partitions and drop partitions past retention.
+    Returns the names of dropped partitions. retention_months=0 keeps everything.
+    With keep_unarchived, partitions of archived tables are only dropped once empty."""
+    try:
+        async with get_session()() as session:
+            current_month = month_start(datetime.utcnow())
+            dropped = []
+
+            for table in PARTITIONED_TABLES:
+                await ensure_partitions(
+                    session,
+                    table.name,
+                    current_month,
+                    add_months(current_month, months_ahead)
+                )
+
+                if retention_months > 0:
+                    cutoff_month = add_months(current_month, -retention_months)
+                    dropped.extend(await drop_partitions_before(
+                        session,
+                        table.name,
+                        cutoff_month,
+                        only_empty=keep_unarchived and table.archived
+                    ))
+
+            await session.commit()
+
+            if dropped:
+                logger.info(f"Dropped expired partitions: {', '.join(dropped)}")
+            return dropped
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error maintaining partitions: {e}")
+        return []
+
+
+async def record_captcha_metrics(rows: List[Dict[str, Any]]) -> bool:
+    """Insert captcha provider call metrics (dicts of CaptchaMetric columns)."""
+    if not rows:
+        return True
+
+    try:
+        async with get_session()() as session:
+            await session.execute(insert(CaptchaMetric), rows)
+            await session.commit()
+            return True
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error recording captcha metrics: {e}")
+        return False
+
+
+async def get_captcha_metrics_summary(since: datetime) -> List[Dict[str, Any]]:
+    """Summarize captcha metrics per provider and role since a point in time."""
+    try:
+        async with get_session()() as session:
+            result = await session.execute(
+                select(
+                    CaptchaMetric.provider,
+                    CaptchaMetric.role,
+                    func.count().label('calls'),
+                    func.count().filter(CaptchaMetric.success).label('successes'),
+                    func.count().filter(CaptchaMetric.error_code == 'no-response').label('no_response'),
+                    func.count().filter(CaptchaMetric.agreed.is_(False)).label('disagreements'),
+                    func.percentile_cont(0.5).within_group(CaptchaMetric.latency_ms).label('p50'),
+                    func.percentile_cont(0.95).within_group(CaptchaMetric.latency_ms).label('p95'),
+                    func.percentile_cont(0.99).within_group(CaptchaMetric.latency_ms).label('p99')
+                )
+                .where(CaptchaMetric.created_time >= since)
+                .group_by(CaptchaMetric.provider, CaptchaMetric.role)
+                .order_by(CaptchaMetric.role, CaptchaMetric.provider)
+            )
+
+            summary = []
+            for row in result:
+                answered = row.calls - row.no_response
+                summary.append({
+                    'provider': row.provider,
+                    'role': row.role,
+                    'calls': row.calls,
+                    'successes': row.successes,
+                    'success_rate': round(row.successes / answered * 100, 2) if answered else 0,
+                    'no_response': row.no_response,
+                    'disagreements': row.disagreements,
+                    'disagreement_rate': round(row.disagreements / answered * 100, 2) if answered else 0,
+                    'latency_p50_ms': round(row.p50) if row.p50 is not None else None,
+                    'latency_p95_ms': round(row.p95) if row.p95 is not None else None,
+                    'latency_p99_ms': round(row.p99) if row.p99 is not None else None
+                })
+
+            return summary
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error getting captcha metrics summary: {e}")
+        return []
+
+
+async def get_blocklist_ids() -> Optional[List[int]]:
+    """Get all blocklisted user IDs (None on error, so callers keep their current copy)."""
+    try:
+        async with get_session()() as session:
+            result = await session.execute(select(BlockedUser.user_id))
+            return list(result.scalars())
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error loading blocklist: {e}")
+        return None
+
+
+async def add_to_blocklist(
+        user_ids: List[int],
+        reason: str,
+        added_by: Optional[int] = None,
+        source_chat_id: Optional[int] = None
+) -> List[int]:
+    """Add users to the blocklist, skipping ones already listed. Returns the newly added IDs."""
+    if not user_ids:
+        return []
+
+    try:
+        async with get_session()() as session:
+            added = []
+            unique_ids = list(dict.fromkeys(user_ids))
+            for start in range(0, len(unique_ids), BLOCKLIST_INSERT_CHUNK):
+                rows = [
+                    {
+                        'user_id': user_id,
+                        'reason': reason,
+                        'added_by': added_by,
+                        'source_chat_id': source_chat_id
+                    }
+                    for user_id in unique_ids[start:start + BLOCKLIST_INSERT_CHUNK]
+                ]
+                result = await session.execute(
+                    pg_insert(BlockedUser)
+                    .values(rows)
+                    .on_conflict_do_nothing(index_elements=[BlockedUser.user_id])
+                    .returning(BlockedUser.user_id)
+                )
+                added.extend(result.scalars())
+
+            if added:
+                await session.execute(_notify(CACHE_INVALIDATED, cache="blocklist"))
+            await session.commit()
+            if added:
+                logger.info(f"Added {len(added)} users to blocklist ({reason})")
+            return added
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error adding users to blocklist: {e}")
+        return []
+
+
+async def remove_from_blocklist(user_id: int) -> bool:
+    """Remove a user from the blocklist. Returns False if they were not listed."""
+    try:
+        async with get_session()() as session:
+            result = await session.execute(
+                delete(BlockedUser).where(BlockedUser.user_id == user_id)
+            )
+            if result.rowcount > 0:
+                await session.execute(_notify(CACHE_INVALIDATED, cache="blocklist"))
+            await session.commit()
+            return result.rowcount > 0
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error removing user {user_id} from blocklist: {e}")
+        return False
+
+
+async def find_repeat_offenders(
+        user_ids: List[int],
+        min_failures: int,
+        min_chats: int,
+        since: datetime
+) -> List[Tuple[int, int]]:
+    """Find which of the given users failed verification often enough to be blocklisted.
+
+    A user qualifies with at least min_failures rejected or expired requests
+    across at least min_chats distinct chats since the given time. Users
+    already on the blocklist are skipped. Returns (user_id, last chat_id) pairs.
+    """
+    if not user_ids:
+        return []
+
+    try:
+        async with get_session()() as session:
+            result = await session.execute(
+                select(
+                    JoinRequest.user_id,
+                    func.max(JoinRequest.chat_id).label('chat_id')
+                )
+                .where(
+                    JoinRequest.user_id.in_(set(user_ids)),
+                    JoinRequest.status.in_([RequestStatus.REJECTED, RequestStatus.EXPIRED]),
+                    JoinRequest.request_time >= since,
+                    JoinRequest.user_id.not_in(select(BlockedUser.user_id))
+                )
+                .group_by(JoinRequest.user_id)
+                .having(
+                    func.count() >= min_failures,
+                    func.count(JoinRequest.chat_id.distinct()) >= min_chats
+                )
+            )
+            return [(row.user_id, row.chat_id) for row in result]
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error finding repeat offenders: {e}")
+        return []
+
+
+async def hit_rate_limit_counter(key: str, window_index: int, expires_at: datetime) -> Optional[Tuple[int, int]]:
+    """Count a request against a key's current window.
+
+    Returns (current window count including this request, previous window
+    count), or None on error.
+    """
+    try:
+        async with get_session()() as session:
+            result = await session.execute(
+                pg_insert(RateLimitCounter)
+                .values(key=key, window_index=window_index, count=1, expires_at=expires_at)
+                .on_conflict_do_update(
+                    index_elements=[RateLimitCounter.key, RateLimitCounter.window_index],
+                    set_={'count': RateLimitCounter.count + 1}
+                )
+                .returning(RateLimitCounter.count)
+            )
+            current = result.scalar_one()
+
+            previous = await session.scalar(
+                select(RateLimitCounter.count).where(
+                    RateLimitCounter.key == key,
+                    RateLimitCounter.window_index == window_index - 1
+                )
+            )
+
+            await session.commit()
+            return current, previous or 0
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error updating rate limit counter: {e}")
+        return None
+
+
+async def delete_expired_rate_limit_counters() -> int:
+    """Delete rate limit counters whose window no longer matters. Returns rows deleted."""
+    try:
+        async with get_session()() as session:
+            result = await session.execute(
+                delete(RateLimitCounter).where(RateLimitCounter.expires_at < datetime.utcnow())
+            )
+            await session.commit()
+            return result.rowcount
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error deleting expired rate limit counters: {e}")
+        return 0
+
+
+async def create_webhook(api_client: str, url: str, secret: str) -> Optional[Webhook]:
+    """Register a webhook for an external API client."""
+    try:
+        async with get_session()() as session:
+            webhook = Webhook(api_client=api_client, url=url, secret=secret)
+            session.add(webhook)
+            await session.commit()
+            await session.refresh(webhook)
+
+            logger.info(f"Registered webhook {webhook.id} for API client {api_client}")
+            return webhook
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error creating webhook: {e}")
+        return None
+
+
+async def get_webhooks(api_client: str) -> Optional[List[Webhook]]:
+    """Get the webhooks of an external API client, or None on error."""
+    try:
+        async with get_session()() as session:
+            result = await session.execute(
+                select(Webhook).where(Webhook.api_client == api_client).order_by(Webhook.id)
+            )
+            return list(result.scalars())
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error getting webhooks: {e}")
+        return None
+
+
+async def delete_webhook(api_client: str, webhook_id: int) -> bool:
+    """Delete one of an API client's webhooks together with its deliveries."""
+    try:
+        async with get_session()() as session:
+            result = await session.execute(
+                delete(Webhook).where(Webhook.id == webhook_id, Webhook.api_client == api_client)
+            )
+            await session.commit()
+            return result.rowcount > 0
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error deleting webhook: {e}")
+        return False
+
+
+async def claim_webhook_deliveries(limit: int, lease_seconds: float) -> List[Dict[str, Any]]:
+    """Claim up to limit due webhook deliveries for sending.
+
+    Claimed rows get their attempt counted and their next attempt pushed past
+    the lease, so other dispatchers skip them while this one sends, and pick
+    them up again if it dies before recording a result. Rows locked by a
+    concurrent claim are skipped rather than waited for.
+    """
+    try:
+        async with get_session()() as session:
+            now = datetime.utcnow()
+            due = (
+                select(WebhookDelivery.id)
+                .where(WebhookDelivery.status == "pending", WebhookDelivery.next_attempt_at <= now)
+                .order_by(WebhookDelivery.next_attempt_at)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+            result = await session.execute(
+                update(WebhookDelivery)
+                .where(WebhookDelivery.id.in_(due.scalar_subquery()))
+                .values(
+                    attempts=WebhookDelivery.attempts + 1,
+                    next_attempt_at=now + timedelta(seconds=lease_seconds)
+                )
+                .returning(
+                    WebhookDelivery.id,
+                    WebhookDelivery.webhook_id,
+                    WebhookDelivery.event,
+                    WebhookDelivery.payload,
+                    WebhookDelivery.attempts
+                )
+            )
+            deliveries = [dict(row._mapping) for row in result]
+
+            if deliveries:
+                webhooks = await session.execute(
+                    select(Webhook.id, Webhook.url, Webhook.secret).where(
+                        Webhook.id.in_({delivery['webhook_id'] for delivery in deliveries})
+                    )
+                )
+                targets = {row.id: row for row in webhooks}
+                for delivery in deliveries:
+                    target = targets[delivery['webhook_id']]
+                    delivery['url'] = target.url
+                    delivery['secret'] = target.secret
+
+            await session.commit()
+            return deliveries
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error claiming webhook deliveries: {e}")
+        return []
+
+
+async def record_webhook_results(results: List[Dict[str, Any]]) -> bool:
+    """Store the outcome of sent webhook deliveries.
+
+    Each result has the delivery id, its new status, next_attempt_at,
+    last_error and delivered_time.
+    """
+    if not results:
+        return True
+
+    try:
+        async with get_session()() as session:
+            table = WebhookDelivery.__table__
+            await session.execute(
+                update(table)
+                .where(table.c.id == bindparam('delivery_id'))
+                .values(
+                    status=bindparam('new_status'),
+                    next_attempt_at=bindparam('retry_at'),
+                    last_error=bindparam('error'),
+                    delivered_time=bindparam('delivered_at')
+                ),
+                [
+                    {
+                        'delivery_id': result['id'],
+                        'new_status': result['status'],
+                        'retry_at': result['next_attempt_at'],
+                        'error': result['last_error'],
+                        'delivered_at': result['delivered_time']
+                    }
+                    for result in results
+                ]
+            )
+            await session.commit()
+            return True
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error recording webhook delivery results: {e}")
+        return False
+
+
+async def delete_finished_webhook_deliveries(before: datetime) -> int:
+    """Delete delivered and failed webhook deliveries created before a cutoff. Returns rows deleted."""
+    try:
+        async with get_session()() as session:
+            result = await session.execute(
+                delete(WebhookDelivery).where(
+                    WebhookDelivery.status != "pending",
+                    WebhookDelivery.created_time < before
+                )
+            )
+            await session.commit()
+            return result.rowcount
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error deleting finished webhook deliveries: {e}")
+        return 0
+
+
+async def create_api_key(name: str, key_hash: str, key_prefix: str, daily_quota: Optional[int] = None) -> Optional[ApiKey]:
+    """Create an API key for a new client (None on error, including an existing name)."""
+    try:
+        async with get_session()() as session:
+            api_key = ApiKey(name=name, key_hash=key_hash, key_prefix=key_prefix, daily_quota=daily_quota)
+            session.add(api_key)
+            await session.commit()
+            await session.refresh(api_key)
+
+            logger.info(f"Created API key {key_prefix}... for client {name}")
+            return api_key
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error creating API key: {e}")
+        return None
+
+
+async def get_api_key_by_name(name: str) -> Optional[ApiKey]:
+    """Get a client's API key by client name."""
+    try:
+        async with get_session()() as session:
+            result = await session.execute(select(ApiKey).where(ApiKey.name == name))
+            return result.scalar_one_or_none()
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error getting API key: {e}")
+        return None
+
+
+async def get_api_key_by_hash(key_hash: str, day: date) -> Optional[Dict[str, Any]]:
+    """Look up an API key by hash together with its usage on a day.
+
+    Returns the key's fields plus 'requests', an empty dict for unknown keys,
+    or None on error.
+    """
+    try:
+        async with get_session()() as session:
+            result = await session.execute(
+                select(
+                    ApiKey.id,
+                    ApiKey.name,
+                    ApiKey.daily_quota,
+                    ApiKey.revoked,
+                    func.coalesce(ApiKeyUsage.requests, 0).label('requests')
+                )
+                .outerjoin(ApiKeyUsage, (ApiKeyUsage.api_key_id == ApiKey.id) & (ApiKeyUsage.day == day))
+                .where(ApiKey.key_hash == key_hash)
+            )
+            row = result.first()
+            return dict(row._mapping) if row is not None else {}
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error looking up API key: {e}")
+        return None
+
+
+async def update_api_key(name: str, **values: Any) -> bool:
+    """Update fields of a client's API key. Returns False if there is no such client or on error.
+
+    Sends a CACHE_INVALIDATED event, so API instances drop their cached keys.
+    """
+    try:
+        async with get_session()() as session:
+            result = await session.execute(
+                update(ApiKey).where(ApiKey.name == name).values(**values)
+            )
+            if result.rowcount > 0:
+                await session.execute(_notify(CACHE_INVALIDATED, cache="api_keys"))
+            await session.commit()
+            return result.rowcount > 0
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error updating API key: {e}")
+        return False
+
+
+async def list_api_keys(day: date) -> Optional[List[Dict[str, Any]]]:
+    """List all API keys with their usage on a day, or None on error."""
+    try:
+        async with get_session()() as session:
+            result = await session.execute(
+                select(
+                    ApiKey.name,
+                    ApiKey.key_prefix,
+                    ApiKey.daily_quota,
+                    ApiKey.revoked,
+                    ApiKey.created_time,
+                    func.coalesce(ApiKeyUsage.requests, 0).label('requests')
+                )
+                .outerjoin(ApiKeyUsage, (ApiKeyUsage.api_key_id == ApiKey.id) & (ApiKeyUsage.day == day))
+                .order_by(ApiKey.name)
+            )
+            return [dict(row._mapping) for row in result]
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error listing API keys: {e}")
+        return None
+
+
+async def add_api_key_usage(counts: Dict[int, int], day: date) -> Optional[Dict[int, int]]:
+    """Add request counts to the keys' usage on a day in one upsert.
+
+    Returns each key's new total (including other instances' counts), or None on error.
+    """
+    if not counts:
+        return {}
+
+    try:
+        async with get_session()() as session:
+            statement = pg_insert(ApiKeyUsage).values([
+                {'api_key_id': api_key_id, 'day': day, 'requests': requests}
+                for api_key_id, requests in counts.items()
+            ])
+            result = await session.execute(
+                statement
+                .on_conflict_do_update(
+                    index_elements=[ApiKeyUsage.api_key_id, ApiKeyUsage.day],
+                    set_={'requests': ApiKeyUsage.requests + statement.excluded.requests}
+                )
+                .returning(ApiKeyUsage.api_key_id, ApiKeyUsage.requests)
+            )
+            totals = {api_key_id: requests for api_key_id, requests in result}
+            await session.commit()
+            return totals
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error adding API key usage: {e}")
+        return None
+
+
+async def get_idempotency_record(api_client: str, key: str) -> Optional[Dict[str, Any]]:
+    """Get the live stored response for an idempotency key: {} if there is none, None on error."""
+    try:
+        async with get_session()() as session:
+            result = await session.execute(
+                select(IdempotencyKey.request_hash, IdempotencyKey.response, IdempotencyKey.expires_at).where(
+                    IdempotencyKey.api_client == api_client,
+                    IdempotencyKey.key == key,
+                    IdempotencyKey.expires_at > datetime.utcnow()
+                )
+            )
+            row = result.first()
+            return dict(row._mapping) if row is not None else {}
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error getting idempotency record: {e}")
+        return None
+
+
+async def save_idempotency_record(
+        api_client: str,
+        key: str,
+        request_hash: str,
+        response: str,
+        expires_at: datetime
+) -> Optional[Dict[str, Any]]:
+    """Store the response for an idempotency key unless a live one exists.
+
+    Returns the record that holds the key afterwards (ours, or the one
+    stored first by a concurrent request), or None on error.
+    """
+    try:
+        async with get_session()() as session:
+            now = datetime.utcnow()
+            statement = pg_insert(IdempotencyKey).values(
+                api_client=api_client,
+                key=key,
+                request_hash=request_hash,
+                response=response,
+                created_time=now,
+                expires_at=expires_at
+            )
+            # An expired record is replaced; a live one is kept
+            result = await session.execute(
+                statement
+                .on_conflict_do_update(
+                    index_elements=[IdempotencyKey.api_client, IdempotencyKey.key],
+                    set_={
+                        'request_hash': statement.excluded.request_hash,
+                        'response': statement.excluded.response,
+                        'created_time': statement.excluded.created_time,
+                        'expires_at': statement.excluded.expires_at
+                    },
+                    where=IdempotencyKey.expires_at <= now
+                )
+                .returning(IdempotencyKey.request_hash, IdempotencyKey.response, IdempotencyKey.expires_at)
+            )
+            row = result.first()
+            if row is None:
+                row = (await session.execute(
+                    select(IdempotencyKey.request_hash, IdempotencyKey.response, IdempotencyKey.expires_at).where(
+                        IdempotencyKey.api_client == api_client,
+                        IdempotencyKey.key == key
+                    )
+                )).first()
+
+            await session.commit()
+            return dict(row._mapping) if row is not None else None
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error saving idempotency record: {e}")
+        return None
+
+
+async def delete_expired_idempotency_records() -> int:
+    """Delete expired idempotency records. Returns rows deleted."""
+    try:
+        async with get_session()() as session:
+            result = await session.execute(
+                delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.utcnow())
+            )
+            await session.commit()
+            return result.rowcount
+
+    except SQLAlchemyError as e:
+        logger.error(f"Error deleting expired idempotency records: {e}")
+        return 0
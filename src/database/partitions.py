@@ -0,0 +1,113 @@
+"""Monthly range partition management for time-partitioned tables."""
+
+import logging
+import re
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import List, Tuple, Union
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PartitionedTable:
+    """A table partitioned by month on a timestamp column."""
+    name: str
+    column: str
+    archived: bool = False  # Rows are moved out by src.database.archive
+
+
+# Tables using monthly range partitioning (migrations 004 and 006)
+PARTITIONED_TABLES: Tuple[PartitionedTable, ...] = (
+    PartitionedTable("join_requests", "request_time", archived=True),
+    PartitionedTable("verification_sessions", "created_time", archived=True),
+    PartitionedTable("captcha_metrics", "created_time"),
+)
+
+_PARTITION_SUFFIX = re.compile(r"_p(\d{4})_(\d{2})$")
+
+
+def month_start(value: Union[date, datetime]) -> date:
+    """Get the first day of the month containing value."""
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    """Shift a month start by a number of months (may be negative)."""
+    index = month.year * 12 + (month.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    """Get the partition name for a table and month, e.g. join_requests_p2025_01."""
+    return f"{table}_p{month.year:04d}_{month.month:02d}"
+
+
+async def create_partition(session: AsyncSession, table: str, month: date) -> None:
+    """Create the partition of table covering the given month if it doesn't exist."""
+    start = month_start(month)
+    end = add_months(start, 1)
+    await session.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {partition_name(table, start)} "
+        f"PARTITION OF {table} FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    ))
+
+
+async def ensure_partitions(session: AsyncSession, table: str, first_month: date, last_month: date) -> None:
+    """Create all monthly partitions of table from first_month to last_month inclusive."""
+    month = month_start(first_month)
+    last = month_start(last_month)
+    while month <= last:
+        await create_partition(session, table, month)
+        month = add_months(month, 1)
+
+
+async def list_partitions(session: AsyncSession, table: str) -> List[Tuple[str, date]]:
+    """List (partition name, month) pairs attached to table, oldest first."""
+    result = await session.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = :table
+    """), {"table": table})
+
+    partitions = []
+    for (name,) in result.all():
+        match = _PARTITION_SUFFIX.search(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+
+    return sorted(partitions, key=lambda p: p[1])
+
+
+async def drop_partitions_before(
+        session: AsyncSession,
+        table: str,
+        cutoff_month: date,
+        only_empty: bool = False
+) -> List[str]:
+    """Detach and drop every partition of table whose month is before cutoff_month.
+
+    Dropping a whole partition is a metadata operation, so retention never
+    has to delete rows one by one or leave dead tuples behind for vacuum.
+    With only_empty, partitions still holding rows are kept (the archiver
+    moves rows out, so what is left has not been archived yet).
+    """
+    dropped = []
+    for name, month in await list_partitions(session, table):
+        if month >= cutoff_month:
+            break
+        if only_empty:
+            result = await session.execute(text(f"SELECT EXISTS (SELECT 1 FROM {name})"))
+            if result.scalar():
+                logger.warning(f"Keeping expired partition {name}: it holds rows that are not archived yet")
+                continue
+        await session.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+        await session.execute(text(f"DROP TABLE {name}"))
+        dropped.append(name)
+
+    return dropped
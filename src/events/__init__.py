@@ -0,0 +1 @@
+# Cross-process event bus over PostgreSQL LISTEN/NOTIFY
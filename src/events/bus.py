@@ -0,0 +1,153 @@
+"""Event bus over PostgreSQL LISTEN/NOTIFY.
+
+Events are sent with pg_notify on EVENTS_CHANNEL, usually by the transaction
+that causes them (see src.database.operations), so listeners only hear about
+committed changes. Each process holds one listening connection and hands the
+events it receives to the handlers subscribed to their type; events sent by
+the process itself are received too.
+
+Notifications sent while a process is not listening are lost. After each
+(re)connect the bus delivers a RESYNC event, on which subscribers reload or
+drop whatever they may have missed.
+"""
+
+import asyncio
+import inspect
+import json
+import logging
+from typing import Any, Callable, Dict, List, Optional, Set
+
+import asyncpg
+
+from src.config.settings import EventsConfig, config
+from src.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+EVENTS_CHANNEL = "tguard_events"
+
+# Event types and their data
+VERIFICATION_COMPLETED = "verification_completed"  # token, user_id, chat_id, request_type
+SESSION_CREATED = "session_created"  # token, user_id, chat_id, expires_at
+CACHE_INVALIDATED = "cache_invalidated"  # cache ("api_keys" or "blocklist")
+
+# Delivered locally after the listener (re)connects, with empty data
+RESYNC = "resync"
+
+# Listener connection health check and reconnect delay
+LISTEN_HEARTBEAT_SECONDS = 30
+LISTEN_RECONNECT_SECONDS = 5
+
+EventHandler = Callable[[Dict[str, Any]], Any]
+
+events_received = metrics.counter(
+    "tguard_events_received_total",
+    "Event bus events received by type",
+    ("type",)
+)
+
+
+def encode_event(event_type: str, **data: Any) -> str:
+    """NOTIFY payload of an event (kept well under PostgreSQL's 8000 byte limit by callers)."""
+    return json.dumps({"type": event_type, "data": data}, separators=(",", ":"))
+
+
+class EventBus:
+    """Receives events from all processes and dispatches them to subscribers."""
+
+    def __init__(self, events_config: EventsConfig):
+        self.config = events_config
+        self._handlers: Dict[str, List[EventHandler]] = {}
+        self._listener: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.listening = False
+
+    def subscribe(self, event_type: str, handler: EventHandler) -> None:
+        """Call handler with the data of each event of the given type.
+
+        Handlers run in the listener callback and should be quick; a handler
+        returning an awaitable has it run as a separate task.
+        """
+        self._handlers.setdefault(event_type, []).append(handler)
+
+    def dispatch(self, event_type: str, data: Dict[str, Any]) -> None:
+        """Hand an event to its subscribers."""
+        events_received.inc(type=event_type)
+        for handler in self._handlers.get(event_type, ()):
+            try:
+                result = handler(data)
+            except Exception as e:
+                logger.error(f"Error handling {event_type} event: {e}")
+                continue
+
+            if inspect.isawaitable(result):
+                task = asyncio.ensure_future(result)
+                self._tasks.add(task)
+                task.add_done_callback(self._task_done)
+
+    def _task_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Event handler task failed: {task.exception()}")
+
+    def _on_notify(self, connection, pid: int, channel: str, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+            event_type, data = event["type"], event.get("data") or {}
+        except (ValueError, KeyError, TypeError):
+            logger.warning(f"Ignoring malformed event: {payload[:200]}")
+            return
+        self.dispatch(event_type, data)
+
+    async def _listen(self) -> None:
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(config.database.dsn)
+                await connection.add_listener(EVENTS_CHANNEL, self._on_notify)
+                self.listening = True
+                logger.info(f"Listening for events on {EVENTS_CHANNEL}")
+                # Events sent while we were not listening went unheard
+                self.dispatch(RESYNC, {})
+
+                # A dead connection does not always close; check it now and then
+                while True:
+                    await asyncio.sleep(LISTEN_HEARTBEAT_SECONDS)
+                    await asyncio.wait_for(connection.execute("SELECT 1"), LISTEN_HEARTBEAT_SECONDS)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Event listener disconnected: {e}")
+            finally:
+                self.listening = False
+                if connection is not None:
+                    connection.terminate()
+
+            await asyncio.sleep(LISTEN_RECONNECT_SECONDS)
+
+    def start(self) -> None:
+        """Start listening (subscribe first, so subscribers get the initial RESYNC)."""
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        """Stop listening and cancel running handler tasks."""
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "listening": self.listening,
+            "handler_tasks": len(self._tasks)
+        }
+
+
+# Global event bus
+event_bus = EventBus(config.events)
@@ -0,0 +1 @@
+# Offline IP reputation database: compiler and memory-mapped lookup index
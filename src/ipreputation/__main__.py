@@ -0,0 +1,75 @@
+"""Compile the IP reputation database.
+
+Usage:
+    python -m src.ipreputation ip-reputation.bin --source proxy=proxies.txt --source tor=tor-exits.txt
+    python -m src.ipreputation ip-reputation.bin --asn datacenter=hosting-asns.txt --pfx2as routeviews-rv2-pfx2as.txt
+
+Range files hold one CIDR, address or first-last range per line; ASN files
+hold one "AS13335" or "13335" per line and are resolved to prefixes through
+a CAIDA Routeviews pfx2as file. "#" starts a comment. Where ranges overlap,
+the category named first wins. The output file is replaced atomically, so
+it can be rebuilt in place while the API is running.
+"""
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from src.ipreputation.compiler import compile_database
+
+
+def _category_path(value: str) -> Tuple[str, Path]:
+    category, sep, path = value.partition("=")
+    if not sep or not category or not path:
+        raise argparse.ArgumentTypeError(f"Expected CATEGORY=PATH, got: {value}")
+    return category, Path(path)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.ipreputation",
+        description="Compile IP range and ASN lists into a TGuard IP reputation database."
+    )
+    parser.add_argument("output", type=Path, help="Database file to write")
+    parser.add_argument(
+        "--source",
+        type=_category_path,
+        action="append",
+        default=[],
+        metavar="CATEGORY=PATH",
+        help="Range list for a category (repeatable)"
+    )
+    parser.add_argument(
+        "--asn",
+        type=_category_path,
+        action="append",
+        default=[],
+        metavar="CATEGORY=PATH",
+        help="ASN list for a category, resolved through --pfx2as (repeatable)"
+    )
+    parser.add_argument("--pfx2as", type=Path, help="CAIDA Routeviews prefix-to-AS file")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if not args.source and not args.asn:
+        parser.error("at least one --source or --asn is required")
+
+    try:
+        counts = compile_database(args.output, args.source, args.asn, args.pfx2as)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    print(f"{counts['ipv4']} IPv4 and {counts['ipv6']} IPv6 ranges written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+"""Compile IP range lists into the binary reputation database."""
+
+import heapq
+import ipaddress
+import logging
+import os
+import sys
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .format import HEADER, MAGIC, MAX_CATEGORIES
+
+logger = logging.getLogger(__name__)
+
+# (first address, last address, rank); a lower rank wins where ranges overlap
+Range = Tuple[int, int, int]
+
+
+def _clean_lines(path: Path) -> Iterator[str]:
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                yield line
+
+
+def parse_range(value: str) -> Tuple[int, int, int]:
+    """Parse "CIDR", "address" or "first-last" into (IP version, first, last)."""
+    if "-" in value:
+        first, last = (ipaddress.ip_address(part.strip()) for part in value.split("-", 1))
+        if first.version != last.version or int(first) > int(last):
+            raise ValueError(f"Invalid address range: {value}")
+        return first.version, int(first), int(last)
+
+    network = ipaddress.ip_network(value, strict=False)
+    return network.version, int(network.network_address), int(network.broadcast_address)
+
+
+def read_range_file(path: Path) -> Iterator[Tuple[int, int, int]]:
+    """Read a range list: one CIDR, address or first-last range per line (extra columns ignored)."""
+    for line in _clean_lines(path):
+        token = line.replace(",", " ").split()[0]
+        try:
+            yield parse_range(token)
+        except ValueError:
+            logger.warning(f"{path}: skipping invalid range {token!r}")
+
+
+def read_asn_file(path: Path) -> Set[int]:
+    """Read an ASN list: one "AS13335" or "13335" per line."""
+    asns = set()
+    for line in _clean_lines(path):
+        token = line.split()[0].upper().removeprefix("AS")
+        if token.isdigit():
+            asns.add(int(token))
+    return asns
+
+
+def read_pfx2as(path: Path, asn_categories: Dict[int, int]) -> Iterator[Tuple[int, int, int, int]]:
+    """Read prefixes originated by listed ASNs from a CAIDA pfx2as file.
+
+    Lines are "<prefix>\\t<length>\\t<asn>", where multi-origin prefixes list
+    ASNs separated by "_" or ",". Yields (IP version, first, last, rank).
+    """
+    for line in _clean_lines(path):
+        parts = line.split()
+        if len(parts) < 3:
+            continue
+        origins = [int(asn) for asn in parts[2].replace(",", "_").split("_") if asn.isdigit()]
+        ranks = [asn_categories[asn] for asn in origins if asn in asn_categories]
+        if not ranks:
+            continue
+        try:
+            version, first, last = parse_range(f"{parts[0]}/{parts[1]}")
+        except ValueError:
+            continue
+        yield version, first, last, min(ranks)
+
+
+def flatten(ranges: List[Range]) -> List[Range]:
+    """Resolve overlaps into sorted, disjoint ranges, merging adjacent ranges of the same rank."""
+    if not ranges:
+        return []
+
+    bounds = sorted({first for first, _, _ in ranges} | {last + 1 for _, last, _ in ranges})
+    by_first = sorted(ranges)
+    active: List[Tuple[int, int]] = []  # heap of (rank, last)
+    flat: List[Range] = []
+    i = 0
+
+    for low, high in zip(bounds, bounds[1:]):
+        while i < len(by_first) and by_first[i][0] <= low:
+            heapq.heappush(active, (by_first[i][2], by_first[i][1]))
+            i += 1
+        while active and active[0][1] < low:
+            heapq.heappop(active)
+        if not active:
+            continue
+
+        rank = active[0][0]
+        if flat and flat[-1][2] == rank and flat[-1][1] == low - 1:
+            flat[-1] = (flat[-1][0], high - 1, rank)
+        else:
+            flat.append((low, high - 1, rank))
+
+    return flat
+
+
+def compile_database(
+        output: Path,
+        sources: List[Tuple[str, Path]],
+        asn_sources: Optional[List[Tuple[str, Path]]] = None,
+        pfx2as: Optional[Path] = None
+) -> Dict[str, int]:
+    """Compile range lists (and ASN lists resolved through pfx2as) into a database file.
+
+    Categories rank in the order they are first named across sources, then
+    ASN sources; where ranges overlap, the earlier category wins. The file is
+    written next to the output and renamed over it, so running servers
+    never map a partially written database.
+
+    Returns the number of IPv4 and IPv6 ranges written.
+    """
+    categories: List[str] = []
+
+    def rank_of(category: str) -> int:
+        if category not in categories:
+            if len(categories) >= MAX_CATEGORIES:
+                raise ValueError(f"At most {MAX_CATEGORIES} categories are supported")
+            categories.append(category)
+        return categories.index(category)
+
+    ranges: Dict[int, List[Range]] = {4: [], 6: []}
+
+    def add(version: int, first: int, last: int, rank: int) -> None:
+        if version == 6:
+            first, last = first >> 64, last >> 64
+        ranges[version].append((first, last, rank))
+
+    for category, path in sources:
+        rank = rank_of(category)
+        for version, first, last in read_range_file(path):
+            add(version, first, last, rank)
+
+    if asn_sources:
+        if pfx2as is None:
+            raise ValueError("ASN sources need a pfx2as file to resolve prefixes")
+        asn_categories: Dict[int, int] = {}
+        for category, path in asn_sources:
+            rank = rank_of(category)
+            for asn in read_asn_file(path):
+                asn_categories.setdefault(asn, rank)
+        for version, first, last, rank in read_pfx2as(pfx2as, asn_categories):
+            add(version, first, last, rank)
+
+    v4 = flatten(ranges[4])
+    v6 = flatten(ranges[6])
+    category_block = "\n".join(categories).encode("utf-8")
+
+    def column(typecode: str, values: Iterable[int]) -> bytes:
+        data = array(typecode, values)
+        if sys.byteorder != "little":
+            data.byteswap()
+        return data.tobytes()
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = output.with_name(output.name + ".tmp")
+    with open(temp_path, "wb") as fh:
+        fh.write(HEADER.pack(MAGIC, len(v4), len(v6), len(category_block), int(time.time())))
+        fh.write(column("I", (first for first, _, _ in v4)))
+        fh.write(column("I", (last for _, last, _ in v4)))
+        fh.write(column("Q", (first for first, _, _ in v6)))
+        fh.write(column("Q", (last for _, last, _ in v6)))
+        fh.write(bytes(rank for _, _, rank in v4))
+        fh.write(bytes(rank for _, _, rank in v6))
+        fh.write(category_block)
+    os.replace(temp_path, output)
+
+    logger.info(f"Compiled {len(v4)} IPv4 and {len(v6)} IPv6 ranges into {output}")
+    return {"ipv4": len(v4), "ipv6": len(v6)}
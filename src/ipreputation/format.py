@@ -0,0 +1,25 @@
+"""On-disk layout of the compiled IP reputation database.
+
+    header     MAGIC, IPv4 range count, IPv6 range count, category block size, build time
+    v4_starts  uint32[n4]   first address of each IPv4 range, ascending
+    v4_ends    uint32[n4]   last address of each IPv4 range
+    v6_starts  uint64[n6]   first /64 prefix of each IPv6 range, ascending
+    v6_ends    uint64[n6]   last /64 prefix of each IPv6 range
+    v4_cats    uint8[n4]    category index of each IPv4 range
+    v6_cats    uint8[n6]    category index of each IPv6 range
+    categories UTF-8 category names joined by "\\n"
+
+All integers are little-endian and ranges never overlap, so a lookup is a
+single binary search over the starts array. IPv6 is tracked at /64
+granularity: hosting and proxy allocations are never smaller than that.
+"""
+
+import struct
+
+MAGIC = b"TGIPREP1"
+
+# magic, v4 count, v6 count, category block bytes, built at (unix seconds); padded to 8-byte alignment
+HEADER = struct.Struct("<8sIIIQ4x")
+
+# Category indexes are stored in one byte
+MAX_CATEGORIES = 255
@@ -0,0 +1,173 @@
+"""Memory-mapped lookup over the compiled IP reputation database."""
+
+import ipaddress
+import logging
+import mmap
+import os
+import sys
+import time
+from array import array
+from bisect import bisect_right
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from .format import HEADER, MAGIC
+
+logger = logging.getLogger(__name__)
+
+# File stamp recorded while the database file is missing
+_MISSING = (-1, -1, -1)
+
+
+class IPReputationIndex:
+    """Read-only view of one compiled database file.
+
+    The range columns are memoryviews straight over the mapped file, so the
+    database costs no heap memory and pages are shared between processes;
+    a lookup is one bisect over the starts column.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as fh:
+            self._mmap = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            magic, n4, n6, category_bytes, built_at = HEADER.unpack_from(self._mmap, 0)
+            if magic != MAGIC:
+                raise ValueError(f"Not an IP reputation database: {path}")
+
+            view = memoryview(self._mmap)
+            offset = HEADER.size
+            self._views: List[memoryview] = [view]
+
+            def column(typecode: str, count: int, itemsize: int):
+                nonlocal offset
+                size = count * itemsize
+                if offset + size > len(self._mmap):
+                    raise ValueError(f"Truncated IP reputation database: {path}")
+                data = view[offset:offset + size]
+                offset += size
+                self._views.append(data)
+                if typecode == "B" or sys.byteorder == "little":
+                    cast = data.cast(typecode)
+                    self._views.append(cast)
+                    return cast
+                # Big-endian hosts cannot use the file in place
+                swapped = array(typecode, data)
+                swapped.byteswap()
+                return swapped
+
+            self._v4_starts = column("I", n4, 4)
+            self._v4_ends = column("I", n4, 4)
+            self._v6_starts = column("Q", n6, 8)
+            self._v6_ends = column("Q", n6, 8)
+            self._v4_cats = column("B", n4, 1)
+            self._v6_cats = column("B", n6, 1)
+            self.categories = bytes(view[offset:offset + category_bytes]).decode("utf-8").split("\n")
+            self.built_at = datetime.utcfromtimestamp(built_at)
+        except Exception:
+            self.close()
+            raise
+
+    def __len__(self) -> int:
+        return len(self._v4_starts) + len(self._v6_starts)
+
+    @staticmethod
+    def _find(starts, ends, cats, value: int) -> Optional[int]:
+        i = bisect_right(starts, value) - 1
+        if i >= 0 and value <= ends[i]:
+            return cats[i]
+        return None
+
+    def lookup(self, ip: str) -> Optional[str]:
+        """Get the category of an address, or None if it is not listed (or not an address)."""
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            return None
+
+        if address.version == 6 and address.ipv4_mapped is not None:
+            address = address.ipv4_mapped
+
+        if address.version == 4:
+            rank = self._find(self._v4_starts, self._v4_ends, self._v4_cats, int(address))
+        else:
+            rank = self._find(self._v6_starts, self._v6_ends, self._v6_cats, int(address) >> 64)
+        return self.categories[rank] if rank is not None else None
+
+    def close(self) -> None:
+        """Unmap the file (all exported views must be released first)."""
+        for view in reversed(getattr(self, "_views", [])):
+            view.release()
+        self._views = []
+        self._mmap.close()
+
+
+class IPReputation:
+    """Serves lookups from the current database file, swapping in a new index when it changes.
+
+    The file is stat()ed at most every check_interval seconds. Compiled
+    databases are renamed into place, so the index being replaced keeps its
+    own mapping of the old file until it is closed.
+    """
+
+    def __init__(self, path: str, check_interval: float = 30.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._index: Optional[IPReputationIndex] = None
+        self._stamp: Optional[Tuple[int, int, int]] = None
+        self._checked_at = float("-inf")
+
+    def _current(self) -> Optional[IPReputationIndex]:
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return self._index
+        self._checked_at = now
+
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            if self._stamp != _MISSING:
+                logger.warning(f"IP reputation database not found: {self.path}")
+            self._stamp = _MISSING
+            return self._index
+
+        stamp = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        if stamp == self._stamp:
+            return self._index
+        self._stamp = stamp
+
+        try:
+            index = IPReputationIndex(self.path)
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to load IP reputation database, keeping the previous one: {e}")
+            return self._index
+
+        previous, self._index = self._index, index
+        if previous is not None:
+            previous.close()
+        logger.info(f"Loaded IP reputation database: {len(index)} ranges built {index.built_at:%Y-%m-%d %H:%M}")
+        return index
+
+    def lookup(self, ip: str) -> Optional[str]:
+        """Get the category of an address (None if unlisted or no database is loaded)."""
+        index = self._current()
+        return index.lookup(ip) if index is not None else None
+
+    def snapshot(self) -> Dict[str, Any]:
+        index = self._current()
+        if index is None:
+            return {"loaded": False, "path": self.path}
+        return {
+            "loaded": True,
+            "path": self.path,
+            "ranges": len(index),
+            "categories": index.categories,
+            "built_at": index.built_at.isoformat()
+        }
+
+    def close(self) -> None:
+        if self._index is not None:
+            self._index.close()
+            self._index = None
@@ -1,8 +1,12 @@
 """Cryptographic utilities."""
 
+import hashlib
 import secrets
 import string
 
+# Prefix of generated API keys, so leaked keys are easy to recognize
+API_KEY_PREFIX = "tgk_"
+
 
 def generate_verification_token(length: int = 32) -> str:
     """Generate a secure random verification token."""
@@ -13,3 +17,18 @@ def generate_verification_token(length: int = 32) -> str:
 def generate_session_id(length: int = 16) -> str:
     """Generate a secure session ID."""
     return secrets.token_urlsafe(length)
+
+
+def generate_secret(nbytes: int = 32) -> str:
+    """Generate a hex-encoded secret key."""
+    return secrets.token_hex(nbytes)
+
+
+def generate_api_key() -> str:
+    """Generate a new external API key."""
+    return API_KEY_PREFIX + secrets.token_urlsafe(32)
+
+
+def hash_api_key(api_key: str) -> str:
+    """Hash an API key for storage and lookup (keys are random, so a plain SHA-256 suffices)."""
+    return hashlib.sha256(api_key.encode()).hexdigest()
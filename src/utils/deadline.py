@@ -0,0 +1,77 @@
+"""Per-request deadlines propagated through a context variable.
+
+A deadline set around a request applies to everything awaited on its
+behalf, including tasks created from it (they copy the context). Each stage
+asks for the remaining budget instead of using its own fixed timeout, so a
+slow early stage leaves less time for later ones rather than adding to the
+total.
+"""
+
+import asyncio
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Coroutine, Iterator, Optional, Set
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("deadline", default=None)
+
+# Detached tasks, referenced until they finish
+_detached: Set[asyncio.Task] = set()
+
+
+class DeadlineExceeded(Exception):
+    """The current deadline passed before an operation finished."""
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[None]:
+    """Run the enclosed code under a deadline (an earlier enclosing deadline still applies)."""
+    at = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(at if current is None else min(current, at))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline (None without one, at most 0 once passed)."""
+    at = _deadline.get()
+    if at is None:
+        return None
+    return at - time.monotonic()
+
+
+async def within_deadline(awaitable: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+    """Await with the remaining budget (and an optional own timeout), cancelling it when either runs out.
+
+    Raises:
+        DeadlineExceeded: The deadline ran out first
+        asyncio.TimeoutError: The operation's own timeout ran out first
+    """
+    left = remaining()
+    if left is None:
+        if timeout is None:
+            return await awaitable
+        return await asyncio.wait_for(awaitable, timeout)
+
+    if left <= 0:
+        if isinstance(awaitable, Coroutine):
+            awaitable.close()
+        raise DeadlineExceeded()
+
+    try:
+        return await asyncio.wait_for(awaitable, left if timeout is None else min(left, timeout))
+    except asyncio.TimeoutError:
+        if timeout is None or left <= timeout:
+            raise DeadlineExceeded()
+        raise
+
+
+def detach(coro: Coroutine[Any, Any, Any]) -> asyncio.Task:
+    """Run a coroutine in the background, free of the current deadline."""
+    task = asyncio.get_running_loop().create_task(coro, context=contextvars.Context())
+    _detached.add(task)
+    task.add_done_callback(_detached.discard)
+    return task
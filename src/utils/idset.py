@@ -0,0 +1,51 @@
+"""Compact integer ID sets."""
+
+from array import array
+from bisect import bisect_left
+from typing import Iterable
+
+
+class SortedIdSet:
+    """Set of 64-bit integer IDs stored as one sorted array.
+
+    Uses 8 bytes per ID (a Python set of ints needs ~70), with membership
+    tests by binary search: about 20 comparisons at a million IDs. Inserts
+    and removals shift the array, so bulk changes should go through update().
+    """
+
+    def __init__(self, ids: Iterable[int] = ()):
+        self._ids = array("q", sorted(set(ids)))
+
+    def __contains__(self, value: int) -> bool:
+        index = bisect_left(self._ids, value)
+        return index < len(self._ids) and self._ids[index] == value
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the ID array."""
+        return self._ids.itemsize * len(self._ids)
+
+    def add(self, value: int) -> bool:
+        """Add an ID; returns False if it was already present."""
+        index = bisect_left(self._ids, value)
+        if index < len(self._ids) and self._ids[index] == value:
+            return False
+        self._ids.insert(index, value)
+        return True
+
+    def discard(self, value: int) -> bool:
+        """Remove an ID; returns False if it was not present."""
+        index = bisect_left(self._ids, value)
+        if index < len(self._ids) and self._ids[index] == value:
+            del self._ids[index]
+            return True
+        return False
+
+    def update(self, values: Iterable[int]) -> None:
+        """Add many IDs with a single rebuild."""
+        new = set(values)
+        if new:
+            self._ids = array("q", sorted(new.union(self._ids)))
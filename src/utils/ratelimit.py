@@ -0,0 +1,40 @@
+"""Rate limiting utilities."""
+
+import asyncio
+import time
+from typing import Optional
+
+
+class AsyncTokenBucket:
+    """Token bucket for pacing outgoing calls to at most `rate` per second.
+
+    Waiters are served in arrival order; bursts up to `capacity` pass immediately.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """Initialize token bucket.
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum burst size (defaults to rate)
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        """Wait until tokens are available and take them."""
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
@@ -0,0 +1,26 @@
+"""Shared test setup.
+
+src.config.settings loads config.toml from the working directory at import,
+so tests run from a scratch directory holding a copy of config.example.toml.
+Nothing here needs a database or network access.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+_workdir = Path(tempfile.mkdtemp(prefix="tguard-tests-"))
+shutil.copy(ROOT / "config.example.toml", _workdir / "config.toml")
+os.chdir(_workdir)
+sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
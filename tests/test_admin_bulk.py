@@ -0,0 +1,137 @@
+"""/approve_all and /decline_all work through every pending request, concurrently and paced."""
+
+import asyncio
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from aiogram.filters import CommandObject
+from aiogram.methods import ApproveChatJoinRequest
+
+from src.bot.handlers import admin
+from src.database.models import RequestStatus
+from src.utils.ratelimit import AsyncTokenBucket
+
+pytestmark = pytest.mark.anyio
+
+CHAT_ID = -100
+STALE_USER, FAILING_USER, FLOODED_USER = 1003, 1005, 1007
+
+
+class FakeBot:
+    """Approves join requests, except for a few users with scripted errors."""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = []
+        self._flooded = False
+
+    async def approve_chat_join_request(self, chat_id, user_id):
+        method = ApproveChatJoinRequest(chat_id=chat_id, user_id=user_id)
+        self.calls.append(user_id)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0)
+            if user_id == STALE_USER:
+                raise TelegramBadRequest(method, "Bad Request: HIDE_REQUESTER_MISSING")
+            if user_id == FAILING_USER:
+                raise TelegramBadRequest(method, "Bad Request: CHAT_ADMIN_REQUIRED")
+            if user_id == FLOODED_USER and not self._flooded:
+                self._flooded = True
+                raise TelegramRetryAfter(method, "Too Many Requests", retry_after=0)
+        finally:
+            self.in_flight -= 1
+
+
+class FakeMessage:
+    def __init__(self, bot):
+        self.bot = bot
+        self.chat = SimpleNamespace(type="private", id=1)
+        self.from_user = SimpleNamespace(id=42)
+        self.texts = []
+
+    async def answer(self, text, **kwargs):
+        self.texts.append(text)
+        return SimpleNamespace(edit_text=self._edit_text)
+
+    async def _edit_text(self, text, **kwargs):
+        self.texts.append(text)
+
+
+@pytest.fixture
+def chat(monkeypatch):
+    """A chat with 450 pending requests (more than two bulk pages)."""
+    start = datetime(2025, 1, 1)
+    pending = [
+        SimpleNamespace(id=i, chat_id=CHAT_ID, user_id=1000 + i, request_time=start + timedelta(seconds=i))
+        for i in range(1, 451)
+    ]
+    updates = {}
+
+    async def get_pending_requests_page(chat_id, cursor=None, limit=10, **kwargs):
+        rows = sorted(pending, key=lambda r: (r.request_time, r.id), reverse=True)
+        if cursor is not None:
+            rows = [r for r in rows if (r.request_time, r.id) < cursor]
+        return rows[:limit]
+
+    async def bulk_update_request_status(request_ids, status, admin_id=None):
+        updates.setdefault(status, []).extend(request_ids)
+        return len(request_ids)
+
+    monkeypatch.setattr(admin, "get_pending_requests_page", get_pending_requests_page)
+    monkeypatch.setattr(admin, "bulk_update_request_status", bulk_update_request_status)
+    monkeypatch.setattr(admin.config.bot, "bulk_concurrency", 4)
+    monkeypatch.setattr(admin.config.bot, "bulk_rate_per_second", 10000)
+    return updates
+
+
+async def test_approve_all(chat):
+    bot = FakeBot()
+    message = FakeMessage(bot)
+    await admin._run_bulk_action(message, CommandObject(command="approve_all", args=str(CHAT_ID)), approve=True)
+
+    assert len(chat[RequestStatus.APPROVED]) == 448
+    assert chat[RequestStatus.EXPIRED] == [STALE_USER - 1000]
+    assert FAILING_USER - 1000 not in chat[RequestStatus.APPROVED]
+    assert FLOODED_USER - 1000 in chat[RequestStatus.APPROVED]
+    assert bot.calls.count(FLOODED_USER) == 2
+
+    assert bot.max_in_flight <= 4
+    assert "批量通过完成" in message.texts[-1]
+    assert "失败：`1`" in message.texts[-1]
+    assert CHAT_ID not in admin._bulk_jobs
+
+
+async def test_one_job_per_chat(chat):
+    message = FakeMessage(FakeBot())
+    admin._bulk_jobs.add(CHAT_ID)
+    try:
+        await admin._run_bulk_action(message, CommandObject(command="decline_all", args=str(CHAT_ID)), approve=False)
+    finally:
+        admin._bulk_jobs.discard(CHAT_ID)
+
+    assert chat == {}
+    assert "已有批量任务" in message.texts[0]
+
+
+def test_parse_bulk_args():
+    private = SimpleNamespace(chat=SimpleNamespace(type="private", id=1))
+    group = SimpleNamespace(chat=SimpleNamespace(type="supergroup", id=CHAT_ID))
+
+    assert admin._parse_bulk_args(private, "older=2h verified -5") == (-5, True, timedelta(hours=2))
+    assert admin._parse_bulk_args(group, "older=30") == (CHAT_ID, False, timedelta(minutes=30))
+    assert admin._parse_bulk_args(private, "verified") is None
+    assert admin._parse_bulk_args(private, "-5 older=soon") is None
+
+
+async def test_token_bucket_paces_calls():
+    bucket = AsyncTokenBucket(rate=50, capacity=1)
+    started = time.monotonic()
+    for _ in range(6):
+        await bucket.acquire()
+    # One token up front, then one every 20 ms
+    assert time.monotonic() - started >= 0.09
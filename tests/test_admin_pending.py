@@ -0,0 +1,124 @@
+"""/pending pages through a chat's pending requests with keyset cursors in the buttons."""
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from src.bot.handlers import admin
+from src.utils.cache import TTLCache
+
+pytestmark = pytest.mark.anyio
+
+START = datetime(2025, 1, 1, 12, 0, 0, 123456)
+
+
+def _pending(count: int):
+    # Pairs of requests share a timestamp, so the id breaks ties
+    return [
+        SimpleNamespace(
+            id=i,
+            user_id=1000 + i,
+            chat_id=-100,
+            first_name=f"user{i}",
+            last_name=None,
+            username=None,
+            verification_completed=False,
+            request_time=START + timedelta(seconds=i // 2)
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+@pytest.fixture
+def pending(monkeypatch):
+    """A chat with 25 pending requests served like get_pending_requests_page."""
+    requests = _pending(25)
+
+    async def get_pending_requests_page(chat_id, cursor=None, limit=10, backward=False, **kwargs):
+        key = lambda r: (r.request_time, r.id)
+        if backward:
+            rows = sorted((r for r in requests if cursor is None or key(r) > cursor), key=key)[:limit]
+            return rows[::-1]
+        return sorted((r for r in requests if cursor is None or key(r) < cursor), key=key, reverse=True)[:limit]
+
+    admin._pending_page_cache.clear()
+    monkeypatch.setattr(admin, "get_pending_requests_page", get_pending_requests_page)
+    return requests
+
+
+class FakeCallback:
+    def __init__(self, data: str):
+        self.data = data
+        self.message = SimpleNamespace(edit_text=self._edit_text)
+        self.text = None
+        self.keyboard = None
+
+    async def _edit_text(self, text, reply_markup=None, parse_mode=None):
+        self.text, self.keyboard = text, reply_markup
+
+    async def answer(self, *args, **kwargs):
+        pass
+
+
+def _buttons(keyboard):
+    return {button.text: button.callback_data for button in keyboard.inline_keyboard[0]} if keyboard else {}
+
+
+def _user_ids(text: str):
+    return [int(line.split("`")[1]) for line in text.splitlines() if line.startswith("•")]
+
+
+async def _click(callback_data: str) -> FakeCallback:
+    assert len(callback_data.encode()) <= 64  # Telegram's callback_data limit
+    callback = FakeCallback(callback_data)
+    await admin.cb_pending_page(callback)
+    return callback
+
+
+async def test_pages_forward_and_back(pending):
+    first = await admin._load_pending_page(-100, cursor=None, backward=False)
+    text, keyboard = admin._render_pending_page(-100, 1, first[:admin.PENDING_PAGE_SIZE], len(first) > admin.PENDING_PAGE_SIZE)
+    assert _user_ids(text) == [1000 + i for i in range(25, 15, -1)]
+    assert list(_buttons(keyboard)) == ["下一页 ➡️"]
+
+    second = await _click(_buttons(keyboard)["下一页 ➡️"])
+    assert _user_ids(second.text) == [1000 + i for i in range(15, 5, -1)]
+
+    third = await _click(_buttons(second.keyboard)["下一页 ➡️"])
+    assert _user_ids(third.text) == [1000 + i for i in range(5, 0, -1)]
+    assert list(_buttons(third.keyboard)) == ["⬅️ 上一页"]
+
+    back = await _click(_buttons(third.keyboard)["⬅️ 上一页"])
+    assert _user_ids(back.text) == _user_ids(second.text)
+
+
+async def test_page_emptied_meanwhile_starts_over(pending):
+    first = await admin._load_pending_page(-100, cursor=None, backward=False)
+    _, keyboard = admin._render_pending_page(-100, 1, first[:admin.PENDING_PAGE_SIZE], True)
+
+    # Everything older than page 1 gets processed before the click
+    del pending[:15]
+    admin._pending_page_cache.clear()
+
+    callback = await _click(_buttons(keyboard)["下一页 ➡️"])
+    assert "第 1 页" in callback.text
+    assert _user_ids(callback.text) == [1000 + i for i in range(25, 15, -1)]
+
+
+def test_cursor_round_trip():
+    request = _pending(3)[2]
+    micros, request_id = admin._encode_cursor(request).split(":")
+    assert admin._decode_cursor(micros, request_id) == (request.request_time, request.id)
+
+
+def test_ttl_cache_expiry_and_eviction():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=-1)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None and "b" not in cache
+
+    cache.set("c", 3)
+    cache.set("d", 4)
+    assert "a" not in cache and cache.get("d") == 4
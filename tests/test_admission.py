@@ -0,0 +1,91 @@
+"""Admission control sheds the lowest-priority traffic first under pressure."""
+
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.api.admission import AdmissionController, AdmissionMiddleware, request_priority
+from src.config.settings import AdmissionConfig
+
+pytestmark = pytest.mark.anyio
+
+
+def _controller() -> AdmissionController:
+    return AdmissionController(AdmissionConfig(enable=True, max_in_flight=10, max_loop_lag_ms=100, max_pool_wait_ms=100))
+
+
+def test_request_priority():
+    assert request_priority("GET", "/api/v1/verification-status/abc") == "status"
+    assert request_priority("GET", "/api/v1/verification-events") == "status"
+    assert request_priority("GET", "/verify") == "page"
+    assert request_priority("POST", "/api/verification/create") == "page"
+    assert request_priority("POST", "/api/v1/verify") == "completion"
+    assert request_priority("GET", "/health") is None
+
+
+def test_pressure_is_the_worst_signal():
+    controller = _controller()
+    assert controller.pressure() == 0
+
+    controller.in_flight = 5
+    controller.loop_lag = 0.15
+    controller.pool_wait = 0.05
+    assert controller.pressure() == pytest.approx(1.5)
+    assert controller.should_shed("status") and controller.should_shed("page")
+    assert not controller.should_shed("completion")
+    assert controller.snapshot()["shedding"] == ["status", "page"]
+
+
+@pytest.fixture
+def admitted():
+    controller = _controller()
+    app = FastAPI()
+    seen = []
+
+    @app.get("/verify")
+    async def page():
+        seen.append(controller.in_flight)
+        return {}
+
+    @app.post("/api/v1/verify")
+    async def completion():
+        return {}
+
+    @app.get("/api/v1/verification-wait")
+    async def wait():
+        seen.append(controller.in_flight)
+        return {}
+
+    transport = httpx.ASGITransport(app=AdmissionMiddleware(app, controller))
+    return controller, seen, httpx.AsyncClient(transport=transport, base_url="http://test")
+
+
+async def test_sheds_by_priority(admitted):
+    controller, _, client = admitted
+    controller.pool_wait = 0.15  # Pressure 1.5
+
+    async with client:
+        page = await client.get("/verify")
+        completion = await client.post("/api/v1/verify")
+
+    assert page.status_code == 503 and page.headers["Retry-After"] == "5"
+    assert completion.status_code == 200
+
+
+async def test_counts_in_flight_except_waiting(admitted):
+    controller, seen, client = admitted
+    async with client:
+        await client.get("/verify")
+        await client.get("/api/v1/verification-wait")
+
+    assert seen == [1, 0]
+    assert controller.in_flight == 0
+
+
+def test_pool_probe_still_waiting_counts():
+    controller = _controller()
+    controller._probe_started = time.monotonic() - 1  # Checkout not finished after a second
+    assert controller.current_pool_wait() >= 1
+    assert controller.should_shed("completion")
@@ -0,0 +1,152 @@
+"""Per-client API keys: cached lookups, daily quotas and batched usage flushes."""
+
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+
+from src.api import dependencies
+from src.api.services import apikeys
+from src.api.services.apikeys import ApiClient, ApiKeyLookupError, ApiKeyStore, QuotaExceededError
+from src.config.settings import ApiKeysConfig
+from src.utils.crypto import hash_api_key
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def database(monkeypatch):
+    """api_keys rows by key hash and api_key_usage totals per key, counting lookups."""
+    keys = {
+        hash_api_key("tg_acme"): {"id": 1, "name": "acme", "revoked": False, "daily_quota": 3, "requests": 1},
+        hash_api_key("tg_revoked"): {"id": 2, "name": "old", "revoked": True, "daily_quota": None, "requests": 0},
+    }
+    usage = {1: 1}
+    state = {"lookups": 0, "available": True, "flushed": []}
+
+    async def get_api_key_by_hash(key_hash, day):
+        state["lookups"] += 1
+        if not state["available"]:
+            return None
+        return keys.get(key_hash, {})
+
+    async def add_api_key_usage(counts, day):
+        if not state["available"]:
+            return None
+        state["flushed"].append(dict(counts))
+        for key_id, count in counts.items():
+            usage[key_id] = usage.get(key_id, 0) + count
+        return {key_id: usage[key_id] for key_id in counts}
+
+    monkeypatch.setattr(apikeys, "get_api_key_by_hash", get_api_key_by_hash)
+    monkeypatch.setattr(apikeys, "add_api_key_usage", add_api_key_usage)
+    return usage, state
+
+
+async def test_lookups_are_cached(database):
+    _, state = database
+    store = ApiKeyStore(ApiKeysConfig())
+
+    assert (await store.authenticate("tg_acme")).name == "acme"
+    assert (await store.authenticate("tg_acme")).name == "acme"
+    assert await store.authenticate("tg_revoked") is None
+    assert await store.authenticate("tg_unknown") is None
+    assert await store.authenticate("tg_unknown") is None
+    assert state["lookups"] == 3
+
+    store.invalidate()
+    await store.authenticate("tg_acme")
+    assert state["lookups"] == 4
+
+
+async def test_lookup_failure_is_not_cached(database):
+    _, state = database
+    store = ApiKeyStore(ApiKeysConfig())
+    state["available"] = False
+    with pytest.raises(ApiKeyLookupError):
+        await store.authenticate("tg_acme")
+
+    state["available"] = True
+    assert (await store.authenticate("tg_acme")).name == "acme"
+
+
+async def test_quota_counts_recorded_and_pending_usage(database):
+    usage, state = database
+    store = ApiKeyStore(ApiKeysConfig())
+    client = await store.authenticate("tg_acme")  # One request recorded today already
+
+    store.consume(client)
+    store.consume(client)
+    with pytest.raises(QuotaExceededError) as error:
+        store.consume(client)
+    assert 1 <= error.value.retry_after <= 86400
+
+    await store.flush()
+    assert state["flushed"] == [{1: 2}] and usage[1] == 3
+    assert store.used_today(1) == 3
+    with pytest.raises(QuotaExceededError):
+        store.consume(client)
+
+
+async def test_other_instances_usage_arrives_with_the_flush(database):
+    usage, _ = database
+    store = ApiKeyStore(ApiKeysConfig())
+    client = ApiClient("acme", key_id=1, daily_quota=10)
+
+    store.consume(client)
+    usage[1] = 8  # Another instance recorded requests meanwhile
+    await store.flush()
+    assert store.used_today(1) == 9
+
+
+async def test_failed_flush_keeps_the_counts(database):
+    _, state = database
+    store = ApiKeyStore(ApiKeysConfig())
+    client = ApiClient("acme", key_id=1)
+
+    store.consume(client)
+    state["available"] = False
+    await store.flush()
+    state["available"] = True
+    store.consume(client)
+    await store.flush()
+    assert state["flushed"] == [{1: 2}]
+
+
+async def test_usage_resets_at_midnight(database, monkeypatch):
+    store = ApiKeyStore(ApiKeysConfig())
+    client = await store.authenticate("tg_acme")
+    store.consume(client)
+    store.consume(client)
+
+    monkeypatch.setattr(apikeys, "_today", lambda: date(2099, 1, 1))
+    store.consume(client)
+    assert store.used_today(1) == 1
+
+
+async def test_default_key_has_no_quota(monkeypatch):
+    monkeypatch.setattr(dependencies.config.api, "enable", True)
+    monkeypatch.setattr(dependencies.config.api, "api_key", "admin-key")
+
+    store = ApiKeyStore(ApiKeysConfig())
+    monkeypatch.setattr(dependencies, "api_key_store", store)
+
+    client = await dependencies.verify_api_key("admin-key")
+    assert client == ApiClient("default")
+    assert store._pending == {}
+
+
+async def test_quota_exceeded_is_429(database, monkeypatch):
+    monkeypatch.setattr(dependencies.config.api, "enable", True)
+    monkeypatch.setattr(dependencies, "api_key_store", ApiKeyStore(ApiKeysConfig()))
+
+    statuses = []
+    for _ in range(3):
+        try:
+            await dependencies.verify_api_key("tg_acme")
+            statuses.append(200)
+        except HTTPException as e:
+            statuses.append(e.status_code)
+            assert int(e.headers["Retry-After"]) >= 1
+
+    assert statuses == [200, 200, 429]
@@ -0,0 +1,92 @@
+"""Global blocklist: compact ID set and /block_import parsing."""
+
+import io
+from types import SimpleNamespace
+
+import pytest
+
+from src.bot import blocklist as blocklist_module
+from src.bot.handlers import admin
+from src.utils.idset import SortedIdSet
+
+pytestmark = pytest.mark.anyio
+
+
+def test_sorted_id_set():
+    ids = SortedIdSet([5, 3, 3, 9])
+    assert len(ids) == 3 and ids.nbytes == 24
+    assert 3 in ids and 4 not in ids
+
+    assert ids.add(4) and not ids.add(4)
+    assert ids.discard(3) and not ids.discard(3)
+    ids.update([1, 9, 2 ** 62])
+    assert [value in ids for value in (1, 4, 5, 9, 2 ** 62)] == [True] * 5
+    assert len(ids) == 5
+
+
+def test_one_id_per_line():
+    content = b"\xef\xbb\xbf123\r\n\n# comment\n  456  \nabc\n0\n12 34\n99999999999999999999\n"
+    assert admin._parse_block_import(content) == ([123, 456], [5, 6, 7, 8])
+
+
+def test_first_csv_column_only():
+    content = (
+        b"user_id,username,joined\n"
+        b"111,bob2024,2024-05-01\n"
+        b'"222";"alice"\n'
+        b"333\t+1 555 0100\n"
+        b"@carol,444\n"
+    )
+    assert admin._parse_block_import(content) == ([111, 222, 333], [1, 5])
+
+
+class FakeMessage:
+    def __init__(self, content: bytes):
+        self.document = SimpleNamespace(file_size=len(content))
+        self.from_user = SimpleNamespace(id=42)
+        self.texts = []
+
+    async def answer(self, text, **kwargs):
+        self.texts.append(text)
+
+
+@pytest.fixture
+def blocked(monkeypatch):
+    added = []
+
+    async def add_to_blocklist(user_ids, reason, added_by=None, source_chat_id=None):
+        added.extend(user_ids)
+        return user_ids
+
+    monkeypatch.setattr(admin.config.blocklist, "enable", True)
+    monkeypatch.setattr(admin.blocklist, "_ids", SortedIdSet())
+    monkeypatch.setattr(blocklist_module, "add_to_blocklist", add_to_blocklist)
+    return added
+
+
+async def _import(content: bytes) -> FakeMessage:
+    message = FakeMessage(content)
+    bot = SimpleNamespace(download=lambda document: _download(content))
+    await admin.cmd_block_import(message, bot)
+    return message
+
+
+async def _download(content: bytes) -> io.BytesIO:
+    return io.BytesIO(content)
+
+
+async def test_import_reports_rejected_lines(blocked):
+    message = await _import(b"1001\n1002\nphone: 5550100\n" + b"x\n" * 12)
+
+    assert blocked == [1001, 1002]
+    assert "新增：`2`" in message.texts[0]
+    assert "无效行：`13`" in message.texts[0]
+    assert "3, 4, 5" in message.texts[0] and "…" in message.texts[0]
+
+
+async def test_import_without_ids(blocked):
+    message = await _import(b"name,phone\nbob,5550100\n")
+
+    assert blocked == []
+    assert "没有找到用户ID" in message.texts[0]
+    assert "无效行：`2`" in message.texts[0]
@@ -0,0 +1,77 @@
+"""Event bus: payload encoding, dispatch to subscribers and the opt-in defaults."""
+
+import asyncio
+import json
+
+import pytest
+
+from src.api.routes import verification
+from src.config.settings import EventsConfig
+from src.events.bus import CACHE_INVALIDATED, VERIFICATION_COMPLETED, EventBus, encode_event
+
+pytestmark = pytest.mark.anyio
+
+
+def test_encode_event():
+    payload = encode_event(VERIFICATION_COMPLETED, token="abc", user_id=1)
+    assert json.loads(payload) == {"type": "verification_completed", "data": {"token": "abc", "user_id": 1}}
+    assert " " not in payload
+
+
+async def test_dispatch_sync_and_async_handlers():
+    bus = EventBus(EventsConfig())
+    received = []
+
+    async def slow(data):
+        await asyncio.sleep(0.01)
+        received.append(("async", data["cache"]))
+
+    bus.subscribe(CACHE_INVALIDATED, lambda data: received.append(("sync", data["cache"])))
+    bus.subscribe(CACHE_INVALIDATED, slow)
+    bus.dispatch(CACHE_INVALIDATED, {"cache": "blocklist"})
+    bus.dispatch(VERIFICATION_COMPLETED, {"token": "abc"})  # No subscribers
+
+    assert received == [("sync", "blocklist")]
+    assert bus.snapshot()["handler_tasks"] == 1
+    await asyncio.sleep(0.05)
+    assert received == [("sync", "blocklist"), ("async", "blocklist")]
+    assert bus.snapshot()["handler_tasks"] == 0
+
+
+async def test_failing_handler_does_not_stop_the_others():
+    bus = EventBus(EventsConfig())
+    received = []
+
+    async def failing_task(data):
+        raise RuntimeError("task failed")
+
+    bus.subscribe(CACHE_INVALIDATED, lambda data: 1 / 0)
+    bus.subscribe(CACHE_INVALIDATED, failing_task)
+    bus.subscribe(CACHE_INVALIDATED, received.append)
+    bus.dispatch(CACHE_INVALIDATED, {"cache": "api_keys"})
+    await asyncio.sleep(0.01)
+
+    assert received == [{"cache": "api_keys"}]
+    assert bus.snapshot()["handler_tasks"] == 0
+
+
+def test_malformed_notifications_are_ignored():
+    bus = EventBus(EventsConfig())
+    received = []
+    bus.subscribe(CACHE_INVALIDATED, received.append)
+
+    bus._on_notify(None, 1, "tguard_events", "not json")
+    bus._on_notify(None, 1, "tguard_events", json.dumps({"data": {}}))
+    bus._on_notify(None, 1, "tguard_events", encode_event(CACHE_INVALIDATED, cache="blocklist"))
+    assert received == [{"cache": "blocklist"}]
+
+
+def test_approval_stays_in_the_api_by_default(monkeypatch):
+    assert EventsConfig() == EventsConfig(enable=False, approve_in_bot=False)
+
+    monkeypatch.setattr(verification.config, "events", EventsConfig(enable=True))
+    assert not verification._approve_in_bot()
+    monkeypatch.setattr(verification.config, "events", EventsConfig(approve_in_bot=True))
+    assert not verification._approve_in_bot()
+    monkeypatch.setattr(verification.config, "events", EventsConfig(enable=True, approve_in_bot=True))
+    assert verification._approve_in_bot()
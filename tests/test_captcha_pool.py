@@ -0,0 +1,65 @@
+"""Remote captcha providers reuse one pooled, pre-warmed HTTP client."""
+
+import httpx
+import pytest
+
+from src.captcha import base
+from src.captcha.turnstile import TurnstileProvider
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def clients(monkeypatch):
+    """Record each HTTP client created and the requests sent through them."""
+    created, requests = [], []
+    real_client = httpx.AsyncClient
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append((request.method, str(request.url)))
+        return httpx.Response(200, json={"success": True})
+
+    def make_client(**kwargs):
+        created.append(kwargs)
+        return real_client(transport=httpx.MockTransport(handler), **kwargs)
+
+    monkeypatch.setattr(base.httpx, "AsyncClient", make_client)
+    return created, requests
+
+
+async def test_one_client_for_warmup_and_verifications(clients):
+    created, requests = clients
+    limits = httpx.Limits(max_connections=5, max_keepalive_connections=2)
+    provider = TurnstileProvider("site", "secret", timeout=3, limits=limits)
+
+    await provider.start()
+    assert (await provider.verify("response-1")).success
+    assert (await provider.verify("response-2")).success
+
+    assert len(created) == 1
+    assert created[0]["limits"] is limits and created[0]["timeout"] == 3
+    assert requests == [
+        ("HEAD", TurnstileProvider.VERIFY_URL),
+        ("POST", TurnstileProvider.VERIFY_URL),
+        ("POST", TurnstileProvider.VERIFY_URL),
+    ]
+
+    await provider.close()
+    assert (await provider.verify("response-3")).success
+    assert len(created) == 2
+    await provider.close()
+
+
+async def test_warmup_failure_is_not_fatal(monkeypatch):
+    real_client = httpx.AsyncClient
+
+    def handler(request):
+        raise httpx.ConnectError("unreachable", request=request)
+
+    monkeypatch.setattr(base.httpx, "AsyncClient", lambda **kwargs: real_client(transport=httpx.MockTransport(handler), **kwargs))
+    provider = TurnstileProvider("site", "secret")
+
+    await provider.start()
+    result = await provider.verify("response")
+    assert result.error_code == "network-error"
+    await provider.close()
@@ -0,0 +1,113 @@
+"""Forwarded headers only count when the request comes through a trusted proxy (such as the Docker gateway, once listed)."""
+
+import ipaddress
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from starlette.requests import Request
+
+from src.api.ratelimit import MemoryRateLimitStore, RateLimitMiddleware
+from src.api.routes import verification
+from src.api.routes.verification import get_client_ip, untrusted_proxy_peer
+from src.config.settings import RateLimitConfig
+
+pytestmark = pytest.mark.anyio
+
+
+def _request(peer: str, headers: dict) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+        "client": (peer, 12345),
+    })
+
+
+def test_untrusted_peer_headers_ignored():
+    request = _request("203.0.113.7", {"X-Forwarded-For": "198.51.100.1", "X-Real-IP": "198.51.100.2"})
+    assert get_client_ip(request) == "203.0.113.7"
+
+
+def test_trusted_proxy_rightmost_untrusted_address():
+    # The client prepended a spoofed address; our proxy appended the real one
+    request = _request("127.0.0.1", {"X-Forwarded-For": "198.51.100.1, 203.0.113.7, 127.0.0.1"})
+    assert get_client_ip(request) == "203.0.113.7"
+
+
+def test_trusted_proxy_real_ip():
+    assert get_client_ip(_request("::1", {"X-Real-IP": "203.0.113.7"})) == "203.0.113.7"
+
+
+def test_trusted_proxy_without_headers():
+    assert get_client_ip(_request("127.0.0.1", {})) == "127.0.0.1"
+
+
+async def test_rate_limit_not_evaded_by_rotating_forwarded_for():
+    app = FastAPI()
+
+    @app.get("/verify")
+    async def verify():
+        return {}
+
+    rate_limit_config = RateLimitConfig(enable=True, ip_limit=3, token_limit=1000)
+    limited = RateLimitMiddleware(app, rate_limit_config, store=MemoryRateLimitStore(1000))
+    transport = httpx.ASGITransport(app=limited, client=("203.0.113.7", 12345))
+
+    statuses = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        for i in range(5):
+            response = await client.get("/verify", headers={"X-Forwarded-For": f"198.51.100.{i}"})
+            statuses.append(response.status_code)
+
+    assert statuses == [200, 200, 200, 429, 429]
+
+
+def _limited_app(rate_limit_config: RateLimitConfig) -> RateLimitMiddleware:
+    app = FastAPI()
+
+    @app.get("/verify")
+    async def verify():
+        return {}
+
+    return RateLimitMiddleware(app, rate_limit_config, store=MemoryRateLimitStore(1000))
+
+
+async def test_docker_gateway_untrusted_by_default_warns_once(caplog):
+    limited = _limited_app(RateLimitConfig(enable=True, ip_limit=1000, token_limit=1000))
+    # A host reverse proxy forwarding to the published port: the container sees the bridge gateway
+    transport = httpx.ASGITransport(app=limited, client=("172.18.0.1", 40000))
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        for address in ("198.51.100.1", "198.51.100.2"):
+            await client.get("/verify", headers={"X-Forwarded-For": address})
+
+    warnings = [record for record in caplog.records if "trusted_proxies" in record.getMessage()]
+    assert len(warnings) == 1 and "172.18.0.1" in warnings[0].getMessage()
+
+
+async def test_docker_gateway_trusted_limits_each_client(monkeypatch, caplog):
+    monkeypatch.setattr(
+        verification, "trusted_proxies", verification.trusted_proxies + [ipaddress.ip_network("172.16.0.0/12")]
+    )
+    request = _request("172.18.0.1", {"X-Forwarded-For": "198.51.100.1"})
+    assert get_client_ip(request) == "198.51.100.1"
+
+    limited = _limited_app(RateLimitConfig(enable=True, ip_limit=2, token_limit=1000))
+    transport = httpx.ASGITransport(app=limited, client=("172.18.0.1", 40000))
+    statuses = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        for address in ("198.51.100.1", "198.51.100.2") * 3:
+            response = await client.get("/verify", headers={"X-Forwarded-For": address})
+            statuses.setdefault(address, []).append(response.status_code)
+
+    assert statuses == {"198.51.100.1": [200, 200, 429], "198.51.100.2": [200, 200, 429]}
+    assert not [record for record in caplog.records if "trusted_proxies" in record.getMessage()]
+
+
+def test_public_peer_is_not_a_suspected_proxy():
+    assert untrusted_proxy_peer(_request("1.1.1.1", {})) is None
+    assert untrusted_proxy_peer(_request("1.1.1.1", {"X-Real-IP": "198.51.100.1"})) == "1.1.1.1"
+    assert untrusted_proxy_peer(_request("10.0.0.5", {})) == "10.0.0.5"
+    assert untrusted_proxy_peer(_request("127.0.0.1", {"X-Real-IP": "198.51.100.1"})) is None
@@ -0,0 +1,57 @@
+"""Request deadlines shrink each stage's budget and are not inherited by detached tasks."""
+
+import asyncio
+
+import pytest
+
+from src.utils.deadline import DeadlineExceeded, deadline, detach, remaining, within_deadline
+
+pytestmark = pytest.mark.anyio
+
+
+def test_nested_deadline_keeps_the_earlier_one():
+    assert remaining() is None
+    with deadline(1):
+        with deadline(10):
+            assert remaining() <= 1
+        with deadline(0.5):
+            assert remaining() <= 0.5
+    assert remaining() is None
+
+
+async def test_stage_gets_the_remaining_budget():
+    with deadline(0.05):
+        with pytest.raises(DeadlineExceeded):
+            await within_deadline(asyncio.sleep(1), timeout=10)
+
+    # The stage's own, shorter timeout is reported as a plain timeout
+    with deadline(10):
+        with pytest.raises(asyncio.TimeoutError):
+            await within_deadline(asyncio.sleep(1), timeout=0.05)
+
+
+async def test_passed_deadline_does_not_start_the_stage():
+    started = []
+
+    async def stage():
+        started.append(True)
+
+    with deadline(0):
+        with pytest.raises(DeadlineExceeded):
+            await within_deadline(stage())
+    assert started == []
+
+
+async def test_without_deadline():
+    assert await within_deadline(asyncio.sleep(0, "done")) == "done"
+    with pytest.raises(asyncio.TimeoutError):
+        await within_deadline(asyncio.sleep(1), timeout=0.01)
+
+
+async def test_detached_task_has_no_deadline():
+    async def budget():
+        return remaining()
+
+    with deadline(5):
+        assert await asyncio.create_task(budget()) <= 5  # Ordinary tasks inherit it
+        assert await detach(budget()) is None
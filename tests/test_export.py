@@ -0,0 +1,101 @@
+"""Verification history export must not pass off a failed read as a complete file."""
+
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy.exc import OperationalError
+
+from src.api.dependencies import get_api_client
+from src.api.routes import external
+from src.database import operations
+
+pytestmark = pytest.mark.anyio
+
+
+def _row(row_id):
+    return SimpleNamespace(id=row_id, _mapping={"id": row_id, "status": "approved"})
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    async def partitions(self, size):
+        for start in range(0, len(self._rows), size):
+            yield self._rows[start:start + size]
+
+
+def _sessions(pages):
+    """get_session() replacement serving one page per session; a page that is an exception is raised."""
+    pages = iter(pages)
+
+    class _Session:
+        async def stream(self, query):
+            page = next(pages)
+            if isinstance(page, Exception):
+                raise page
+            return _Result(page)
+
+    @asynccontextmanager
+    async def session():
+        yield _Session()
+
+    return lambda: session
+
+
+def _db_error():
+    return OperationalError("SELECT", {}, Exception("connection lost"))
+
+
+def _serve(monkeypatch, pages) -> FastAPI:
+    """App with the external routes, exporting the given pages two rows at a time."""
+    monkeypatch.setattr(operations, "get_session", _sessions(pages))
+    monkeypatch.setattr(
+        external,
+        "stream_verification_history",
+        lambda **kwargs: operations.stream_verification_history(page_size=2, fetch_size=2)
+    )
+    app = FastAPI()
+    app.include_router(external.router, prefix="/api")
+    app.dependency_overrides[get_api_client] = lambda: "default"
+    return app
+
+
+async def _export(app: FastAPI) -> httpx.Response:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        return await client.get("/api/verification/export")
+
+
+async def test_stream_raises_when_a_later_page_fails(monkeypatch):
+    monkeypatch.setattr(operations, "get_session", _sessions([[_row(1), _row(2)], _db_error()]))
+
+    batches = operations.stream_verification_history(page_size=2, fetch_size=2)
+    assert [row.id for row in await anext(batches)] == [1, 2]
+    with pytest.raises(OperationalError):
+        await anext(batches)
+
+
+async def test_export_aborts_when_a_later_page_fails(monkeypatch):
+    app = _serve(monkeypatch, [[_row(1), _row(2)], _db_error()])
+
+    # The error escapes the app mid-response instead of ending the body cleanly
+    with pytest.raises(OperationalError):
+        await _export(app)
+
+
+async def test_export_fails_before_streaming_when_the_first_page_fails(monkeypatch):
+    app = _serve(monkeypatch, [_db_error()])
+
+    response = await _export(app)
+    assert response.status_code == 500
+
+
+async def test_export_streams_all_pages(monkeypatch):
+    app = _serve(monkeypatch, [[_row(1), _row(2)], [_row(3)]])
+
+    response = await _export(app)
+    assert response.status_code == 200
+    assert len(response.text.splitlines()) == 3
@@ -0,0 +1,90 @@
+"""Batch create and batch status endpoints of the external API."""
+
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.api.dependencies import get_api_client
+from src.api.routes import external
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def created(monkeypatch):
+    """Verifications written by create_api_verifications."""
+    batches = []
+
+    async def create_api_verifications(tokens, expires_at, api_client=None):
+        batches.append((dict(tokens), api_client))
+        return True
+
+    monkeypatch.setattr(external, "create_api_verifications", create_api_verifications)
+    monkeypatch.setattr(external.config.api, "batch_create_max_size", 3)
+    monkeypatch.setattr(external.config.api, "batch_status_max_size", 3)
+    return batches
+
+
+def _client(api_client: str = "default") -> httpx.AsyncClient:
+    app = FastAPI()
+    app.include_router(external.router, prefix="/api")
+    app.dependency_overrides[get_api_client] = lambda: api_client
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+async def test_create_batch_dedupes_users(created):
+    async with _client("acme") as client:
+        response = await client.post("/api/verification/create-batch", json={"user_ids": [1, 2, 1]})
+
+    assert response.status_code == 200
+    verifications = response.json()["verifications"]
+    assert [item["user_id"] for item in verifications] == [1, 2]
+    assert len({item["token"] for item in verifications}) == 2
+    assert all(item["verification_url"].endswith(item["token"]) for item in verifications)
+    assert len(created) == 1 and created[0][1] == "acme"
+
+
+async def test_batch_size_limits(created):
+    async with _client() as client:
+        empty = await client.post("/api/verification/create-batch", json={"user_ids": []})
+        too_many = await client.post("/api/verification/create-batch", json={"user_ids": [1, 2, 3, 4]})
+        too_many_tokens = await client.post("/api/verification/status-batch", json={"tokens": ["a", "b", "c", "d"]})
+
+    assert empty.status_code == 400
+    assert too_many.status_code == 413 and too_many_tokens.status_code == 413
+    assert created == []
+
+
+async def test_create_batch_failure(monkeypatch, created):
+    async def create_api_verifications(tokens, expires_at, api_client=None):
+        return False
+
+    monkeypatch.setattr(external, "create_api_verifications", create_api_verifications)
+    async with _client() as client:
+        response = await client.post("/api/verification/create-batch", json={"user_ids": [1]})
+    assert response.status_code == 500
+
+
+async def test_status_batch(monkeypatch, created):
+    now = datetime.utcnow()
+
+    async def get_verification_statuses(tokens, api_client=None):
+        return {
+            "done": {
+                "captcha_completed": True,
+                "status": "approved",
+                "created_time": now - timedelta(minutes=1),
+                "expires_at": now + timedelta(minutes=9)
+            }
+        }
+
+    monkeypatch.setattr(external, "get_verification_statuses", get_verification_statuses)
+    async with _client() as client:
+        response = await client.post("/api/verification/status-batch", json={"tokens": ["done", "missing", "done"]})
+
+    entries = response.json()["verifications"]
+    assert [entry["token"] for entry in entries] == ["done", "missing"]
+    assert entries[0]["completed"] and entries[0]["status"] == "approved" and not entries[0]["expired"]
+    assert entries[1] == {"token": "missing", "found": False}
@@ -0,0 +1,57 @@
+"""Per-client API keys only see their own verifications and no tenant-wide data."""
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.api.dependencies import get_api_client
+from src.api.routes import external
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    """Record the api_client each database lookup is scoped to."""
+    calls = []
+
+    async def get_verification_statuses(tokens, api_client=None):
+        calls.append(api_client)
+        return {}
+
+    async def get_captcha_metrics_summary(since):
+        calls.append("metrics")
+        return []
+
+    monkeypatch.setattr(external, "get_verification_statuses", get_verification_statuses)
+    monkeypatch.setattr(external, "get_captcha_metrics_summary", get_captcha_metrics_summary)
+    return calls
+
+
+def _client(api_client: str) -> httpx.AsyncClient:
+    app = FastAPI()
+    app.include_router(external.router, prefix="/api")
+    app.dependency_overrides[get_api_client] = lambda: api_client
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+async def test_metrics_default_client_only(lookups):
+    async with _client("acme") as client:
+        assert (await client.get("/api/captcha/metrics")).status_code == 403
+    async with _client("default") as client:
+        assert (await client.get("/api/captcha/metrics")).status_code == 200
+    assert lookups == ["metrics"]
+
+
+async def test_status_batch_scoped_to_client(lookups):
+    async with _client("acme") as client:
+        response = await client.post("/api/verification/status-batch", json={"tokens": ["t1"]})
+    assert response.status_code == 200
+    assert response.json()["verifications"][0]["found"] is False
+    assert lookups == ["acme"]
+
+
+async def test_status_batch_default_client_sees_all(lookups):
+    async with _client("default") as client:
+        await client.post("/api/verification/status-batch", json={"tokens": ["t1"]})
+    assert lookups == [None]
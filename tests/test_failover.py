@@ -0,0 +1,115 @@
+"""Provider failover, hedged verification, and binding submissions to the rendered provider."""
+
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.api.routes import verification
+from src.captcha.base import CaptchaProvider, CaptchaVerificationResult
+from src.captcha.resilience import CaptchaProviderPool, CircuitBreaker, ResilientCaptchaProvider
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeProvider(CaptchaProvider):
+    """Accepts every response, after the delays given for successive calls."""
+
+    supports_idempotency_key = True
+
+    def __init__(self, name: str, delays=()):
+        super().__init__("site", "secret", timeout=5)
+        self.name = name
+        self.delays = list(delays)
+        self.keys = []
+
+    @property
+    def provider_name(self) -> str:
+        return self.name
+
+    async def verify(self, response, remote_ip=None, user_agent=None, idempotency_key=None):
+        self.keys.append(idempotency_key)
+        await asyncio.sleep(self.delays.pop(0) if self.delays else 0)
+        return CaptchaVerificationResult(success=True)
+
+    def get_frontend_config(self, hardened=False):
+        return {"provider": self.name}
+
+
+def _pool(*names) -> CaptchaProviderPool:
+    return CaptchaProviderPool([
+        ResilientCaptchaProvider(FakeProvider(name), breaker=CircuitBreaker(min_requests=1)) for name in names
+    ])
+
+
+def _trip(provider: ResilientCaptchaProvider) -> None:
+    provider.breaker.record_failure(provider.breaker.allow_request())
+    assert provider.breaker.is_open
+
+
+def test_select_fails_over_and_back():
+    pool = _pool("hcaptcha", "pow")
+    primary, backup = pool.providers
+    assert pool.select() is primary
+
+    _trip(primary)
+    assert pool.select() is backup
+
+    primary.breaker = CircuitBreaker()
+    assert pool.select() is primary
+
+
+async def test_hedged_call_shares_idempotency_key():
+    inner = FakeProvider("turnstile", delays=[1, 0])
+    provider = ResilientCaptchaProvider(inner, hedge=True, hedge_delay=0.05)
+
+    result = await provider.verify("response")
+    assert result.success
+    assert provider.hedged_calls == 1
+    assert len(inner.keys) == 2 and inner.keys[0] == inner.keys[1] is not None
+
+
+@pytest.fixture
+def chain(monkeypatch):
+    pool = _pool("hcaptcha", "pow")
+    monkeypatch.setattr(verification, "get_captcha_provider", lambda name=None: pool.get(name) if name else pool.select())
+    return pool
+
+
+def test_rendered_provider_only(chain):
+    primary, backup = chain.providers
+    assert verification._rendered_provider("hcaptcha", "hcaptcha") is primary
+    assert verification._rendered_provider(None, "hcaptcha") is primary
+    with pytest.raises(ValueError):
+        verification._rendered_provider("pow", "hcaptcha")
+    with pytest.raises(ValueError):
+        verification._rendered_provider("pow", None)
+
+
+def test_other_provider_after_failover(chain):
+    primary, backup = chain.providers
+    _trip(primary)
+    assert verification._rendered_provider("pow", "hcaptcha") is backup
+    # Still accepted from pages rendered before the failover
+    assert verification._rendered_provider("hcaptcha", "hcaptcha") is primary
+
+
+async def test_verify_rejects_unrendered_provider(chain, monkeypatch):
+    async def get_verification_session(token):
+        return SimpleNamespace(user_id=1, is_expired=False, captcha_completed=False, captcha_provider="hcaptcha")
+
+    monkeypatch.setattr(verification, "check_client_ip", lambda client_ip: None)
+    monkeypatch.setattr(verification, "get_verification_session", get_verification_session)
+
+    app = FastAPI()
+    app.include_router(verification.router, prefix="/api/v1")
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post(
+            "/api/v1/verify",
+            json={"token": "token", "captcha_response": "anything", "provider": "pow"}
+        )
+
+    assert response.status_code == 400
+    assert chain.providers[1].provider.keys == []
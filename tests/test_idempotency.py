@@ -0,0 +1,134 @@
+"""Idempotency-Key: retries replay the first successful response instead of creating rows again."""
+
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.api.dependencies import get_api_client
+from src.api.routes import external
+from src.api.services import idempotency
+from src.api.services.idempotency import IdempotencyKeyReusedError, IdempotencyStore, request_hash
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def records(monkeypatch):
+    """The idempotency_keys table: first response stored per (client, key) wins."""
+    table = {}
+
+    async def get_idempotency_record(api_client, key):
+        return table.get((api_client, key), {})
+
+    async def save_idempotency_record(api_client, key, fingerprint, response, expires_at):
+        return table.setdefault((api_client, key), {
+            "request_hash": fingerprint,
+            "response": response,
+            "expires_at": expires_at
+        })
+
+    monkeypatch.setattr(idempotency, "get_idempotency_record", get_idempotency_record)
+    monkeypatch.setattr(idempotency, "save_idempotency_record", save_idempotency_record)
+    return table
+
+
+class Handler:
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return {"token": f"token-{self.calls}"}
+
+
+async def test_retry_replays_the_response(records):
+    store = IdempotencyStore(maxsize=100, ttl=3600)
+    handler = Handler()
+    fingerprint = request_hash("/verification/create", {"user_id": 1})
+
+    first = await store.run("acme", "key-1", fingerprint, handler)
+    retry = await store.run("acme", "key-1", fingerprint, handler)
+    assert first == ({"token": "token-1"}, False)
+    assert retry == ({"token": "token-1"}, True)
+
+    # Keys are per client
+    assert await store.run("other", "key-1", fingerprint, handler) == ({"token": "token-2"}, False)
+
+
+async def test_concurrent_retries_run_once(records):
+    store = IdempotencyStore(maxsize=100, ttl=3600)
+    handler = Handler()
+    results = await asyncio.gather(*(store.run("acme", "key-1", "hash", handler) for _ in range(5)))
+
+    assert handler.calls == 1
+    assert sorted(replayed for _, replayed in results) == [False, True, True, True, True]
+
+
+async def test_key_reused_for_another_request(records):
+    store = IdempotencyStore(maxsize=100, ttl=3600)
+    await store.run("acme", "key-1", request_hash("/verification/create", {"user_id": 1}), Handler())
+
+    with pytest.raises(IdempotencyKeyReusedError):
+        await store.run("acme", "key-1", request_hash("/verification/create", {"user_id": 2}), Handler())
+
+
+async def test_failed_call_can_be_retried(records):
+    store = IdempotencyStore(maxsize=100, ttl=3600)
+
+    async def failing():
+        raise RuntimeError("database down")
+
+    with pytest.raises(RuntimeError):
+        await store.run("acme", "key-1", "hash", failing)
+    assert await store.run("acme", "key-1", "hash", Handler()) == ({"token": "token-1"}, False)
+
+
+async def test_response_stored_by_another_instance_wins(records):
+    store = IdempotencyStore(maxsize=100, ttl=3600)
+    handler = Handler()
+
+    async def racing_handler():
+        # Another instance finishes the same call first
+        records[("acme", "key-1")] = {
+            "request_hash": "hash",
+            "response": json.dumps({"token": "theirs"}),
+            "expires_at": datetime.utcnow() + timedelta(hours=1)
+        }
+        return await handler()
+
+    assert await store.run("acme", "key-1", "hash", racing_handler) == ({"token": "theirs"}, True)
+
+
+def test_request_hash_ignores_key_order():
+    assert request_hash("/a", {"x": 1, "y": 2}) == request_hash("/a", {"y": 2, "x": 1})
+    assert request_hash("/a", {"x": 1}) != request_hash("/b", {"x": 1})
+
+
+async def test_create_endpoint_replays(records, monkeypatch):
+    created = []
+
+    async def create_verification(user_id, api_client):
+        created.append(user_id)
+        return external.CreateVerificationResponse(token=f"t{len(created)}", verification_url="u", expires_at="e")
+
+    monkeypatch.setattr(external, "_create_verification", create_verification)
+    monkeypatch.setattr(external, "idempotency_store", IdempotencyStore(maxsize=100, ttl=3600))
+
+    app = FastAPI()
+    app.include_router(external.router, prefix="/api")
+    app.dependency_overrides[get_api_client] = lambda: "acme"
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        headers = {"Idempotency-Key": "abc"}
+        first = await client.post("/api/verification/create", json={"user_id": 1}, headers=headers)
+        retry = await client.post("/api/verification/create", json={"user_id": 1}, headers=headers)
+        reused = await client.post("/api/verification/create", json={"user_id": 2}, headers=headers)
+
+    assert first.json() == retry.json() and created == [1]
+    assert "Idempotent-Replayed" not in first.headers
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert reused.status_code == 422
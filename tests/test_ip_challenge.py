@@ -0,0 +1,84 @@
+"""Clients on flagged networks must solve the hardened proof-of-work challenge."""
+
+import hashlib
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.api.routes import verification
+from src.api.services.ipreputation import CHALLENGE
+from src.captcha.pow import PowProvider, leading_zero_bits
+from src.captcha.resilience import ResilientCaptchaProvider
+
+pytestmark = pytest.mark.anyio
+
+
+def _solve(challenge: str) -> str:
+    difficulty = int(challenge.split(".")[2])
+    counter = 0
+    while leading_zero_bits(hashlib.sha256(f"{challenge}:{counter}".encode()).digest()) < difficulty:
+        counter += 1
+    return f"{challenge}:{counter}"
+
+
+@pytest.fixture
+def flagged(monkeypatch):
+    """A flagged client and a PoW provider with cheap normal and hardened difficulties."""
+    provider = ResilientCaptchaProvider(PowProvider("secret", difficulty=4, max_difficulty=8))
+    completed = []
+
+    async def get_verification_session(token):
+        return SimpleNamespace(user_id=1, is_expired=False, captcha_completed=False)
+
+    async def complete_verification(**kwargs):
+        completed.append(kwargs["token"])
+        return False  # Stop here: the challenge check has been passed
+
+    monkeypatch.setattr(verification, "check_client_ip", lambda client_ip: CHALLENGE)
+    monkeypatch.setattr(verification, "get_captcha_provider", lambda name=None: provider)
+    monkeypatch.setattr(verification, "get_challenge_provider", lambda: provider)
+    monkeypatch.setattr(verification, "get_verification_session", get_verification_session)
+    monkeypatch.setattr(verification, "complete_verification", complete_verification)
+    return SimpleNamespace(pow=provider.provider, completed=completed)
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(verification.router, prefix="/api/v1")
+    return app
+
+
+async def _post_verify(token: str, captcha_response: str) -> httpx.Response:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=_app()), base_url="http://test") as client:
+        return await client.post(
+            "/api/v1/verify",
+            json={"token": token, "captcha_response": captcha_response, "provider": "pow"}
+        )
+
+
+async def test_captcha_config_issues_hardened_challenge(flagged):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=_app()), base_url="http://test") as client:
+        response = await client.get("/api/v1/captcha-config")
+
+    assert response.status_code == 200
+    assert response.json()["captcha"]["difficulty"] == 8
+
+
+async def test_easy_solution_from_flagged_ip_is_rejected(flagged):
+    easy_challenge = flagged.pow.issue_challenge()
+    assert int(easy_challenge.split(".")[2]) < 8
+
+    response = await _post_verify("easy-token", _solve(easy_challenge))
+
+    assert response.status_code == 403
+    assert flagged.completed == []
+
+
+async def test_hardened_solution_from_flagged_ip_is_accepted(flagged):
+    hard_challenge = flagged.pow.issue_challenge(hardened=True)
+
+    await _post_verify("hard-token", _solve(hard_challenge))
+
+    assert flagged.completed == ["hard-token"]
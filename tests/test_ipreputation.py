@@ -0,0 +1,68 @@
+"""IP reputation lists compile into a memory-mapped index with one binary search per lookup."""
+
+import os
+
+import pytest
+
+from src.ipreputation.compiler import compile_database, flatten, parse_range
+from src.ipreputation.index import IPReputation, IPReputationIndex
+
+
+def test_flatten_resolves_overlaps_by_rank():
+    ranges = [(0, 99, 1), (50, 60, 0), (100, 150, 1), (200, 210, 2)]
+    assert flatten(ranges) == [(0, 49, 1), (50, 60, 0), (61, 150, 1), (200, 210, 2)]
+    assert flatten([]) == []
+
+
+def test_parse_range():
+    assert parse_range("10.0.0.0/8") == (4, 0x0A000000, 0x0AFFFFFF)
+    assert parse_range("10.0.0.1-10.0.0.5") == (4, 0x0A000001, 0x0A000005)
+    assert parse_range("192.0.2.7") == (4, 0xC0000207, 0xC0000207)
+    with pytest.raises(ValueError):
+        parse_range("not-an-address")
+
+
+@pytest.fixture
+def database(tmp_path):
+    (tmp_path / "tor.txt").write_text("# exit nodes\n198.51.100.7\n2001:db8:1::/48\n")
+    (tmp_path / "hosting.txt").write_text("198.51.100.0/24 example-cloud\n203.0.113.0-203.0.113.127\n")
+    path = tmp_path / "db" / "ipreputation.bin"
+    counts = compile_database(path, [("tor", tmp_path / "tor.txt"), ("hosting", tmp_path / "hosting.txt")])
+    return path, counts
+
+
+def test_lookup(database):
+    path, counts = database
+    assert counts == {"ipv4": 4, "ipv6": 1}
+
+    index = IPReputationIndex(str(path))
+    try:
+        assert index.categories == ["tor", "hosting"]
+        assert index.lookup("198.51.100.7") == "tor"  # Earlier category wins the overlap
+        assert index.lookup("198.51.100.8") == "hosting"
+        assert index.lookup("203.0.113.127") == "hosting"
+        assert index.lookup("203.0.113.128") is None
+        assert index.lookup("2001:db8:1:ffff::1") == "tor"
+        assert index.lookup("2001:db8:2::1") is None
+        assert index.lookup("garbage") is None
+    finally:
+        index.close()
+
+
+def test_reloads_when_the_file_is_replaced(database, tmp_path):
+    path, _ = database
+    reputation = IPReputation(str(path), check_interval=0)
+    assert reputation.lookup("192.0.2.1") is None
+
+    (tmp_path / "vpn.txt").write_text("192.0.2.0/24\n")
+    compile_database(path, [("vpn", tmp_path / "vpn.txt")])
+    os.utime(path, ns=(0, 1))  # Make sure the stamp differs on coarse clocks
+    assert reputation.lookup("192.0.2.1") == "vpn"
+    assert reputation.snapshot()["categories"] == ["vpn"]
+    reputation.close()
+
+
+def test_missing_database_serves_nothing(tmp_path):
+    reputation = IPReputation(str(tmp_path / "missing.bin"))
+    assert reputation.lookup("198.51.100.7") is None
+    assert reputation.snapshot() == {"loaded": False, "path": str(tmp_path / "missing.bin")}
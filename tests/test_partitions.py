@@ -0,0 +1,57 @@
+"""Partition retention must not drop history the archiver has not exported yet."""
+
+from datetime import date
+
+import pytest
+
+from src.database.partitions import add_months, drop_partitions_before, partition_name
+
+pytestmark = pytest.mark.anyio
+
+
+class _Result:
+    def __init__(self, rows=(), scalar=None):
+        self._rows = list(rows)
+        self._scalar = scalar
+
+    def all(self):
+        return self._rows
+
+    def scalar(self):
+        return self._scalar
+
+
+class FakeSession:
+    """Answers the partition listing and emptiness queries; records everything else."""
+
+    def __init__(self, table, months, non_empty):
+        self.partitions = [partition_name(table, month) for month in months]
+        self.non_empty = set(non_empty)
+        self.statements = []
+
+    async def execute(self, statement, params=None):
+        sql = str(statement)
+        if "pg_inherits" in sql:
+            return _Result(rows=[(name,) for name in self.partitions])
+        if sql.startswith("SELECT EXISTS"):
+            return _Result(scalar=any(name in sql for name in self.non_empty))
+        self.statements.append(sql)
+        return _Result()
+
+
+def _months(first: date, count: int):
+    return [add_months(first, i) for i in range(count)]
+
+
+async def test_drops_all_expired_partitions():
+    session = FakeSession("join_requests", _months(date(2025, 1, 1), 4), non_empty={"join_requests_p2025_01"})
+    dropped = await drop_partitions_before(session, "join_requests", date(2025, 3, 1))
+    assert dropped == ["join_requests_p2025_01", "join_requests_p2025_02"]
+
+
+async def test_only_empty_keeps_partitions_with_rows():
+    session = FakeSession("join_requests", _months(date(2025, 1, 1), 4), non_empty={"join_requests_p2025_01"})
+    dropped = await drop_partitions_before(session, "join_requests", date(2025, 3, 1), only_empty=True)
+
+    assert dropped == ["join_requests_p2025_02"]
+    assert not any("join_requests_p2025_01" in sql for sql in session.statements)
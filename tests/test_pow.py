@@ -0,0 +1,107 @@
+"""Proof-of-work challenges: verification, replay, and load-driven difficulty."""
+
+import hashlib
+import itertools
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.api.routes import verification
+from src.captcha import pow
+from src.captcha.pow import PowProvider, leading_zero_bits
+
+pytestmark = pytest.mark.anyio
+
+
+def _solve(challenge: str) -> str:
+    difficulty = int(challenge.split(".")[2])
+    for counter in itertools.count():
+        if leading_zero_bits(hashlib.sha256(f"{challenge}:{counter}".encode()).digest()) >= difficulty:
+            return f"{challenge}:{counter}"
+
+
+def _provider(**kwargs) -> PowProvider:
+    options = dict(difficulty=4, max_difficulty=8, load_threshold_per_minute=2, raid_threshold_per_minute=8)
+    options.update(kwargs)
+    return PowProvider("secret", **options)
+
+
+async def test_solution_accepted_once():
+    provider = _provider()
+    solution = _solve(provider.issue_challenge())
+
+    result = await provider.verify(solution)
+    assert result.success and result.extra_data == {"difficulty": 4}
+    assert (await provider.verify(solution)).error_code == "timeout-or-duplicate"
+
+
+async def test_rejects_forged_expired_and_weak_solutions(monkeypatch):
+    provider = _provider()
+    nonce, expires_at, difficulty, signature = provider.issue_challenge().split(".")
+
+    forged = f"{nonce}.{expires_at}.0.{signature}"
+    assert (await provider.verify(f"{forged}:0")).error_code == "invalid-input-response"
+    assert (await provider.verify("garbage")).error_code == "invalid-input-response"
+
+    challenge = f"{nonce}.{expires_at}.{difficulty}.{signature}"
+    weak = next(
+        f"{challenge}:{counter}" for counter in itertools.count()
+        if leading_zero_bits(hashlib.sha256(f"{challenge}:{counter}".encode()).digest()) < 4
+    )
+    assert (await provider.verify(weak)).error_code == "invalid-solution"
+
+    solution = _solve(challenge)
+    monkeypatch.setattr(pow.time, "time", lambda: int(expires_at) + 1)
+    assert (await provider.verify(solution)).error_code == "challenge-expired"
+
+
+def test_difficulty_follows_sessions_not_issuance():
+    provider = _provider()
+    for _ in range(100):
+        provider.issue_challenge()
+    assert provider.current_difficulty() == 4
+
+    for _ in range(10):
+        provider.record_session("same-token")  # Reloads count once
+    assert provider.session_rate() == 1
+
+    for i in range(3):
+        provider.record_session(f"token-{i}")
+    assert provider.current_difficulty() == 5  # 4 sessions a minute: one doubling over the threshold
+
+    for i in range(3, 10):
+        provider.record_session(f"token-{i}")
+    assert provider.current_difficulty() == 8  # Raid
+
+
+def test_hardened_and_raid_mode():
+    assert int(_provider().issue_challenge(hardened=True).split(".")[2]) == 8
+    assert _provider(raid_mode=True).current_difficulty() == 8
+
+
+@pytest.fixture
+def config_client(monkeypatch):
+    provider = _provider()
+    live_tokens = {"live"}
+
+    async def set_session_captcha_provider(token, provider_name):
+        return token in live_tokens
+
+    monkeypatch.setattr(verification, "check_client_ip", lambda client_ip: None)
+    monkeypatch.setattr(verification, "get_captcha_provider", lambda name=None: provider)
+    monkeypatch.setattr(verification, "set_session_captcha_provider", set_session_captcha_provider)
+
+    app = FastAPI()
+    app.include_router(verification.router, prefix="/api/v1")
+    return provider, httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+async def test_captcha_config_counts_live_sessions_only(config_client):
+    provider, client = config_client
+    async with client:
+        for params in ({}, {"token": "unknown"}, {"token": "live"}, {"token": "live"}):
+            response = await client.get("/api/v1/captcha-config", params=params)
+            assert response.json()["provider"] == "pow"
+
+    assert provider.session_rate() == 1
@@ -0,0 +1,82 @@
+"""Sliding window counter: window rollover, weighting of the previous window and Retry-After."""
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.api import ratelimit
+from src.api.ratelimit import MemoryRateLimitStore, RateLimitMiddleware, _route_key_types, retry_after
+from src.config.settings import RateLimitConfig
+
+pytestmark = pytest.mark.anyio
+
+
+class Clock:
+    def __init__(self):
+        self.now = 6000.0  # Start of a 60 second window
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ratelimit, "time", clock)
+    return clock
+
+
+async def test_memory_store_rolls_windows(clock):
+    store = MemoryRateLimitStore(100)
+    assert await store.hit("ip:a", 60) == (1, 0, 0.0)
+    clock.now += 10
+    assert await store.hit("ip:a", 60) == (2, 0, 10.0)
+
+    clock.now += 60  # Next window: the old count becomes the previous one
+    assert await store.hit("ip:a", 60) == (1, 2, 10.0)
+
+    clock.now += 120  # Two windows later: nothing carries over
+    assert await store.hit("ip:a", 60) == (1, 0, 10.0)
+    assert await store.hit("ip:b", 60) == (1, 0, 10.0)
+
+
+def test_retry_after():
+    # Current window alone is full: wait out the rest of it, then for the decay
+    assert retry_after(current=10, previous=0, elapsed=30, window=60, limit=10) == 36
+    # The previous window's weight must decay below the remaining room
+    assert retry_after(current=5, previous=10, elapsed=30, window=60, limit=10) == 6
+    assert retry_after(current=1, previous=10, elapsed=59, window=60, limit=10) == 1  # Never below one second
+
+
+async def test_previous_window_is_weighted(clock):
+    app = FastAPI()
+
+    @app.get("/verify")
+    async def verify():
+        return {}
+
+    limited = RateLimitMiddleware(
+        app, RateLimitConfig(enable=True, ip_limit=4, token_limit=1000), store=MemoryRateLimitStore(100)
+    )
+    transport = httpx.ASGITransport(app=limited, client=("1.1.1.1", 40000))
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        statuses = [(await client.get("/verify")).status_code for _ in range(5)]
+        assert statuses == [200, 200, 200, 200, 429]
+
+        # Half into the next window, the 5 earlier requests still weigh 2.5
+        clock.now += 90
+        statuses = [(await client.get("/verify")).status_code for _ in range(2)]
+        assert statuses == [200, 429]
+        response = await client.get("/verify")
+        assert response.status_code == 429 and int(response.headers["Retry-After"]) >= 1
+
+
+def test_route_key_types():
+    assert _route_key_types("POST", "/api/v1/verify") == ("ip", "token")
+    assert _route_key_types("GET", "/api/v1/verification-events") == ("ip",)
+    assert _route_key_types("GET", "/api/verification/abc") == ("api_key",)
+    assert _route_key_types("GET", "/health") == ()
@@ -0,0 +1,92 @@
+"""/verify submissions are deduplicated per (token, captcha response)."""
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from src.api.services.replay import ResponseReusedError, VerifyReplayCache
+from src.captcha.base import CaptchaVerificationResult
+
+pytestmark = pytest.mark.anyio
+
+
+class Handler:
+    """Counts calls and returns or raises a scripted outcome after a tick."""
+
+    def __init__(self, outcome="verified"):
+        self.outcome = outcome
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        return self.outcome
+
+
+async def test_duplicate_gets_the_earlier_outcome():
+    cache = VerifyReplayCache(maxsize=100, ttl=60)
+    handler = Handler()
+
+    assert await cache.run("token", "response", handler) == "verified"
+    assert await cache.run("token", "response", handler) == "verified"
+    assert handler.calls == 1
+
+
+async def test_concurrent_duplicates_share_one_attempt():
+    cache = VerifyReplayCache(maxsize=100, ttl=60)
+    handler = Handler()
+
+    results = await asyncio.gather(*(cache.run("token", "response", handler) for _ in range(5)))
+    assert results == ["verified"] * 5
+    assert handler.calls == 1
+
+
+async def test_client_errors_replay_server_errors_retry():
+    cache = VerifyReplayCache(maxsize=100, ttl=60)
+
+    rejected = Handler(HTTPException(status_code=400, detail="验证失败"))
+    for _ in range(2):
+        with pytest.raises(HTTPException) as error:
+            await cache.run("token", "bad-response", rejected)
+        assert error.value.status_code == 400
+    assert rejected.calls == 1
+
+    failing = Handler(HTTPException(status_code=500, detail="服务器错误"))
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            await cache.run("token", "response", failing)
+    assert failing.calls == 2
+
+
+async def test_response_reused_for_another_token():
+    cache = VerifyReplayCache(maxsize=100, ttl=60)
+    await cache.run("token-a", "response", Handler())
+
+    with pytest.raises(ResponseReusedError):
+        await cache.run("token-b", "response", Handler())
+
+
+async def test_client_disconnect_does_not_abort_the_attempt():
+    cache = VerifyReplayCache(maxsize=100, ttl=60)
+    handler = Handler()
+
+    submission = asyncio.ensure_future(cache.run("token", "response", handler))
+    await asyncio.sleep(0)
+    submission.cancel()
+    await asyncio.sleep(0.05)
+
+    assert await cache.run("token", "response", handler) == "verified"
+    assert handler.calls == 1
+
+
+def test_only_successful_captcha_checks_are_remembered():
+    cache = VerifyReplayCache(maxsize=100, ttl=60)
+    cache.store_captcha_result("token", "failed", CaptchaVerificationResult(success=False))
+    cache.store_captcha_result("token", "solved", CaptchaVerificationResult(success=True))
+
+    assert cache.get_captcha_result("token", "failed") is None
+    assert cache.get_captcha_result("token", "solved").success
+    assert cache.get_captcha_result("other-token", "solved") is None
@@ -0,0 +1,168 @@
+"""Circuit breaker states, late outcomes and adaptive timeouts of captcha providers."""
+
+import asyncio
+
+import pytest
+
+from src.captcha import resilience
+from src.captcha.base import CaptchaProvider, CaptchaVerificationResult
+from src.captcha.resilience import CircuitBreaker, LatencyTracker, ResilientCaptchaProvider
+
+pytestmark = pytest.mark.anyio
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(resilience, "time", clock)
+    return clock
+
+
+def _breaker(**kwargs) -> CircuitBreaker:
+    options = dict(failure_rate_threshold=0.5, min_requests=4, window_seconds=60, open_seconds=30, half_open_max_calls=2)
+    options.update(kwargs)
+    return CircuitBreaker(**options)
+
+
+def _trip(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.min_requests):
+        breaker.record_failure(breaker.allow_request())
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_opens_on_failure_rate(clock):
+    breaker = _breaker()
+    for succeeded in (True, False, True):
+        ticket = breaker.allow_request()
+        breaker.record_success(ticket) if succeeded else breaker.record_failure(ticket)
+    assert breaker.state == CircuitBreaker.CLOSED  # below min_requests
+
+    breaker.record_failure(breaker.allow_request())
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.allow_request() is None
+
+
+def test_half_open_probes_then_closes(clock):
+    breaker = _breaker()
+    _trip(breaker)
+
+    clock.now += 30
+    trials = [breaker.allow_request(), breaker.allow_request()]
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert None not in trials and breaker.allow_request() is None
+
+    for ticket in trials:
+        breaker.record_success(ticket)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_failure_reopens(clock):
+    breaker = _breaker()
+    _trip(breaker)
+    clock.now += 30
+
+    breaker.record_failure(breaker.allow_request())
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.opened_at == clock.now
+
+
+def test_call_admitted_while_closed_finishing_half_open(clock):
+    breaker = _breaker()
+    late = breaker.allow_request()  # Admitted while closed, finishes much later
+    _trip(breaker)
+
+    clock.now += 30
+    trials = [breaker.allow_request(), breaker.allow_request()]
+
+    # The late call must not free a trial slot or count as a probe
+    breaker.record_success(late)
+    assert breaker.allow_request() is None
+    breaker.record_failure(late)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    breaker.record_success(trials[0])
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.record_success(trials[1])
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_trial_of_earlier_half_open_period_is_ignored(clock):
+    breaker = _breaker(half_open_max_calls=1)
+    _trip(breaker)
+
+    clock.now += 30
+    stale_trial = breaker.allow_request()
+    breaker.release(stale_trial)
+    failing_trial = breaker.allow_request()
+    breaker.record_failure(failing_trial)  # Re-opens
+
+    clock.now += 30
+    trial = breaker.allow_request()
+    breaker.release(stale_trial)
+    breaker.record_success(stale_trial)
+    assert breaker.allow_request() is None  # The slot is still taken by the current trial
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    breaker.record_success(trial)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_latency_percentiles():
+    tracker = LatencyTracker(window=100)
+    for ms in range(1, 101):
+        tracker.record(ms / 1000)
+    assert tracker.percentile(0.5) == 0.05
+    assert tracker.percentile(0.99) == 0.099
+
+
+class SlowProvider(CaptchaProvider):
+    """Answers after a set delay."""
+
+    def __init__(self, delay: float, timeout: float = 5):
+        super().__init__("site", "secret", timeout=timeout)
+        self.delay = delay
+
+    @property
+    def provider_name(self) -> str:
+        return "slow"
+
+    async def verify(self, response, remote_ip=None, user_agent=None):
+        await asyncio.sleep(self.delay)
+        return CaptchaVerificationResult(success=True)
+
+    def get_frontend_config(self, hardened=False):
+        return {}
+
+
+def test_adaptive_timeout_follows_p99():
+    provider = ResilientCaptchaProvider(SlowProvider(0, timeout=10), min_timeout=0.5, timeout_multiplier=3)
+    assert provider.current_timeout() == 10  # Too few samples yet
+
+    for _ in range(ResilientCaptchaProvider.MIN_ADAPTIVE_SAMPLES):
+        provider.latency.record(1.0)
+    assert provider.current_timeout() == 3.0
+
+    provider.latency = LatencyTracker()
+    for _ in range(ResilientCaptchaProvider.MIN_ADAPTIVE_SAMPLES):
+        provider.latency.record(0.01)
+    assert provider.current_timeout() == 0.5
+
+
+async def test_timeouts_open_the_breaker():
+    provider = ResilientCaptchaProvider(
+        SlowProvider(1, timeout=0.01),
+        breaker=CircuitBreaker(min_requests=2, failure_rate_threshold=0.5),
+        adaptive_timeout=False
+    )
+    assert (await provider.verify("r")).error_code == "timeout"
+    assert (await provider.verify("r")).error_code == "timeout"
+    assert provider.breaker.state == CircuitBreaker.OPEN
+    assert (await provider.verify("r")).error_code == "circuit-open"
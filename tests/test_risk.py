@@ -0,0 +1,88 @@
+"""Risk scorers decide which join requests skip the captcha."""
+
+import pytest
+
+from src.bot import risk
+from src.bot.risk import RISK_SCORERS, RiskEngine
+from src.config.settings import RiskConfig
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def history(monkeypatch):
+    """Trust history per user id, counting the lookups."""
+    histories, lookups = {}, []
+
+    async def get_user_trust_history(user_id, since):
+        lookups.append(user_id)
+        return histories.get(user_id)
+
+    monkeypatch.setattr(risk, "get_user_trust_history", get_user_trust_history)
+    return histories, lookups
+
+
+def _engine(**kwargs) -> RiskEngine:
+    risk_config = RiskConfig(enable=True, **kwargs)
+    return RiskEngine([RISK_SCORERS[name](risk_config) for name in risk_config.scorers], risk_config)
+
+
+def _history(approvals=0, failures=0, avg_score=None, scored=0):
+    return {
+        "verified_approvals": approvals,
+        "failures": failures,
+        "avg_captcha_score": avg_score,
+        "scored_sessions": scored
+    }
+
+
+async def test_allow_list_decides_alone(history):
+    _, lookups = history
+    engine = _engine(allow_lists={"-100": [1], "*": [2]})
+
+    assert (await engine.assess(1, -100)).trusted
+    assert (await engine.assess(2, -200)).trusted
+    assert not (await engine.assess(1, -200)).trusted
+    assert lookups == [1]  # Only the request without an allow list match looked up history
+
+
+async def test_history_and_captcha_score(history):
+    histories, lookups = history
+    histories[1] = _history(approvals=9, avg_score=0.9, scored=3)
+    histories[2] = _history(approvals=3, failures=1)
+    engine = _engine()
+
+    trusted = await engine.assess(1, -100)
+    assert trusted.trusted
+    assert [signal.scorer for signal in trusted.signals] == ["history", "captcha_score"]
+    assert trusted.score == pytest.approx(5 + 1.6)  # Approvals capped at 5
+    assert lookups == [1]  # Both scorers share one query
+
+    penalized = await engine.assess(2, -100)
+    assert penalized.score == 1.0 and not penalized.trusted
+
+    unknown = await engine.assess(3, -100)
+    assert unknown.signals == [] and not unknown.trusted
+
+
+async def test_too_few_scored_sessions_are_ignored(history):
+    histories, _ = history
+    histories[1] = _history(approvals=1, avg_score=1.0, scored=1)
+
+    assessment = await _engine().assess(1, -100)
+    assert [signal.scorer for signal in assessment.signals] == ["history"]
+
+
+async def test_failing_scorer_is_skipped(monkeypatch):
+    async def get_user_trust_history(user_id, since):
+        raise RuntimeError("database down")
+
+    monkeypatch.setattr(risk, "get_user_trust_history", get_user_trust_history)
+    assessment = await _engine().assess(1, -100)
+    assert assessment.signals == [] and not assessment.trusted
+
+
+def test_unknown_scorer_is_rejected(monkeypatch):
+    monkeypatch.setattr(risk.config, "risk", RiskConfig(enable=True, scorers=["history", "geoip"]))
+    with pytest.raises(ValueError):
+        risk.create_risk_engine()
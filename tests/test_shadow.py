@@ -0,0 +1,79 @@
+"""Shadow providers are evaluated alongside the primary without delaying or deciding it."""
+
+import asyncio
+
+import pytest
+
+from src.api.services import shadow
+from src.api.services.shadow import ShadowEvaluator
+from src.captcha.base import CaptchaProvider, CaptchaVerificationResult
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeProvider(CaptchaProvider):
+    def __init__(self, name: str, success: bool, delay: float = 0):
+        super().__init__("site", "secret")
+        self.name = name
+        self.success = success
+        self.delay = delay
+
+    @property
+    def provider_name(self) -> str:
+        return self.name
+
+    async def verify(self, response, remote_ip=None, user_agent=None):
+        await asyncio.sleep(self.delay)
+        return CaptchaVerificationResult(success=self.success, error_code=None if self.success else "invalid")
+
+    def get_frontend_config(self, hardened=False):
+        return {}
+
+
+@pytest.fixture
+def recorded(monkeypatch):
+    rows = []
+
+    async def record_captcha_metrics(batch):
+        rows.extend(batch)
+
+    monkeypatch.setattr(shadow, "record_captcha_metrics", record_captcha_metrics)
+    return rows
+
+
+async def test_primary_decides_without_waiting_for_shadow(recorded):
+    evaluator = ShadowEvaluator()
+    primary = FakeProvider("hcaptcha", success=True)
+    secondary = FakeProvider("turnstile", success=False, delay=0.2)
+
+    result = await asyncio.wait_for(
+        evaluator.verify(primary, "response", shadow=secondary, shadow_response="shadow-response"),
+        timeout=0.1
+    )
+    assert result.success
+    assert recorded == []
+
+    await evaluator.drain()
+    assert [(row["role"], row["success"], row["agreed"]) for row in recorded] == [
+        ("primary", True, None),
+        ("shadow", False, False),
+    ]
+    assert recorded[1]["latency_ms"] >= 200
+
+
+async def test_missing_shadow_response_is_recorded(recorded):
+    evaluator = ShadowEvaluator()
+    await evaluator.verify(FakeProvider("hcaptcha", True), "response", shadow=FakeProvider("pow", True))
+    await evaluator.drain()
+
+    assert recorded[1]["provider"] == "pow"
+    assert recorded[1]["error_code"] == "no-response"
+
+
+async def test_no_metrics_without_shadow(recorded):
+    evaluator = ShadowEvaluator()
+    result = await evaluator.verify(FakeProvider("hcaptcha", False), "response")
+    await evaluator.drain()
+
+    assert not result.success
+    assert recorded == []
@@ -0,0 +1,113 @@
+"""Long-poll and SSE status endpoints wake on completions instead of polling the database."""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.api.routes import verification
+from src.api.services.status_events import RESYNC, StatusHub
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def sessions(monkeypatch):
+    """Session status rows by token, counting the lookups."""
+    now = datetime.utcnow()
+    rows = {
+        token: {
+            "captcha_completed": False,
+            "status": "pending",
+            "created_time": now,
+            "expires_at": now + timedelta(minutes=10)
+        }
+        for token in ("a", "b")
+    }
+    lookups = []
+
+    async def get_verification_statuses(tokens, api_client=None):
+        lookups.append(list(tokens))
+        return {token: dict(rows[token]) for token in tokens if token in rows}
+
+    hub = StatusHub()
+    monkeypatch.setattr(verification, "get_verification_statuses", get_verification_statuses)
+    monkeypatch.setattr(verification, "status_hub", hub)
+    monkeypatch.setattr(verification.config.status_events, "keepalive_seconds", 0.05)
+    return rows, lookups, hub
+
+
+def _client() -> httpx.AsyncClient:
+    app = FastAPI()
+    app.include_router(verification.router, prefix="/api/v1")
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+async def _complete_later(rows, hub, token: str, delay: float = 0.05) -> None:
+    await asyncio.sleep(delay)
+    rows[token]["captcha_completed"] = True
+    hub.publish(token)
+
+
+async def test_long_poll_wakes_on_completion(sessions):
+    rows, lookups, hub = sessions
+    completing = asyncio.ensure_future(_complete_later(rows, hub, "b"))
+
+    async with _client() as client:
+        response = await client.get("/api/v1/verification-wait", params={"token": ["a", "b"], "timeout": 5})
+    await completing
+
+    entries = {entry["token"]: entry for entry in response.json()["verifications"]}
+    assert entries["b"]["completed"] and not entries["a"]["completed"]
+    assert len(lookups) == 2  # Once on arrival, once when woken
+
+
+async def test_long_poll_returns_at_once_when_nothing_can_change(sessions):
+    rows, lookups, _ = sessions
+    rows["a"]["captcha_completed"] = True
+
+    async with _client() as client:
+        done = await client.get("/api/v1/verification-wait", params={"token": "a", "timeout": 5})
+        missing = await client.get("/api/v1/verification-wait", params={"token": "unknown", "timeout": 5})
+
+    assert done.json()["verifications"][0]["completed"]
+    assert missing.json()["verifications"] == [{"token": "unknown", "found": False}]
+
+
+async def test_long_poll_times_out(sessions):
+    async with _client() as client:
+        response = await client.get("/api/v1/verification-wait", params={"token": "a", "timeout": 0.05})
+    assert not response.json()["verifications"][0]["completed"]
+
+
+async def test_event_stream(sessions):
+    rows, lookups, hub = sessions
+    events = []
+
+    async def consume():
+        async for chunk in verification._status_events(["a", "b"]):
+            events.append(chunk)
+
+    consuming = asyncio.ensure_future(consume())
+    await _complete_later(rows, hub, "a", delay=0.1)
+    await _complete_later(rows, hub, "b", delay=0.01)
+    await asyncio.wait_for(consuming, 5)
+
+    statuses = [chunk for chunk in events if chunk.startswith("event: status")]
+    assert len(statuses) == 4  # Both initial states, then both completions
+    assert ": keepalive\n\n" in events  # Idle while waiting for "a"
+    assert events[-1].startswith("event: end")
+    assert lookups == [["a", "b"], ["a", "b"], ["b"]]  # Queries on wakeups only, not keepalives
+
+
+def test_hub_subscriptions():
+    hub = StatusHub()
+    with hub.subscribe(["a", "b"]) as queue:
+        hub.publish("a")
+        hub.publish("c")
+        hub._resync({})
+        assert [queue.get_nowait(), queue.get_nowait()] == ["a", RESYNC]
+        assert queue.empty()
+    assert hub._subscribers == {}
@@ -0,0 +1,67 @@
+"""Cross-chat join throttle: sliding window counts and the open verification registry."""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.bot import throttle
+from src.bot.throttle import JoinThrottle
+from src.config.settings import ThrottleConfig
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(throttle, "time", clock)
+    return clock
+
+
+def test_sliding_window(clock):
+    join_throttle = JoinThrottle(ThrottleConfig(enable=True, window_seconds=60, max_requests=3))
+    assert [join_throttle.over_limit(1) for _ in range(4)] == [False, False, False, True]
+    assert not join_throttle.over_limit(2)  # Counted per user
+
+    clock.now += 61
+    assert not join_throttle.over_limit(1)
+
+
+def test_prune_forgets_idle_users(clock, monkeypatch):
+    monkeypatch.setattr(throttle, "PRUNE_EVERY", 3)
+    join_throttle = JoinThrottle(ThrottleConfig(enable=True, window_seconds=60))
+    join_throttle.hit(1)
+    join_throttle.set_open(1, "old", -100, datetime.utcnow() - timedelta(seconds=1))
+
+    clock.now += 61
+    join_throttle.hit(2)
+    join_throttle.hit(2)
+    assert 1 not in join_throttle._hits and 1 not in join_throttle._open
+    assert 2 in join_throttle._hits
+
+
+def test_open_verification(clock):
+    join_throttle = JoinThrottle(ThrottleConfig(enable=True, collapse=False))
+    join_throttle.set_open(1, "token", -100, datetime.utcnow() + timedelta(minutes=5))
+
+    assert join_throttle.open_verification(1) is None  # Collapsing disabled
+    assert join_throttle.open_verification(1, force=True).token == "token"
+
+    join_throttle.set_open(2, "expired", -100, datetime.utcnow() - timedelta(seconds=1))
+    assert join_throttle.open_verification(2, force=True) is None
+
+    join_throttle.clear_open(1)
+    assert join_throttle.open_verification(1, force=True) is None
+
+
+def test_lock_is_shared_per_user():
+    join_throttle = JoinThrottle(ThrottleConfig())
+    lock = join_throttle.lock(1)
+    assert join_throttle.lock(1) is lock
+    assert join_throttle.lock(2) is not lock
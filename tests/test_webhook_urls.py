@@ -0,0 +1,198 @@
+"""Webhook URLs must not reach internal services, at registration or delivery, and deliveries are signed."""
+
+import hashlib
+import hmac
+from types import SimpleNamespace
+
+import httpcore
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.api.dependencies import get_api_client
+from src.api.routes import external
+from src.api.services import webhooks
+from src.api.services.webhooks import (
+    PinnedTransport,
+    UnsafeWebhookURLError,
+    WebhookDispatcher,
+    check_webhook_url,
+    retry_delay,
+    sign_payload
+)
+from src.config.settings import WebhookConfig
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def dns(monkeypatch):
+    """Resolve hostnames from a dict instead of DNS."""
+    records = {}
+
+    async def resolve(host, port):
+        if host not in records:
+            raise OSError("Name or service not known")
+        return records[host]
+
+    monkeypatch.setattr(webhooks, "_resolve", resolve)
+    return records
+
+
+@pytest.mark.parametrize("url", [
+    "http://hooks.example.com/tguard",  # not https
+    "https://127.0.0.1/tguard",
+    "https://[::1]/tguard",
+    "https://10.0.0.5/tguard",
+    "https://192.168.1.1:8443/tguard",
+    "https://169.254.169.254/latest/meta-data",
+    "https://[fe80::1]/tguard",
+    "https://[::ffff:127.0.0.1]/tguard",
+    "https://0.0.0.0/tguard",
+    "https://240.0.0.1/tguard",
+])
+async def test_rejected_urls(url):
+    with pytest.raises(UnsafeWebhookURLError):
+        await check_webhook_url(url)
+
+
+async def test_rejects_hostname_resolving_to_private_address(dns):
+    dns["hooks.example.com"] = ["93.184.215.14", "10.1.2.3"]
+    with pytest.raises(UnsafeWebhookURLError):
+        await check_webhook_url("https://hooks.example.com/tguard")
+
+
+async def test_rejects_unresolvable_hostname(dns):
+    with pytest.raises(UnsafeWebhookURLError):
+        await check_webhook_url("https://nowhere.example.com/tguard")
+
+
+async def test_accepts_public_https_url(dns):
+    dns["hooks.example.com"] = ["93.184.215.14", "2606:2800:21f:cb07:6820:80da:af6b:8b2c"]
+    await check_webhook_url("https://hooks.example.com/tguard")
+
+
+async def test_register_rejects_internal_url(monkeypatch):
+    created = []
+
+    async def get_webhooks(api_client):
+        return []
+
+    async def create_webhook(api_client, url, secret):
+        created.append(url)
+
+    monkeypatch.setattr(external.config, "webhooks", WebhookConfig(enable=True))
+    monkeypatch.setattr(external, "get_webhooks", get_webhooks)
+    monkeypatch.setattr(external, "create_webhook", create_webhook)
+
+    app = FastAPI()
+    app.include_router(external.router, prefix="/api")
+    app.dependency_overrides[get_api_client] = lambda: "default"
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post("/api/webhooks", json={"url": "https://169.254.169.254/latest"})
+
+    assert response.status_code == 400
+    assert created == []
+
+
+async def test_delivery_rechecks_url(dns):
+    # The host passed the registration check, then was re-pointed at loopback
+    dns["hooks.example.com"] = ["127.0.0.1"]
+    posted = []
+
+    async def post(url, **kwargs):
+        posted.append(url)
+
+    dispatcher = WebhookDispatcher(WebhookConfig(max_attempts=1))
+    dispatcher._client = SimpleNamespace(post=post)
+    result = await dispatcher._deliver({
+        'id': 1,
+        'url': "https://hooks.example.com/tguard",
+        'secret': "secret",
+        'event': "verification.completed",
+        'payload': "{}",
+        'attempts': 1
+    })
+
+    assert posted == []
+    assert result['status'] == "failed"
+    assert "UnsafeWebhookURLError" in result['last_error']
+
+
+class FakeStream(httpcore.AsyncNetworkStream):
+    """Answers any HTTP/1.1 request with an empty 204."""
+
+    def __init__(self):
+        self.sent = b""
+        self._response = b"HTTP/1.1 204 No Content\r\nContent-Length: 0\r\n\r\n"
+
+    async def read(self, max_bytes, timeout=None):
+        response, self._response = self._response, b""
+        return response
+
+    async def write(self, buffer, timeout=None):
+        self.sent += buffer
+
+    async def aclose(self):
+        pass
+
+
+class FakeBackend(httpcore.AsyncNetworkBackend):
+    """Records the addresses connections are opened to."""
+
+    def __init__(self, refused=()):
+        self.connected = []
+        self.streams = []
+        self.refused = set(refused)
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        self.connected.append((host, port))
+        if host in self.refused:
+            raise httpcore.ConnectError("connection refused")
+        self.streams.append(FakeStream())
+        return self.streams[-1]
+
+    async def sleep(self, seconds):
+        pass
+
+
+async def test_connects_to_the_checked_address(dns):
+    dns["hooks.example.com"] = ["93.184.215.14", "93.184.215.15"]
+    backend = FakeBackend(refused={"93.184.215.14"})
+
+    async with httpx.AsyncClient(transport=PinnedTransport(httpx.Limits(), backend=backend)) as client:
+        response = await client.post("http://hooks.example.com:8080/tguard", content=b"{}")
+
+    assert response.status_code == 204
+    assert backend.connected == [("93.184.215.14", 8080), ("93.184.215.15", 8080)]
+    assert b"Host: hooks.example.com:8080" in backend.streams[0].sent
+
+
+async def test_host_re_pointed_after_the_check_is_not_connected(dns):
+    dns["hooks.example.com"] = ["93.184.215.14"]
+    await check_webhook_url("https://hooks.example.com/tguard")
+
+    # DNS rebinding: the same name now answers with an internal address
+    dns["hooks.example.com"] = ["169.254.169.254"]
+    backend = FakeBackend()
+    async with httpx.AsyncClient(transport=PinnedTransport(httpx.Limits(), backend=backend)) as client:
+        with pytest.raises(UnsafeWebhookURLError):
+            await client.post("https://hooks.example.com/tguard", content=b"{}")
+
+    assert backend.connected == []
+
+
+def test_signature_verifies_with_the_documented_scheme():
+    body = b'{"event": "verification.completed"}'
+    signature = sign_payload("secret", 1700000000, body)
+
+    expected = hmac.new(b"secret", b"1700000000." + body, hashlib.sha256).hexdigest()
+    assert signature == f"sha256={expected}"
+    assert sign_payload("secret", 1700000001, body) != signature
+
+
+def test_retry_delay_backs_off_with_jitter():
+    webhook_config = WebhookConfig(backoff_base_seconds=10, backoff_max_seconds=100)
+    assert 5 <= retry_delay(1, webhook_config) <= 10
+    assert 20 <= retry_delay(3, webhook_config) <= 40
+    assert 50 <= retry_delay(10, webhook_config) <= 100